@@ -19,6 +19,12 @@ function getEventImageUrl(imageUrl: string | null | undefined, id: number): stri
   if (imageUrl && imageUrl.trim() !== '') {
     // Local parsed image (e.g. "parsed_images/abc123.jpg") → serve from public/
     if (imageUrl.startsWith('parsed_images/')) {
+      // Stored image "parsed_images/ab/<sha256>.jpg" → its 640px WebP rendition (see services/image_variants.py);
+      // EventCard falls back to the original if the rendition is missing
+      const stored = imageUrl.match(/^(parsed_images\/[0-9a-f]{2}\/[0-9a-f]{64})\.\w+$/);
+      if (stored) {
+        return `/${stored[1]}.card.webp`;
+      }
       return `/${imageUrl}`;
     }
     // Already a full URL
@@ -134,6 +140,7 @@ function App() {
             country: dbEvent.country || 'Unknown',
             description: dbEvent.description || '',
             imageUrl: getEventImageUrl(dbEvent.image_url, dbEvent.id),
+            originalImageUrl: dbEvent.image_url?.startsWith('parsed_images/') ? `/${dbEvent.image_url}` : undefined,
             industry: dbEvent.industry || 'General',
             url: dbEvent.url,
             place: dbEvent.place,
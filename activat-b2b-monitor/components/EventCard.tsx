@@ -16,6 +16,11 @@ export const EventCard: React.FC<EventCardProps> = ({ event, onFeedback, onClick
   const langCode = getLanguageCode(language);
   
   const handleImageError = () => {
+    if (imageSrc.endsWith('.card.webp') && event.originalImageUrl) {
+      // Rendition not made yet — show the original
+      setImageSrc(event.originalImageUrl);
+      return;
+    }
     if (!imageError) {
       setImageError(true);
       // Fallback to Picsum Photos if the image fails to load
@@ -13,7 +13,7 @@ interface EventDetailProps {
 
 export const EventDetail: React.FC<EventDetailProps> = ({ event, onClose, onSave, language = 'English' }) => {
   const [imageError, setImageError] = React.useState(false);
-  const [imageSrc, setImageSrc] = React.useState(event.imageUrl);
+  const [imageSrc, setImageSrc] = React.useState(event.originalImageUrl || event.imageUrl);
   const [isShareOpen, setIsShareOpen] = React.useState(false);
   const langCode = getLanguageCode(language);
   const translate = (key: string) => t(key, langCode);
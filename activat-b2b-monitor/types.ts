@@ -9,6 +9,8 @@ export interface Event {
   country: string;
   description: string;
   imageUrl: string;
+  // Full-size image when imageUrl is a smaller rendition
+  originalImageUrl?: string;
   industry: string;
   url?: string;
   place?: string;
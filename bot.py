@@ -5,6 +5,7 @@ from config import API_KEY
 from database.engine import init_db
 from handlers import start, feedback, settings, admin, events
 from services.scheduler import start_scheduler, run_parsing_cycle
+from services.crawler import close_crawler_state
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,7 +34,11 @@ async def main():
     start_scheduler(bot)
 
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        # Общий HTTP-клиент парсера живёт весь процесс
+        await close_crawler_state()
 
 
 if __name__ == "__main__":
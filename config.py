@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 API_KEY = os.getenv("API_KEY")
+# Telegram id администраторов через запятую: им доступны команды, меняющие данные (/gc)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").replace(" ", "").split(",") if i}
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./events_bot.db")
 
 # Ежедневное обновление выставок в 10:00 (часовой пояс бота)
@@ -11,6 +13,173 @@ DAILY_PARSING_HOUR = 10
 DAILY_PARSING_MINUTE = 0
 SCHEDULER_TIMEZONE = "Asia/Almaty"
 
+# Кэш условных запросов (ETag/Last-Modified + отпечаток) для страниц-листингов
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "http_cache")
+# Записанные ответы источников для офлайн-прогонов и бенчмарков (services/cassettes.py)
+CASSETTES_DIR = os.getenv("CASSETTES_DIR", "cassettes")
+KNOWN_FILTER_PATH = os.getenv("KNOWN_FILTER_PATH", "known_events.bloom")
+CHECKPOINTS_DIR = os.getenv("CHECKPOINTS_DIR", "checkpoints")
+HTML_ARCHIVE_DIR = os.getenv("HTML_ARCHIVE_DIR", "html_archive")
+
+# HTTP-клиент парсера: общий пул соединений и вежливость к каждому хосту
+HTTP_MAX_CONNECTIONS = 50
+HTTP_KEEPALIVE_EXPIRY = 120.0       # сколько держать простаивающее соединение
+HTTP2_ENABLED = True                # HTTP/2 там, где сервер поддерживает (нужен пакет h2)
+DNS_CACHE_TTL_SECONDS = 600
+HOST_RATE_PER_SECOND = 4.0          # token bucket: устойчивая скорость запросов на хост
+HOST_BURST = 8                      # token bucket: допустимый всплеск
+HOST_INITIAL_CONCURRENCY = 2        # AIMD: стартовое окно параллельных запросов на хост
+HOST_MAX_CONCURRENCY = 8            # AIMD: потолок окна
+HTTP_MAX_RETRIES = 3                # повторы для 429/503/5xx и сетевых ошибок
+HTTP_RETRY_BASE_DELAY = 1.0         # экспоненциальная задержка: 1, 2, 4... секунд
+HTTP_MAX_RETRY_AFTER = 120.0        # не ждать Retry-After дольше этого
+
+# Circuit breaker источников: после N подряд неудачных циклов источник пропускается,
+# пробные (half-open) запуски — через 6ч, 12ч, 24ч... но не реже раза в неделю
+CIRCUIT_FAILURE_THRESHOLD = 2
+CIRCUIT_OPEN_BASE_HOURS = 6
+CIRCUIT_OPEN_MAX_HOURS = 24 * 7
+
+# Бюджет времени на источник: по истечении парсер отменяется, уже собранные события сохраняются
+SOURCE_DEADLINE_SECONDS = 180
+SOURCE_DEADLINES = {
+    "parse_expomap": 300,  # 8 страниц стран последовательно
+}
+# Hedged-запросы листингов: дубль запроса, если ответа нет дольше p95 хоста
+HEDGE_LISTING_REQUESTS = True
+HEDGE_MIN_SAMPLES = 5
+
+# Пагинация листингов (crawl frontier): максимум страниц на источник и параллельных загрузок
+LISTING_MAX_PAGES = {
+    "exposale.net": 10,
+    "vystavki.su": 10,
+}
+FRONTIER_WORKERS = 3
+
+# Инкрементальное обнаружение по sitemap.xml (включая sitemap index и .gz):
+# детальные страницы загружаются только для новых URL или URL с изменённым <lastmod>
+SITEMAP_SOURCES = [
+    {
+        "source": "astanahub.com",
+        "sitemap_url": "https://astanahub.com/sitemap.xml",
+        "url_pattern": r"/ru/event/[^/]+/?$",
+        "country": "Казахстан",
+    },
+    {
+        "source": "vystavki.su",
+        "sitemap_url": "https://vystavki.su/sitemap.xml",
+        "url_pattern": r"vystavki\.su/(?!page/|category/|tag/|author/)[^/?#]+/?$",
+        "country": "Казахстан",
+    },
+]
+SITEMAP_MAX_PAGES_PER_CYCLE = 50    # детальных страниц на источник за цикл
+SITEMAP_MAX_DEPTH = 2               # вложенность sitemap index
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024  # предел распакованного sitemap (.gz), как в протоколе sitemaps.org
+
+# Реестр источников (services/sources.py). Имена — как у circuit breaker'ов (/sources).
+# Частота обновления, минут: источник обновляется своим таймером между ежедневными циклами.
+# Источники без записи обновляются только ежедневным полным циклом.
+SOURCE_CADENCE_MINUTES = {
+    "parse_astanahub": 60,
+    "sitemap_astanahub.com": 60,
+    "parse_iteca": 6 * 60,
+    "parse_exposale_all": 12 * 60,
+    "parse_vystavki_main": 12 * 60,
+}
+# Приоритет: меньше — раньше получает слот и раньше побеждает при дедупликации по URL
+SOURCE_PRIORITIES = {
+    "parse_iteca": 10,
+    "parse_astanahub": 10,
+    "parse_exposale_all": 20,
+    "parse_vystavki_main": 20,
+    "parse_expomap": 30,
+}
+DEFAULT_SOURCE_PRIORITY = 50
+# Зависимости: источник стартует после завершения указанных, если они в том же запуске
+SOURCE_DEPENDENCIES = {
+    # sitemap добирает то, чего нет в листинге — листинг отрабатывает первым и его записи приоритетнее
+    "sitemap_astanahub.com": ["parse_astanahub"],
+    "sitemap_vystavki.su": ["parse_vystavki_main"],
+}
+MAX_CONCURRENT_SOURCES = 8
+# Бюджет обхода (services/crawl_budget.py): после каждого цикла источник получает оценку по числу
+# новых событий за запуск (относительно медианы источников), доле 👍 и исключениям пользователей.
+# Слабые источники обходятся реже (до CRAWL_BUDGET_MAX_SLOWDOWN раз), у сильных больше страниц
+# пагинации/sitemap и детальных страниц; источник, исключённый всеми активными пользователями, —
+# раз в CRAWL_BUDGET_EXCLUDED_DAYS дней (0 — не обходится)
+CRAWL_BUDGET_ENABLED = True
+CRAWL_BUDGET_DAYS = 30              # окно истории crawl_runs (замедленный в 7 раз источник успевает набрать CRAWL_BUDGET_MIN_RUNS)
+CRAWL_BUDGET_FEEDBACK_DAYS = 60     # окно отзывов 👍/👎
+CRAWL_BUDGET_MIN_RUNS = 3           # меньше запусков в окне — нейтральная оценка 1
+CRAWL_BUDGET_MAX_SLOWDOWN = 7
+CRAWL_BUDGET_PAGE_FACTOR = (0.5, 2.0)   # множитель LISTING_MAX_PAGES / SITEMAP_MAX_PAGES_PER_CYCLE
+CRAWL_BUDGET_DETAIL_PAGES = 40      # детальных страниц за цикл у источника с оценкой 1 (масштабируется 0.25–3×)
+CRAWL_BUDGET_EXCLUDED_DAYS = 7
+# Сколько ждать, чтобы источники, сработавшие одновременно, ушли одним циклом
+SOURCE_REFRESH_BATCH_SECONDS = 5
+
+# Потоковый конвейер цикла (services/pipeline.py): ёмкость очередей между этапами.
+# Полная очередь притормаживает предыдущий этап (backpressure)
+PIPELINE_BATCH_QUEUE_SIZE = 4       # партии событий источников: crawl → classify → dedup
+PIPELINE_EVENT_QUEUE_SIZE = 50      # отдельные события: dedup → details → enrich → persist → notify
+PIPELINE_DETAIL_WORKERS = 8         # параллельных загрузок детальных страниц (лимиты хоста — в rate limiter)
+PIPELINE_ENRICH_WORKERS = 2         # параллельных запросов к AI
+PIPELINE_NOTIFY_BATCH = 20          # не больше событий за одну рассылку
+PIPELINE_STATS_INTERVAL = 30        # как часто логировать глубину очередей, секунд
+# Изображения скачиваются в фоне (services/images.py), не задерживая разбор листингов
+IMAGE_DOWNLOAD_WORKERS = 6
+IMAGE_HOST_CONCURRENCY = 2          # одновременных загрузок изображений с одного хоста
+IMAGE_QUEUE_SIZE = 200
+IMAGE_NOTIFY_WAIT = 15              # сколько рассылка ждёт изображения своих событий, секунд
+IMAGE_DRAIN_TIMEOUT = 120           # сколько в конце цикла ждать незавершённые загрузки, секунд
+IMAGE_MAX_BYTES = 10 * 1024 * 1024  # больше — загрузка прерывается (Telegram не принимает фото больше 10 МБ)
+IMAGE_STREAM_CHUNK = 64 * 1024      # изображения пишутся на диск блоками, целиком в памяти не держатся
+# Уменьшенные копии изображений (services/image_variants.py): имя → (наибольшая сторона, формат, качество).
+# Делаются один раз на файл хранилища
+IMAGE_VARIANTS = {
+    "telegram": (1280, "JPEG", 82),  # фото в рассылке (больше 1280 px Telegram всё равно ужимает)
+    "card": (640, "WEBP", 78),       # карточка события в веб-приложении
+    "thumb": (320, "WEBP", 72),      # миниатюра
+}
+IMAGE_VARIANT_BACKFILL = 200        # сколько старых изображений без копий обрабатывать за цикл
+# Сборка мусора в parsed_images (services/image_gc.py): удаляются файлы, на которые не ссылается БД
+IMAGE_GC_INTERVAL_HOURS = 12
+IMAGE_GC_GRACE_HOURS = 24           # файлы моложе не трогаются (загрузки, ещё не привязанные к событию)
+IMAGE_GC_BATCH = 200                # файлов за шаг; между шагами пауза, во время цикла парсинга — ожидание
+IMAGE_GC_PAUSE = 0.2
+# Контрольные точки цикла (services/checkpoints.py): сырой вывод источников и нормализованные записи
+# в checkpoints/*.jsonl.gz — для повторного прогона этапов без обхода (scripts/replay_checkpoint.py)
+CHECKPOINTS_ENABLED = True
+CHECKPOINTS_KEEP = 30               # сколько последних файлов хранить (0 — все)
+# Архив загруженных страниц (services/html_archive.py): листинги, детальные страницы и sitemap
+# в html_archive/<источник>/ со сжатием zstd — для повторного разбора исправленным парсером
+# без сети (scripts/reparse_archive.py)
+HTML_ARCHIVE_ENABLED = True
+HTML_ARCHIVE_MAX_MB = 1024          # предельный размер архива; сверх него удаляются самые старые дни (0 — без предела)
+HTML_ARCHIVE_LEVEL = 9              # уровень сжатия zstd
+HTML_ARCHIVE_DICT_SIZE = 112 * 1024 # словарь сжатия источника: разметка его страниц во многом общая
+HTML_ARCHIVE_DICT_MIN_SAMPLES = 20  # страниц источника, после которых обучается словарь
+HTML_ARCHIVE_DICT_SAMPLES = 300     # на скольких последних страницах обучается
+HTML_ARCHIVE_DICT_RETRAIN_DAYS = 30 # как часто переобучать (старые словари хранятся, пока нужны кадрам)
+# Фильтр Блума уже сохранённых событий (URL и event_hash, services/known_filter.py): известные события
+# отбрасываются сразу после обхода источника. Положительный ответ фильтра проверяется запросом к БД
+KNOWN_FILTER_CAPACITY = 50000       # минимальная ёмкость в ключах (на событие — два); при пересборке — с запасом вдвое
+KNOWN_FILTER_ERROR_RATE = 0.01      # доля ложных срабатываний (каждое стоит одного запроса к БД)
+# Детальная страница загружается для нового события, если с листинга нет даты, места,
+# изображения или описание короче этого
+DETAIL_MIN_DESCRIPTION = 120
+
+# Разбор HTML (BeautifulSoup/lxml) и дедупликация — в пуле процессов, чтобы не блокировать бота.
+# 0 — разбирать в основном процессе
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 2))
+# Теневой режим (services/shadow.py): кандидат в новую версию извлечения запускается на том же HTML,
+# что и боевой метод; его результат только сравнивается (поля, число записей, CPU) — в БД и рассылку
+# не попадает. Ключ — боевой метод EventExtractor или "spec:<имя>" для extract_with_spec,
+# значение — метод-кандидат с теми же аргументами или "spec:<имя>" из SOURCE_SPECS.
+# Пример: {"extract_iteca": "extract_iteca_v2", "spec:astanahub": "spec:astanahub_v2"}
+SHADOW_EXTRACTORS = {}
+SHADOW_DIFF_SAMPLES = 5             # примеров различий в отчёте /shadow на каждый метод
+
 # Multi-country support: CIS target countries
 COUNTRIES = [
     "Казахстан",
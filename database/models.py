@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Index, Float
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import JSON
 from sqlalchemy.orm import relationship, declarative_base
@@ -77,3 +77,93 @@ class UserEvent(Base):
 
     user = relationship("User", back_populates="sent_events")
     event = relationship("Event", back_populates="sent_to_users")
+
+
+class SourceHealth(Base):
+    """Circuit breaker state per parser source (see services/source_health.py)."""
+    __tablename__ = "source_health"
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, unique=True, nullable=False, index=True)
+    state = Column(String, nullable=False, default="closed")  # closed | open | half_open
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    last_success_at = Column(DateTime, nullable=True)
+    last_failure_at = Column(DateTime, nullable=True)
+    open_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+
+class SitemapEntry(Base):
+    """Last-seen <lastmod> per URL from source sitemaps (see services/sitemap.py)."""
+    __tablename__ = "sitemap_entries"
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, nullable=False, index=True)
+    source = Column(String, nullable=True, index=True)
+    is_sitemap = Column(Boolean, nullable=False, default=False)
+    lastmod = Column(String, nullable=True)
+    processed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ImageBlob(Base):
+    """Stored image file, addressed by the sha256 of its bytes (see services/image_store.py)."""
+    __tablename__ = "image_blobs"
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)  # число событий в event_images
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ImageSource(Base):
+    """Image URL already downloaded → its blob; such URLs are not fetched again."""
+    __tablename__ = "image_sources"
+    url = Column(String, primary_key=True)
+    sha256 = Column(String(64), ForeignKey("image_blobs.sha256"), nullable=False, index=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EventImage(Base):
+    """Event (by URL — the image can land before the event row exists) → its image blob."""
+    __tablename__ = "event_images"
+    event_url = Column(String, primary_key=True)
+    sha256 = Column(String(64), ForeignKey("image_blobs.sha256"), nullable=False, index=True)
+    linked_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CrawlRun(Base):
+    """Metrics of one source in one parsing cycle (see services/crawl_metrics.py)."""
+    __tablename__ = "crawl_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    cycle_started_at = Column(DateTime, nullable=False, index=True)
+    source = Column(String, nullable=False, index=True)
+    wall_seconds = Column(Float, nullable=False, default=0.0)
+    requests = Column(Integer, nullable=False, default=0)
+    fetch_seconds = Column(Float, nullable=False, default=0.0)  # сумма задержек запросов
+    max_fetch_seconds = Column(Float, nullable=False, default=0.0)
+    bytes_downloaded = Column(BigInteger, nullable=False, default=0)
+    status_counts = Column(JsonType, nullable=True)  # {"200": 12, "404": 1, "error": 2}
+    parse_cpu_seconds = Column(Float, nullable=False, default=0.0)
+    items_seen = Column(Integer, nullable=False, default=0)      # вернул парсер
+    items_relevant = Column(Integer, nullable=False, default=0)  # после фильтра мусора и стран
+    items_new = Column(Integer, nullable=False, default=0)       # сохранено новых после дедупликации
+    images_fetched = Column(Integer, nullable=False, default=0)
+    image_errors = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+
+
+class SourceBudget(Base):
+    """Crawl budget of a registry source, recomputed after every cycle (see services/crawl_budget.py)."""
+    __tablename__ = "source_budgets"
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String, unique=True, nullable=False, index=True)
+    score = Column(Float, nullable=False, default=1.0)  # 1 — типичный источник
+    runs = Column(Integer, nullable=False, default=0)   # запусков в окне CRAWL_BUDGET_DAYS
+    avg_new = Column(Float, nullable=False, default=0.0)
+    acceptance = Column(Float, nullable=True)           # доля 👍 по событиям источника, None — нет отзывов
+    excluded_share = Column(Float, nullable=False, default=0.0)  # доля активных пользователей, исключивших источник
+    interval_hours = Column(Float, nullable=True)       # не чаще; None — не обходить
+    page_factor = Column(Float, nullable=False, default=1.0)
+    detail_limit = Column(Integer, nullable=False, default=0)
+    event_sources = Column(JsonType, default=list)      # значения Event.source, которые выдаёт источник
+    last_crawled_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
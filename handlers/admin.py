@@ -1,4 +1,6 @@
+import asyncio
 from pathlib import Path
+from typing import Optional
 
 from aiogram import Router, Bot
 from aiogram.types import Message
@@ -7,13 +9,61 @@ from sqlalchemy.orm import Session
 
 from database.engine import SessionLocal
 from database.models import User, Event
-from services.scheduler import run_parsing_cycle
+from services.scheduler import run_parsing_cycle, run_image_gc, scheduler
+from services.rate_limit import get_rate_limiter
+from services.crawler import get_crawler_state
+from services.source_health import get_source_health
+from services.sources import get_source_registry
+from services.crawl_budget import get_crawl_budget
+from services.pipeline import get_running_pipeline
+from services.image_gc import get_last_report
+from services import crawl_metrics
+from services import shadow
+from services.html_archive import get_html_archive
+from config import ADMIN_IDS, SHADOW_EXTRACTORS, HTML_ARCHIVE_ENABLED, HTML_ARCHIVE_MAX_MB
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Лимит сообщения Telegram — 4096 символов, с запасом
+_MESSAGE_LIMIT = 4000
+
+
+async def _is_registered(message: Message) -> bool:
+    """Служебные команды — только для зарегистрированных; остальным подсказка про /start"""
+    db: Session = SessionLocal()
+    try:
+        user = db.query(User).filter(User.telegram_id == message.from_user.id).first()
+    finally:
+        db.close()
+    if not user:
+        await message.answer("Сначала зарегистрируйся через /start")
+        return False
+    return True
+
+
+async def _is_admin(message: Message) -> bool:
+    """Команды, меняющие данные, — только для ADMIN_IDS; без них ручной запуск выключен"""
+    if not ADMIN_IDS:
+        await message.answer("Ручной запуск выключен: задай ADMIN_IDS в .env")
+        return False
+    if message.from_user.id not in ADMIN_IDS:
+        await message.answer("Команда доступна только администраторам")
+        return False
+    return True
+
+
+async def _send_long(message: Message, text: str, parse_mode: Optional[str] = None):
+    """Отправить длинный отчёт несколькими сообщениями, разрезая по строкам"""
+    while text:
+        cut = text.rfind("\n", 0, _MESSAGE_LIMIT) if len(text) > _MESSAGE_LIMIT else len(text)
+        if cut <= 0:
+            cut = _MESSAGE_LIMIT
+        await message.answer(text[:cut], parse_mode=parse_mode)
+        text = text[cut:].lstrip("\n")
+
 
 @router.message(Command("parse"))
 async def cmd_parse(message: Message, bot: Bot):
@@ -74,6 +124,223 @@ async def cmd_stats(message: Message):
         db.close()
 
 
+@router.message(Command("hosts"))
+async def cmd_hosts(message: Message):
+    """Лимиты парсера по хостам: окно, очередь, ожидание"""
+    if not await _is_registered(message):
+        return
+
+    stats = get_rate_limiter().stats()
+    if not stats:
+        await message.answer("🌐 Запросов к источникам ещё не было. Запусти /parse")
+        return
+    net = get_crawler_state().network_stats.stats()
+    lines = ["🌐 Лимиты по хостам\n"]
+    for host, st in stats.items():
+        n = net.get(host, {})
+        lines.append(
+            f"<b>{host}</b>: окно {st['concurrency']}, в работе {st['in_flight']}, "
+            f"очередь {st['queued']} (макс {st['max_queued']}), запросов {st['requests']}, "
+            f"429/503: {st['throttled']}, ошибок {st['errors']}, "
+            f"ожидание ср. {st['avg_wait']}с / макс {st['max_wait']}с, "
+            f"p95 листинга {st['listing_p95'] if st['listing_p95'] is not None else '—'}с, hedged {st['hedged']}; "
+            f"соединений {n.get('connects', 0)} (ср. {n.get('avg_connect', 0.0)}с), "
+            f"TLS {n.get('tls_handshakes', 0)} (ср. {n.get('avg_tls', 0.0)}с), "
+            f"DNS {n.get('dns_lookups', 0)} / из кэша {n.get('dns_cache_hits', 0)}"
+        )
+    await _send_long(message, "\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("sources"))
+async def cmd_sources(message: Message):
+    """Состояние circuit breaker'ов источников, расписание и бюджет обхода"""
+    if not await _is_registered(message):
+        return
+
+    rows = get_source_health()
+    if not rows:
+        await message.answer("📡 Источники ещё не опрашивались. Запусти /parse")
+        return
+    icons = {"closed": "🟢", "half_open": "🟡", "open": "🔴"}
+    lines = ["📡 Источники\n"]
+    for h in rows:
+        line = f"{icons.get(h.state, '⚪')} <b>{h.source}</b>: {h.state}"
+        if h.consecutive_failures:
+            line += f", ошибок подряд {h.consecutive_failures}"
+        if h.open_until and h.state == "open":
+            line += f", пропуск до {h.open_until:%d.%m %H:%M} UTC"
+        if h.last_success_at:
+            line += f", успех {h.last_success_at:%d.%m %H:%M}"
+        lines.append(line)
+
+    scheduled = [s for s in get_source_registry().values() if s.cadence_minutes]
+    if scheduled:
+        lines.append("\n⏱ Обновление по таймеру (остальные — ежедневным циклом)")
+        for source in scheduled:
+            job = scheduler.get_job(f"refresh_{source.name}")
+            line = f"<b>{source.name}</b>: каждые {source.cadence_minutes} мин"
+            if job and job.next_run_time:
+                line += f", следующее {job.next_run_time:%d.%m %H:%M}"
+            lines.append(line)
+
+    # Бюджет обхода: только источники, которые обходятся не как обычно
+    budgets = {
+        name: b for name, b in get_crawl_budget().budgets.items()
+        if b['interval_hours'] is None or abs(b['score'] - 1) >= 0.05
+    }
+    if budgets:
+        lines.append("\n📈 Бюджет обхода (новых за запуск, 👍, исключили)")
+        for name, b in sorted(budgets.items(), key=lambda item: -item[1]['score']):
+            interval = f"раз в {b['interval_hours']:.0f} ч" if b['interval_hours'] is not None else "не обходится"
+            acceptance = f"{b['acceptance']:.0%}" if b['acceptance'] is not None else "—"
+            lines.append(
+                f"<b>{name}</b>: оценка {b['score']:.2f} ({b['avg_new']:.1f}, {acceptance}, {b['excluded_share']:.0%}) — "
+                f"{interval}, страниц ×{b['page_factor']:.1f}, детальных до {b['detail_limit']}"
+            )
+    await _send_long(message, "\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("pipeline"))
+async def cmd_pipeline(message: Message):
+    """Глубина очередей конвейера текущего цикла парсинга"""
+    if not await _is_registered(message):
+        return
+
+    pipeline = get_running_pipeline()
+    if pipeline is None:
+        await message.answer("🛠 Сейчас цикл парсинга не идёт. Запусти /parse")
+        return
+    lines = [
+        "🛠 Конвейер парсинга\n",
+        f"Собрано {pipeline.crawled}, сохранено {pipeline.persisted}, отправлено {pipeline.notified}",
+    ]
+    images = pipeline.images.stats()
+    lines.append(
+        f"<b>images</b>: в очереди {images['queued']}, загружается {images['in_progress']}, "
+        f"скачано {images['downloaded']}, не удалось {images['failed']}"
+    )
+    for stage, st in pipeline.stats().items():
+        lines.append(
+            f"<b>{stage}</b>: в очереди {st['depth']}/{st['capacity']} (макс {st['max_depth']}), "
+            f"обработано {st['processed']}"
+        )
+    await _send_long(message, "\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("gc"))
+async def cmd_gc(message: Message):
+    """Сборка мусора в parsed_images и её отчёт (только для администраторов)"""
+    if not await _is_admin(message):
+        return
+
+    await message.answer("🧹 Сборка мусора в parsed_images...")
+    report = await run_image_gc()
+    if report is None:
+        last = get_last_report()
+        await message.answer(
+            "🧹 Сейчас идёт цикл парсинга (или сборка не удалась) — попробуй позже"
+            + (f". Прошлая сборка {last['finished_at']:%d.%m %H:%M}: освобождено "
+               f"{last['bytes_reclaimed'] / 1024 / 1024:.1f} МБ" if last else "")
+        )
+        return
+    await message.answer(
+        f"🧹 Освобождено {report['bytes_reclaimed'] / 1024 / 1024:.1f} МБ: "
+        f"удалено файлов {report['files_deleted']} из {report['files_scanned']}, "
+        f"изображений в хранилище {report['blobs_deleted']}, висячих ссылок {report['links_dropped']}, "
+        f"исправлено счётчиков {report['refcounts_fixed']} "
+        f"({report['finished_at']:%d.%m %H:%M}, {report['seconds']}с)"
+    )
+
+
+@router.message(Command("crawlstats"))
+async def cmd_crawlstats(message: Message):
+    """Метрики источников из crawl_runs: скорость, объём, выход новых событий. /crawlstats [дней]"""
+    if not await _is_registered(message):
+        return
+
+    parts = (message.text or "").split()
+    days = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 7
+    summary = crawl_metrics.summarize(days)
+    if not summary:
+        await message.answer(f"📊 За {days} дн. циклов парсинга не было. Запусти /parse")
+        return
+
+    def trend(change):
+        return f" ({change:+.0%})" if change is not None else ""
+
+    lines = [f"📊 Источники за {days} дн. (в скобках — к предыдущим {days} дн.), в среднем за запуск\n"]
+    for st in summary:
+        lines.append(
+            f"<b>{st['source']}</b>: запусков {st['runs']}, {st['avg_wall']:.1f}с{trend(st.get('wall_change'))}, "
+            f"запросов {st['avg_requests']:.0f} по {st['avg_latency']:.2f}с (макс {st['max_latency']:.1f}с), "
+            f"{st['avg_mb']:.1f} МБ, CPU {st['avg_cpu']:.1f}с, ошибок HTTP {st['failed_share']:.0%}; "
+            f"событий {st['avg_seen']:.0f} → {st['avg_relevant']:.0f} → новых {st['avg_new']:.1f}{trend(st.get('new_change'))}; "
+            f"изображений {st['images']}, не скачано {st['image_errors']}; сбоев {st['errors']}"
+        )
+    await _send_long(message, "\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("shadow"))
+async def cmd_shadow(message: Message):
+    """Отчёт теневого режима (SHADOW_EXTRACTORS): боевое извлечение против кандидата. /shadow reset — обнулить"""
+    if not await _is_registered(message):
+        return
+
+    if not SHADOW_EXTRACTORS:
+        await message.answer("👥 Теневой режим выключен: SHADOW_EXTRACTORS в config.py пуст")
+        return
+    parts = (message.text or "").split()
+    if len(parts) > 1 and parts[1] == "reset":
+        shadow.reset()
+        await message.answer("👥 Статистика теневого режима обнулена")
+        return
+
+    since, report = shadow.get_report()
+    if not report:
+        pairs = ", ".join(f"{k} → {v}" for k, v in SHADOW_EXTRACTORS.items())
+        await message.answer(f"👥 С {since:%d.%m %H:%M} теневые методы ({pairs}) не вызывались. Запусти /parse")
+        return
+
+    lines = [f"👥 Теневой режим с {since:%d.%m %H:%M}\n"]
+    for stats in report:
+        lines.append(stats.summary())
+        for sample in stats.samples:
+            if "production" in sample:
+                lines.append(f"  • {sample['url']} [{sample['field']}]: {sample['production']} → {sample['candidate']}")
+            else:
+                lines.append(f"  • {sample['url']}: {sample['field']}")
+        lines.append("")
+    # Примеры — сырой repr, поэтому без parse_mode
+    await _send_long(message, "\n".join(lines))
+
+
+@router.message(Command("archive"))
+async def cmd_archive(message: Message):
+    """Архив загруженных страниц: объём и сжатие по источникам"""
+    if not await _is_registered(message):
+        return
+
+    archive = get_html_archive()
+    if archive is None or not HTML_ARCHIVE_ENABLED:
+        await message.answer("🗄 Архив страниц выключен (HTML_ARCHIVE_ENABLED или нет пакета zstandard)")
+        return
+    stats = await asyncio.to_thread(archive.stats)
+    if not stats:
+        await message.answer("🗄 Архив страниц пуст. Запусти /parse")
+        return
+    total = await asyncio.to_thread(archive.size)
+    lines = [f"🗄 Архив страниц: {total / 1024 / 1024:.1f} из {HTML_ARCHIVE_MAX_MB} МБ\n"]
+    for st in stats:
+        ratio = st['raw_bytes'] / st['stored_bytes'] if st['stored_bytes'] else 0
+        lines.append(
+            f"<b>{st['source']}</b>: страниц {st['pages']} ({st['urls']} URL), "
+            f"{st['first'][:10]} … {st['last'][:10]}, {st['raw_bytes'] / 1024 / 1024:.1f} → "
+            f"{st['stored_bytes'] / 1024 / 1024:.1f} МБ (×{ratio:.1f}), "
+            f"{'словарь' if st['dict'] else 'без словаря'}"
+        )
+    await _send_long(message, "\n".join(lines), parse_mode="HTML")
+
+
 @router.message(Command("help"))
 async def cmd_help(message: Message):
     """Справка по командам"""
@@ -85,6 +352,14 @@ async def cmd_help(message: Message):
         "/parse - Запустить поиск новых событий вручную\n"
         "/stats - Показать статистику\n"
         "/help - Показать эту справку\n\n"
+        "🛠 Служебные команды:\n"
+        "/hosts - Лимиты парсера по хостам\n"
+        "/sources - Источники: circuit breaker, расписание, бюджет обхода\n"
+        "/pipeline - Очереди конвейера текущего цикла\n"
+        "/gc - Сборка мусора в parsed_images (администраторы)\n"
+        "/crawlstats [дней] - Метрики источников за период\n"
+        "/shadow [reset] - Отчёт теневого режима извлечения\n"
+        "/archive - Архив загруженных страниц\n\n"
         "💡 Бот автоматически присылает новые события каждые 60 минут.\n"
         "💡 Используй кнопки 👍/👎 под событиями для улучшения рекомендаций."
     )
@@ -0,0 +1,177 @@
+"""Benchmark every registry source and parse_all against a recorded cassette (no network).
+
+Usage: python scripts/benchmark_parsers.py [--cassette NAME] [--repeat 3] [--source NAME ...]
+                                           [--no-parse-all] [--pool] [--json FILE] [--compare FILE] [--verbose]
+
+For each source: median/min wall time and CPU time over --repeat runs, peak
+Python memory (a separate tracemalloc run, so it does not skew the timings),
+events returned, responses served and cassette misses. Per-host rate limits are
+lifted — only parsing is measured. Extraction runs in the main process unless
+--pool is given (then CPU time covers the main process only).
+
+--json writes the results; --compare prints the change against such a file,
+so a parser optimisation can be checked against the same recorded pages.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/bench.db"
+if "--pool" not in sys.argv:
+    os.environ["PARSE_WORKERS"] = "0"
+
+from database.engine import init_db, SessionLocal
+from database.models import SourceHealth
+from services.crawler import CrawlerState
+from services.parser import EventParser
+from services.rate_limit import RateLimiter
+from services.sources import get_source_registry
+from services.cassettes import ReplayTransport, cassette_path
+from config import HOST_MAX_CONCURRENCY
+
+logging.basicConfig(
+    level=logging.INFO if "--verbose" in sys.argv else logging.ERROR,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+PARSE_ALL = "parse_all"
+
+
+def _reset_breakers():
+    """Failures recorded by earlier runs must not make parse_all skip sources."""
+    db = SessionLocal()
+    try:
+        db.query(SourceHealth).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _run_once(state: CrawlerState, replay: ReplayTransport, name: str):
+    replay.reset()
+    _reset_breakers()
+    parser = EventParser(use_cache=False, state=state)
+    # Офлайн вежливость не нужна: без token bucket, окно сразу максимальное
+    parser.rate_limiter = RateLimiter(
+        rate=1e9, burst=10 ** 9, initial_concurrency=HOST_MAX_CONCURRENCY, max_concurrency=HOST_MAX_CONCURRENCY
+    )
+    if name == PARSE_ALL:
+        return await parser.parse_all()
+    return await get_source_registry()[name].parse(parser)
+
+
+async def benchmark(state: CrawlerState, replay: ReplayTransport, name: str, repeat: int) -> dict:
+    walls, cpus = [], []
+    events = error = None
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            events = await _run_once(state, replay, name)
+        except Exception as e:
+            error = repr(e)
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+
+    tracemalloc.start()
+    try:
+        await _run_once(state, replay, name)
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "wall_median": round(statistics.median(walls), 4),
+        "wall_min": round(min(walls), 4),
+        "cpu_median": round(statistics.median(cpus), 4),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "events": len(events) if events is not None else 0,
+        "responses": replay.hits,
+        "misses": len(replay.misses),
+        "error": error,
+    }
+
+
+def _print_table(results: dict, baseline: dict):
+    header = f"{'source':<34} {'wall med':>9} {'wall min':>9} {'cpu med':>9} {'peak MB':>8} {'events':>7} {'resp':>6} {'miss':>5}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (
+            f"{name:<34} {r['wall_median']:>9.3f} {r['wall_min']:>9.3f} {r['cpu_median']:>9.3f} "
+            f"{r['peak_mb']:>8.2f} {r['events']:>7} {r['responses']:>6} {r['misses']:>5}"
+        )
+        base = baseline.get(name)
+        if base:
+            line += f"   wall {_delta(r['wall_median'], base['wall_median'])}, cpu {_delta(r['cpu_median'], base['cpu_median'])}"
+            if r['events'] != base['events']:
+                line += f", events {base['events']} → {r['events']}"
+        if r['error']:
+            line += f"   ERROR {r['error']}"
+        print(line)
+
+
+def _delta(value: float, base: float) -> str:
+    if not base:
+        return "—"
+    return f"{(value - base) / base * 100:+.1f}%"
+
+
+async def main(args):
+    path = cassette_path(args.cassette).resolve()
+    os.chdir(WORKDIR)
+    init_db()
+    replay = ReplayTransport(path)
+    print(f"Cassette {path}: {len(replay)} responses; repeat {args.repeat}; "
+          f"extraction {'in pool' if args.pool else 'in process'}\n")
+
+    names = args.sources or list(get_source_registry())
+    if not args.no_parse_all:
+        names.append(PARSE_ALL)
+
+    state = CrawlerState(wrap_transport=lambda _: replay)
+    results = {}
+    try:
+        for name in names:
+            results[name] = await benchmark(state, replay, name, args.repeat)
+    finally:
+        await state.close()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    _print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cassette": str(path), "repeat": args.repeat, "pool": args.pool, "results": results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--cassette", help="cassette name or directory (default: the newest one)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--source", action="append", dest="sources", help="benchmark only these registry sources")
+    ap.add_argument("--no-parse-all", action="store_true", help="skip the parse_all run")
+    ap.add_argument("--pool", action="store_true", help="extract HTML in the process pool (PARSE_WORKERS)")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="results file of an earlier run to compare with")
+    ap.add_argument("--verbose", action="store_true", help="show parser logs")
+    args = ap.parse_args()
+    args.json = args.json and os.path.abspath(args.json)
+    args.compare = args.compare and os.path.abspath(args.compare)
+    asyncio.run(main(args))
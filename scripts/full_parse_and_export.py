@@ -15,7 +15,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from database.engine import init_db, SessionLocal
 from database.models import Event
 from services.parser import EventParser
+from services.crawler import close_crawler_state
 from services.csv_export import export_events_to_csv
+from services import image_store
 from config import STOP_WORDS
 
 logging.basicConfig(
@@ -76,12 +78,14 @@ async def main():
 
     # Step 2: Parse all sources
     logger.info("\nParsing all sources...")
-    parser = EventParser()
+    # Events table was just wiped — bypass the conditional-request cache to re-parse every source
+    parser = EventParser(use_cache=False)
     try:
         events_data = await parser.parse_all()
         logger.info(f"Parser returned {len(events_data)} events")
     finally:
         await parser.close()
+        await close_crawler_state()
 
     # Step 3: Save to database with dedup + stop-word filtering
     db = SessionLocal()
@@ -134,8 +138,13 @@ async def main():
             db.add(event)
             db.commit()
             db.refresh(event)
+            # Скачанная картинка получает ссылку только вместе с сохранённым событием
+            if event.image_url:
+                image_store.link(event.url, event.image_url)
             saved_count += 1
 
+        # Обработанные записи sitemap запоминаются только после сохранения событий
+        parser.commit_crawl_state()
         logger.info(f"\nSaved {saved_count} events to DB")
         logger.info(f"Skipped: {skipped_stop} (stop words), {skipped_dup} (duplicates)")
 
@@ -0,0 +1,64 @@
+"""Record every HTTP response of a parse_all run into a cassette (for offline runs and benchmarks).
+
+Usage: python scripts/record_cassette.py [--name NAME] [--source NAME ...]
+
+The run uses a throwaway database and working directory, so it sees every
+source as new (detail pages, images) and leaves the bot's data untouched.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKDIR = tempfile.mkdtemp(prefix="record-")
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/record.db"
+
+from database.engine import init_db
+from services.crawler import CrawlerState
+from services.parser import EventParser
+from services.cassettes import RecordingTransport
+from config import CASSETTES_DIR
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def main(name: str, sources):
+    path = (Path(CASSETTES_DIR) / name).resolve()
+    os.chdir(WORKDIR)
+    init_db()
+
+    recorder = None
+
+    def wrap(transport):
+        nonlocal recorder
+        recorder = RecordingTransport(transport, path)
+        return recorder
+
+    state = CrawlerState(wrap_transport=wrap)
+    parser = EventParser(use_cache=False, state=state)
+    try:
+        events = await parser.parse_all(sources)
+        logger.info(f"parse_all returned {len(events)} events")
+    finally:
+        recorder.save()
+        await state.close()
+    logger.info(f"Cassette saved to {path}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--name", default=datetime.now().strftime("%Y%m%d-%H%M%S"), help="cassette name (default: timestamp)")
+    ap.add_argument("--source", action="append", dest="sources", help="record only these registry sources")
+    args = ap.parse_args()
+    asyncio.run(main(args.name, args.sources))
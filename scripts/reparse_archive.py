@@ -0,0 +1,131 @@
+"""Re-parse archived pages with the current parser code, without the network.
+
+Usage: python scripts/reparse_archive.py [--at 2026-10-01T12:00] [--source NAME ...]
+                                         [--list] [--live] [--ai] [--no-export] [--verbose]
+
+The parser crawls the HTML archive (HTML_ARCHIVE_DIR) the way it crawls the
+sites: every request is answered with the newest copy of the URL archived no
+later than --at (default: the newest copies), a URL never archived gets a 404.
+Events go through the pipeline stages as in a parsing cycle; images are not
+downloaded and nobody is notified. Then events are exported to CSV.
+
+By default the run writes into a throwaway database and working directory, so
+every event counts as new — compare its CSV and counters with an earlier run to
+see what a parser fix changes. --live writes into the bot's database instead
+and so backfills events the old parser missed. The run never touches the bot's
+crawl state: circuit breakers are neither checked nor updated (archive misses
+are not site failures), and sitemap <lastmod> state is read but not written.
+Enrichment uses the local fallback unless --ai is given.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKDIR = None
+if "--live" not in sys.argv and "--list" not in sys.argv:
+    WORKDIR = tempfile.mkdtemp(prefix="reparse-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/reparse.db"
+    os.environ["KNOWN_FILTER_PATH"] = f"{WORKDIR}/known_events.bloom"
+# Архив читается из каталога бота, даже когда рабочий каталог — временный
+os.environ["HTML_ARCHIVE_DIR"] = str((ROOT / os.getenv("HTML_ARCHIVE_DIR", "html_archive")).resolve())
+
+from database.engine import init_db, SessionLocal
+from services.crawler import CrawlerState
+from services.csv_export import export_events_to_csv
+from services.html_archive import ArchiveTransport, get_html_archive
+from services.parser import EventParser
+from services.pipeline import IngestPipeline
+from services.rate_limit import RateLimiter
+from services.sources import get_source_registry
+from config import HOST_MAX_CONCURRENCY
+
+logging.basicConfig(
+    level=logging.INFO if "--verbose" in sys.argv else logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _list(archive):
+    stats = archive.stats()
+    if not stats:
+        print(f"Archive {archive.root} is empty")
+        return
+    for st in stats:
+        ratio = st["raw_bytes"] / st["stored_bytes"] if st["stored_bytes"] else 0
+        print(f"{st['source']}: {st['pages']} pages of {st['urls']} URLs, {st['first']} … {st['last']}, "
+              f"{st['raw_bytes'] / 1024 / 1024:.1f} MB → {st['stored_bytes'] / 1024 / 1024:.1f} MB (×{ratio:.1f}), "
+              f"dictionary {st['dict'] or 'none'}")
+    print(f"Total on disk: {archive.size() / 1024 / 1024:.1f} MB")
+
+
+async def main(args, archive):
+    registry = get_source_registry()
+    archived = set(archive.sources())
+    # Источник без архивных страниц дал бы только промахи
+    sources = args.sources or [name for name in registry if name in archived]
+    if not sources:
+        print(f"No archived pages of registry sources in {archive.root}")
+        return
+    transport = ArchiveTransport(archive, args.at)
+    print(f"Archive {archive.root} as of {args.at or 'now'}: {len(transport)} URLs; sources: {', '.join(sources)}")
+    if WORKDIR:
+        os.chdir(WORKDIR)
+        print(f"Throwaway database and output in {WORKDIR}")
+    init_db()
+
+    state = CrawlerState(wrap_transport=lambda _: transport)
+    parser = EventParser(use_cache=False, state=state, archive=False, track_health=False)
+    # Без сети вежливость не нужна: без token bucket, окно сразу максимальное
+    parser.rate_limiter = RateLimiter(
+        rate=1e9, burst=10 ** 9, initial_concurrency=HOST_MAX_CONCURRENCY, max_concurrency=HOST_MAX_CONCURRENCY
+    )
+    pipeline = IngestPipeline(None, parser, sources, use_ai=args.ai, offline=True)
+    started = time.perf_counter()
+    try:
+        persisted = await pipeline.run()
+    finally:
+        await state.close()
+    elapsed = time.perf_counter() - started
+    processed = ", ".join(f"{stage} {n}" for stage, n in pipeline.processed.items())
+    print(f"Re-parsed {pipeline.crawled} events ({pipeline.known_skipped} already stored) → persisted {persisted} "
+          f"in {elapsed:.2f}s; pages served {transport.hits}, not archived {len(transport.misses)}; "
+          f"processed per stage: {processed}")
+    if args.verbose:
+        for url in transport.misses:
+            print(f"  not archived: {url}")
+
+    if not args.no_export:
+        db = SessionLocal()
+        try:
+            print(f"CSV: {export_events_to_csv(db, Path(WORKDIR) / 'events.csv' if WORKDIR else None)}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--at", type=datetime.fromisoformat, help="archive as of this UTC time (default: newest copies)")
+    ap.add_argument("--source", action="append", dest="sources", help="re-parse only these registry sources")
+    ap.add_argument("--list", action="store_true", help="show what the archive holds and exit")
+    ap.add_argument("--live", action="store_true", help="write into the bot's database instead of a throwaway one")
+    ap.add_argument("--ai", action="store_true", help="call the AI for enrichment (default: local fallback)")
+    ap.add_argument("--no-export", action="store_true", help="skip the CSV export")
+    ap.add_argument("--verbose", action="store_true", help="show pipeline logs and URLs missing from the archive")
+    args = ap.parse_args()
+    archive = get_html_archive()
+    if archive is None:
+        sys.exit("The zstandard package is required: pip install zstandard")
+    if args.list:
+        _list(archive)
+    else:
+        asyncio.run(main(args, archive))
@@ -0,0 +1,112 @@
+"""Replay a crawl checkpoint through the pipeline stages offline (no crawling, no messages).
+
+Usage: python scripts/replay_checkpoint.py [CHECKPOINT] [--list] [--source NAME ...]
+                                           [--live] [--ai] [--no-export] [--repeat N]
+
+CHECKPOINT is a file in CHECKPOINTS_DIR (name, stem or path; default: the
+newest one). Its raw source batches go through classify, dedup, enrich and
+persist as in a parsing cycle; detail pages come from the checkpoint, images
+are not downloaded and nobody is notified. Then events are exported to CSV.
+
+By default the replay writes into a throwaway database and working directory,
+so it sees every event as new and is repeatable; --live uses the bot's
+database instead. Enrichment uses the local fallback unless --ai is given, so
+runs are deterministic. Stage counters and timings are printed for comparing
+changes to the downstream stages.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKDIR = None
+if "--live" not in sys.argv and "--list" not in sys.argv:
+    WORKDIR = tempfile.mkdtemp(prefix="replay-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR}/replay.db"
+    os.environ["KNOWN_FILTER_PATH"] = f"{WORKDIR}/known_events.bloom"
+
+from database.engine import init_db, engine, SessionLocal
+from database.models import Base
+from services.checkpoints import Checkpoint, checkpoint_path, list_checkpoints
+from services.csv_export import export_events_to_csv
+from services.parser import EventParser
+from services.pipeline import IngestPipeline
+
+logging.basicConfig(
+    level=logging.INFO if "--verbose" in sys.argv else logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def _list():
+    for path in list_checkpoints():
+        try:
+            cp = Checkpoint(path)
+        except Exception as e:
+            print(f"{path.name}: unreadable ({e})")
+            continue
+        sources = cp.meta.get("sources") or "all sources"
+        summary = f", persisted {cp.summary.get('persisted')}" if cp.summary else ", incomplete"
+        print(f"{path.name}: {cp.meta.get('started_at')}, {sources}, {len(cp)} raw, "
+              f"{len(cp.normalized)} normalized{summary}, {path.stat().st_size / 1024:.0f} KB")
+
+
+async def main(args):
+    checkpoint = Checkpoint(checkpoint_path(args.checkpoint).resolve())
+    print(f"Checkpoint {checkpoint.path}: cycle of {checkpoint.meta.get('started_at')}, "
+          f"{len(checkpoint)} raw events, {len(checkpoint.normalized)} normalized")
+    if WORKDIR:
+        os.chdir(WORKDIR)
+        print(f"Throwaway database and output in {WORKDIR}")
+    init_db()
+
+    for attempt in range(args.repeat):
+        if WORKDIR and attempt:
+            # Каждый повтор — с пустой БД, иначе всё уже сохранено и этапы ничего не делают
+            Base.metadata.drop_all(bind=engine)
+            init_db()
+        parser = EventParser(use_cache=False)
+        pipeline = IngestPipeline(None, parser, args.sources, replay=checkpoint, use_ai=args.ai)
+        started = time.perf_counter()
+        try:
+            persisted = await pipeline.run()
+        finally:
+            await parser.close()
+        elapsed = time.perf_counter() - started
+        processed = ", ".join(f"{stage} {n}" for stage, n in pipeline.processed.items())
+        print(f"Run {attempt + 1}: {pipeline.crawled} raw ({pipeline.known_skipped} already stored) → "
+              f"persisted {persisted} in {elapsed:.2f}s; processed per stage: {processed}")
+
+    if not args.no_export:
+        db = SessionLocal()
+        try:
+            print(f"CSV: {export_events_to_csv(db, Path(WORKDIR) / 'events.csv' if WORKDIR else None)}")
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("checkpoint", nargs="?", help="checkpoint name or path (default: the newest one)")
+    ap.add_argument("--list", action="store_true", help="list checkpoints and exit")
+    ap.add_argument("--source", action="append", dest="sources", help="replay only these registry sources")
+    ap.add_argument("--live", action="store_true", help="write into the bot's database instead of a throwaway one")
+    ap.add_argument("--ai", action="store_true", help="call the AI for enrichment (default: local fallback)")
+    ap.add_argument("--no-export", action="store_true", help="skip the CSV export")
+    ap.add_argument("--repeat", type=int, default=1, help="replay N times (throwaway database only), for timings")
+    ap.add_argument("--verbose", action="store_true", help="show pipeline logs")
+    args = ap.parse_args()
+    if args.list:
+        _list()
+    else:
+        if args.live:
+            args.repeat = 1
+        asyncio.run(main(args))
@@ -70,18 +70,20 @@ async def extract_event_structured(
     raw_desc: str,
     raw_url: str = "",
     relevant_keywords: Optional[list] = None,
+    use_ai: bool = True,
 ) -> dict:
     """
     Extract structured event data using Groq Llama-3.1-8b-instant.
 
     Falls back to local truncation if:
+    - use_ai is False (offline replays)
     - GROQ_API_KEY is not set
     - API returns an error (rate limit, network, etc.)
     - Response is not valid JSON
     """
     fallback = _build_fallback(raw_title, raw_desc)
 
-    client = _get_client()
+    client = _get_client() if use_ai else None
     if client is None:
         return fallback
 
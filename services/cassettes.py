@@ -0,0 +1,144 @@
+"""
+HTTP record/replay for the parser.
+
+RecordingTransport wraps the real httpx transport and writes every response
+into a cassette directory:
+
+    cassettes/<name>/cassette.json   format version, creation time, entries
+    cassettes/<name>/bodies/<sha256>  raw (still content-encoded) response bodies
+
+ReplayTransport serves a cassette offline: a request gets the recorded
+response of the same method and URL (repeated requests get the recorded
+responses in order, then the last one again); an unrecorded request gets a 404
+and is counted as a miss. Both plug into CrawlerState(transport=...), see
+scripts/record_cassette.py and scripts/benchmark_parsers.py.
+"""
+import hashlib
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from config import CASSETTES_DIR
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_FORMAT = 1
+
+# Заголовки ответа, которые не переносятся в кассету (body хранится отдельно, длина пересчитывается)
+_SKIP_HEADERS = {'transfer-encoding', 'connection', 'keep-alive', 'set-cookie'}
+
+
+def cassette_path(name: Optional[str] = None) -> Path:
+    """Directory of the named cassette; with no name — the newest one."""
+    root = Path(CASSETTES_DIR)
+    if name:
+        path = Path(name)
+        return path if path.is_dir() else root / name
+    recorded = sorted(p for p in root.glob('*/cassette.json'))
+    if not recorded:
+        raise FileNotFoundError(f"No cassettes in {root}")
+    return recorded[-1].parent
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, path: Optional[Path] = None):
+        self.inner = inner
+        self.path = Path(path) if path else Path(CASSETTES_DIR) / datetime.now().strftime('%Y%m%d-%H%M%S')
+        (self.path / 'bodies').mkdir(parents=True, exist_ok=True)
+        self.entries: List[Dict] = []
+        self.started = time.monotonic()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        try:
+            body = b''.join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        digest = hashlib.sha256(body).hexdigest()
+        body_file = self.path / 'bodies' / digest
+        if not body_file.exists():
+            body_file.write_bytes(body)
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _SKIP_HEADERS]
+        self.entries.append({
+            'method': request.method,
+            'url': str(request.url),
+            'status': response.status_code,
+            'headers': headers,
+            'body': digest,
+            'at': round(time.monotonic() - self.started, 3),
+        })
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            content=body,
+            request=request,
+            extensions={k: v for k, v in response.extensions.items() if k == 'http_version'},
+        )
+
+    def save(self) -> Path:
+        """Write the cassette index; call once after the cycle."""
+        data = {
+            'format': CASSETTE_FORMAT,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'entries': self.entries,
+        }
+        with open(self.path / 'cassette.json', 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        logger.info(f"Cassette {self.path}: {len(self.entries)} responses recorded")
+        return self.path
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path / 'cassette.json', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != CASSETTE_FORMAT:
+            raise ValueError(f"{self.path}: cassette format {data.get('format')}, expected {CASSETTE_FORMAT}")
+        self._responses: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        for entry in data['entries']:
+            self._responses[(entry['method'], entry['url'])].append(entry)
+        self._served: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._bodies: Dict[str, bytes] = {}
+        self.hits = 0
+        self.misses: List[str] = []
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._responses.values())
+
+    def _body(self, digest: str) -> bytes:
+        if digest not in self._bodies:
+            self._bodies[digest] = (self.path / 'bodies' / digest).read_bytes()
+        return self._bodies[digest]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = (request.method, str(request.url))
+        recorded = self._responses.get(key)
+        if not recorded:
+            self.misses.append(key[1])
+            return httpx.Response(404, headers={'x-cassette-miss': '1'}, request=request)
+        index = min(self._served[key], len(recorded) - 1)
+        self._served[key] += 1
+        self.hits += 1
+        entry = recorded[index]
+        return httpx.Response(
+            entry['status'],
+            headers=entry['headers'],
+            content=self._body(entry['body']),
+            request=request,
+        )
+
+    def reset(self):
+        """Start serving repeated requests from their first recorded response again."""
+        self._served.clear()
+        self.hits = 0
+        self.misses = []
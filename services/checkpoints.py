@@ -0,0 +1,159 @@
+"""
+Crawl checkpoints: what a parsing cycle crawled, as gzip-compressed JSONL.
+
+    checkpoints/20261017-093000.jsonl.gz
+
+    {"type": "cycle", "format": 1, "started_at": ..., "sources": [...] | null, ...}
+    {"type": "raw", "source": "parse_iteca", "event": {...}}         stream_sources output, per source
+    {"type": "normalized", "source": "parse_iteca", "event": {...}}  after classify, dedup and the detail page
+    {"type": "end", "finished_at": ..., "raw": 120, "normalized": 14, "persisted": 9}
+
+datetime values are stored as {"$dt": "<iso>"} and restored on reading.
+
+IngestPipeline writes one checkpoint per cycle (CHECKPOINTS_ENABLED). A
+Checkpoint passed back into IngestPipeline(replay=...) replaces crawling:
+raw batches go through classify, dedup, enrich, persist again, detail pages
+come from the checkpoint's normalized records, nothing is downloaded or sent
+(scripts/replay_checkpoint.py). The newest CHECKPOINTS_KEEP files are kept.
+"""
+import gzip
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import CHECKPOINTS_DIR, CHECKPOINTS_KEEP
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FORMAT = 1
+_SUFFIX = ".jsonl.gz"
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: Dict):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def checkpoint_path(name: Optional[str] = None) -> Path:
+    """Path of the named checkpoint (file name, stem or path); with no name — the newest one."""
+    root = Path(CHECKPOINTS_DIR)
+    if name:
+        for candidate in (Path(name), root / name, root / f"{name}{_SUFFIX}"):
+            if candidate.is_file():
+                return candidate
+        raise FileNotFoundError(f"No checkpoint {name} in {root}")
+    found = list_checkpoints()
+    if not found:
+        raise FileNotFoundError(f"No checkpoints in {root}")
+    return found[-1]
+
+
+def list_checkpoints() -> List[Path]:
+    """Checkpoint files, oldest first."""
+    return sorted(Path(CHECKPOINTS_DIR).glob(f"*{_SUFFIX}"))
+
+
+class CheckpointWriter:
+    def __init__(self, sources: Optional[List[str]] = None):
+        self.started_at = datetime.utcnow()
+        root = Path(CHECKPOINTS_DIR)
+        root.mkdir(parents=True, exist_ok=True)
+        self.path = root / f"{self.started_at:%Y%m%d-%H%M%S}{_SUFFIX}"
+        # Сжатие потоковое: файл растёт по мере обхода, в памяти — только буфер gzip
+        self._file = gzip.open(self.path, "wt", compresslevel=6, encoding="utf-8")
+        self.counts = {"raw": 0, "normalized": 0}
+        self._write({
+            "type": "cycle",
+            "format": CHECKPOINT_FORMAT,
+            "started_at": self.started_at,
+            "sources": sources,
+        })
+
+    def _write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=_encode))
+        self._file.write("\n")
+
+    def raw(self, source: str, events: List[Dict]):
+        for event in events:
+            self._write({"type": "raw", "source": source, "event": event})
+        self.counts["raw"] += len(events)
+
+    def normalized(self, source: Optional[str], event: Dict):
+        self._write({"type": "normalized", "source": source, "event": event})
+        self.counts["normalized"] += 1
+
+    def close(self, **summary):
+        try:
+            self._write({"type": "end", "finished_at": datetime.utcnow(), **self.counts, **summary})
+            self._file.close()
+        except OSError as e:
+            logger.warning(f"Failed to finish checkpoint {self.path}: {e}")
+            return
+        logger.info(
+            f"Checkpoint {self.path}: {self.counts['raw']} raw, {self.counts['normalized']} normalized records, "
+            f"{self.path.stat().st_size / 1024:.0f} KB"
+        )
+        _prune()
+
+
+def _prune():
+    if CHECKPOINTS_KEEP <= 0:
+        return
+    for old in list_checkpoints()[:-CHECKPOINTS_KEEP]:
+        try:
+            old.unlink()
+        except OSError as e:
+            logger.warning(f"Failed to delete old checkpoint {old}: {e}")
+
+
+def _records(f, path: Path) -> Iterator[Dict]:
+    try:
+        for line in f:
+            yield json.loads(line, object_hook=_decode)
+    except (EOFError, ValueError) as e:
+        # Файл цикла, прерванного на записи: обрезанный gzip или последняя строка
+        logger.warning(f"Checkpoint {path} is truncated: {e}")
+
+
+class Checkpoint:
+    """A checkpoint read back: its metadata, raw batches per source and normalized records by URL."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.meta: Dict = {}
+        self.summary: Optional[Dict] = None
+        self._batches: Dict[str, List[Dict]] = {}
+        self.normalized: Dict[str, Dict] = {}
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for record in _records(f, self.path):
+                kind = record.get("type")
+                if kind == "cycle":
+                    if record.get("format") != CHECKPOINT_FORMAT:
+                        raise ValueError(f"{self.path}: checkpoint format {record.get('format')}, expected {CHECKPOINT_FORMAT}")
+                    self.meta = record
+                elif kind == "raw":
+                    self._batches.setdefault(record["source"], []).append(record["event"])
+                elif kind == "normalized":
+                    self.normalized[record["event"].get("url", "")] = record["event"]
+                elif kind == "end":
+                    self.summary = record
+        if self.summary is None:
+            # Цикл прервался: сырые записи до обрыва всё равно пригодны для воспроизведения
+            logger.warning(f"Checkpoint {self.path} is incomplete (no end record)")
+
+    def batches(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """Raw events per source, in crawl order; copies, so a replay can be repeated."""
+        for source, events in self._batches.items():
+            yield source, [dict(e) for e in events]
+
+    def __len__(self) -> int:
+        return sum(len(events) for events in self._batches.values())
@@ -0,0 +1,242 @@
+"""
+Yield-aware crawl budget per registry source, kept in the source_budgets table.
+
+After every cycle refresh() scores each source from its history:
+
+    score = yield ratio × feedback factor × (1 − excluded share)
+
+yield ratio      new events per run over the last CRAWL_BUDGET_DAYS (crawl_runs)
+                 against the median source, smoothed by one event
+feedback factor  0.5 + smoothed share of 👍 on the source's events
+excluded share   active users whose excluded_sources (the "reason" feedback
+                 buttons) cover every Event.source the source produces
+
+A score of 1 is a typical source; sources with fewer than CRAWL_BUDGET_MIN_RUNS
+runs keep 1 until there is history. The score is turned into a budget:
+
+- how often: a source scoring below 1 is crawled at most every
+  base interval / score (base — its cadence or the daily cycle, up to
+  CRAWL_BUDGET_MAX_SLOWDOWN times slower); a source every active user
+  excluded — every CRAWL_BUDGET_EXCLUDED_DAYS days or never;
+- how deep: LISTING_MAX_PAGES and SITEMAP_MAX_PAGES_PER_CYCLE are scaled
+  by the score within CRAWL_BUDGET_PAGE_FACTOR;
+- how many detail pages the pipeline fetches for it per cycle;
+- start order: within one priority higher scores get a slot first.
+
+Slowed sources still run now and then, so their yield keeps being measured.
+"""
+import logging
+import statistics
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import func
+
+from config import (
+    CRAWL_BUDGET_ENABLED, CRAWL_BUDGET_DAYS, CRAWL_BUDGET_FEEDBACK_DAYS, CRAWL_BUDGET_MIN_RUNS,
+    CRAWL_BUDGET_MAX_SLOWDOWN, CRAWL_BUDGET_PAGE_FACTOR, CRAWL_BUDGET_DETAIL_PAGES,
+    CRAWL_BUDGET_EXCLUDED_DAYS,
+)
+from database.engine import SessionLocal
+from database.models import CrawlRun, Event, Feedback, SourceBudget, User
+from services.sources import get_source_registry
+
+logger = logging.getLogger(__name__)
+
+DAILY_INTERVAL_HOURS = 24
+# Источник считается «пора обходить» чуть раньше срока: ежедневный цикл не ровно через 24 ч
+_DUE_SLACK = 0.9
+
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(high, value))
+
+
+def _score(avg_new: float, median_new: float, acceptance: Optional[float], excluded_share: float) -> float:
+    yield_ratio = (avg_new + 1) / (median_new + 1)
+    feedback = 0.5 + acceptance if acceptance is not None else 1.0
+    return yield_ratio * feedback * (1 - excluded_share)
+
+
+class CrawlBudget:
+    """Budgets loaded from source_budgets; unknown sources get the neutral budget."""
+
+    def __init__(self):
+        self.budgets: Dict[str, Dict] = {}
+
+    def load(self):
+        db = SessionLocal()
+        try:
+            self.budgets = {
+                b.source: {
+                    'score': b.score,
+                    'runs': b.runs,
+                    'avg_new': b.avg_new,
+                    'acceptance': b.acceptance,
+                    'excluded_share': b.excluded_share,
+                    'interval_hours': b.interval_hours,
+                    'page_factor': b.page_factor,
+                    'detail_limit': b.detail_limit,
+                    'last_crawled_at': b.last_crawled_at,
+                }
+                for b in db.query(SourceBudget).all()
+            }
+        except Exception as e:
+            # Без бюджета источники обходятся как раньше
+            logger.warning(f"Crawl budgets unavailable: {e}")
+            self.budgets = {}
+        finally:
+            db.close()
+
+    def score(self, name: Optional[str]) -> float:
+        budget = self.budgets.get(name) if CRAWL_BUDGET_ENABLED else None
+        return budget['score'] if budget else 1.0
+
+    def is_due(self, source, now: Optional[datetime] = None) -> bool:
+        """False if the source was crawled more recently than its budgeted interval allows."""
+        budget = self.budgets.get(source.name) if CRAWL_BUDGET_ENABLED else None
+        if not budget:
+            return True
+        base = source.cadence_minutes / 60 if source.cadence_minutes else DAILY_INTERVAL_HOURS
+        interval = budget['interval_hours']
+        if interval is None:
+            return False
+        if interval <= base or budget['last_crawled_at'] is None:
+            return True
+        elapsed = (now or datetime.utcnow()) - budget['last_crawled_at']
+        return elapsed >= timedelta(hours=interval * _DUE_SLACK)
+
+    def select(self, sources: List) -> List:
+        """Drop sources that are not due; within one priority order by score."""
+        if not CRAWL_BUDGET_ENABLED:
+            return sources
+        now = datetime.utcnow()
+        due = [s for s in sources if self.is_due(s, now)]
+        skipped = [s.name for s in sources if s not in due]
+        if skipped:
+            logger.info(f"Crawl budget: not due this cycle: {', '.join(skipped)}")
+        # sort устойчив: при равных приоритете и оценке — прежний порядок
+        due.sort(key=lambda s: (s.priority, -self.score(s.name)))
+        return due
+
+    def pages(self, name: Optional[str], base: int) -> int:
+        """Page limit of source name instead of the configured base."""
+        budget = self.budgets.get(name) if CRAWL_BUDGET_ENABLED else None
+        if not budget:
+            return base
+        return max(1, round(base * budget['page_factor']))
+
+    def detail_limit(self, name: Optional[str]) -> Optional[int]:
+        """Detail pages the pipeline may fetch for the source this cycle; None — no limit."""
+        budget = self.budgets.get(name) if CRAWL_BUDGET_ENABLED else None
+        return budget['detail_limit'] if budget else None
+
+
+def _event_sources(db, metrics) -> Dict[str, Set[str]]:
+    mapping: Dict[str, Set[str]] = {b.source: set(b.event_sources or []) for b in db.query(SourceBudget).all()}
+    if metrics is not None:
+        for name, run in metrics.runs.items():
+            mapping.setdefault(name, set()).update(run.event_sources)
+    return mapping
+
+
+def _acceptance(db, since: datetime) -> Dict[str, Optional[float]]:
+    """Smoothed share of positive feedback per Event.source."""
+    rows = (
+        db.query(Event.source, Feedback.is_positive, func.count(Feedback.id))
+        .join(Feedback, Feedback.event_id == Event.id)
+        .filter(Feedback.created_at >= since)
+        .group_by(Event.source, Feedback.is_positive)
+        .all()
+    )
+    positive: Counter = Counter()
+    total: Counter = Counter()
+    for source, is_positive, count in rows:
+        total[source] += count
+        if is_positive:
+            positive[source] += count
+    return {source: (positive[source] + 1) / (total[source] + 2) for source in total}
+
+
+def _combined_acceptance(per_source: Dict[str, float], event_sources: Set[str]) -> Optional[float]:
+    values = [per_source[s] for s in event_sources if s in per_source]
+    return sum(values) / len(values) if values else None
+
+
+def refresh(metrics=None):
+    """Recompute every budget from crawl_runs, feedback and users; call after a cycle's metrics are saved."""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        runs: Dict[str, List[CrawlRun]] = defaultdict(list)
+        for run in db.query(CrawlRun).filter(CrawlRun.cycle_started_at >= now - timedelta(days=CRAWL_BUDGET_DAYS)):
+            runs[run.source].append(run)
+        event_sources = _event_sources(db, metrics)
+        acceptance = _acceptance(db, now - timedelta(days=CRAWL_BUDGET_FEEDBACK_DAYS))
+        users = db.query(User.feedback_metadata).filter(User.is_active == True).all()
+        excluded = [set((meta or {}).get("excluded_sources") or []) for (meta,) in users]
+
+        avg_new = {name: sum(r.items_new for r in rs) / len(rs) for name, rs in runs.items()}
+        established = [avg_new[name] for name, rs in runs.items() if len(rs) >= CRAWL_BUDGET_MIN_RUNS]
+        median_new = statistics.median(established) if established else 0.0
+
+        registry = get_source_registry()
+        existing = {b.source: b for b in db.query(SourceBudget).all()}
+        for name in set(registry) | set(runs):
+            source = registry.get(name)
+            produced = event_sources.get(name, set())
+            excluded_share = (
+                sum(1 for ex in excluded if produced <= ex) / len(excluded) if produced and excluded else 0.0
+            )
+            accepted = _combined_acceptance(acceptance, produced)
+            history = len(runs.get(name, []))
+            if history >= CRAWL_BUDGET_MIN_RUNS:
+                score = _score(avg_new[name], median_new, accepted, excluded_share)
+            else:
+                score = 1 - excluded_share
+
+            base = source.cadence_minutes / 60 if source and source.cadence_minutes else DAILY_INTERVAL_HOURS
+            if excluded_share >= 1:
+                interval = CRAWL_BUDGET_EXCLUDED_DAYS * 24 if CRAWL_BUDGET_EXCLUDED_DAYS else None
+            else:
+                interval = base * _clamp(1 / score if score > 0 else CRAWL_BUDGET_MAX_SLOWDOWN, 1, CRAWL_BUDGET_MAX_SLOWDOWN)
+
+            budget = existing.get(name)
+            if budget is None:
+                budget = SourceBudget(source=name)
+                db.add(budget)
+            budget.score = round(score, 3)
+            budget.runs = history
+            budget.avg_new = round(avg_new.get(name, 0.0), 2)
+            budget.acceptance = round(accepted, 3) if accepted is not None else None
+            budget.excluded_share = round(excluded_share, 3)
+            budget.interval_hours = round(interval, 2) if interval is not None else None
+            budget.page_factor = round(_clamp(score, *CRAWL_BUDGET_PAGE_FACTOR), 2)
+            budget.detail_limit = round(CRAWL_BUDGET_DETAIL_PAGES * _clamp(score, 0.25, 3))
+            budget.event_sources = sorted(produced)
+            if metrics is not None and name in metrics.runs:
+                budget.last_crawled_at = metrics.cycle_started_at
+            elif runs.get(name) and budget.last_crawled_at is None:
+                budget.last_crawled_at = max(r.cycle_started_at for r in runs[name])
+            budget.updated_at = now
+        db.commit()
+        logger.info(f"Crawl budget: {len(registry)} sources scored, median new events per run {median_new:.1f}")
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to refresh crawl budgets: {e}")
+    finally:
+        db.close()
+    get_crawl_budget().load()
+
+
+_budget: Optional[CrawlBudget] = None
+
+
+def get_crawl_budget() -> CrawlBudget:
+    """Process-wide budgets, reloaded by refresh()."""
+    global _budget
+    if _budget is None:
+        _budget = CrawlBudget()
+        _budget.load()
+    return _budget
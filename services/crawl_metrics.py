@@ -0,0 +1,195 @@
+"""
+Per-source crawl metrics, stored per cycle in the crawl_runs table.
+
+The pipeline owns a CrawlMetrics for its cycle. Work done on behalf of a source
+runs inside metrics.attribute(name): the source's parse_* coroutine and the
+detail pages of its events. EventParser._get and _extract record requests
+(latency, bytes, status) and parse CPU time into current(). Stage counters —
+items seen, relevant, new, images — are added by the pipeline and the image
+queue directly. save() writes one CrawlRun row per source at the end of the
+cycle; summarize() aggregates them for /crawlstats.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from database.engine import SessionLocal
+from database.models import CrawlRun
+
+logger = logging.getLogger(__name__)
+
+
+class SourceRun:
+    def __init__(self, source: str):
+        self.source = source
+        self.wall_seconds = 0.0
+        self.requests = 0
+        self.fetch_seconds = 0.0
+        self.max_fetch_seconds = 0.0
+        self.bytes_downloaded = 0
+        self.status_counts: Counter = Counter()
+        self.parse_cpu_seconds = 0.0
+        self.items_seen = 0
+        self.items_relevant = 0
+        self.items_new = 0
+        self.images_fetched = 0
+        self.image_errors = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        # Значения Event.source в событиях источника (для бюджета обхода, в crawl_runs не пишется)
+        self.event_sources: Set[str] = set()
+
+    def record_response(self, status: int, seconds: float, nbytes: int):
+        self.requests += 1
+        self.fetch_seconds += seconds
+        self.max_fetch_seconds = max(self.max_fetch_seconds, seconds)
+        self.bytes_downloaded += nbytes
+        self.status_counts[str(status)] += 1
+
+    def record_request_error(self, seconds: float, error: Exception):
+        self.requests += 1
+        self.fetch_seconds += seconds
+        self.status_counts["error"] += 1
+        self.last_error = repr(error)[:500]
+
+    def record_failure(self, error: str):
+        self.errors += 1
+        self.last_error = error[:500]
+
+
+_current: ContextVar[Optional[SourceRun]] = ContextVar("crawl_source_run", default=None)
+
+
+def current() -> Optional[SourceRun]:
+    """Run of the source the current task works for, None outside attribute()."""
+    return _current.get()
+
+
+class CrawlMetrics:
+    def __init__(self):
+        self.cycle_started_at = datetime.utcnow()
+        self.runs: Dict[str, SourceRun] = {}
+
+    def source(self, name: str) -> SourceRun:
+        if name not in self.runs:
+            self.runs[name] = SourceRun(name)
+        return self.runs[name]
+
+    @contextmanager
+    def attribute(self, name: Optional[str]):
+        """Attribute requests and parsing in this block (and tasks started from it) to source name."""
+        if not name:
+            yield None
+            return
+        token = _current.set(self.source(name))
+        try:
+            yield self.runs[name]
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def timed(self, name: str):
+        """attribute() that also adds the block's wall time to the source."""
+        run = self.source(name)
+        started = time.monotonic()
+        with self.attribute(name):
+            try:
+                yield run
+            finally:
+                run.wall_seconds += time.monotonic() - started
+
+    def save(self):
+        if not self.runs:
+            return
+        db = SessionLocal()
+        try:
+            for run in self.runs.values():
+                db.add(CrawlRun(
+                    cycle_started_at=self.cycle_started_at,
+                    source=run.source,
+                    wall_seconds=round(run.wall_seconds, 3),
+                    requests=run.requests,
+                    fetch_seconds=round(run.fetch_seconds, 3),
+                    max_fetch_seconds=round(run.max_fetch_seconds, 3),
+                    bytes_downloaded=run.bytes_downloaded,
+                    status_counts=dict(run.status_counts),
+                    parse_cpu_seconds=round(run.parse_cpu_seconds, 3),
+                    items_seen=run.items_seen,
+                    items_relevant=run.items_relevant,
+                    items_new=run.items_new,
+                    images_fetched=run.images_fetched,
+                    image_errors=run.image_errors,
+                    errors=run.errors,
+                    last_error=run.last_error,
+                ))
+            db.commit()
+            logger.info(f"Crawl metrics: saved {len(self.runs)} source runs")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to save crawl metrics: {e}")
+        finally:
+            db.close()
+
+
+def summarize(days: int = 7) -> List[Dict]:
+    """Per source averages over the last days, with the change against the days before."""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        rows = db.query(CrawlRun).filter(CrawlRun.cycle_started_at >= now - timedelta(days=2 * days)).all()
+    finally:
+        db.close()
+
+    current_rows: Dict[str, List[CrawlRun]] = {}
+    previous_rows: Dict[str, List[CrawlRun]] = {}
+    boundary = now - timedelta(days=days)
+    for row in rows:
+        target = current_rows if row.cycle_started_at >= boundary else previous_rows
+        target.setdefault(row.source, []).append(row)
+
+    summary = []
+    for source, runs in current_rows.items():
+        stats = _aggregate(runs)
+        before = previous_rows.get(source)
+        if before:
+            prev = _aggregate(before)
+            stats["wall_change"] = _change(stats["avg_wall"], prev["avg_wall"])
+            stats["new_change"] = _change(stats["avg_new"], prev["avg_new"])
+        summary.append(stats | {"source": source})
+    summary.sort(key=lambda s: s["avg_wall"], reverse=True)
+    return summary
+
+
+def _aggregate(runs: List[CrawlRun]) -> Dict:
+    n = len(runs)
+    requests = sum(r.requests for r in runs)
+    statuses: Counter = Counter()
+    for r in runs:
+        statuses.update(r.status_counts or {})
+    failed = sum(v for k, v in statuses.items() if k == "error" or (k.isdigit() and int(k) >= 400))
+    return {
+        "runs": n,
+        "avg_wall": sum(r.wall_seconds for r in runs) / n,
+        "avg_latency": sum(r.fetch_seconds for r in runs) / requests if requests else 0.0,
+        "max_latency": max(r.max_fetch_seconds for r in runs),
+        "avg_mb": sum(r.bytes_downloaded for r in runs) / n / 1024 / 1024,
+        "avg_cpu": sum(r.parse_cpu_seconds for r in runs) / n,
+        "avg_requests": requests / n,
+        "failed_share": failed / requests if requests else 0.0,
+        "avg_seen": sum(r.items_seen for r in runs) / n,
+        "avg_relevant": sum(r.items_relevant for r in runs) / n,
+        "avg_new": sum(r.items_new for r in runs) / n,
+        "images": sum(r.images_fetched for r in runs),
+        "image_errors": sum(r.image_errors for r in runs),
+        "errors": sum(r.errors for r in runs),
+    }
+
+
+def _change(value: float, before: float) -> Optional[float]:
+    if not before:
+        return None
+    return (value - before) / before
@@ -0,0 +1,342 @@
+"""
+Process-wide crawler state shared by every EventParser.
+
+One httpx.AsyncClient lives for the whole bot process, so keep-alive
+connections, the DNS cache and the image cache survive between parsing
+cycles. HTTP/2 is used where the server supports it (needs the `h2` package).
+TCP connect, TLS handshake and DNS lookups are timed per host.
+HTML extraction runs in a process pool owned by the same state, so the bot's
+event loop is never blocked by BeautifulSoup/lxml work.
+"""
+import asyncio
+import contextlib
+import importlib.util
+import ipaddress
+import logging
+import multiprocessing
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import httpcore
+import httpx
+
+from config import (
+    HTTP_MAX_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP2_ENABLED,
+    DNS_CACHE_TTL_SECONDS,
+    PARSE_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
+class NetworkStats:
+    """Connect / TLS handshake / DNS counters per host."""
+
+    def __init__(self):
+        self._hosts: Dict[str, Dict] = {}
+
+    def _host(self, host: str) -> Dict:
+        if host not in self._hosts:
+            self._hosts[host] = {
+                'connects': 0, 'connect_time': 0.0,
+                'tls_handshakes': 0, 'tls_time': 0.0,
+                'dns_lookups': 0, 'dns_cache_hits': 0, 'dns_time': 0.0,
+            }
+        return self._hosts[host]
+
+    def record(self, host: str, kind: str, seconds: float = 0.0):
+        st = self._host(host)
+        if kind == 'connect':
+            st['connects'] += 1
+            st['connect_time'] += seconds
+        elif kind == 'tls':
+            st['tls_handshakes'] += 1
+            st['tls_time'] += seconds
+        elif kind == 'dns':
+            st['dns_lookups'] += 1
+            st['dns_time'] += seconds
+        elif kind == 'dns_hit':
+            st['dns_cache_hits'] += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        result = {}
+        for host, st in sorted(self._hosts.items()):
+            result[host] = {
+                'connects': st['connects'],
+                'avg_connect': round(st['connect_time'] / st['connects'], 3) if st['connects'] else 0.0,
+                'tls_handshakes': st['tls_handshakes'],
+                'avg_tls': round(st['tls_time'] / st['tls_handshakes'], 3) if st['tls_handshakes'] else 0.0,
+                'dns_lookups': st['dns_lookups'],
+                'dns_cache_hits': st['dns_cache_hits'],
+            }
+        return result
+
+
+class _TimedStream(httpcore.AsyncNetworkStream):
+    """Network stream that times its TLS handshake."""
+
+    def __init__(self, stream: httpcore.AsyncNetworkStream, host: str, stats: NetworkStats):
+        self._stream = stream
+        self._host = host
+        self._stats = stats
+
+    async def read(self, max_bytes: int, timeout: Optional[float] = None) -> bytes:
+        return await self._stream.read(max_bytes, timeout=timeout)
+
+    async def write(self, buffer: bytes, timeout: Optional[float] = None) -> None:
+        await self._stream.write(buffer, timeout=timeout)
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+    async def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        started = time.monotonic()
+        stream = await self._stream.start_tls(ssl_context, server_hostname=server_hostname, timeout=timeout)
+        self._stats.record(self._host, 'tls', time.monotonic() - started)
+        return _TimedStream(stream, self._host, self._stats)
+
+    def get_extra_info(self, info: str):
+        return self._stream.get_extra_info(info)
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore backend with a TTL DNS cache and connect/TLS timing.
+
+    Connects to the cached IPs in resolver order, moving on to the next one
+    when a connect fails; httpcore still passes the original host name as TLS
+    server_hostname, so SNI and certificate checks are unaffected.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend, stats: NetworkStats, ttl: float = DNS_CACHE_TTL_SECONDS):
+        self._backend = backend
+        self._stats = stats
+        self._ttl = ttl
+        self._dns: Dict[tuple, tuple] = {}
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        cached = self._dns.get((host, port))
+        if cached and cached[1] > time.monotonic():
+            self._stats.record(host, 'dns_hit')
+            return cached[0]
+        started = time.monotonic()
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        self._stats.record(host, 'dns', time.monotonic() - started)
+        # Порядок резолвера сохраняем, дубли (по одному на протокол) убираем
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._dns[(host, port)] = (addresses, time.monotonic() + self._ttl)
+        return addresses
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = await self._resolve(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        last_error: Optional[Exception] = None
+        for address in addresses:
+            started = time.monotonic()
+            try:
+                stream = await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+                continue
+            self._stats.record(host, 'connect', time.monotonic() - started)
+            return _TimedStream(stream, host, self._stats)
+        # Ни один адрес не ответил — адреса могли смениться, следующая попытка резолвит заново
+        self._dns.pop((host, port), None)
+        raise last_error or httpcore.ConnectError(f"No addresses for {host}")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# Исключения httpcore → httpx, как в httpx.AsyncHTTPTransport
+_HTTPCORE_ERRORS = {
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.ProtocolError: httpx.ProtocolError,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+}
+
+
+@contextlib.contextmanager
+def _map_httpcore_errors():
+    try:
+        yield
+    except Exception as exc:
+        mapped = None
+        for from_exc, to_exc in _HTTPCORE_ERRORS.items():
+            # Самый точный класс: ReadTimeout, а не просто TimeoutException
+            if isinstance(exc, from_exc) and (mapped is None or issubclass(to_exc, mapped)):
+                mapped = to_exc
+        if mapped is None:
+            raise
+        raise mapped(str(exc)) from exc
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with _map_httpcore_errors():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class CrawlerTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore pool with a custom network backend.
+
+    httpx.AsyncHTTPTransport has no network_backend argument, while
+    httpcore.AsyncConnectionPool does — so the pool is built here and requests
+    are mapped the same way httpx maps them.
+    """
+
+    def __init__(self, network_backend: httpcore.AsyncNetworkBackend, verify: bool = True, http2: bool = False,
+                 limits: httpx.Limits = httpx.Limits()):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(verify=verify),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=network_backend,
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        req = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_httpcore_errors():
+            resp = await self._pool.handle_async_request(req)
+        return httpx.Response(
+            status_code=resp.status,
+            headers=resp.headers,
+            stream=_ResponseStream(resp.stream),
+            extensions=resp.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+class CrawlerState:
+    """Long-lived HTTP client plus caches shared by parsers across cycles."""
+
+    def __init__(self, wrap_transport: Optional[Callable[[httpx.AsyncBaseTransport], httpx.AsyncBaseTransport]] = None):
+        """wrap_transport(transport) -> transport: record or replay traffic (services/cassettes.py)."""
+        self.network_stats = NetworkStats()
+        http2 = HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+        if HTTP2_ENABLED and not http2:
+            logger.warning("HTTP/2 disabled: package 'h2' is not installed (pip install 'httpx[http2]')")
+        transport: httpx.AsyncBaseTransport = CrawlerTransport(
+            CachingNetworkBackend(httpcore.AnyIOBackend(), self.network_stats),
+            verify=False,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        if wrap_transport is not None:
+            transport = wrap_transport(transport)
+        self.transport = transport
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            timeout=30.0,
+            follow_redirects=True,
+            headers=DEFAULT_HEADERS,
+        )
+        # Загрузки изображений в процессе (image_url → задача) — общие для всех парсеров
+        self.image_downloads: Dict[str, asyncio.Future] = {}
+        self._extraction_pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def extraction_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Pool of PARSE_WORKERS processes for HTML extraction, None if disabled."""
+        if PARSE_WORKERS <= 0:
+            return None
+        if self._extraction_pool is None:
+            # spawn: не копировать в воркеры открытые сокеты и соединения БД основного процесса
+            self._extraction_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Extraction pool started with {PARSE_WORKERS} worker(s)")
+        return self._extraction_pool
+
+    def reset_extraction_pool(self):
+        """Shut the pool down; the next extraction starts a new one."""
+        if self._extraction_pool is not None:
+            self._extraction_pool.shutdown(wait=False, cancel_futures=True)
+            self._extraction_pool = None
+
+    async def close(self):
+        await self.client.aclose()
+        self.reset_extraction_pool()
+
+
+_state: Optional[CrawlerState] = None
+
+
+def get_crawler_state() -> CrawlerState:
+    """Process-wide crawler state, created on first use."""
+    global _state
+    if _state is None or _state.client.is_closed:
+        _state = CrawlerState()
+    return _state
+
+
+async def close_crawler_state():
+    """Close the shared client — call once on process shutdown."""
+    global _state
+    if _state is not None:
+        await _state.close()
+        _state = None
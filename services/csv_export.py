@@ -3,6 +3,7 @@ import csv
 import logging
 import re
 from pathlib import Path
+from typing import Optional
 from sqlalchemy.orm import Session
 
 from database.models import Event
@@ -26,9 +27,9 @@ CSV_COLUMNS = [
 ]
 
 
-def export_events_to_csv(db: Session) -> str:
+def export_events_to_csv(db: Session, path: Optional[Path] = None) -> str:
     """
-    Export all events from DB to events.csv.
+    Export all events from DB to events.csv (or to path).
     Returns the absolute path to the created file.
     """
     events = db.query(Event).order_by(Event.id.desc()).all()
@@ -76,7 +77,7 @@ def export_events_to_csv(db: Session) -> str:
             "image_url": e.image_url or "",
         })
 
-    filepath = Path(__file__).parent.parent / CSV_PATH
+    filepath = Path(path) if path else Path(__file__).parent.parent / CSV_PATH
     with open(filepath, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
         writer.writeheader()
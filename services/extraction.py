@@ -0,0 +1,1508 @@
+"""
+HTML → event records, without any network or database access.
+
+EventExtractor holds the text helpers and one extract_* method per source.
+Every extract_* takes raw HTML and returns plain dicts, so it can run in a
+worker process: EventParser (services/parser.py) inherits from this class,
+fetches the pages and sends the HTML to the process pool via run_extractor().
+"""
+import re
+import logging
+import time
+from bs4 import BeautifulSoup
+from lxml import etree
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urljoin, unquote, urlparse
+from html import unescape as html_unescape
+from difflib import SequenceMatcher
+from config import (
+    STOP_WORDS,
+    B2B_KEYWORDS,
+    CITY_VARIANTS,
+)
+from services import structured_data
+from services.source_specs import compile_spec, parse_html
+
+logger = logging.getLogger(__name__)
+
+
+# Маппинг ключевых слов -> индустрия для автоопределения
+INDUSTRY_KEYWORDS = {
+    "IT/Digital": ["it", "digital", "цифр", "технолог", "software", "стартап", "ai", "artificial intelligence", "блокчейн", "blockchain", "кибербезопасност", "cybersecurity"],
+    "Агросектор": ["агро", "сельск", "ферм", "food", "агропром", "агрокультура", "животноводств", "растениеводств", "irrigation", "watering"],
+    "Медицина": ["медицин", "здоровь", "клиник", "kihe", "pharma", "фарм", "стоматолог", "dent", "ветеринар", "hospital", "surgery"],
+    "Строительство": ["строительств", "build", "интерьер", "недвижим", "architect", "design", "ремонт", "отделк", "construction"],
+    "Энергетика": ["энерг", "power", "electric", "renewable", "solar", "wind", "атом", "nuclear", "электростанц"],
+    "Ритейл/FMCG": ["ритейл", "fmcg", "розниц", "retail", "товар", "потребитель", "consumer", "упаковк", "packaging", "продукт", "food processing"],
+    "Нефть и Газ": ["нефть", "газ", "oil", "gas", "недропольз", "petrochemical", "нефтехим", "бурени", "drilling", "refinery"],
+    "Транспорт": ["транспорт", "логистик", "авто", "transport", "logistic", "shipping", "aviation", "авиа", "railway", "жд"],
+    "Mining": ["mining", "горн", "металл", "amm", "kioge", "металлург", "steel", "aluminum", "цветн", "precious metal"],
+    "Туризм": ["туризм", "travel", "tourism", "hotel", "отель", "гостиниц", "hospitality", "курорт"],
+    "Финансы": ["финанс", "finance", "bank", "банк", "инвест", "invest", "страхов", "insurance", "fintech"],
+    "Образование": ["образовани", "education", "школ", "университет", "student", "учебн", "pedagog"],
+    "Экология": ["эколог", "ecology", "environment", "recycling", "переработк", "waste", "green", "устойчив"],
+}
+
+# Все ключевые слова: B2B + все категории
+ALL_RELEVANT_KEYWORDS = B2B_KEYWORDS + [
+    kw for keywords in INDUSTRY_KEYWORDS.values() for kw in keywords
+]
+
+# Месяцы на разных языках для парсинга дат (включая склонения)
+MONTHS = {
+    'янв': 1, 'январ': 1, 'января': 1, 'jan': 1, 'january': 1,
+    'фев': 2, 'феврал': 2, 'февраля': 2, 'feb': 2, 'february': 2,
+    'мар': 3, 'март': 3, 'марта': 3, 'mar': 3, 'march': 3,
+    'апр': 4, 'апрел': 4, 'апреля': 4, 'apr': 4, 'april': 4,
+    'май': 5, 'мая': 5, 'may': 5,
+    'июн': 6, 'июня': 6, 'jun': 6, 'june': 6,
+    'июл': 7, 'июля': 7, 'jul': 7, 'july': 7,
+    'авг': 8, 'август': 8, 'августа': 8, 'aug': 8, 'august': 8,
+    'сен': 9, 'сентябр': 9, 'сентября': 9, 'sep': 9, 'september': 9,
+    'окт': 10, 'октябр': 10, 'октября': 10, 'oct': 10, 'october': 10,
+    'ноя': 11, 'ноябр': 11, 'ноября': 11, 'nov': 11, 'november': 11,
+    'дек': 12, 'декабр': 12, 'декабря': 12, 'dec': 12, 'december': 12,
+}
+
+
+class EventExtractor:
+    """Синхронное извлечение событий из HTML (BeautifulSoup/lxml), без I/O."""
+
+    def _discover_listing_pages(self, soup: BeautifulSoup, page_url: str, pattern: str) -> List[str]:
+        """Ссылки пагинации листинга: rel=next и href по шаблону, только тот же хост."""
+        host = urlparse(page_url).hostname
+        page_re = re.compile(pattern)
+        urls = []
+        for tag in soup.find_all(['a', 'link'], href=True):
+            href = tag['href']
+            rel = tag.get('rel') or []
+            if 'next' not in rel and not page_re.search(href):
+                continue
+            full_url = urljoin(page_url, href).split('#')[0]
+            if urlparse(full_url).hostname == host and full_url not in urls:
+                urls.append(full_url)
+        return urls
+
+    def _extract_all_image_urls_from_element(self, element, base_url: str) -> List[str]:
+        """Извлечь ВСЕ возможные URL изображений из элемента."""
+        image_urls = []
+        if not element:
+            return image_urls
+
+        # 1. Img tag - все возможные атрибуты
+        img = element.find('img') if hasattr(element, 'find') else None
+        if img:
+            for attr in ['src', 'data-src', 'data-lazy-src', 'data-original', 'data-srcset', 'data-thumb', 'original-src']:
+                val = img.get(attr)
+                if val and not val.startswith('data:'):
+                    # Для srcset берём первое изображение
+                    if attr == 'data-srcset' or attr == 'srcset':
+                        val = val.split(',')[0].split()[0]
+                    full_url = urljoin(base_url, val.strip())
+                    image_urls.append(full_url)
+            
+            # Проверить вложенные picture > source
+            picture = element.find('picture')
+            if picture:
+                for source in picture.find_all('source'):
+                    srcset = source.get('srcset')
+                    if srcset:
+                        img_url = srcset.split(',')[0].split()[0]
+                        image_urls.append(urljoin(base_url, img_url.strip()))
+
+        # 2. Background-image в style
+        if hasattr(element, 'get'):
+            style = element.get('style', '')
+            if style:
+                # Разные форматы background-image
+                bg_patterns = [
+                    r'background-image:\s*url\(["\']?([^"\')\s]+)["\']?\)',
+                    r'background:\s*[^;]*url\(["\']?([^"\')\s]+)["\']?\)',
+                ]
+                for pattern in bg_patterns:
+                    matches = re.findall(pattern, style, re.IGNORECASE)
+                    for match in matches:
+                        image_urls.append(urljoin(base_url, match.strip()))
+
+        # 3. Поиск по классам (.img, .image, .thumbnail, .photo)
+        if hasattr(element, 'find_all'):
+            for img_class in ['img', 'image', 'thumbnail', 'photo', 'picture', 'media']:
+                for img_elem in element.find_all(class_=re.compile(img_class, re.I)):
+                    # Проверить как img tag, так и background
+                    img_tag = img_elem.find('img')
+                    if img_tag and img_tag.get('src'):
+                        image_urls.append(urljoin(base_url, img_tag['src']))
+                    elif img_elem.get('style'):
+                        style = img_elem.get('style')
+                        bg_match = re.search(r'url\(["\']?([^"\')\s]+)["\']?\)', style)
+                        if bg_match:
+                            image_urls.append(urljoin(base_url, bg_match.group(1)))
+
+        # 4. Соседние элементы с изображениями
+        if hasattr(element, 'find_next_sibling'):
+            for sibling in [element.find_next_sibling(), element.find_previous_sibling()]:
+                if sibling:
+                    sibling_imgs = sibling.find_all('img')
+                    for img_tag in sibling_imgs:
+                        if img_tag.get('src'):
+                            image_urls.append(urljoin(base_url, img_tag['src']))
+
+        # Удалить дубликаты и невалидные URL
+        unique_urls = []
+        seen = set()
+        for url in image_urls:
+            if url and url not in seen and url.startswith(('http://', 'https://')):
+                seen.add(url)
+                unique_urls.append(url)
+        
+        return unique_urls
+
+    def _clean_text(self, text: str) -> str:
+        """Очистить текст от лишнего whitespace и управляющих символов."""
+        if not text:
+            return ""
+        # Удалить лишние пробелы, табы, новые строки
+        text = re.sub(r'[\t\n\r\f]+', ' ', text)
+        # Удалить лишние пробелы
+        text = re.sub(r'\s+', ' ', text)
+        # Удалить специальные символы в начале/конце
+        text = text.strip(' \t\n\r\x0b\x0c\u200b')
+        return text
+
+    # Известные SEO-хвосты сайтов
+    _SEO_TAILS = [
+        'iteca', 'exposale', 'vystavki', 'worldexpo', 'atakent', 'qazexpo',
+        'astanahub', 'expo-centralasia', 'bakuexpo', 'exhibitions', 'выставки',
+        'все выставки', 'каталог выставок', 'главная', 'home',
+    ]
+
+    def _clean_title(self, title: str) -> str:
+        """Очистить заголовок от мусора, SEO-текста, лишних символов."""
+        if not title:
+            return ""
+
+        # Удалить SEO-хвосты только если они содержат известные паттерны
+        for _ in range(2):
+            m = re.search(r'\s*[-|–—]\s*([^-|–—]+)$', title)
+            if m:
+                tail = m.group(1).strip().lower()
+                if any(seo in tail for seo in self._SEO_TAILS):
+                    title = title[:m.start()]
+
+        # Удалить лишние кавычки
+        title = title.strip('"\'"')
+
+        return self._clean_text(title)
+
+    def _clean_description(self, description: str, full_html: str = "") -> str:
+        """Очистить описание от мусора, навигации, рекламы."""
+        if not description:
+            return ""
+
+        # Декодировать HTML entities
+        description = html_unescape(description)
+        # Удалить &nbsp; и прочие оставшиеся entities
+        description = re.sub(r'&\w+;', ' ', description)
+
+        # Удалить типичный мусор (только хвосты, не начала)
+        tail_patterns = [
+            r'Читать далее.*$',
+            r'Подробнее\s*\.{0,3}\s*$',
+            r'Learn more.*$',
+            r'Купить билет.*$',
+            r'Book now.*$',
+            r'Поделиться.*$',
+            r'Share on.*$',
+            r'←.*$',
+            r'→.*$',
+            r'Home\s*>\s*.*$',
+            r'Главная\s*>\s*.*$',
+        ]
+
+        for pattern in tail_patterns:
+            description = re.sub(pattern, '', description, flags=re.IGNORECASE | re.MULTILINE)
+
+        # Удалить пустые строки в начале
+        desc_lines = description.split('\n')
+        while desc_lines and not desc_lines[0].strip():
+            desc_lines.pop(0)
+
+        description = '\n'.join(desc_lines)
+        return self._clean_text(description)
+
+    def _clean_url(self, url: str) -> str:
+        """Очистить URL от мусора."""
+        if not url:
+            return ""
+        
+        # Удалить tg://msg_url?url=
+        if url.startswith("tg://msg_url?url="):
+            url = url.replace("tg://msg_url?url=", "")
+            try:
+                url = unquote(url)
+            except:
+                pass
+        
+        # Игнорировать javascript:void(0)
+        if url.lower() in ["javascript:void(0)", "javascript:void(0);", "#"]:
+            return ""
+        
+        # Удалить якоря
+        url = url.split('#')[0]
+        
+        # Удалить UTM метки (опционально, можно оставить для аналитики)
+        # parsed = urlparse(url)
+        # query_params = parse_qs(parsed.query)
+        # clean_params = {k: v for k, v in query_params.items() if not k.lower().startswith('utm_')}
+        # url = urlunparse(parsed._replace(query='&'.join(f'{k}={v[0]}' for k, v in clean_params.items())))
+        
+        return url.strip()
+
+    def _normalize_text_for_comparison(self, text: str) -> str:
+        """Нормализовать текст для сравнения."""
+        if not text:
+            return ""
+        normalized = re.sub(r'[^\w\s]', ' ', text.lower())
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        return normalized
+
+    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
+        """Рассчитать схожесть текстов (0.0 to 1.0)."""
+        if not text1 or not text2:
+            return 0.0
+        norm1 = self._normalize_text_for_comparison(text1)
+        norm2 = self._normalize_text_for_comparison(text2)
+        if not norm1 or not norm2:
+            return 0.0
+        return SequenceMatcher(None, norm1, norm2).ratio()
+
+    def _contains_stop_word(self, text: str) -> bool:
+        """Проверить наличие стоп-слова."""
+        if not text:
+            return False
+        normalized = re.sub(r'[-\s]+', ' ', text.lower())
+        for stop_word in STOP_WORDS:
+            normalized_stop = re.sub(r'[-\s]+', ' ', stop_word.lower())
+            if normalized_stop in normalized:
+                return True
+        return False
+
+    def _is_relevant(self, title: str, description: str) -> bool:
+        """Проверить релевантность события (B2B, не стоп-слова)."""
+        full_text = (title + " " + (description or "")).lower()
+        if self._contains_stop_word(full_text):
+            return False
+        # B2B keywords или industry keywords
+        if any(w in full_text for w in ALL_RELEVANT_KEYWORDS):
+            return True
+        # Паттерны типичных названий выставок: "Something 2026", "Something EXPO", год в названии
+        title_lower = title.lower()
+        if re.search(r'\b20[2-5]\d\b', title_lower):
+            return True
+        # Названия с типичными суффиксами выставок
+        if re.search(r'\b(show|fair|week|summit|congress|symposium)\b', title_lower, re.I):
+            return True
+        return False
+
+    def _extract_city(self, text: str) -> Optional[str]:
+        """Извлечь город из текста."""
+        if not text:
+            return None
+        text_lower = text.lower()
+        for city, variants in CITY_VARIANTS.items():
+            if any(v in text_lower for v in variants):
+                return city
+        return None
+
+    def _extract_country_from_city(self, city: str) -> Optional[str]:
+        """Определить страну по городу."""
+        if not city:
+            return None
+        
+        city_lower = city.lower()
+        country_city_map = {
+            "Казахстан": ["алматы", "астана", "шымкент", "атырау", "актау", "караганда", "актобе", "тараз", "павлодар", "уральск", "семей", "костанай", "кызылорда", "петропавловск", "туркестан", "кокшетау", "талдыкорган", "оскемен", "усть-каменогорск"],
+            "Узбекистан": ["ташкент", "самарканд", "наманган", "андижан", "бухара", "хива", "карши", "термез"],
+            "Азербайджан": ["баку", "гянджа", "сумгаит", "ленкорань", "шеки"],
+            "Грузия": ["тбилиси", "батуми", "кутаиси", "рузтави"],
+            "Армения": ["ереван", "гюмри", "ванадзор"],
+            "Кыргызстан": ["бишкек", "ош", "джалал-абад", "каракол"],
+            "Таджикистан": ["душанбе", "худжанд", "куляб"],
+            "Туркменистан": ["ашхабад", "туркменабат", "мары", "дашогуз"],
+        }
+        
+        for country, cities in country_city_map.items():
+            if any(c in city_lower for c in cities):
+                return country
+        
+        return None
+
+    def _infer_country_from_text(self, text: str) -> Optional[str]:
+        """Определить страну из текста."""
+        if not text:
+            return None
+        t = text.lower()
+        country_map = [
+            ("казахстан", "Казахстан"), ("алматы", "Казахстан"), ("астана", "Казахстан"), ("шымкент", "Казахстан"), ("атырау", "Казахстан"),
+            ("узбекистан", "Узбекистан"), ("ташкент", "Узбекистан"), ("самарканд", "Узбекистан"),
+            ("азербайджан", "Азербайджан"), ("баку", "Азербайджан"),
+            ("грузия", "Грузия"), ("тбилиси", "Грузия"), ("батуми", "Грузия"),
+            ("армения", "Армения"), ("ереван", "Армения"),
+            ("кыргызстан", "Кыргызстан"), ("киргиз", "Кыргызстан"), ("бишкек", "Кыргызстан"), ("ош", "Кыргызстан"),
+            ("таджикистан", "Таджикистан"), ("душанбе", "Таджикистан"), ("худжанд", "Таджикистан"),
+            ("туркменистан", "Туркменистан"), ("ашхабад", "Туркменистан"), ("мары", "Туркменистан"),
+            # Нецелевые страны — определяем чтобы потом отфильтровать
+            ("россия", "Россия"), ("москва", "Россия"), ("санкт-петербург", "Россия"), ("краснодар", "Россия"),
+            ("новосибирск", "Россия"), ("екатеринбург", "Россия"), ("казань", "Россия"), ("нижний новгород", "Россия"),
+            ("russia", "Россия"), ("moscow", "Россия"), ("st. petersburg", "Россия"),
+            ("китай", "Китай"), ("china", "Китай"), ("пекин", "Китай"), ("шанхай", "Китай"),
+            ("гуанчжоу", "Китай"), ("шэньчжэнь", "Китай"), ("beijing", "Китай"), ("shanghai", "Китай"),
+            ("guangzhou", "Китай"), ("shenzhen", "Китай"), ("hong kong", "Китай"), ("гонконг", "Китай"),
+            ("турция", "Турция"), ("turkey", "Турция"), ("стамбул", "Турция"), ("istanbul", "Турция"), ("анкара", "Турция"),
+            ("иран", "Иран"), ("iran", "Иран"), ("тегеран", "Иран"),
+            ("индия", "Индия"), ("india", "Индия"), ("дели", "Индия"), ("мумбаи", "Индия"),
+            ("германия", "Германия"), ("germany", "Германия"), ("берлин", "Германия"), ("мюнхен", "Германия"),
+            ("оаэ", "ОАЭ"), ("uae", "ОАЭ"), ("дубай", "ОАЭ"), ("dubai", "ОАЭ"), ("абу-даби", "ОАЭ"),
+            ("беларус", "Беларусь"), ("belarus", "Беларусь"), ("минск", "Беларусь"), ("minsk", "Беларусь"),
+            ("украин", "Украина"), ("ukraine", "Украина"), ("киев", "Украина"), ("kyiv", "Украина"), ("kiev", "Украина"),
+            ("молдов", "Молдова"), ("moldova", "Молдова"), ("кишинёв", "Молдова"), ("кишинев", "Молдова"),
+            ("польш", "Польша"), ("poland", "Польша"), ("варшав", "Польша"), ("warsaw", "Польша"),
+            ("латви", "Латвия"), ("latvia", "Латвия"), ("рига", "Латвия"),
+            ("литв", "Литва"), ("lithuania", "Литва"), ("вильнюс", "Литва"),
+            ("эстони", "Эстония"), ("estonia", "Эстония"), ("таллин", "Эстония"),
+        ]
+        for kw, country in country_map:
+            if kw in t:
+                return country
+        return None
+
+    def _infer_industry(self, title: str, description: str) -> Optional[str]:
+        """Определить индустрию по ключевым словам."""
+        full = (title + " " + (description or "")).lower()
+        
+        # Считать совпадения по каждой индустрии
+        industry_scores = {}
+        for industry, keywords in INDUSTRY_KEYWORDS.items():
+            score = sum(1 for kw in keywords if kw.lower() in full)
+            if score > 0:
+                industry_scores[industry] = score
+        
+        if not industry_scores:
+            return "Другое"
+        
+        # Вернуть индустрию с наибольшим количеством совпадений
+        return max(industry_scores.items(), key=lambda x: x[1])[0]
+
+    def _month_to_num(self, month_name: str) -> Optional[int]:
+        """Преобразовать название месяца в число."""
+        if not month_name:
+            return None
+        month_lower = month_name.lower().strip()
+        # Сначала ищем точное вхождение (или вхождение ключа в название)
+        best_match = None
+        best_len = 0
+        for m_name, m_num in MONTHS.items():
+            if m_name in month_lower or month_lower.startswith(m_name):
+                if len(m_name) > best_len:
+                    best_len = len(m_name)
+                    best_match = m_num
+        return best_match
+
+    def _extract_dates_from_text(self, text: str) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Извлечь даты начала и окончания из текста. Поддерживает множество форматов."""
+        if not text:
+            return None, None
+
+        text_lower = text.lower().strip()
+        current_year = datetime.now().year
+
+        # Формат 1: "с DD.MM.YYYY по DD.MM.YYYY" / "DD.MM.YYYY — DD.MM.YYYY"
+        m = re.search(r'(?:с\s+)?(\d{1,2})\.(\d{1,2})\.(20[2-5]\d)\s*(?:по|[-—–])\s*(\d{1,2})\.(\d{1,2})\.(20[2-5]\d)', text_lower)
+        if m:
+            try:
+                return (
+                    datetime(int(m.group(3)), int(m.group(2)), int(m.group(1))),
+                    datetime(int(m.group(6)), int(m.group(5)), int(m.group(4)))
+                )
+            except ValueError:
+                pass
+
+        # Формат 2: "DD.MM — DD.MM.YYYY" (год только у второй даты)
+        m = re.search(r'(\d{1,2})\.(\d{1,2})\s*[-—–]\s*(\d{1,2})\.(\d{1,2})\.(20[2-5]\d)', text_lower)
+        if m:
+            try:
+                year = int(m.group(5))
+                return (
+                    datetime(year, int(m.group(2)), int(m.group(1))),
+                    datetime(year, int(m.group(4)), int(m.group(3)))
+                )
+            except ValueError:
+                pass
+
+        # Формат 3: "с DD месяц по DD месяц YYYY" (межмесячные диапазоны)
+        m = re.search(
+            r'(?:с\s+)?(\d{1,2})\s+([а-яё]+)\s+(?:по|[-—–])\s*(\d{1,2})\s+([а-яё]+)\s*(20[2-5]\d)?',
+            text_lower
+        )
+        if m:
+            day1, month1_name, day2, month2_name, year_str = m.groups()
+            month1 = self._month_to_num(month1_name)
+            month2 = self._month_to_num(month2_name)
+            if month1 and month2:
+                year = int(year_str) if year_str else current_year
+                try:
+                    return (
+                        datetime(year, month1, int(day1)),
+                        datetime(year, month2, int(day2))
+                    )
+                except ValueError:
+                    pass
+
+        # Формат 4: "DD-DD месяц YYYY" / "DD — DD месяц YYYY"
+        m = re.search(r'(\d{1,2})\s*[-—–]\s*(\d{1,2})\s+([а-яёa-z]+)\s*(20[2-5]\d)?', text_lower)
+        if m:
+            day1, day2, month_name, year_str = m.groups()
+            month_num = self._month_to_num(month_name)
+            if month_num:
+                year = int(year_str) if year_str else current_year
+                try:
+                    return (
+                        datetime(year, month_num, int(day1)),
+                        datetime(year, month_num, int(day2))
+                    )
+                except ValueError:
+                    pass
+
+        # Формат 5: "March 15-17, 2024" (английский)
+        m = re.search(r'([a-z]+)\s+(\d{1,2})\s*[-—–]\s*(\d{1,2}),?\s*(20[2-5]\d)?', text_lower)
+        if m:
+            month_name, day1, day2, year_str = m.groups()
+            month_num = self._month_to_num(month_name)
+            if month_num:
+                year = int(year_str) if year_str else current_year
+                try:
+                    return (
+                        datetime(year, month_num, int(day1)),
+                        datetime(year, month_num, int(day2))
+                    )
+                except ValueError:
+                    pass
+
+        # Формат 6: Одиночная дата "DD месяц YYYY"
+        m = re.search(r'(\d{1,2})\s+([а-яёa-z]+)\s+(20[2-5]\d)', text_lower)
+        if m:
+            day, month_name, year_str = m.groups()
+            month_num = self._month_to_num(month_name)
+            if month_num:
+                try:
+                    return datetime(int(year_str), month_num, int(day)), None
+                except ValueError:
+                    pass
+
+        # Формат 7: "DD месяц" без года
+        m = re.search(r'(\d{1,2})\s+([а-яёa-z]{3,})', text_lower)
+        if m:
+            day, month_name = m.groups()
+            month_num = self._month_to_num(month_name)
+            if month_num:
+                try:
+                    return datetime(current_year, month_num, int(day)), None
+                except ValueError:
+                    pass
+
+        # Формат 8: числовые "YYYY-MM-DD" или "DD.MM.YYYY"
+        m = re.search(r'(20[2-5]\d)[-\./](\d{1,2})[-\./](\d{1,2})', text)
+        if m:
+            try:
+                return datetime(int(m.group(1)), int(m.group(2)), int(m.group(3))), None
+            except ValueError:
+                pass
+
+        m = re.search(r'(\d{1,2})[-\./](\d{1,2})[-\./](20[2-5]\d)', text)
+        if m:
+            first, second, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
+            day, month = (first, second) if first > 12 else (first, second)
+            if second > 12:
+                month, day = first, second
+            try:
+                return datetime(year, month, day), None
+            except ValueError:
+                pass
+
+        return None, None
+
+    def _extract_from_json_ld(self, html: str, base_url: str) -> List[Dict]:
+        """Извлечь события из JSON-LD structured data (сканером по сырому HTML, без DOM)."""
+        events = []
+        for item in structured_data.iter_json_ld(html):
+            try:
+                item_type = item.get('@type', '')
+                if item_type not in ('Event', 'ExhibitionEvent', 'BusinessEvent', 'Exhibition'):
+                    continue
+                name = item.get('name', '')
+                if not name or len(name) < 5:
+                    continue
+                start_str = item.get('startDate', '')
+                end_str = item.get('endDate', '')
+                start_date = end_date = None
+                for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M'):
+                    if start_str and not start_date:
+                        try:
+                            start_date = datetime.strptime(start_str[:19], fmt[:len(fmt)])
+                        except (ValueError, IndexError):
+                            pass
+                    if end_str and not end_date:
+                        try:
+                            end_date = datetime.strptime(end_str[:19], fmt[:len(fmt)])
+                        except (ValueError, IndexError):
+                            pass
+
+                location = item.get('location', {})
+                if isinstance(location, dict):
+                    place_name = location.get('name', '')
+                    address = location.get('address', {})
+                    if isinstance(address, dict):
+                        city = address.get('addressLocality', '')
+                        country = address.get('addressCountry', '')
+                    elif isinstance(address, str):
+                        city = address
+                        country = ''
+                    else:
+                        city = ''
+                        country = ''
+                else:
+                    place_name = str(location) if location else ''
+                    city = ''
+                    country = ''
+
+                event_url = item.get('url', '') or base_url
+                if event_url and not event_url.startswith('http'):
+                    event_url = urljoin(base_url, event_url)
+
+                image = item.get('image', '')
+                if isinstance(image, list):
+                    image = image[0] if image else ''
+                if isinstance(image, dict):
+                    image = image.get('url', '')
+
+                events.append({
+                    'title': self._clean_title(name),
+                    'name': name,
+                    'description': self._clean_description(item.get('description', ''))[:800],
+                    'city': self._extract_city(city or place_name) or city,
+                    'place': place_name or None,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'url': self._clean_url(event_url),
+                    'image_url': image or None,
+                    'country': self._infer_country_from_text(f"{city} {country} {place_name}"),
+                })
+            except (TypeError, KeyError, AttributeError):
+                continue
+        return events
+
+    def _parse_vystavki_title(self, raw_title: str) -> Dict:
+        """Разобрать заголовок vystavki.su формата 'НАЗВАНИЕ YYYY Город, Страна DD — DD Месяц YYYY'."""
+        result = {'title': raw_title, 'city': None, 'country': None, 'start_date': None, 'end_date': None}
+
+        # Попробовать выделить дату из конца строки
+        start_date, end_date = self._extract_dates_from_text(raw_title)
+        if start_date:
+            result['start_date'] = start_date
+            result['end_date'] = end_date
+
+        # Попробовать выделить город и страну
+        city = self._extract_city(raw_title)
+        if city:
+            result['city'] = city
+            result['country'] = self._extract_country_from_city(city)
+
+        country = self._infer_country_from_text(raw_title)
+        if country and not result['country']:
+            result['country'] = country
+
+        # Очистить заголовок: убрать дату и город/страну из конца
+        clean = raw_title
+        # Убрать дату (числа + месяц + год в конце)
+        clean = re.sub(r'\s*\d{1,2}\s*[-—–]\s*\d{1,2}\s+[а-яёa-z]+\s*\d{4}\s*$', '', clean, flags=re.I)
+        clean = re.sub(r'\s*\d{1,2}\s+[а-яёa-z]+\s*[-—–]\s*\d{1,2}\s+[а-яёa-z]+\s*\d{4}\s*$', '', clean, flags=re.I)
+        # Убрать "Город, Страна" из конца
+        clean = re.sub(r'\s*,?\s*(Казахстан|Узбекистан|Азербайджан|Грузия|Армения|Кыргызстан|Таджикистан|Туркменистан)\s*$', '', clean, flags=re.I)
+        # Убрать год из конца
+        clean = re.sub(r'\s+20[2-5]\d\s*$', '', clean)
+        # Убрать город из конца если он отдельный
+        if city:
+            clean = re.sub(r'\s*,?\s*' + re.escape(city) + r'\s*$', '', clean, flags=re.I)
+
+        result['title'] = self._clean_title(clean.strip()) or self._clean_title(raw_title)
+        return result
+
+    def _normalize_title_for_dedup(self, title: str) -> str:
+        """Нормализовать заголовок для дедупликации."""
+        if not title:
+            return ""
+        t = re.sub(r'[^\w\s]', '', title.lower())
+        t = re.sub(r'\s+', ' ', t).strip()
+        # Убрать год
+        t = re.sub(r'\b20[2-5]\d\b', '', t).strip()
+        return t
+
+    def _find_og_image(self, soup: BeautifulSoup, base_url: str) -> Optional[str]:
+        """Извлечь og:image (или главное изображение) из уже разобранной страницы."""
+        # Попробовать разные meta tags
+        for prop in ['og:image', 'og:image:url', 'twitter:image', 'twitter:image:src']:
+            meta = soup.find('meta', property=prop) or soup.find('meta', attrs={'name': prop})
+            if meta and meta.get('content'):
+                return urljoin(base_url, meta['content'])
+
+        # Поиск всех img и возврат первого большого (вероятно основного)
+        for img in soup.find_all('img', src=True):
+            src = img['src']
+            if src and not src.startswith('data:'):
+                # Проверить размеры через class/id (большие изображения обычно главные)
+                img_class = img.get('class', [])
+                img_id = img.get('id', '')
+                if any('hero' in str(c).lower() or 'main' in str(c).lower() or 'large' in str(c).lower()
+                       for c in img_class) or 'hero' in img_id.lower() or 'main' in img_id.lower():
+                    return urljoin(base_url, src)
+
+        return None
+
+    def _find_first(self, soup: BeautifulSoup, selectors: List[str]):
+        """Первый элемент по списку селекторов.
+
+        '.name' — элемент, в классе которого есть подстрока name (event-date, date-block...);
+        остальное ('article', '[itemprop="startDate"]') — обычный CSS-селектор.
+        """
+        for selector in selectors:
+            if selector.startswith('.'):
+                elem = soup.find(class_=re.compile(re.escape(selector[1:]), re.I))
+            else:
+                elem = soup.select_one(selector)
+            if elem:
+                return elem
+        return None
+
+    # --- Извлечение записей из HTML (выполняется в процессе пула, см. run_extractor) ---
+    #
+    # Каждый extract_* получает сырой HTML и возвращает компактные записи событий.
+    # Изображения не скачиваются: кандидаты лежат в 'image_candidates',
+    # загрузкой занимается EventParser в основном процессе.
+
+    def extract_detail_page(self, html: str, event_url: str, base_event: Dict) -> Dict:
+        """Дополнить событие данными детальной страницы.
+
+        Если на странице есть JSON-LD события — берём данные из него, DOM не строится.
+        """
+        json_ld_events = self._extract_from_json_ld(html, event_url)
+        if json_ld_events:
+            return self._merge_json_ld_event(base_event, json_ld_events[0], event_url)
+
+        soup = BeautifulSoup(html, 'lxml')
+        try:
+            # Извлечь og:image
+            if not base_event.get('image_url'):
+                og_image = self._find_og_image(soup, event_url)
+                if og_image:
+                    self._add_image_candidate(base_event, og_image)
+
+            # Извлечь title из h1
+            h1 = soup.find('h1')
+            if h1:
+                h1_text = self._clean_title(h1.get_text())
+                if len(h1_text) > len(base_event.get('title', '')):
+                    base_event['title'] = h1_text
+                    base_event['name'] = h1_text
+
+            # Извлечь описание: meta description и первый блок с описанием — берётся более длинный
+            meta = soup.find('meta', attrs={'name': 'description'})
+            if meta and meta.get('content'):
+                desc_text = self._clean_description(meta['content'])
+                if len(desc_text) > len(base_event.get('description', '')):
+                    base_event['description'] = desc_text
+
+            desc_selectors = [
+                '.description', '.content', '.about', '.event-description',
+                '.details', '.info', 'article', '[itemprop="description"]',
+            ]
+            elem = self._find_first(soup, desc_selectors)
+            if elem:
+                desc_text = self._clean_description(elem.get_text())
+                if len(desc_text) > len(base_event.get('description', '')):
+                    base_event['description'] = desc_text
+
+            # Извлечь дату
+            date_selectors = [
+                '.date', '.event-date', '.datetime', '[itemprop="startDate"]',
+                '.schedule', '.when', '.time',
+            ]
+            elem = self._find_first(soup, date_selectors)
+            if elem:
+                date_text = elem.get('content') or elem.get_text()
+                start, end = self._extract_dates_from_text(date_text)
+                if start:
+                    base_event['start_date'] = start
+                if end:
+                    base_event['end_date'] = end
+
+            # Извлечь место
+            place_selectors = [
+                '.place', '.location', '.venue', '.address', '[itemprop="location"]',
+                '.where', '.event-location',
+            ]
+            elem = self._find_first(soup, place_selectors)
+            if elem:
+                place_text = self._clean_text(elem.get_text())
+                if place_text and len(place_text) > 5:
+                    base_event['place'] = place_text
+                    # Также извлечь город из места
+                    city = self._extract_city(place_text)
+                    if city and not base_event.get('city'):
+                        base_event['city'] = city
+
+        except Exception as e:
+            logger.debug(f"Error parsing detail page {event_url}: {e}")
+
+        return base_event
+
+    def _merge_json_ld_event(self, base_event: Dict, ld_event: Dict, event_url: str) -> Dict:
+        """Дополнить событие полями из JSON-LD детальной страницы."""
+        if len(ld_event['title']) > len(base_event.get('title', '')):
+            base_event['title'] = ld_event['title']
+            base_event['name'] = ld_event['title']
+        if len(ld_event['description']) > len(base_event.get('description', '')):
+            base_event['description'] = ld_event['description']
+        for key in ('start_date', 'end_date', 'place'):
+            if ld_event.get(key):
+                base_event[key] = ld_event[key]
+        if ld_event.get('city') and not base_event.get('city'):
+            base_event['city'] = ld_event['city']
+        if ld_event.get('image_url') and not base_event.get('image_url'):
+            self._add_image_candidate(base_event, urljoin(event_url, ld_event['image_url']))
+        return base_event
+
+    @staticmethod
+    def _add_image_candidate(base_event: Dict, image_url: str):
+        """Добавить изображение детальной страницы после кандидатов с листинга (без повторов)."""
+        candidates = base_event.get('image_candidates') or []
+        if image_url not in candidates:
+            candidates = candidates + [image_url]
+        base_event['image_candidates'] = candidates
+
+    def extract_iteca(self, html: str, url: str) -> List[Dict]:
+        """iteca.events: выставки из RSC payload или __NEXT_DATA__."""
+        events = []
+        base_url = "https://iteca.events"
+        exhibitions = []
+
+        # RSC payload: JSON внутри строк self.__next_f.push([1, "..."]) — ищем "exhibitions":[...]
+        payload = structured_data.next_f_payload(html)
+        for value in structured_data.find_json_values(payload, 'exhibitions'):
+            if isinstance(value, list) and value:
+                exhibitions = value
+                break
+
+        # Fallback: __NEXT_DATA__ (старая версия сайта)
+        if not exhibitions:
+            nd = structured_data.next_data(html) or {}
+            page_props = nd.get('props', {}).get('pageProps', {}) if isinstance(nd.get('props'), dict) else {}
+            exhibitions = page_props.get('exhibitions', []) if isinstance(page_props, dict) else []
+
+        seen_urls = set()
+        for exh in exhibitions:
+            if not isinstance(exh, dict):
+                continue
+            try:
+                title = (exh.get('title', '') or exh.get('project', '') or '').strip()
+                if not title or len(title) < 5:
+                    continue
+
+                description = exh.get('description', '') or ''
+                begin_date = exh.get('beginDate', '') or ''
+                end_date_str = exh.get('endDate', '') or ''
+                city_label = exh.get('city_label', '') or exh.get('city', '') or ''
+                location = exh.get('location', '') or exh.get('address', '') or ''
+                logo = exh.get('logo', '') or exh.get('logo_svg', '') or exh.get('image_profile', '') or ''
+                website = exh.get('website', '') or ''
+
+                # Даты
+                start_date = end_date = None
+                for ds, target in [(begin_date, 'start'), (end_date_str, 'end')]:
+                    if ds:
+                        for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%d.%m.%Y'):
+                            try:
+                                parsed = datetime.strptime(str(ds)[:19], fmt)
+                                if target == 'start':
+                                    start_date = parsed
+                                else:
+                                    end_date = parsed
+                                break
+                            except ValueError:
+                                pass
+                if not start_date:
+                    date_text = exh.get('formattedDateRange', '') or f"{title} {description}"
+                    start_date, end_date = self._extract_dates_from_text(date_text)
+
+                event_url = website if website.startswith('http') else url
+                if event_url in seen_urls:
+                    continue
+                seen_urls.add(event_url)
+
+                city = self._extract_city(city_label) or self._extract_city(location) or self._extract_city(title)
+
+                cleaned_url = self._clean_url(event_url)
+                if not cleaned_url:
+                    continue
+
+                events.append({
+                    'title': self._clean_title(title),
+                    'name': description or title,
+                    'description': self._clean_description(description)[:800],
+                    'city': city,
+                    'place': self._clean_text(location) or None,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'url': cleaned_url,
+                    'image_url': None,
+                    'image_candidates': [logo if logo.startswith('http') else urljoin(base_url, logo)] if logo else [],
+                    'source': 'iteca.events',
+                    'country': self._extract_country_from_city(city) or 'Казахстан',
+                    'industry': (lambda v: v if v and v != '$undefined' else None)(exh.get('industryTitle')) or self._infer_industry(title, description),
+                })
+            except Exception as e:
+                logger.debug(f"Iteca item error: {e}")
+        return events
+
+    def extract_atakent(self, html: str, url: str) -> List[Dict]:
+        """atakent-expo.kz — с дедупликацией внутри источника."""
+        events = []
+        seen_urls = set()
+        soup = BeautifulSoup(html, 'lxml')
+
+        # JSON-LD
+        json_ld_events = self._extract_from_json_ld(html, url)
+        for ev in json_ld_events:
+            if ev.get('url') and ev['url'] not in seen_urls:
+                ev['source'] = 'atakent-expo.kz'
+                ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
+                ev['country'] = 'Казахстан'
+                if not ev.get('city'):
+                    ev['city'] = 'Алматы'
+                if not ev.get('place'):
+                    ev['place'] = 'Атакент'
+                if self._is_relevant(ev.get('title', ''), ev.get('description', '')):
+                    events.append(ev)
+                    seen_urls.add(ev['url'])
+
+        # CSS selectors — с приоритетом более специфичных
+        selectors = ['.event-item', '.exhibition-item', 'a[href*="event"]', 'article', '.card']
+        items = []
+        for sel in selectors:
+            items.extend(soup.select(sel))
+
+        for item in items:
+            try:
+                title_tag = item.find(['h2', 'h3', 'h4']) or item
+                title = self._clean_title(title_tag.get_text())
+                if len(title) < 5:
+                    continue
+
+                link = item.find('a', href=True) or (item if item.name == 'a' and item.get('href') else None)
+                event_url = urljoin(url, link['href']) if link and link.get('href') else url
+                if event_url in seen_urls:
+                    continue
+
+                desc = item.find('p')
+                description = self._clean_description(desc.get_text()) if desc else ""
+
+                full_text = title + " " + description
+                start_date, end_date = self._extract_dates_from_text(full_text)
+
+                if self._is_relevant(title, description):
+                    cleaned_url = self._clean_url(event_url)
+                    if not cleaned_url:
+                        continue
+                    seen_urls.add(event_url)
+
+                    events.append({
+                        'title': title,
+                        'name': title,
+                        'description': description[:800],
+                        'city': self._extract_city(title) or "Алматы",
+                        'place': "Атакент",
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'url': cleaned_url,
+                        'image_url': None,
+                        'image_candidates': self._extract_all_image_urls_from_element(item, url),
+                        'source': 'atakent-expo.kz',
+                        'country': 'Казахстан',
+                        'industry': self._infer_industry(title, description)
+                    })
+            except Exception as e:
+                logger.debug(f"Atakent item error: {e}")
+        return events
+
+    def extract_qazexpo(self, html: str, url: str) -> List[Dict]:
+        """qazexpo.kz"""
+        events = []
+        soup = BeautifulSoup(html, 'lxml')
+        items = soup.find_all(['a', 'div', 'article'], class_=re.compile(r'event|exhibition|card|news', re.I))
+
+        for item in items:
+            try:
+                title = self._clean_title(item.get_text())
+                if len(title) < 10:
+                    continue
+
+                link = item if item.name == 'a' and item.get('href') else item.find('a', href=True)
+                event_url = urljoin(url, link['href']) if link and link.get('href') else url
+
+                # Дата
+                start_date, end_date = self._extract_dates_from_text(title)
+
+                if self._is_relevant(title, ""):
+                    cleaned_url = self._clean_url(event_url)
+                    if not cleaned_url:
+                        continue
+
+                    events.append({
+                        'title': title[:200],
+                        'name': title[:200],
+                        'description': "",
+                        'city': self._extract_city(title) or "Астана",
+                        'place': "QazExpo",
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'url': cleaned_url,
+                        'image_url': None,
+                        'image_candidates': self._extract_all_image_urls_from_element(item, url),
+                        'source': 'qazexpo.kz',
+                        'country': 'Казахстан',
+                        'industry': self._infer_industry(title, "")
+                    })
+            except Exception:
+                pass
+        return events
+
+    def extract_expo_centralasia(self, html: str, url: str) -> List[Dict]:
+        """expo-centralasia.com"""
+        events = []
+        soup = BeautifulSoup(html, 'lxml')
+        items = soup.find_all(['a', 'article', 'div'], class_=re.compile(r'event|expo|card|news', re.I))
+
+        for item in items:
+            try:
+                title_tag = item.find(['h2', 'h3', 'h4']) or item
+                title = self._clean_title(title_tag.get_text())
+                if len(title) < 5:
+                    continue
+
+                link = item.find('a', href=True) or (item if item.name == 'a' else None)
+                event_url = urljoin(url, link['href']) if link and link.get('href') else url
+
+                desc = item.find('p')
+                description = self._clean_description(desc.get_text()) if desc else ""
+
+                # Дата
+                full_text = title + " " + description
+                start_date, end_date = self._extract_dates_from_text(full_text)
+
+                if self._is_relevant(title, description):
+                    cleaned_url = self._clean_url(event_url)
+                    if not cleaned_url:
+                        continue
+
+                    events.append({
+                        'title': title,
+                        'name': title,
+                        'description': description[:800],
+                        'city': self._extract_city(full_text),
+                        'place': None,
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'url': cleaned_url,
+                        'image_url': None,
+                        'image_candidates': self._extract_all_image_urls_from_element(item, url),
+                        'source': 'expo-centralasia.com',
+                        'country': 'Казахстан',
+                        'industry': self._infer_industry(title, description)
+                    })
+            except Exception as e:
+                logger.debug(f"Expo CentralAsia item error: {e}")
+        return events
+
+    def extract_worldexpo(self, html: str, url: str) -> List[Dict]:
+        """worldexpo.pro/vystavki/kazahstan"""
+        events = []
+        soup = BeautifulSoup(html, 'lxml')
+        items = soup.find_all('div', class_='item-content')
+        if not items:
+            items = soup.select('.exhibition, .event-item, .news-item')
+        if not items:
+            items = soup.find_all('a', href=re.compile(r'/vystavk|/exhibition'))
+
+        for item in items:
+            try:
+                title_tag = item.find(['h4', 'h3', 'h2'])
+                if title_tag:
+                    link = title_tag.find('a')
+                    title = self._clean_title((link or title_tag).get_text())
+                    event_url = urljoin(url, link['href']) if link and link.get('href') else url
+                else:
+                    title = self._clean_title(item.get_text())
+                    link = item.find('a', href=True)
+                    event_url = urljoin(url, link['href']) if link else url
+
+                if len(title) < 5:
+                    continue
+
+                date_span = item.find('span', class_=re.compile(r'date|item-content-date'))
+                loc_span = item.find('span', class_=re.compile(r'location|search-location'))
+                desc = item.find('p')
+                description = self._clean_description(desc.get_text()) if desc else ""
+
+                # Дата — теперь извлекаем start И end
+                raw_date = date_span.get_text() if date_span else title
+                start_date, end_date = self._extract_dates_from_text(raw_date)
+
+                loc_text = loc_span.get_text() if loc_span else ""
+                city = self._extract_city(loc_text or title)
+                country = self._infer_country_from_text(loc_text) or 'Казахстан'
+
+                if self._is_relevant(title, description):
+                    cleaned_url = self._clean_url(event_url)
+                    if not cleaned_url:
+                        continue
+
+                    events.append({
+                        'title': title,
+                        'name': title,
+                        'description': description[:800],
+                        'city': city,
+                        'place': self._clean_text(loc_text) or None,
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'url': cleaned_url,
+                        'image_url': None,
+                        'image_candidates': self._extract_all_image_urls_from_element(item, url),
+                        'source': 'worldexpo.pro',
+                        'country': country,
+                        'industry': self._infer_industry(title, description)
+                    })
+            except Exception as e:
+                logger.debug(f"WorldExpo item error: {e}")
+        return events
+
+    def extract_exposale_page(self, html: str, page_url: str, seen_urls: List[str]) -> Tuple[List[Dict], List[str]]:
+        """Одна страница листинга exposale.net → (события, ссылки пагинации).
+
+        seen_urls — URL, уже собранные с других страниц источника.
+        """
+        events = []
+        seen_urls = set(seen_urls)
+        base = "https://exposale.net"
+        soup = BeautifulSoup(html, 'lxml')
+
+        # Способ 1: JSON-LD structured data
+        json_ld_events = self._extract_from_json_ld(html, base)
+        for ev in json_ld_events:
+            if ev.get('url') and ev['url'] not in seen_urls:
+                ev['source'] = 'exposale.net'
+                ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
+                if not ev.get('country'):
+                    ev['country'] = self._infer_country_from_text(
+                        f"{ev.get('city', '')} {ev.get('place', '')}"
+                    ) or 'Казахстан'
+                # exposale.net — все записи являются выставками, не фильтруем по relevance
+                if not self._contains_stop_word(ev.get('title', '') + ' ' + ev.get('description', '')):
+                    events.append(ev)
+                    seen_urls.add(ev['url'])
+
+        # Способ 2: Карточки выставок — ищем ссылки на /ru/exhibition/
+        for link in soup.find_all('a', href=re.compile(r'/ru/exhibition/')):
+            try:
+                href = link.get('href', '')
+                event_url = urljoin(base, href)
+                if event_url in seen_urls:
+                    continue
+
+                title = self._clean_title(link.get_text())
+                if len(title) < 5:
+                    continue
+
+                # Подняться к карточке-контейнеру
+                card = link.find_parent(['div', 'article', 'li', 'tr', 'td'])
+                card_text = card.get_text() if card else title
+
+                country = self._infer_country_from_text(card_text) or "Казахстан"
+                city = self._extract_city(card_text)
+
+                # Описание
+                desc_elem = card.find('p') if card else None
+                description = self._clean_description(desc_elem.get_text()) if desc_elem else ""
+
+                # Дата — из текста карточки (формат "с DD.MM.YYYY по DD.MM.YYYY")
+                start_date, end_date = self._extract_dates_from_text(card_text)
+
+                if self._contains_stop_word(title + ' ' + description):
+                    continue
+                cleaned_url = self._clean_url(event_url)
+                if not cleaned_url:
+                    continue
+                seen_urls.add(event_url)
+
+                events.append({
+                    'title': title[:200],
+                    'name': title[:200],
+                    'description': description[:800] or self._clean_text(card_text)[:800],
+                    'city': city,
+                    'place': None,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'url': cleaned_url,
+                    'image_url': None,
+                    'image_candidates': self._extract_all_image_urls_from_element(card, base) if card else [],
+                    'source': 'exposale.net',
+                    'country': country,
+                    'industry': self._infer_industry(title, description)
+                })
+            except Exception as e:
+                logger.debug(f"Exposale item error: {e}")
+        return events, self._discover_listing_pages(soup, page_url, r'[?&]page=\d+')
+
+    def extract_vystavki_page(self, html: str, url: str, seen_urls: List[str]) -> Tuple[List[Dict], List[str]]:
+        """Одна страница листинга vystavki.su → (события, ссылки пагинации)."""
+        events = []
+        seen_urls = set(seen_urls)
+        soup = BeautifulSoup(html, 'lxml')
+
+        # Способ 1: JSON-LD
+        json_ld_events = self._extract_from_json_ld(html, url)
+        for ev in json_ld_events:
+            if ev.get('url') and ev['url'] not in seen_urls:
+                ev['source'] = 'vystavki.su'
+                ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
+                if not ev.get('country'):
+                    ev['country'] = 'Казахстан'
+                if self._is_relevant(ev.get('title', ''), ev.get('description', '')):
+                    events.append(ev)
+                    seen_urls.add(ev['url'])
+
+        # Способ 2: Ссылки с изображениями (основной контент vystavki.su)
+        for link in soup.find_all('a', href=True):
+            try:
+                href = link.get('href', '')
+                if not href or href == '/' or href == '#':
+                    continue
+                event_url = urljoin(url, href)
+                if event_url in seen_urls:
+                    continue
+                # Пропускать nav-ссылки, соцсети, и т.д.
+                if any(skip in event_url for skip in ['#', 'javascript:', 'mailto:', 'tel:', 'facebook', 'twitter', 'vk.com', 'instagram', 'youtube', 'telegram']):
+                    continue
+                # Ссылка должна содержать img или значимый текст
+                has_img = link.find('img') is not None
+                link_text = self._clean_text(link.get_text())
+                if not has_img and len(link_text) < 10:
+                    continue
+                if len(link_text) > 500:
+                    continue
+
+                raw_title = link_text
+                parsed = self._parse_vystavki_title(raw_title)
+                title = parsed['title']
+                if len(title) < 5:
+                    continue
+
+                city = parsed['city']
+                country = parsed['country'] or self._infer_country_from_text(raw_title) or 'Казахстан'
+                start_date = parsed['start_date']
+                end_date = parsed['end_date']
+
+                # Описание из родителя
+                parent = link.find_parent(['article', 'div', 'li', 'section'])
+                description = ""
+                if parent:
+                    desc_tag = parent.find('p')
+                    if desc_tag:
+                        description = self._clean_description(desc_tag.get_text())
+
+                if self._is_relevant(title, description or raw_title):
+                    cleaned_url = self._clean_url(event_url)
+                    if not cleaned_url:
+                        continue
+                    seen_urls.add(event_url)
+
+                    # Изображения
+                    image_urls = self._extract_all_image_urls_from_element(link, url)
+                    if not image_urls and parent:
+                        image_urls = self._extract_all_image_urls_from_element(parent, url)
+
+                    events.append({
+                        'title': title[:200],
+                        'name': title[:200],
+                        'description': description[:800],
+                        'city': city,
+                        'place': None,
+                        'start_date': start_date,
+                        'end_date': end_date,
+                        'url': cleaned_url,
+                        'image_url': None,
+                        'image_candidates': image_urls,
+                        'source': 'vystavki.su',
+                        'country': country,
+                        'industry': self._infer_industry(title, description)
+                    })
+            except Exception as e:
+                logger.debug(f"Vystavki item error: {e}")
+
+        # Способ 3: Fallback — article/post containers
+        if not events:
+            for item in soup.select('article, .post, .entry'):
+                try:
+                    title_tag = item.find(['h2', 'h3', 'h4'])
+                    if not title_tag:
+                        continue
+                    raw_title = title_tag.get_text()
+                    parsed = self._parse_vystavki_title(raw_title)
+                    title = parsed['title']
+                    if len(title) < 5:
+                        continue
+
+                    link = item.find('a', href=True)
+                    event_url = urljoin(url, link['href']) if link else url
+                    if event_url in seen_urls:
+                        continue
+
+                    desc = item.find('p')
+                    description = self._clean_description(desc.get_text()) if desc else ""
+
+                    if self._is_relevant(title, description or raw_title):
+                        cleaned_url = self._clean_url(event_url)
+                        if not cleaned_url:
+                            continue
+                        seen_urls.add(event_url)
+                        events.append({
+                            'title': title[:200],
+                            'name': title[:200],
+                            'description': description[:800],
+                            'city': parsed['city'],
+                            'place': None,
+                            'start_date': parsed['start_date'],
+                            'end_date': parsed['end_date'],
+                            'url': cleaned_url,
+                            'image_url': None,
+                            'image_candidates': self._extract_all_image_urls_from_element(item, url),
+                            'source': 'vystavki.su',
+                            'country': parsed['country'] or 'Казахстан',
+                            'industry': self._infer_industry(title, description)
+                        })
+                except Exception as e:
+                    logger.debug(f"Vystavki fallback item error: {e}")
+
+        return events, self._discover_listing_pages(soup, url, r'/page/\d+/?$')
+
+    def extract_expomap(self, html: str, base: str, country_name: str) -> List[Dict]:
+        """expomap.ru — события страны из JSON-LD."""
+        events = []
+        for ev in self._extract_from_json_ld(html, base):
+            if not ev.get('url'):
+                continue
+            ev['source'] = 'expomap.ru'
+            ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
+            if not ev.get('country') or ev['country'] == '':
+                ev['country'] = country_name
+            if not self._contains_stop_word(ev.get('title', '') + ' ' + ev.get('description', '')):
+                events.append(ev)
+        return events
+
+    def _image_urls_lxml(self, element, base_url: str) -> List[str]:
+        """Кандидаты изображений карточки (lxml) — те же правила, что _extract_all_image_urls_from_element."""
+        image_urls = []
+        imgs = element.xpath('descendant-or-self::img[1]')
+        if imgs:
+            img = imgs[0]
+            for attr in ['src', 'data-src', 'data-lazy-src', 'data-original', 'data-srcset', 'data-thumb', 'original-src']:
+                val = img.get(attr)
+                if val and not val.startswith('data:'):
+                    if attr == 'data-srcset':
+                        val = val.split(',')[0].split()[0]
+                    image_urls.append(urljoin(base_url, val.strip()))
+            for srcset in element.xpath('.//picture/source/@srcset'):
+                image_urls.append(urljoin(base_url, srcset.split(',')[0].split()[0].strip()))
+
+        # Background-image в style самой карточки
+        style = element.get('style', '')
+        if style:
+            for match in re.findall(r'background(?:-image)?:\s*[^;]*url\(["\']?([^"\')\s]+)["\']?\)', style, re.IGNORECASE):
+                image_urls.append(urljoin(base_url, match.strip()))
+
+        # Вложенные блоки с классами img/image/thumbnail/photo/picture/media
+        for node in element.xpath('.//*[@class]'):
+            if not re.search(r'img|image|thumbnail|photo|picture|media', node.get('class', ''), re.I):
+                continue
+            src = node.xpath('string(.//img[1]/@src)')
+            if src:
+                image_urls.append(urljoin(base_url, src))
+            elif node.get('style'):
+                bg_match = re.search(r'url\(["\']?([^"\')\s]+)["\']?\)', node.get('style'))
+                if bg_match:
+                    image_urls.append(urljoin(base_url, bg_match.group(1)))
+
+        # Соседние элементы с изображениями
+        for sibling in (element.getnext(), element.getprevious()):
+            if sibling is not None and isinstance(sibling.tag, str):
+                image_urls.extend(urljoin(base_url, src) for src in sibling.xpath('.//img/@src'))
+
+        unique_urls = []
+        for url in image_urls:
+            if url and url not in unique_urls and url.startswith(('http://', 'https://')):
+                unique_urls.append(url)
+        return unique_urls
+
+    def extract_with_spec(self, spec_name: str, html: str, url: str,
+                          source: Optional[str] = None, country: Optional[str] = None) -> List[Dict]:
+        """Извлечь карточки по декларативной спецификации (services/source_specs.py)."""
+        spec = compile_spec(spec_name)
+        rules = spec.spec
+        source = source or rules['source']
+        country = country or rules['country']
+        base_url = rules.get('base_url') or url
+        events = []
+        seen_urls = set()
+        try:
+            doc = parse_html(html)
+        except (etree.ParserError, ValueError):
+            return events
+
+        for item in spec.find_items(doc):
+            try:
+                raw_title = spec.first(item, 'title')
+                title = self._clean_title(raw_title) if rules.get('clean_title', True) else self._clean_text(raw_title)
+                # Длина проверяется по полному названию: у iteca.uz короткое (h4) бывает аббревиатурой
+                name = self._clean_text(spec.first(item, 'name')) or title
+                if len(name) < 5:
+                    continue
+
+                href = spec.first(item, 'url').strip()
+                if href.startswith('#') or href.lower().startswith('javascript'):
+                    href = ''
+                if not href and rules.get('url_required'):
+                    continue
+                event_url = urljoin(base_url, href) if href else url
+                if event_url in seen_urls:
+                    continue
+                seen_urls.add(event_url)
+
+                place = self._clean_text(spec.first(item, 'place'))
+                if place and spec.place_strip:
+                    place = spec.place_strip.sub('', place)
+                derived = {'title': title, 'place': place}
+
+                def text_of(fields: List[str], sep: str = ' ') -> str:
+                    values = (derived[f] if f in derived else self._clean_text(spec.first(item, f)) for f in fields)
+                    return sep.join(v for v in values if v)
+
+                description = self._clean_description(text_of(rules.get('description_from', ['description']), '. '))
+                derived['description'] = description
+
+                start_date, end_date = self._extract_dates_from_text(text_of(rules.get('date_from', [])))
+                if not start_date and rules.get('date_fallback'):
+                    start_date, end_date = self._extract_dates_from_text(text_of(rules['date_fallback']))
+
+                city = None
+                for field in rules.get('city_from', []):
+                    city = self._extract_city(text_of([field]))
+                    if city:
+                        break
+                city = city or rules.get('city_default')
+
+                if rules.get('relevance') and not self._is_relevant(title, description):
+                    continue
+
+                if rules.get('image') == 'auto':
+                    image_candidates = self._image_urls_lxml(item, url)
+                else:
+                    image_candidates = [
+                        urljoin(base_url, src.strip()) for src in spec.values(item, 'image')
+                        if not src.startswith('data:')
+                    ][:1]
+
+                cleaned_url = self._clean_url(event_url)
+                if not cleaned_url:
+                    continue
+
+                title_max = rules.get('title_max')
+                events.append({
+                    'title': title[:title_max],
+                    'name': name[:title_max],
+                    'description': description[:800],
+                    'city': city,
+                    'place': place or None,
+                    'start_date': start_date,
+                    'end_date': end_date,
+                    'url': cleaned_url,
+                    'image_url': None,
+                    'image_candidates': image_candidates,
+                    'source': source,
+                    'country': country,
+                    'industry': self._infer_industry(name, description),
+                })
+            except Exception as e:
+                logger.debug(f"{spec_name} item error: {e}")
+        return events
+
+    def dedup_by_description(self, events: List[Dict], known_descriptions: Optional[List[str]] = None) -> List[Dict]:
+        """Убрать события с похожим описанием (SequenceMatcher >= 75%).
+
+        known_descriptions — описания уже принятых событий (потоковая дедупликация по партиям):
+        событие, похожее на любое из них, тоже отбрасывается.
+        """
+        filtered_events = []
+        accepted = [d for d in (known_descriptions or []) if d and len(d.strip()) >= 20]
+        for event in events:
+            event_description = event.get('description', '')
+            if not event_description or len(event_description.strip()) < 20:
+                filtered_events.append(event)
+                continue
+
+            is_duplicate = False
+            for existing_description in accepted:
+                similarity = self._calculate_text_similarity(event_description, existing_description)
+                if similarity >= 0.75:
+                    logger.debug(
+                        f"Parser: Skipping duplicate (similarity {similarity:.2%}): "
+                        f"'{event.get('title', '')[:50]}' vs '{existing_description[:50]}'"
+                    )
+                    is_duplicate = True
+                    break
+
+            if not is_duplicate:
+                filtered_events.append(event)
+                accepted.append(event_description)
+        return filtered_events
+
+
+_worker_extractor: Optional[EventExtractor] = None
+
+
+def worker_extractor() -> EventExtractor:
+    """EventExtractor процесса пула (один на процесс)."""
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = EventExtractor()
+    return _worker_extractor
+
+
+def run_extractor(method: str, *args):
+    """Точка входа процесса пула: EventExtractor().<method>(*args)."""
+    return getattr(worker_extractor(), method)(*args)
+
+
+def run_extractor_timed(method: str, *args):
+    """run_extractor и время CPU потока воркера на него: (результат, секунды)."""
+    started = time.thread_time()
+    result = run_extractor(method, *args)
+    return result, time.thread_time() - started
@@ -0,0 +1,99 @@
+"""
+Crawl frontier for paginated listing sources.
+
+A bounded asyncio queue of page URLs per source: pages are fetched by a few
+concurrent workers (host politeness is enforced by the parser's rate limiter),
+visited URLs are deduplicated, newly discovered pagination links are queued,
+and crawling stops as soon as a page yields only already-known events.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import FRONTIER_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# fetch(url) -> html или None (страница не изменилась)
+FetchPage = Callable[[str], Awaitable[Optional[str]]]
+# handle(url, html) -> (события страницы, найденные ссылки пагинации)
+HandlePage = Callable[[str, str], Awaitable[Tuple[List[Dict], List[str]]]]
+
+
+def _normalize_page_url(url: str) -> str:
+    return url.split('#')[0].rstrip('/')
+
+
+class CrawlFrontier:
+    def __init__(
+        self,
+        name: str,
+        fetch: FetchPage,
+        handle: HandlePage,
+        is_known: Callable[[str], bool],
+        max_pages: int,
+        workers: int = FRONTIER_WORKERS,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.handle = handle
+        self.is_known = is_known
+        self.max_pages = max_pages
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pages)
+        self.visited = set()
+        self.stopped = False
+        self.pages_fetched = 0
+        self.new_events = 0
+
+    def _enqueue(self, url: str):
+        key = _normalize_page_url(url)
+        if self.stopped or key in self.visited or len(self.visited) >= self.max_pages:
+            return
+        try:
+            self.queue.put_nowait(url)
+        except asyncio.QueueFull:
+            return
+        self.visited.add(key)
+
+    async def _worker(self):
+        while True:
+            url = await self.queue.get()
+            try:
+                if self.stopped:
+                    continue
+                html = await self.fetch(url)
+                if html is None:
+                    # Не изменилась с прошлого цикла — дальше по пагинации новых событий не будет
+                    self.stopped = True
+                    continue
+                page_events, next_urls = await self.handle(url, html)
+                self.pages_fetched += 1
+                new = [e for e in page_events if not self.is_known(e.get('url', ''))]
+                self.new_events += len(new)
+                if not new:
+                    logger.info(f"{self.name}: no new events on {url}, stopping pagination")
+                    self.stopped = True
+                    continue
+                for next_url in next_urls:
+                    self._enqueue(next_url)
+            except Exception as e:
+                logger.warning(f"{self.name}: page {url} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def crawl(self, start_url: str) -> int:
+        """Crawl from start_url until the frontier is exhausted or stopped. Returns pages fetched."""
+        self._enqueue(start_url)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await self.queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        logger.info(
+            f"{self.name}: crawled {self.pages_fetched} page(s), {self.new_events} new events"
+            f"{' (stopped early)' if self.stopped and len(self.visited) < self.max_pages else ''}"
+        )
+        return self.pages_fetched
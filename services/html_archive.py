@@ -0,0 +1,311 @@
+"""
+Archive of fetched pages, so a fixed or newer parser can re-read history offline.
+
+Every listing, detail page and sitemap the parser downloads is stored by the
+registry source it was fetched for, keyed by URL and fetch time:
+
+    html_archive/parse_iteca/20261017.zst        zstd frames, one per page, appended
+    html_archive/parse_iteca/20261017.idx        JSON line per page: url, fetched_at, type,
+                                                 sha256, offset, length, size, dict
+    html_archive/parse_iteca/dict-123456.zdict   compression dictionary of the source
+
+A page identical to the last archived copy of its URL is not stored again.
+Pages of one source share most of their markup, so once a source has
+HTML_ARCHIVE_DICT_MIN_SAMPLES pages, maintain() trains a zstd dictionary on its
+recent pages and new frames are compressed with it (retrained every
+HTML_ARCHIVE_DICT_RETRAIN_DAYS); a frame records the id of its dictionary, old
+dictionaries are kept while frames need them. maintain() also deletes the
+oldest day files until the archive fits in HTML_ARCHIVE_MAX_MB.
+
+ArchiveTransport serves the archive to httpx as it was at a given moment, so
+the parser crawls it like the live sites (scripts/reparse_archive.py).
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+from config import (
+    HTML_ARCHIVE_DIR, HTML_ARCHIVE_LEVEL, HTML_ARCHIVE_MAX_MB, HTML_ARCHIVE_DICT_SIZE,
+    HTML_ARCHIVE_DICT_MIN_SAMPLES, HTML_ARCHIVE_DICT_SAMPLES, HTML_ARCHIVE_DICT_RETRAIN_DAYS,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+HTML_TYPE = "text/html; charset=utf-8"
+_SEGMENT_SUFFIX = ".zst"
+_INDEX_SUFFIX = ".idx"
+_DICT_PREFIX = "dict-"
+_DICT_SUFFIX = ".zdict"
+
+
+def _source_dir_name(source: str) -> str:
+    return re.sub(r"[^\w.-]", "_", source) or "_"
+
+
+class HtmlArchive:
+    def __init__(self, root=HTML_ARCHIVE_DIR):
+        self.root = Path(root)
+        # Запись из потоков (to_thread) и maintain() — под одной блокировкой
+        self._lock = threading.Lock()
+        # Источник → {URL → sha256 последней сохранённой копии}, читается из .idx при первой записи
+        self._last: Dict[str, Dict[str, str]] = {}
+        # Источник → (id, словарь) для сжатия новых страниц; 0 — без словаря
+        self._current_dict: Dict[str, tuple] = {}
+        self._dicts: Dict[tuple, object] = {}
+        self.stored = 0
+        self.duplicates = 0
+
+    # --- запись ---
+
+    def _dir(self, source: str) -> Path:
+        return self.root / _source_dir_name(source)
+
+    def _last_hashes(self, source: str) -> Dict[str, str]:
+        if source not in self._last:
+            self._last[source] = {entry["url"]: entry["sha256"] for entry in self._entries(source)}
+        return self._last[source]
+
+    def _dict_for_writing(self, source: str):
+        if source not in self._current_dict:
+            found = sorted(self._dir(source).glob(f"{_DICT_PREFIX}*{_DICT_SUFFIX}"), key=lambda p: p.stat().st_mtime)
+            if found:
+                dict_id = int(found[-1].stem[len(_DICT_PREFIX):])
+                self._current_dict[source] = (dict_id, self._dictionary(source, dict_id))
+            else:
+                self._current_dict[source] = (0, None)
+        return self._current_dict[source]
+
+    def _dictionary(self, source: str, dict_id: int):
+        key = (source, dict_id)
+        if key not in self._dicts:
+            path = self._dir(source) / f"{_DICT_PREFIX}{dict_id}{_DICT_SUFFIX}"
+            self._dicts[key] = zstandard.ZstdCompressionDict(path.read_bytes())
+        return self._dicts[key]
+
+    def store(self, source: str, url: str, body: bytes, content_type: str = HTML_TYPE) -> bool:
+        """Append a fetched page; False if it equals the last stored copy of the URL.
+
+        Blocking (compression and file writes) — the parser calls it in a thread.
+        """
+        source = _source_dir_name(source)
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            last = self._last_hashes(source)
+            if last.get(url) == digest:
+                self.duplicates += 1
+                return False
+            dict_id, dictionary = self._dict_for_writing(source)
+            compressor = zstandard.ZstdCompressor(level=HTML_ARCHIVE_LEVEL, dict_data=dictionary)
+            frame = compressor.compress(body)
+            now = datetime.utcnow()
+            directory = self._dir(source)
+            directory.mkdir(parents=True, exist_ok=True)
+            day = f"{now:%Y%m%d}"
+            segment = directory / f"{day}{_SEGMENT_SUFFIX}"
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                f.write(frame)
+            entry = {
+                "url": url,
+                "fetched_at": now.isoformat(timespec="seconds"),
+                "type": content_type,
+                "sha256": digest,
+                "offset": offset,
+                "length": len(frame),
+                "size": len(body),
+                "dict": dict_id,
+            }
+            # Индекс пишется после кадра: обрыв между ними оставит лишь недоступные байты в сегменте
+            with open(directory / f"{day}{_INDEX_SUFFIX}", "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            last[url] = digest
+            self.stored += 1
+            return True
+
+    # --- чтение ---
+
+    def sources(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.is_dir() else []
+
+    def _entries(self, source: str) -> Iterator[Dict]:
+        for index in sorted(self._dir(source).glob(f"*{_INDEX_SUFFIX}")):
+            day = index.stem
+            with open(index, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Строка, недописанная при обрыве процесса
+                        continue
+                    entry["source"] = source
+                    entry["segment"] = day
+                    yield entry
+
+    def entries(self, sources: Optional[List[str]] = None, until: Optional[datetime] = None) -> Iterator[Dict]:
+        """Index entries of the given sources (default: all) fetched no later than until, oldest day first."""
+        for source in sources or self.sources():
+            for entry in self._entries(source):
+                if until is None or datetime.fromisoformat(entry["fetched_at"]) <= until:
+                    yield entry
+
+    def read(self, entry: Dict) -> bytes:
+        """Decompressed body of an index entry."""
+        path = self._dir(entry["source"]) / f"{entry['segment']}{_SEGMENT_SUFFIX}"
+        with open(path, "rb") as f:
+            f.seek(entry["offset"])
+            frame = f.read(entry["length"])
+        dictionary = self._dictionary(entry["source"], entry["dict"]) if entry["dict"] else None
+        return zstandard.ZstdDecompressor(dict_data=dictionary).decompress(frame)
+
+    # --- обслуживание ---
+
+    def maintain(self):
+        """Train or refresh per-source dictionaries, then apply the size limit. Blocking.
+
+        Training reads a snapshot of the index outside the lock, so a running cycle
+        keeps archiving pages; the lock is taken only to swap the dictionary in.
+        """
+        for source in self.sources():
+            try:
+                self._train(source)
+            except Exception as e:
+                logger.warning(f"HTML archive: dictionary for {source} not trained: {e}")
+        with self._lock:
+            self._prune()
+
+    def _train(self, source: str):
+        with self._lock:
+            dict_id, _ = self._dict_for_writing(source)
+        if dict_id:
+            age = time.time() - (self._dir(source) / f"{_DICT_PREFIX}{dict_id}{_DICT_SUFFIX}").stat().st_mtime
+            if age < HTML_ARCHIVE_DICT_RETRAIN_DAYS * 86400:
+                return
+        # Кадр пишется раньше строки индекса, так что всё, что есть в снимке индекса, уже читается
+        entries = list(self._entries(source))
+        if len(entries) < HTML_ARCHIVE_DICT_MIN_SAMPLES:
+            return
+        started = time.monotonic()
+        samples = [self.read(entry) for entry in entries[-HTML_ARCHIVE_DICT_SAMPLES:]]
+        trained = zstandard.train_dictionary(HTML_ARCHIVE_DICT_SIZE, samples, level=HTML_ARCHIVE_LEVEL)
+        new_id = trained.dict_id()
+        path = self._dir(source) / f"{_DICT_PREFIX}{new_id}{_DICT_SUFFIX}"
+        path.write_bytes(trained.as_bytes())
+        with self._lock:
+            self._dicts[(source, new_id)] = trained
+            self._current_dict[source] = (new_id, trained)
+        logger.info(
+            f"HTML archive: trained a {len(trained.as_bytes()) // 1024} KB dictionary for {source} "
+            f"on {len(samples)} pages in {time.monotonic() - started:.1f}s"
+        )
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.rglob("*") if p.is_file()) if self.root.is_dir() else 0
+
+    def _prune(self):
+        limit = HTML_ARCHIVE_MAX_MB * 1024 * 1024
+        total = self.size()
+        if not limit or total <= limit:
+            return
+        segments = sorted(self.root.glob(f"*/*{_SEGMENT_SUFFIX}"), key=lambda p: (p.stem, p.parent.name))
+        deleted = 0
+        for segment in segments:
+            if total <= limit:
+                break
+            index = segment.with_suffix(_INDEX_SUFFIX)
+            for path in (segment, index):
+                if path.exists():
+                    total -= path.stat().st_size
+                    path.unlink()
+            deleted += 1
+        # Последние копии URL могли быть в удалённых файлах — перечитываются из индекса при записи
+        self._last.clear()
+        # Словари, на которые не ссылается ни один оставшийся кадр, кроме текущего словаря источника
+        for source in self.sources():
+            used = {entry["dict"] for entry in self._entries(source)}
+            used.add(self._dict_for_writing(source)[0])
+            for path in self._dir(source).glob(f"{_DICT_PREFIX}*{_DICT_SUFFIX}"):
+                dict_id = int(path.stem[len(_DICT_PREFIX):])
+                if dict_id not in used:
+                    path.unlink()
+                    self._dicts.pop((source, dict_id), None)
+        logger.info(f"HTML archive: deleted {deleted} oldest day files, {total / 1024 / 1024:.0f} MB left")
+
+    def stats(self) -> List[Dict]:
+        """Per source: pages, raw and compressed bytes, days covered, current dictionary."""
+        result = []
+        for source in self.sources():
+            entries = list(self._entries(source))
+            if not entries:
+                continue
+            result.append({
+                "source": source,
+                "pages": len(entries),
+                "urls": len({e["url"] for e in entries}),
+                "raw_bytes": sum(e["size"] for e in entries),
+                "stored_bytes": sum(e["length"] for e in entries),
+                "first": entries[0]["fetched_at"],
+                "last": entries[-1]["fetched_at"],
+                "dict": self._dict_for_writing(source)[0],
+            })
+        return result
+
+
+class ArchiveTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering GETs from the archive as it was at as_of (default: the newest copies).
+
+    A URL that was never archived before as_of gets a 404 and is counted as a miss.
+    """
+
+    def __init__(self, archive: HtmlArchive, as_of: Optional[datetime] = None, sources: Optional[List[str]] = None):
+        self.archive = archive
+        self._latest: Dict[str, Dict] = {}
+        for entry in archive.entries(sources, as_of):
+            current = self._latest.get(entry["url"])
+            if current is None or entry["fetched_at"] >= current["fetched_at"]:
+                self._latest[entry["url"]] = entry
+        self.hits = 0
+        self.misses: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self._latest.get(str(request.url)) if request.method == "GET" else None
+        if entry is None:
+            self.misses.append(str(request.url))
+            return httpx.Response(404, headers={"x-archive-miss": "1"}, request=request)
+        try:
+            body = self.archive.read(entry)
+        except OSError:
+            # Файл дня удалён ограничением размера после загрузки индекса
+            self.misses.append(str(request.url))
+            return httpx.Response(404, headers={"x-archive-miss": "1"}, request=request)
+        self.hits += 1
+        return httpx.Response(200, headers={"content-type": entry["type"]}, content=body, request=request)
+
+
+_archive: Optional[HtmlArchive] = None
+
+
+def get_html_archive() -> Optional[HtmlArchive]:
+    """Process-wide archive; None if the zstandard package is not installed."""
+    global _archive
+    if _archive is None:
+        if zstandard is None:
+            logger.warning("HTML archive disabled: package 'zstandard' is not installed (pip install zstandard)")
+            return None
+        _archive = HtmlArchive()
+    return _archive
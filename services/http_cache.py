@@ -0,0 +1,124 @@
+"""
+On-disk cache of conditional-request validators for source listing pages.
+
+For every listing URL we keep ETag / Last-Modified and a fingerprint of the
+normalized page body. The parser sends conditional requests and skips the whole
+per-source parse when the server answers 304 or the fingerprint did not change.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Фрагменты, которые меняются при каждом ответе, не меняя сам листинг
+_VOLATILE_PATTERNS = [
+    re.compile(r'\snonce="[^"]*"', re.IGNORECASE),
+    re.compile(r'<meta[^>]+name="csrf-token"[^>]*>', re.IGNORECASE),
+    re.compile(r'<input[^>]+name="_?csrf[^"]*"[^>]*>', re.IGNORECASE),
+    re.compile(r'([?&](?:v|ver|_|t|ts)=)\d{8,}', re.IGNORECASE),
+]
+
+
+def content_fingerprint(html: str) -> str:
+    """sha256 of the page body with volatile tokens and whitespace normalized away."""
+    text = html or ""
+    for pattern in _VOLATILE_PATTERNS:
+        text = pattern.sub(r'\1' if pattern.groups else '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return hashlib.sha256(text.encode('utf-8', 'ignore')).hexdigest()
+
+
+class HttpCache:
+    """Validators per URL, one small JSON file each.
+
+    New entries are staged in memory per source and written only by commit(),
+    so a source that failed, or whose events were not persisted, re-fetches its
+    pages next time.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._pending: Dict[str, Dict] = {}
+        # URL → источник, для которого он загружен (None — вне источника)
+        self._pending_source: Dict[str, Optional[str]] = {}
+
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[Dict]:
+        if url in self._pending:
+            return self._pending[url]
+        path = self._path(url)
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Broken HTTP cache entry for {url}: {e}")
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for the stored validators."""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_unchanged(self, url: str, fingerprint: str) -> bool:
+        entry = self.get(url)
+        return bool(entry) and entry.get('fingerprint') == fingerprint
+
+    def stage(self, url: str, response_headers, fingerprint: str, source: Optional[str] = None):
+        """Remember validators of a fresh 200 response until commit()."""
+        self._pending_source[url] = source
+        self._pending[url] = {
+            'url': url,
+            'etag': response_headers.get('etag'),
+            'last_modified': response_headers.get('last-modified'),
+            'fingerprint': fingerprint,
+            'fetched_at': datetime.utcnow().isoformat(),
+        }
+
+    def _staged_urls(self, sources: Optional[Iterable[str]]):
+        if sources is None:
+            return list(self._pending)
+        sources = set(sources)
+        return [url for url, source in self._pending_source.items() if source in sources]
+
+    def commit(self, sources: Optional[Iterable[str]] = None) -> int:
+        """Write staged entries of the given sources (default: all) to disk (atomic replace).
+
+        Returns number written.
+        """
+        written = 0
+        for url in self._staged_urls(sources):
+            entry = self._pending.pop(url)
+            self._pending_source.pop(url, None)
+            path = self._path(url)
+            tmp_path = path.with_suffix('.tmp')
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+                written += 1
+            except OSError as e:
+                logger.warning(f"Failed to write HTTP cache entry for {url}: {e}")
+        return written
+
+    def discard(self, sources: Optional[Iterable[str]] = None):
+        """Forget staged entries of the given sources (default: all)."""
+        for url in self._staged_urls(sources):
+            self._pending.pop(url, None)
+            self._pending_source.pop(url, None)
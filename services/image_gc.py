@@ -0,0 +1,172 @@
+"""
+Mark-and-sweep garbage collection of parsed_images/.
+
+Mark: what the database still references — local Event.image_url paths and
+the blobs linked to existing events through event_images. Links of events
+that no longer exist (the events table was wiped, the event was dropped after
+its image landed) are removed once older than the grace period, refcounts are
+recomputed from the remaining links, and blobs nobody uses any more are
+removed from the store.
+
+Sweep: a file in parsed_images/ that belongs to no marked blob (original,
+renditions or manifest) and is no marked legacy file is deleted if it is older
+than IMAGE_GC_GRACE_HOURS, so downloads that are not linked yet survive.
+Files are handled in batches of IMAGE_GC_BATCH in a thread with a pause in
+between, and the sweep waits while a parsing cycle runs.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from database.engine import SessionLocal
+from database.models import Event, EventImage, ImageBlob, ImageSource
+from services.image_store import IMAGES_DIR
+from config import IMAGE_GC_GRACE_HOURS, IMAGE_GC_BATCH, IMAGE_GC_PAUSE
+
+logger = logging.getLogger(__name__)
+
+_SHA_RE = re.compile(r'^([0-9a-f]{64})\.')
+
+_last_report: Optional[Dict] = None
+
+
+def get_last_report() -> Optional[Dict]:
+    """Report of the last finished collection (None if none ran since start)."""
+    return _last_report
+
+
+async def collect_garbage(cycle_lock: Optional[asyncio.Lock] = None) -> Dict:
+    """Run one collection; returns counters including bytes_reclaimed.
+
+    cycle_lock — the scheduler's parsing cycle lock: the mark phase holds it,
+    the sweep pauses whenever a cycle holds it.
+    """
+    global _last_report
+    started = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(hours=IMAGE_GC_GRACE_HOURS)
+    cutoff_ts = time.time() - IMAGE_GC_GRACE_HOURS * 3600
+
+    if cycle_lock is not None:
+        async with cycle_lock:
+            live_blobs, live_paths, report = await asyncio.to_thread(_mark, cutoff)
+    else:
+        live_blobs, live_paths, report = await asyncio.to_thread(_mark, cutoff)
+
+    files = await asyncio.to_thread(_list_files)
+    report.update(files_scanned=len(files), files_deleted=0, bytes_reclaimed=0)
+    for i in range(0, len(files), IMAGE_GC_BATCH):
+        while cycle_lock is not None and cycle_lock.locked():
+            await asyncio.sleep(5)
+        deleted, reclaimed = await asyncio.to_thread(
+            _sweep_batch, files[i:i + IMAGE_GC_BATCH], live_blobs, live_paths, cutoff_ts
+        )
+        report['files_deleted'] += deleted
+        report['bytes_reclaimed'] += reclaimed
+        await asyncio.sleep(IMAGE_GC_PAUSE)
+    await asyncio.to_thread(_remove_empty_dirs)
+
+    report['seconds'] = round(time.monotonic() - started, 1)
+    report['finished_at'] = datetime.now()
+    _last_report = report
+    logger.info(
+        f"Image GC: reclaimed {report['bytes_reclaimed'] / 1024 / 1024:.1f} MB "
+        f"({report['files_deleted']} of {report['files_scanned']} files), "
+        f"{report['blobs_deleted']} blobs and {report['links_dropped']} dangling links removed, "
+        f"{report['refcounts_fixed']} refcounts fixed in {report['seconds']}s"
+    )
+    return report
+
+
+def _local_path(path: Optional[str]) -> Optional[str]:
+    if not path or path == 'NO IMAGE' or path.startswith(('http://', 'https://')):
+        return None
+    return os.path.normpath(path)
+
+
+def _mark(cutoff: datetime) -> Tuple[Set[str], Set[str], Dict]:
+    """Reconcile the store with the events table; returns live blob hashes and live legacy paths."""
+    report = {"links_dropped": 0, "refcounts_fixed": 0, "blobs_deleted": 0}
+    db = SessionLocal()
+    try:
+        event_urls = {url for (url,) in db.query(Event.url)}
+        live_paths = {p for p in (_local_path(path) for (path,) in db.query(Event.image_url)) if p}
+
+        links: Counter = Counter()
+        for link in db.query(EventImage):
+            # Изображение может прийти раньше, чем событие сохранится, — такие ссылки ждут срок
+            if link.event_url in event_urls or (link.linked_at and link.linked_at >= cutoff):
+                links[link.sha256] += 1
+            else:
+                db.delete(link)
+                report['links_dropped'] += 1
+        db.flush()
+
+        live_blobs: Set[str] = set()
+        for blob in db.query(ImageBlob):
+            count = links.get(blob.sha256, 0)
+            used = count or os.path.normpath(blob.path) in live_paths
+            if not used and blob.created_at and blob.created_at < cutoff:
+                db.query(ImageSource).filter(ImageSource.sha256 == blob.sha256).delete(synchronize_session=False)
+                db.delete(blob)
+                report['blobs_deleted'] += 1
+                continue
+            live_blobs.add(blob.sha256)
+            if blob.refcount != count:
+                blob.refcount = count
+                report['refcounts_fixed'] += 1
+        db.commit()
+        return live_blobs, live_paths, report
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _list_files() -> List[Path]:
+    files = []
+    for root, _, names in os.walk(IMAGES_DIR):
+        for name in names:
+            if name != '.gitkeep':
+                files.append(Path(root) / name)
+    return files
+
+
+def _sweep_batch(files: List[Path], live_blobs: Set[str], live_paths: Set[str], cutoff_ts: float) -> Tuple[int, int]:
+    deleted = reclaimed = 0
+    for file in files:
+        try:
+            stat = file.stat()
+        except OSError:
+            continue
+        if stat.st_mtime >= cutoff_ts:
+            continue
+        # Недописанные временные файлы (.download-*.tmp, .<sha>.card.webp.tmp) ничьи
+        owner = None if file.name.endswith('.tmp') else _SHA_RE.match(file.name)
+        if owner and owner.group(1) in live_blobs:
+            continue
+        if os.path.normpath(file) in live_paths:
+            continue
+        try:
+            file.unlink()
+        except OSError as e:
+            logger.warning(f"Image GC: cannot delete {file}: {e}")
+            continue
+        deleted += 1
+        reclaimed += stat.st_size
+    return deleted, reclaimed
+
+
+def _remove_empty_dirs():
+    for entry in IMAGES_DIR.iterdir():
+        if entry.is_dir():
+            try:
+                entry.rmdir()  # только пустые
+            except OSError:
+                pass
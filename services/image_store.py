@@ -0,0 +1,241 @@
+"""
+Content-addressed image store in parsed_images/.
+
+Every image file is named by the sha256 of its bytes (parsed_images/ab/abcdef….jpg),
+so a logo shared by many events is stored once. Three tables keep the books:
+
+image_blobs    one row per file, with refcount = number of events using it
+image_sources  image URL → blob: a URL that was downloaded once is never fetched again
+event_images   event URL → blob (by URL: the image can land before the event row exists)
+
+Downloads are streamed straight to a temp file (store_stream), sniffed from the
+first bytes and capped at IMAGE_MAX_BYTES.
+
+release() drops an event's link; a blob nobody references any more is deleted
+together with its file, its renditions (services/image_variants.py) and its
+source URLs.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+from database.engine import SessionLocal
+from database.models import ImageBlob, ImageSource, EventImage
+from config import IMAGE_MAX_BYTES, IMAGE_STREAM_CHUNK
+
+logger = logging.getLogger(__name__)
+
+IMAGES_DIR = Path("parsed_images")
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """File extension by magic bytes of the first chunk, None if it is not an image we keep."""
+    if head[:2] == b'\xff\xd8':
+        return '.jpg'
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        return '.png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def blob_path(sha256: str, ext: str) -> Path:
+    return IMAGES_DIR / sha256[:2] / f"{sha256}{ext}"
+
+
+def lookup_url(url: str) -> Optional[str]:
+    """Local path of an already downloaded image URL (None if unknown or the file is gone)."""
+    db = SessionLocal()
+    try:
+        row = db.query(ImageBlob.path).join(ImageSource, ImageSource.sha256 == ImageBlob.sha256).filter(
+            ImageSource.url == url
+        ).first()
+    except Exception as e:
+        logger.warning(f"Image store lookup failed for {url}: {e}")
+        return None
+    finally:
+        db.close()
+    if row and Path(row[0]).exists():
+        return row[0]
+    return None
+
+
+def is_blob(path: str) -> bool:
+    """True if path is a file of the store (shared — never delete it directly)."""
+    db = SessionLocal()
+    try:
+        return db.query(ImageBlob.sha256).filter(ImageBlob.path == path).first() is not None
+    finally:
+        db.close()
+
+
+class NotAnImage(Exception):
+    pass
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+async def store_stream(response, source_url: str, max_bytes: int = IMAGE_MAX_BYTES) -> Optional[str]:
+    """Stream an httpx response into the store; returns the local path.
+
+    The format is sniffed from the first bytes (NotAnImage aborts before the rest
+    is downloaded), more than max_bytes raises ImageTooLarge. Chunks go to a temp
+    file that is renamed into place only when complete, so memory per download
+    is one chunk and a half-written file never appears under a blob name.
+    """
+    declared = response.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise ImageTooLarge(f"Content-Length {declared} > {max_bytes}")
+    content_type = response.headers.get('content-type', '').lower()
+
+    IMAGES_DIR.mkdir(exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix='.download-', suffix='.tmp', dir=IMAGES_DIR)
+    tmp = Path(tmp_name)
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    head = b''
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            async for chunk in response.aiter_bytes(IMAGE_STREAM_CHUNK):
+                if ext is None:
+                    head += chunk
+                    if len(head) < 16:
+                        continue
+                    ext = _image_extension(head, content_type, source_url)
+                    chunk, head = head, b''
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageTooLarge(f"more than {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+            if ext is None:
+                # Ответ короче 16 байт
+                ext = _image_extension(head, content_type, source_url)
+                size += len(head)
+                digest.update(head)
+                f.write(head)
+        return _register(tmp, digest.hexdigest(), ext, size, source_url)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _image_extension(head: bytes, content_type: str, source_url: str) -> str:
+    ext = sniff_image_format(head)
+    if ext:
+        return ext
+    if not content_type.startswith('image/'):
+        raise NotAnImage(f"content-type: {content_type or 'unknown'}")
+    # Формат не распознан по сигнатуре — расширение из URL
+    ext = os.path.splitext(urlparse(source_url).path)[1].lower()
+    return ext if ext in IMAGE_EXTENSIONS else '.jpg'
+
+
+def _register(tmp: Path, sha256: str, ext: str, size: int, source_url: str) -> Optional[str]:
+    """Move a complete download into place (unless the content is already stored) and record it."""
+    db = SessionLocal()
+    try:
+        blob = db.get(ImageBlob, sha256)
+        if blob is None:
+            path = blob_path(sha256, ext)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp, path)
+            blob = ImageBlob(sha256=sha256, path=str(path), size=size, refcount=0)
+            db.add(blob)
+            logger.info(f"Stored image {path.name} ({size} bytes)")
+        else:
+            logger.debug(f"Image {source_url} is a duplicate of {blob.path}")
+        source = db.get(ImageSource, source_url)
+        if source is None:
+            db.add(ImageSource(url=source_url, sha256=sha256))
+        else:
+            source.sha256 = sha256
+        db.commit()
+        return blob.path
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to store image from {source_url}: {e}")
+        return None
+    finally:
+        db.close()
+
+
+def link(event_url: str, path: str):
+    """Point the event at the blob stored under path (replacing its previous image)."""
+    db = SessionLocal()
+    try:
+        blob = db.query(ImageBlob).filter(ImageBlob.path == path).first()
+        if blob is None:
+            return
+        current = db.get(EventImage, event_url)
+        orphan = None
+        if current is not None:
+            if current.sha256 == blob.sha256:
+                return
+            orphan = _unref(db, current.sha256)
+            current.sha256 = blob.sha256
+        else:
+            db.add(EventImage(event_url=event_url, sha256=blob.sha256))
+        blob.refcount += 1
+        db.commit()
+        _delete_file(orphan)
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to link image to {event_url}: {e}")
+    finally:
+        db.close()
+
+
+def release(event_url: str) -> bool:
+    """Drop the event's image link; False if the event has no image in the store."""
+    db = SessionLocal()
+    try:
+        current = db.get(EventImage, event_url)
+        if current is None:
+            return False
+        sha256 = current.sha256
+        db.delete(current)
+        orphan = _unref(db, sha256)
+        db.commit()
+        _delete_file(orphan)
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to release image of {event_url}: {e}")
+        return True
+    finally:
+        db.close()
+
+
+def _unref(db, sha256: str) -> Optional[str]:
+    """Decrement the blob's refcount; at zero delete its rows and return the file to delete after commit."""
+    blob = db.get(ImageBlob, sha256)
+    if blob is None:
+        return None
+    blob.refcount -= 1
+    if blob.refcount > 0:
+        return None
+    db.query(ImageSource).filter(ImageSource.sha256 == sha256).delete(synchronize_session=False)
+    db.delete(blob)
+    return blob.path
+
+
+def _delete_file(path: Optional[str]):
+    """Delete a blob's file together with its renditions and manifest (<sha>.*)."""
+    if not path:
+        return
+    blob = Path(path)
+    for file in blob.parent.glob(f"{blob.stem}.*"):
+        try:
+            file.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to delete image {file}: {e}")
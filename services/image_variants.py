@@ -0,0 +1,151 @@
+"""
+Resized renditions of stored images.
+
+For a blob of the image store (services/image_store.py) render_variants()
+writes every rendition from IMAGE_VARIANTS next to the original —
+parsed_images/ab/<sha>.<variant>.<ext> — and a manifest <sha>.json with the
+size, dimensions and format of each. Renditions are made once per blob: a blob
+that already has a manifest is skipped, so a logo shared by many events is
+resized once.
+
+notify_users sends the 'telegram' rendition and, after the first upload,
+Telegram's file_id from the manifest; the web app shows the 'card' rendition.
+"""
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image, ImageOps
+
+from config import IMAGE_VARIANTS
+
+logger = logging.getLogger(__name__)
+
+_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+
+
+def manifest_path(path: str) -> Path:
+    return Path(path).with_suffix('.json')
+
+
+def variant_file(path: str, name: str) -> Path:
+    """Where rendition name of the blob at path is stored."""
+    fmt = IMAGE_VARIANTS[name][1]
+    original = Path(path)
+    return original.with_name(f"{original.stem}.{name}{_EXTENSIONS[fmt]}")
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    """Manifest of the blob at path, None if its renditions were not made yet."""
+    try:
+        with open(manifest_path(path), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if set(manifest.get('variants', {})) != set(IMAGE_VARIANTS):
+        # IMAGE_VARIANTS изменился — рендеры пересоздаются
+        return None
+    return manifest
+
+
+def variant_path(path: str, name: str) -> Optional[str]:
+    """Path of a ready rendition, None if there is none (fall back to the original)."""
+    manifest = load_manifest(path)
+    if not manifest:
+        return None
+    variant = manifest['variants'].get(name)
+    if variant and Path(variant['path']).exists():
+        return variant['path']
+    return None
+
+
+def render_variants(path: str) -> Optional[Dict]:
+    """Write all renditions of the blob at path and its manifest; returns the manifest.
+
+    CPU-bound — runs in the extraction pool (see ImageDownloadQueue).
+    """
+    manifest = load_manifest(path)
+    if manifest:
+        return manifest
+    try:
+        with Image.open(path) as img:
+            original = {
+                "path": str(path),
+                "width": img.width,
+                "height": img.height,
+                "bytes": os.path.getsize(path),
+                "format": (img.format or '').lower(),
+            }
+            largest = max(size for size, _, _ in IMAGE_VARIANTS.values())
+            # JPEG декодируется сразу в уменьшенном масштабе (1/2…1/8) — в разы быстрее
+            img.draft('RGB', (largest, largest))
+            img = ImageOps.exif_transpose(img)
+            img.load()
+    except Exception as e:
+        logger.warning(f"Cannot render variants of {path}: {e}")
+        return None
+
+    variants = {}
+    for name, (size, fmt, quality) in IMAGE_VARIANTS.items():
+        rendition = img.copy()
+        rendition.thumbnail((size, size), Image.LANCZOS)
+        rendition = _convert_for(rendition, fmt)
+        buf = io.BytesIO()
+        rendition.save(buf, fmt, quality=quality, optimize=True)
+        target = variant_file(path, name)
+        _write_atomic(target, buf.getvalue())
+        variants[name] = {
+            "path": str(target),
+            "width": rendition.width,
+            "height": rendition.height,
+            "bytes": buf.tell(),
+            "format": fmt.lower(),
+        }
+
+    manifest = {"sha256": Path(path).stem, "original": original, "variants": variants}
+    _write_manifest(path, manifest)
+    logger.debug(
+        f"Rendered variants of {Path(path).name}: {original['bytes']} → "
+        + ", ".join(f"{name} {v['bytes']}" for name, v in variants.items())
+    )
+    return manifest
+
+
+def remember_telegram_file_id(path: str, file_id: str):
+    """Keep the file_id of an uploaded rendition: later sends reuse it instead of uploading again."""
+    manifest = load_manifest(path)
+    if manifest is None or manifest.get('telegram_file_id') == file_id:
+        return
+    manifest['telegram_file_id'] = file_id
+    _write_manifest(path, manifest)
+
+
+def _convert_for(img: Image.Image, fmt: str) -> Image.Image:
+    if fmt == "JPEG":
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Прозрачность — на белый фон (логотипы)
+            rgba = img.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return img.convert('RGB') if img.mode != 'RGB' else img
+    if img.mode not in ('RGB', 'RGBA'):
+        return img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'P') else 'RGB')
+    return img
+
+
+def _write_manifest(path: str, manifest: Dict):
+    data = json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8')
+    try:
+        _write_atomic(manifest_path(path), data)
+    except OSError as e:
+        logger.warning(f"Cannot write manifest of {path}: {e}")
+
+
+def _write_atomic(target: Path, data: bytes):
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
@@ -0,0 +1,196 @@
+"""
+Background image downloads, decoupled from listing parsing.
+
+Extractors only collect image candidates; ImageDownloadQueue fetches them with
+a few workers (IMAGE_DOWNLOAD_WORKERS) and at most IMAGE_HOST_CONCURRENCY
+downloads per host, trying an event's candidates in order until one works.
+A landed image is written to the Event row if it is already stored, otherwise
+it is kept until the pipeline's persist stage picks it up with take_landed().
+The image store reference (image_store.link) is taken only for a stored event
+— by _land for one already in the DB, by whoever commits the event otherwise —
+so events later dropped by dedup or persist do not hold references.
+Before an event counts as done its image's renditions are made
+(services/image_variants.py), so the notification can send the small one.
+"""
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from database.engine import SessionLocal
+from database.models import Event, ImageBlob
+from services import image_store, image_variants
+from config import IMAGE_DOWNLOAD_WORKERS, IMAGE_HOST_CONCURRENCY, IMAGE_QUEUE_SIZE, IMAGE_VARIANT_BACKFILL
+
+if TYPE_CHECKING:
+    from services.crawl_metrics import CrawlMetrics
+    from services.parser import EventParser
+
+logger = logging.getLogger(__name__)
+
+# Значения image_url, означающие «изображения нет»
+MISSING_IMAGE = (None, '', 'NO IMAGE')
+
+
+class ImageDownloadQueue:
+    def __init__(self, parser: "EventParser", workers: int = IMAGE_DOWNLOAD_WORKERS, metrics: Optional["CrawlMetrics"] = None):
+        self.parser = parser
+        self.metrics = metrics
+        self.queue: asyncio.Queue = asyncio.Queue(IMAGE_QUEUE_SIZE)
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        # event_url → событие «загрузка завершена» (успешно или нет)
+        self._pending: Dict[str, asyncio.Event] = {}
+        # Изображения, скачанные раньше, чем событие попало в БД
+        self._landed: Dict[str, str] = {}
+        # Рендеры одного файла, запрошенные параллельно (общий логотип), делаются один раз
+        self._rendering: Dict[str, asyncio.Future] = {}
+        self.downloaded = 0
+        self.failed = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, event_url: str, candidates: List[str], source: Optional[str] = None):
+        """Queue the event's candidate image URLs (first that downloads wins); source — for crawl metrics."""
+        if not event_url or not candidates or event_url in self._pending:
+            return
+        self._pending[event_url] = asyncio.Event()
+        await self.queue.put((event_url, list(candidates), source))
+
+    def take_landed(self, event_url: str) -> Optional[str]:
+        """Local path of an image that landed before its event was stored."""
+        return self._landed.pop(event_url, None)
+
+    async def wait_for(self, event_urls: Iterable[str], timeout: float) -> bool:
+        """Wait until downloads of event_urls finish; False on timeout."""
+        waiting = [self._pending[u].wait() for u in event_urls if u in self._pending]
+        if not waiting:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.gather(*waiting), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def join(self, timeout: Optional[float] = None):
+        """Wait for the queue to drain, then stop the workers."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Images: downloads still running after {timeout}s, {self.queue.qsize()} queued ones dropped")
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop the workers; queued downloads are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for done in self._pending.values():
+            done.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self.queue.qsize(),
+            "in_progress": sum(1 for e in self._pending.values() if not e.is_set()) - self.queue.qsize(),
+            "downloaded": self.downloaded,
+            "failed": self.failed,
+            "rendering": len(self._rendering),
+        }
+
+    def _slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).hostname or ''
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(IMAGE_HOST_CONCURRENCY)
+        return self._host_slots[host]
+
+    async def _worker(self):
+        while True:
+            event_url, candidates, source = await self.queue.get()
+            run = self.metrics.source(source) if self.metrics is not None and source else None
+            try:
+                path = None
+                for image_url in candidates:
+                    async with self._slot(image_url):
+                        path = await self.parser._download_and_save_image(image_url)
+                    if path:
+                        break
+                if path:
+                    self.downloaded += 1
+                    if run is not None:
+                        run.images_fetched += 1
+                    await self._render(path)
+                    self._land(event_url, path)
+                else:
+                    self.failed += 1
+                    if run is not None:
+                        run.image_errors += 1
+            except Exception as e:
+                self.failed += 1
+                if run is not None:
+                    run.image_errors += 1
+                logger.warning(f"Image download for {event_url} failed: {e}")
+            finally:
+                self._pending[event_url].set()
+                self.queue.task_done()
+
+    async def _render(self, path: str):
+        if image_variants.load_manifest(path) is not None:
+            return
+        task = self._rendering.get(path)
+        if task is None:
+            task = asyncio.ensure_future(render_variants(self.parser, path))
+            self._rendering[path] = task
+            task.add_done_callback(lambda _: self._rendering.pop(path, None))
+        await asyncio.shield(task)
+
+    def _land(self, event_url: str, path: str):
+        db = SessionLocal()
+        try:
+            updated = db.query(Event).filter(
+                Event.url == event_url,
+                (Event.image_url.is_(None)) | (Event.image_url.in_(['', 'NO IMAGE'])),
+            ).update({Event.image_url: path}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to attach image to {event_url}: {e}")
+            updated = 0
+        finally:
+            db.close()
+        if updated:
+            image_store.link(event_url, path)
+        else:
+            # Событие ещё не сохранено (или отброшено) — ссылку возьмёт тот, кто его сохранит
+            self._landed[event_url] = path
+
+
+async def render_variants(parser: "EventParser", path: str) -> bool:
+    """Make the blob's renditions in the extraction pool (a thread if the pool is off)."""
+    loop = asyncio.get_running_loop()
+    try:
+        manifest = await loop.run_in_executor(parser.state.extraction_pool, image_variants.render_variants, path)
+    except Exception as e:
+        logger.warning(f"Rendering variants of {path} failed: {e}")
+        return False
+    return manifest is not None
+
+
+async def render_missing_variants(parser: "EventParser", limit: int = IMAGE_VARIANT_BACKFILL) -> int:
+    """Make renditions for stored images that have none (stored before renditions existed)."""
+    db = SessionLocal()
+    try:
+        paths = [path for (path,) in db.query(ImageBlob.path).order_by(ImageBlob.created_at.desc())]
+    finally:
+        db.close()
+    missing = [p for p in paths if image_variants.load_manifest(p) is None][:limit]
+    rendered = 0
+    for path in missing:
+        if await render_variants(parser, path):
+            rendered += 1
+    if missing:
+        logger.info(f"Images: rendered variants for {rendered} of {len(missing)} stored images without them")
+    return rendered
@@ -0,0 +1,246 @@
+"""
+Bloom filter of events already in the database: their URLs and event hashes.
+
+The pipeline asks it before doing any work on a crawled item. A negative
+answer is certain — the item is new and no DB lookup is needed. A positive
+answer is confirmed by an exact query, so a false positive costs one lookup and
+never drops a new event; the observed false-positive share is logged after each
+cycle next to the configured KNOWN_FILTER_ERROR_RATE.
+
+The filter lives in memory for the whole process and is saved to
+KNOWN_FILTER_PATH. sync() compares it with the events table (row count and
+highest id) at the start of every cycle and rebuilds it from the table when
+they differ — after expired events were deleted (a Bloom filter cannot forget
+keys), after rows were added by another process, or when the file is missing,
+broken or built with other parameters.
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import KNOWN_FILTER_PATH, KNOWN_FILTER_CAPACITY, KNOWN_FILTER_ERROR_RATE
+from database.engine import SessionLocal
+from database.models import Event
+
+logger = logging.getLogger(__name__)
+
+FILTER_FORMAT = 1
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Оптимальные m (бит) и k (хешей) для n элементов и вероятности ложного срабатывания p
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Двойное хеширование: k позиций из двух 64-битных половин одного blake2b
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _url_key(url: str) -> str:
+    return f"url:{url}"
+
+
+def _hash_key(event_hash: str) -> str:
+    return f"hash:{event_hash}"
+
+
+class KnownEvents:
+    def __init__(self, path=KNOWN_FILTER_PATH):
+        self.path = Path(path)
+        self.bloom: Optional[BloomFilter] = None
+        # Состояние таблицы events, которому соответствует фильтр: (число строк, максимальный id)
+        self.events = 0
+        self.max_id = 0
+        self.dirty = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.checks = 0
+        self.positives = 0
+        self.false_positives = 0
+
+    # --- загрузка и пересборка ---
+
+    def _table_state(self, db: Session) -> Tuple[int, int]:
+        count, max_id = db.query(func.count(Event.id), func.max(Event.id)).one()
+        return count or 0, max_id or 0
+
+    def _capacity(self, events: int) -> int:
+        # Два ключа на событие (URL и хеш) и запас вдвое на новые события цикла
+        return max(KNOWN_FILTER_CAPACITY, events * 4)
+
+    def _load(self) -> bool:
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline())
+                bits = bytearray(f.read())
+        except (OSError, ValueError) as e:
+            if self.path.exists():
+                logger.warning(f"Known events filter {self.path} is unreadable, rebuilding: {e}")
+            return False
+        if header.get('format') != FILTER_FORMAT or header.get('error_rate') != KNOWN_FILTER_ERROR_RATE:
+            return False
+        bloom = BloomFilter(header['capacity'], header['error_rate'], bits)
+        if len(bits) != (bloom.size + 7) // 8:
+            return False
+        self.bloom = bloom
+        self.events, self.max_id = header['events'], header['max_id']
+        return True
+
+    def rebuild(self, db: Session):
+        started = time.monotonic()
+        events, max_id = self._table_state(db)
+        bloom = BloomFilter(self._capacity(events), KNOWN_FILTER_ERROR_RATE)
+        for url, event_hash in db.query(Event.url, Event.event_hash).yield_per(1000):
+            bloom.add(_url_key(url))
+            if event_hash:
+                bloom.add(_hash_key(event_hash))
+        # Недостроенный фильтр давал бы ложные отрицательные ответы — подменяется только целиком
+        self.bloom, self.events, self.max_id = bloom, events, max_id
+        self.dirty = True
+        logger.info(
+            f"Known events filter rebuilt: {events} events, {len(bloom.bits) / 1024:.0f} KB, "
+            f"{bloom.hashes} hashes, in {time.monotonic() - started:.2f}s"
+        )
+
+    def sync(self):
+        """Load the saved filter (once) and rebuild it if it does not match the events table.
+
+        Blocking (file and table scan) — the pipeline runs it in a thread.
+        """
+        if self.bloom is None:
+            self._load()
+        db = SessionLocal()
+        try:
+            state = self._table_state(db)
+            if (
+                self.bloom is None
+                or state != (self.events, self.max_id)
+                or self.events * 2 > self.bloom.capacity
+            ):
+                self.rebuild(db)
+        finally:
+            db.close()
+        self.reset_stats()
+
+    def save(self):
+        if not self.dirty or self.bloom is None:
+            return
+        header = {
+            'format': FILTER_FORMAT,
+            'capacity': self.bloom.capacity,
+            'error_rate': self.bloom.error_rate,
+            'events': self.events,
+            'max_id': self.max_id,
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                f.write(self.bloom.bits)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            logger.warning(f"Failed to save known events filter: {e}")
+
+    # --- проверки ---
+
+    def _check(self, key: str, confirm) -> bool:
+        if self.bloom is None:
+            return confirm()
+        self.checks += 1
+        if key not in self.bloom:
+            return False
+        self.positives += 1
+        if confirm():
+            return True
+        self.false_positives += 1
+        return False
+
+    def is_known_url(self, url: str, db: Optional[Session] = None) -> bool:
+        """URL is stored: the filter first, an exact query only for its positives."""
+        if not url:
+            return False
+        return self._check(_url_key(url), lambda: _exists(db, Event.url == url))
+
+    def is_known_hash(self, event_hash: str, db: Optional[Session] = None) -> bool:
+        if not event_hash:
+            return False
+        return self._check(_hash_key(event_hash), lambda: _exists(db, Event.event_hash == event_hash))
+
+    def add(self, event: Event):
+        """Remember a just-stored event (call after commit, so event.id is set)."""
+        if self.bloom is None:
+            return
+        self.bloom.add(_url_key(event.url))
+        if event.event_hash:
+            self.bloom.add(_hash_key(event.event_hash))
+        self.events += 1
+        self.max_id = max(self.max_id, event.id or 0)
+        self.dirty = True
+
+    def stats(self) -> Dict:
+        negatives = self.checks - self.positives
+        return {
+            'checks': self.checks,
+            'positives': self.positives,
+            'false_positives': self.false_positives,
+            # Доля ложных срабатываний среди ключей, которых нет в БД
+            'false_positive_rate': round(self.false_positives / (negatives + self.false_positives), 4)
+            if negatives + self.false_positives else 0.0,
+            'events': self.events,
+        }
+
+    def log_stats(self):
+        st = self.stats()
+        logger.info(
+            f"Known events filter: {st['checks']} checks, {st['positives']} positive, "
+            f"{st['false_positives']} false positives ({st['false_positive_rate']:.2%}, "
+            f"target {KNOWN_FILTER_ERROR_RATE:.2%}), {st['events']} events"
+        )
+
+
+def _exists(db: Optional[Session], condition) -> bool:
+    if db is not None:
+        return db.query(Event.id).filter(condition).first() is not None
+    db = SessionLocal()
+    try:
+        return db.query(Event.id).filter(condition).first() is not None
+    finally:
+        db.close()
+
+
+_known_events: Optional[KnownEvents] = None
+
+
+def get_known_events() -> KnownEvents:
+    """Process-wide filter, kept in memory between parsing cycles."""
+    global _known_events
+    if _known_events is None:
+        _known_events = KnownEvents()
+    return _known_events
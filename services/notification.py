@@ -1,9 +1,11 @@
 import logging
+from pathlib import Path
 from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, URLInputFile
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, URLInputFile, FSInputFile
 from sqlalchemy.orm import Session
 from database.models import User, Event, UserEvent, Feedback
 from handlers.feedback import get_event_keyboard
+from services import image_variants
 
 logger = logging.getLogger(__name__)
 
@@ -30,14 +32,18 @@ async def notify_users(bot: Bot, events: list, db: Session):
                 
                 kb = get_event_keyboard(event.id, event.url)
                 
-                if event.image_url:
-                    await bot.send_photo(
+                photo = _photo_for(event)
+                if photo:
+                    message = await bot.send_photo(
                         chat_id=user.telegram_id,
-                        photo=event.image_url,
+                        photo=photo,
                         caption=text,
                         parse_mode="HTML",
                         reply_markup=kb
                     )
+                    if isinstance(photo, FSInputFile) and message.photo:
+                        # Следующим получателям — по file_id, без повторной загрузки
+                        image_variants.remember_telegram_file_id(event.image_url, message.photo[-1].file_id)
                 else:
                     await bot.send_message(
                         chat_id=user.telegram_id,
@@ -54,6 +60,22 @@ async def notify_users(bot: Bot, events: list, db: Session):
             except Exception as e:
                 logger.error(f"Failed to send event {event.id} to user {user.id}: {e}")
 
+def _photo_for(event: Event):
+    """What to send as the event's photo: Telegram file_id of an earlier upload,
+    the 'telegram' rendition, the original file or a remote URL; None if there is no image."""
+    image = event.image_url
+    if not image or image == 'NO IMAGE':
+        return None
+    if image.startswith(('http://', 'https://')):
+        return image
+    manifest = image_variants.load_manifest(image)
+    if manifest and manifest.get('telegram_file_id'):
+        return manifest['telegram_file_id']
+    path = image_variants.variant_path(image, 'telegram') or image
+    if not Path(path).exists():
+        return None
+    return FSInputFile(path)
+
 def _check_filters(user: User, event: Event) -> bool:
     # Фильтр по стране
     user_countries = user.countries if user.countries is not None else []
@@ -1,243 +1,303 @@
 import re
-import json
 import logging
 import asyncio
 import httpx
-import hashlib
-import os
-from pathlib import Path
-from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
-from urllib.parse import urljoin, unquote, urlparse, parse_qs
-from html import unescape as html_unescape
-from difflib import SequenceMatcher
+import random
+import time
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterable, List, Dict, Optional, Tuple
+from urllib.parse import urlparse
 from config import (
-    STOP_WORDS,
-    B2B_KEYWORDS,
-    CITY_VARIANTS,
-    INDUSTRIES,
     COUNTRIES,
-    COUNTRY_SOURCES,
     EXPOSALE_ALL_URL,
     VYSTAVKI_MAIN_URL,
+    HTTP_CACHE_DIR,
+    HTTP_MAX_RETRIES,
+    HTTP_RETRY_BASE_DELAY,
+    SOURCE_DEADLINE_SECONDS,
+    SOURCE_DEADLINES,
+    HEDGE_LISTING_REQUESTS,
+    LISTING_MAX_PAGES,
+    SITEMAP_MAX_PAGES_PER_CYCLE,
+    SITEMAP_MAX_DEPTH,
+    MAX_CONCURRENT_SOURCES,
+    DETAIL_MIN_DESCRIPTION,
+    SHADOW_EXTRACTORS,
+    HTML_ARCHIVE_ENABLED,
 )
+from services.crawler import CrawlerState, DEFAULT_HEADERS, get_crawler_state
+from services.extraction import EventExtractor, run_extractor_timed
+from services.http_cache import HttpCache, content_fingerprint
+from services.rate_limit import get_rate_limiter, parse_retry_after
+from services import source_health
+from services.frontier import CrawlFrontier
+from services import sitemap
+from services.sources import Source, get_source_registry
+from services.images import ImageDownloadQueue, MISSING_IMAGE
+from services import image_store
+from services import crawl_metrics
+from services import shadow
+from services.known_filter import get_known_events
+from services.crawl_budget import get_crawl_budget
+from services.crawl_metrics import CrawlMetrics
+from services.html_archive import HTML_TYPE, get_html_archive
 
 logger = logging.getLogger(__name__)
 
-# Маппинг ключевых слов -> индустрия для автоопределения
-INDUSTRY_KEYWORDS = {
-    "IT/Digital": ["it", "digital", "цифр", "технолог", "software", "стартап", "ai", "artificial intelligence", "блокчейн", "blockchain", "кибербезопасност", "cybersecurity"],
-    "Агросектор": ["агро", "сельск", "ферм", "food", "агропром", "агрокультура", "животноводств", "растениеводств", "irrigation", "watering"],
-    "Медицина": ["медицин", "здоровь", "клиник", "kihe", "pharma", "фарм", "стоматолог", "dent", "ветеринар", "hospital", "surgery"],
-    "Строительство": ["строительств", "build", "интерьер", "недвижим", "architect", "design", "ремонт", "отделк", "construction"],
-    "Энергетика": ["энерг", "power", "electric", "renewable", "solar", "wind", "атом", "nuclear", "электростанц"],
-    "Ритейл/FMCG": ["ритейл", "fmcg", "розниц", "retail", "товар", "потребитель", "consumer", "упаковк", "packaging", "продукт", "food processing"],
-    "Нефть и Газ": ["нефть", "газ", "oil", "gas", "недропольз", "petrochemical", "нефтехим", "бурени", "drilling", "refinery"],
-    "Транспорт": ["транспорт", "логистик", "авто", "transport", "logistic", "shipping", "aviation", "авиа", "railway", "жд"],
-    "Mining": ["mining", "горн", "металл", "amm", "kioge", "металлург", "steel", "aluminum", "цветн", "precious metal"],
-    "Туризм": ["туризм", "travel", "tourism", "hotel", "отель", "гостиниц", "hospitality", "курорт"],
-    "Финансы": ["финанс", "finance", "bank", "банк", "инвест", "invest", "страхов", "insurance", "fintech"],
-    "Образование": ["образовани", "education", "школ", "университет", "student", "учебн", "pedagog"],
-    "Экология": ["эколог", "ecology", "environment", "recycling", "переработк", "waste", "green", "устойчив"],
-}
-
-# Все ключевые слова: B2B + все категории
-ALL_RELEVANT_KEYWORDS = B2B_KEYWORDS + [
-    kw for keywords in INDUSTRY_KEYWORDS.values() for kw in keywords
-]
-
-# Месяцы на разных языках для парсинга дат (включая склонения)
-MONTHS = {
-    'янв': 1, 'январ': 1, 'января': 1, 'jan': 1, 'january': 1,
-    'фев': 2, 'феврал': 2, 'февраля': 2, 'feb': 2, 'february': 2,
-    'мар': 3, 'март': 3, 'марта': 3, 'mar': 3, 'march': 3,
-    'апр': 4, 'апрел': 4, 'апреля': 4, 'apr': 4, 'april': 4,
-    'май': 5, 'мая': 5, 'may': 5,
-    'июн': 6, 'июня': 6, 'jun': 6, 'june': 6,
-    'июл': 7, 'июля': 7, 'jul': 7, 'july': 7,
-    'авг': 8, 'август': 8, 'августа': 8, 'aug': 8, 'august': 8,
-    'сен': 9, 'сентябр': 9, 'сентября': 9, 'sep': 9, 'september': 9,
-    'окт': 10, 'октябр': 10, 'октября': 10, 'oct': 10, 'october': 10,
-    'ноя': 11, 'ноябр': 11, 'ноября': 11, 'nov': 11, 'november': 11,
-    'дек': 12, 'декабр': 12, 'декабря': 12, 'dec': 12, 'december': 12,
-}
-
-
-class EventParser:
-    def __init__(self):
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        self.client = httpx.AsyncClient(
-            timeout=30.0,
-            follow_redirects=True,
-            headers=self.headers,
-            verify=False,
-            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
-        )
-        self.images_dir = Path("parsed_images")
+# Итоги загрузки листингов текущего источника (ставится в _safe_parse, пишется в _fetch_listing_html
+# и _extract): имя источника, успешные и упавшие загрузки, ошибки разбора
+_listing_outcome: ContextVar[Optional[Dict]] = ContextVar('_listing_outcome', default=None)
+# Списки событий, которые наполняет текущий источник — чтобы сохранить частичный результат при дедлайне
+_partial_results: ContextVar[Optional[List[List[Dict]]]] = ContextVar('_partial_results', default=None)
+
+
+# Мусорные записи — навигационные ссылки, новостные статьи и т.д.
+_JUNK_TITLE_RE = re.compile('|'.join([
+    r'^\d+\s+exhibitions?$',                    # "20 exhibitions"
+    r'^Международные выставки\b',               # navigation links
+    r'^Календарь\b',                             # "Календарь выставок"
+    r'^Мероприятия$',                            # generic "Events" page title
+    r'^\d{1,2}\s+\w+\s+20\d{2}\s+',            # news articles starting with date "26 September 2025 ..."
+]), re.IGNORECASE)
+
+
+class EventParser(EventExtractor):
+    def __init__(self, use_cache: bool = True, state: Optional[CrawlerState] = None, archive: bool = True,
+                 track_health: bool = True):
+        # Общий на процесс клиент (HTTP/2, keep-alive, DNS-кэш) и кэш изображений — см. services/crawler.py
+        self.state = state or get_crawler_state()
+        self.headers = DEFAULT_HEADERS
+        self.client = self.state.client
+        # Лимиты на хост (token bucket + AIMD) — общий на процесс, окна переживают циклы
+        self.rate_limiter = get_rate_limiter()
+        self.images_dir = image_store.IMAGES_DIR
         self.images_dir.mkdir(exist_ok=True)
-        
-        # Кэш изображений для избежания повторных загрузок
-        self._image_cache = set()
+
+        # Условные запросы для листингов: неизменённый источник не парсится повторно
+        self.http_cache = HttpCache(HTTP_CACHE_DIR) if use_cache else None
+        self.unchanged_urls: List[str] = []
+        # Детальные страницы, уже применённые в этом цикле (sitemap) — повторно не загружаются
+        self._detail_urls: set = set()
+        # Обработанные записи sitemap по источникам цикла: (записи, источник sitemap, is_sitemap) — пишутся в commit_crawl_state
+        self._pending_lastmods: Dict[str, List[Tuple[List[Tuple[str, Optional[str]]], str, bool]]] = {}
+        # Метрики источников цикла (crawl_runs) — задаёт конвейер; None — не собираются
+        self.metrics: Optional[CrawlMetrics] = None
+        # Архив загруженных страниц; archive=False — при разборе самого архива
+        self.archive = get_html_archive() if archive and HTML_ARCHIVE_ENABLED else None
+        # Circuit breaker'ы источников; track_health=False — при разборе архива: его промахи (404) не сбои сайтов
+        self.track_health = track_health
 
     async def close(self):
-        await self.client.aclose()
-
-    def _extract_all_image_urls_from_element(self, element, base_url: str) -> List[str]:
-        """Извлечь ВСЕ возможные URL изображений из элемента."""
-        image_urls = []
-        if not element:
-            return image_urls
-
-        # 1. Img tag - все возможные атрибуты
-        img = element.find('img') if hasattr(element, 'find') else None
-        if img:
-            for attr in ['src', 'data-src', 'data-lazy-src', 'data-original', 'data-srcset', 'data-thumb', 'original-src']:
-                val = img.get(attr)
-                if val and not val.startswith('data:'):
-                    # Для srcset берём первое изображение
-                    if attr == 'data-srcset' or attr == 'srcset':
-                        val = val.split(',')[0].split()[0]
-                    full_url = urljoin(base_url, val.strip())
-                    image_urls.append(full_url)
-            
-            # Проверить вложенные picture > source
-            picture = element.find('picture')
-            if picture:
-                for source in picture.find_all('source'):
-                    srcset = source.get('srcset')
-                    if srcset:
-                        img_url = srcset.split(',')[0].split()[0]
-                        image_urls.append(urljoin(base_url, img_url.strip()))
-
-        # 2. Background-image в style
-        if hasattr(element, 'get'):
-            style = element.get('style', '')
-            if style:
-                # Разные форматы background-image
-                bg_patterns = [
-                    r'background-image:\s*url\(["\']?([^"\')\s]+)["\']?\)',
-                    r'background:\s*[^;]*url\(["\']?([^"\')\s]+)["\']?\)',
-                ]
-                for pattern in bg_patterns:
-                    matches = re.findall(pattern, style, re.IGNORECASE)
-                    for match in matches:
-                        image_urls.append(urljoin(base_url, match.strip()))
-
-        # 3. Поиск по классам (.img, .image, .thumbnail, .photo)
-        if hasattr(element, 'find_all'):
-            for img_class in ['img', 'image', 'thumbnail', 'photo', 'picture', 'media']:
-                for img_elem in element.find_all(class_=re.compile(img_class, re.I)):
-                    # Проверить как img tag, так и background
-                    img_tag = img_elem.find('img')
-                    if img_tag and img_tag.get('src'):
-                        image_urls.append(urljoin(base_url, img_tag['src']))
-                    elif img_elem.get('style'):
-                        style = img_elem.get('style')
-                        bg_match = re.search(r'url\(["\']?([^"\')\s]+)["\']?\)', style)
-                        if bg_match:
-                            image_urls.append(urljoin(base_url, bg_match.group(1)))
-
-        # 4. Соседние элементы с изображениями
-        if hasattr(element, 'find_next_sibling'):
-            for sibling in [element.find_next_sibling(), element.find_previous_sibling()]:
-                if sibling:
-                    sibling_imgs = sibling.find_all('img')
-                    for img_tag in sibling_imgs:
-                        if img_tag.get('src'):
-                            image_urls.append(urljoin(base_url, img_tag['src']))
-
-        # Удалить дубликаты и невалидные URL
-        unique_urls = []
-        seen = set()
-        for url in image_urls:
-            if url and url not in seen and url.startswith(('http://', 'https://')):
-                seen.add(url)
-                unique_urls.append(url)
-        
-        return unique_urls
-
-    async def _download_and_save_image(self, image_url: str, event_url: str) -> Optional[str]:
-        """Скачать изображение и сохранить в parsed_images. Возвращает локальный путь или None."""
-        if not image_url:
-            return None
-        
-        # Проверить кэш
-        cache_key = f"{image_url}:{event_url}"
-        if cache_key in self._image_cache:
-            logger.debug(f"Image already cached: {image_url}")
-            # Вернуть существующий файл если есть
-            url_hash = hashlib.md5(event_url.encode('utf-8')).hexdigest()[:12]
-            for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                filepath = self.images_dir / f"{url_hash}{ext}"
-                if filepath.exists():
-                    return str(filepath)
-
-        if not image_url.startswith(('http://', 'https://')):
-            return None
+        """Клиент общий и живёт весь процесс — закрывается через services.crawler.close_crawler_state()."""
+        return None
 
-        try:
-            url_hash = hashlib.md5(event_url.encode('utf-8')).hexdigest()[:12]
-            parsed_url = urlparse(image_url)
-            ext = os.path.splitext(parsed_url.path)[1].lower()
-            
-            # Если расширение неясно, попробовать определить по content-type
-            if not ext or ext not in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
-                ext = '.jpg'  # default
-
-            filename = f"{url_hash}{ext}"
-            filepath = self.images_dir / filename
-
-            if filepath.exists():
-                logger.debug(f"Image already exists: {filename}")
-                self._image_cache.add(cache_key)
-                return str(filepath)
-
-            # Скачать изображение
-            response = await self.client.get(image_url)
+    # Статусы, при которых сервер просит сбавить темп, и временные ошибки
+    _THROTTLE_STATUSES = (429, 503)
+    _TRANSIENT_STATUSES = (500, 502, 504)
+
+    async def _get(self, url: str, consume=None, listing: bool = False, **kwargs):
+        """GET через лимитер хоста с экспоненциальными повторами.
+
+        429/503 сужают окно хоста и ставят его на паузу (Retry-After),
+        5xx и сетевые ошибки повторяются с задержкой 1, 2, 4... секунд.
+
+        consume — async-функция (response) -> результат для потокового чтения тела:
+        ответ открывается через client.stream, consume читает его внутри слота хоста,
+        и возвращается её результат. Любой ответ с ошибкой в этом режиме — HTTPStatusError,
+        в том числе 429/503/5xx после исчерпания повторов.
+
+        listing=True — задержка ответа идёт в порог hedging хоста; считается с получения
+        слота, без ожидания в очереди, иначе под нагрузкой порог растёт.
+        """
+        limiter = self.rate_limiter.for_host(urlparse(url).hostname)
+        retry_statuses = self._THROTTLE_STATUSES + self._TRANSIENT_STATUSES
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            backoff = HTTP_RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random() * 0.25)
+            result = None
+            run = crawl_metrics.current()
+            started = time.monotonic()
+            try:
+                async with limiter.slot():
+                    started = time.monotonic()
+                    if consume is None:
+                        response = await self.client.get(url, **kwargs)
+                    else:
+                        async with self.client.stream('GET', url, **kwargs) as response:
+                            if response.status_code not in retry_statuses:
+                                if run is not None and response.is_error:
+                                    run.record_response(response.status_code, time.monotonic() - started, 0)
+                                response.raise_for_status()
+                                result = await consume(response)
+            except httpx.TransportError as e:
+                if run is not None:
+                    run.record_request_error(time.monotonic() - started, e)
+                limiter.on_error()
+                if attempt >= HTTP_MAX_RETRIES:
+                    raise
+                logger.debug(f"Transient error for {url} ({e!r}), retry in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
+                continue
+            if listing:
+                limiter.record_listing_latency(time.monotonic() - started)
+            if run is not None:
+                nbytes = response.num_bytes_downloaded
+                if not nbytes and consume is None:
+                    nbytes = len(response.content)
+                run.record_response(response.status_code, time.monotonic() - started, nbytes)
+
+            if response.status_code in self._THROTTLE_STATUSES:
+                limiter.on_throttle(parse_retry_after(response.headers.get('retry-after')), backoff)
+                if attempt >= HTTP_MAX_RETRIES:
+                    break
+                # Пауза хоста выдерживается внутри limiter.slot()
+                continue
+            if response.status_code in self._TRANSIENT_STATUSES:
+                limiter.on_error()
+                if attempt >= HTTP_MAX_RETRIES:
+                    break
+                await asyncio.sleep(backoff)
+                continue
+
+            limiter.on_success()
+            return response if consume is None else result
+
+        # Повторы исчерпаны: в потоковом режиме вызывающий ждёт результат consume, а не ответ
+        if consume is not None:
             response.raise_for_status()
+        return response
+
+    async def _hedged_get(self, url: str, **kwargs) -> httpx.Response:
+        """GET листинга с hedging: если ответа нет дольше p95 хоста — дублирующий запрос, берём первый."""
+        limiter = self.rate_limiter.for_host(urlparse(url).hostname)
+        hedge_after = limiter.listing_p95() if HEDGE_LISTING_REQUESTS else None
+        if hedge_after is None:
+            return await self._get(url, listing=True, **kwargs)
+
+        primary = asyncio.ensure_future(self._get(url, listing=True, **kwargs))
+        pending = {primary}
+        error = None
+        try:
+            # Отмена вызывающего (дедлайн источника) во время ожидания не должна оставить запрос сиротой
+            done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            logger.debug(f"Hedging {url}: no response after p95 {hedge_after:.1f}s")
+            limiter.hedged += 1
+            pending.add(asyncio.ensure_future(self._get(url, listing=True, **kwargs)))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _is_known_event_url(self, url: str) -> bool:
+        """URL события уже есть в БД (фильтр Блума, положительный ответ проверяется запросом)."""
+        try:
+            return get_known_events().is_known_url(self._clean_url(url))
+        except Exception as e:
+            logger.warning(f"Failed to check known event URL {url}: {e}")
+            return False
+
+    def _page_budget(self, base: int) -> int:
+        """Лимит страниц для источника, от имени которого идёт разбор, с учётом бюджета обхода."""
+        run = crawl_metrics.current()
+        return get_crawl_budget().pages(run.source if run else None, base)
+
+    def _new_events_list(self) -> List[Dict]:
+        """Список событий источника, видимый _safe_parse даже если парсер отменён по дедлайну."""
+        events: List[Dict] = []
+        partial = _partial_results.get()
+        if partial is not None:
+            partial.append(events)
+        return events
 
-            content_type = response.headers.get('content-type', '').lower()
-            
-            # Проверить что это изображение
-            if not content_type.startswith('image/'):
-                # Попробовать определить по содержимому (JPEG magic bytes)
-                content = response.content[:10]
-                is_image = (
-                    content[:2] == b'\xff\xd8' or  # JPEG
-                    content[:8] == b'\x89PNG\r\n\x1a\n' or  # PNG
-                    content[:6] == b'GIF87a' or content[:6] == b'GIF89a' or  # GIF
-                    content[:4] == b'RIFF' and content[8:12] == b'WEBP'  # WEBP
-                )
-                if not is_image:
-                    logger.warning(f"Not an image: {image_url} (content-type: {content_type})")
-                    return None
-                # Определить правильное расширение
-                if content[:2] == b'\xff\xd8':
-                    ext = '.jpg'
-                elif content[:8] == b'\x89PNG\r\n\x1a\n':
-                    ext = '.png'
-                elif content[:6] in [b'GIF87a', b'GIF89a']:
-                    ext = '.gif'
-                elif content[:4] == b'RIFF':
-                    ext = '.webp'
-                filepath = self.images_dir / f"{url_hash}{ext}"
-
-            # Сохранить
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-
-            logger.info(f"Downloaded image: {filename} ({len(response.content)} bytes)")
-            self._image_cache.add(cache_key)
-            return str(filepath)
+    def log_host_stats(self):
+        """Вывести глубину очереди, ожидание и время рукопожатий по хостам — для подбора лимитов."""
+        net = self.state.network_stats.stats()
+        for host, st in self.rate_limiter.stats().items():
+            n = net.get(host, {})
+            logger.info(
+                f"Host {host}: window={st['concurrency']} requests={st['requests']} "
+                f"throttled={st['throttled']} errors={st['errors']} max_queue={st['max_queued']} "
+                f"avg_wait={st['avg_wait']}s max_wait={st['max_wait']}s "
+                f"connects={n.get('connects', 0)} avg_connect={n.get('avg_connect', 0.0)}s "
+                f"tls={n.get('tls_handshakes', 0)} avg_tls={n.get('avg_tls', 0.0)}s "
+                f"dns={n.get('dns_lookups', 0)} dns_hits={n.get('dns_cache_hits', 0)}"
+            )
+
+    def commit_crawl_state(self, failed: Iterable[str] = ()):
+        """Зафиксировать валидаторы листингов и <lastmod> sitemap источников, чьи события сохранены.
+
+        Вызывать после сохранения событий цикла; источники из failed (их события не дошли
+        до БД) забываются и в следующем цикле загружаются заново.
+        """
+        self.discard_crawl_state(failed)
+        if self.http_cache:
+            written = self.http_cache.commit()
+            logger.info(f"HTTP cache: committed {written} listing entries, {len(self.unchanged_urls)} unchanged this cycle")
+        pending, self._pending_lastmods = self._pending_lastmods, {}
+        for batches in pending.values():
+            for entries, source, is_sitemap in batches:
+                sitemap.save_lastmods(entries, source, is_sitemap=is_sitemap)
+
+    def discard_crawl_state(self, sources: Optional[Iterable[str]] = None):
+        """Забыть загруженное источниками (по умолчанию — всеми): следующий цикл разберёт их заново."""
+        if self.http_cache:
+            self.http_cache.discard(sources)
+        if sources is None:
+            self._pending_lastmods.clear()
+        else:
+            for source in sources:
+                self._pending_lastmods.pop(source, None)
+
+    def _stage_lastmods(self, entries: List[Tuple[str, Optional[str]]], source: str, is_sitemap: bool = False):
+        """Отложить запись обработанных записей sitemap до commit_crawl_state (ключ — источник цикла)."""
+        if not entries:
+            return
+        outcome = _listing_outcome.get()
+        key = outcome['source'] if outcome else source
+        self._pending_lastmods.setdefault(key, []).append((list(entries), source, is_sitemap))
+
+    async def _download_and_save_image(self, image_url: str) -> Optional[str]:
+        """Скачать изображение в хранилище parsed_images (по sha256 содержимого). Возвращает локальный путь или None.
+
+        URL, скачанный раньше (в любом цикле), повторно не загружается; одновременные
+        запросы одного URL объединяются в одну загрузку.
+        """
+        if not image_url or not image_url.startswith(('http://', 'https://')):
+            return None
 
+        known = image_store.lookup_url(image_url)
+        if known:
+            logger.debug(f"Image already stored: {image_url}")
+            return known
+
+        in_flight = self.state.image_downloads
+        task = in_flight.get(image_url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_image(image_url))
+            in_flight[image_url] = task
+            task.add_done_callback(lambda _: in_flight.pop(image_url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_image(self, image_url: str) -> Optional[str]:
+        """Потоковая загрузка в хранилище: формат проверяется по первому блоку, размер ограничен IMAGE_MAX_BYTES."""
+        try:
+            return await self._get(image_url, consume=lambda response: image_store.store_stream(response, image_url))
+        except image_store.NotAnImage as e:
+            logger.warning(f"Not an image: {image_url} ({e})")
+            return None
+        except image_store.ImageTooLarge as e:
+            logger.warning(f"Image too large, aborted: {image_url} ({e})")
+            return None
         except httpx.HTTPStatusError as e:
             logger.warning(f"HTTP error downloading {image_url}: {e.response.status_code}")
             return None
@@ -248,686 +308,317 @@ class EventParser:
             logger.warning(f"Failed to download image from {image_url}: {e}")
             return None
 
-    async def _extract_og_image(self, html_content: str, base_url: str) -> Optional[str]:
-        """Извлечь og:image из meta tags HTML."""
+    def _record_listing_outcome(self, url: str, error: Optional[Exception] = None):
+        """Учесть загрузку листинга текущего источника для его circuit breaker'а."""
+        outcome = _listing_outcome.get()
+        if outcome is None:
+            return
+        if error is None:
+            outcome['ok'] += 1
+        else:
+            outcome['errors'] += 1
+            outcome['last_error'] = f"{url}: {error!r}"
+
+    async def _fetch_listing_html(self, url: str, headers: Optional[Dict] = None) -> Optional[str]:
+        """Скачать страницу-листинг условным запросом.
+
+        Возвращает None, если страница не изменилась с прошлого цикла (304 или тот же отпечаток).
+        Ошибки HTTP пробрасываются вызывающему.
+        """
+        request_headers = dict(headers or {})
+        if self.http_cache:
+            request_headers.update(self.http_cache.conditional_headers(url))
         try:
-            soup = BeautifulSoup(html_content, 'lxml')
-            
-            # Попробовать разные meta tags
-            for prop in ['og:image', 'og:image:url', 'twitter:image', 'twitter:image:src']:
-                meta = soup.find('meta', property=prop) or soup.find('meta', attrs={'name': prop})
-                if meta and meta.get('content'):
-                    return urljoin(base_url, meta['content'])
-            
-            # Поиск всех img и возврат первого большого (вероятно основного)
-            for img in soup.find_all('img', src=True):
-                src = img['src']
-                if src and not src.startswith('data:'):
-                    # Проверить размеры через class/id (большие изображения обычно главные)
-                    img_class = img.get('class', [])
-                    img_id = img.get('id', '')
-                    if any('hero' in str(c).lower() or 'main' in str(c).lower() or 'large' in str(c).lower() 
-                           for c in img_class) or 'hero' in img_id.lower() or 'main' in img_id.lower():
-                        return urljoin(base_url, src)
-            
+            response = await self._hedged_get(url, headers=request_headers or None)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except Exception as e:
+            self._record_listing_outcome(url, e)
+            raise
+        self._record_listing_outcome(url)
+        if response.status_code == 304:
+            logger.info(f"Listing not modified (304), skipping: {url}")
+            self.unchanged_urls.append(url)
             return None
+        html = response.text
+        if self.http_cache:
+            fingerprint = content_fingerprint(html)
+            unchanged = self.http_cache.is_unchanged(url, fingerprint)
+            outcome = _listing_outcome.get()
+            self.http_cache.stage(url, response.headers, fingerprint, outcome['source'] if outcome else None)
+            if unchanged:
+                logger.info(f"Listing content unchanged, skipping: {url}")
+                self.unchanged_urls.append(url)
+                return None
+        await self._archive_page(url, html)
+        return html
+
+    async def _fetch_html(self, url: str, conditional: bool = False) -> Optional[str]:
+        """Скачать страницу и вернуть HTML (разбор — в пуле процессов, см. _extract).
+
+        conditional=True — для листингов: None, если страница не изменилась.
+        """
+        try:
+            if conditional:
+                return await self._fetch_listing_html(url)
+            response = await self._get(url)
+            response.raise_for_status()
+            html = response.text
+            await self._archive_page(url, html)
+            return html
         except Exception as e:
-            logger.debug(f"Error extracting og:image: {e}")
+            logger.warning(f"Failed to fetch {url}: {e}")
             return None
 
-    def _clean_text(self, text: str) -> str:
-        """Очистить текст от лишнего whitespace и управляющих символов."""
-        if not text:
-            return ""
-        # Удалить лишние пробелы, табы, новые строки
-        text = re.sub(r'[\t\n\r\f]+', ' ', text)
-        # Удалить лишние пробелы
-        text = re.sub(r'\s+', ' ', text)
-        # Удалить специальные символы в начале/конце
-        text = text.strip(' \t\n\r\x0b\x0c\u200b')
-        return text
-
-    # Известные SEO-хвосты сайтов
-    _SEO_TAILS = [
-        'iteca', 'exposale', 'vystavki', 'worldexpo', 'atakent', 'qazexpo',
-        'astanahub', 'expo-centralasia', 'bakuexpo', 'exhibitions', 'выставки',
-        'все выставки', 'каталог выставок', 'главная', 'home',
-    ]
-
-    def _clean_title(self, title: str) -> str:
-        """Очистить заголовок от мусора, SEO-текста, лишних символов."""
-        if not title:
-            return ""
-
-        # Удалить SEO-хвосты только если они содержат известные паттерны
-        for _ in range(2):
-            m = re.search(r'\s*[-|–—]\s*([^-|–—]+)$', title)
-            if m:
-                tail = m.group(1).strip().lower()
-                if any(seo in tail for seo in self._SEO_TAILS):
-                    title = title[:m.start()]
-
-        # Удалить лишние кавычки
-        title = title.strip('"\'"')
-
-        return self._clean_text(title)
-
-    def _clean_description(self, description: str, full_html: str = "") -> str:
-        """Очистить описание от мусора, навигации, рекламы."""
-        if not description:
-            return ""
-
-        # Декодировать HTML entities
-        description = html_unescape(description)
-        # Удалить &nbsp; и прочие оставшиеся entities
-        description = re.sub(r'&\w+;', ' ', description)
-
-        # Удалить типичный мусор (только хвосты, не начала)
-        tail_patterns = [
-            r'Читать далее.*$',
-            r'Подробнее\s*\.{0,3}\s*$',
-            r'Learn more.*$',
-            r'Купить билет.*$',
-            r'Book now.*$',
-            r'Поделиться.*$',
-            r'Share on.*$',
-            r'←.*$',
-            r'→.*$',
-            r'Home\s*>\s*.*$',
-            r'Главная\s*>\s*.*$',
-        ]
-
-        for pattern in tail_patterns:
-            description = re.sub(pattern, '', description, flags=re.IGNORECASE | re.MULTILINE)
-
-        # Удалить пустые строки в начале
-        desc_lines = description.split('\n')
-        while desc_lines and not desc_lines[0].strip():
-            desc_lines.pop(0)
-
-        description = '\n'.join(desc_lines)
-        return self._clean_text(description)
-
-    def _clean_url(self, url: str) -> str:
-        """Очистить URL от мусора."""
-        if not url:
-            return ""
-        
-        # Удалить tg://msg_url?url=
-        if url.startswith("tg://msg_url?url="):
-            url = url.replace("tg://msg_url?url=", "")
-            try:
-                url = unquote(url)
-            except:
-                pass
-        
-        # Игнорировать javascript:void(0)
-        if url.lower() in ["javascript:void(0)", "javascript:void(0);", "#"]:
-            return ""
-        
-        # Удалить якоря
-        url = url.split('#')[0]
-        
-        # Удалить UTM метки (опционально, можно оставить для аналитики)
-        # parsed = urlparse(url)
-        # query_params = parse_qs(parsed.query)
-        # clean_params = {k: v for k, v in query_params.items() if not k.lower().startswith('utm_')}
-        # url = urlunparse(parsed._replace(query='&'.join(f'{k}={v[0]}' for k, v in clean_params.items())))
-        
-        return url.strip()
-
-    def _normalize_text_for_comparison(self, text: str) -> str:
-        """Нормализовать текст для сравнения."""
-        if not text:
-            return ""
-        normalized = re.sub(r'[^\w\s]', ' ', text.lower())
-        normalized = re.sub(r'\s+', ' ', normalized).strip()
-        return normalized
-
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Рассчитать схожесть текстов (0.0 to 1.0)."""
-        if not text1 or not text2:
-            return 0.0
-        norm1 = self._normalize_text_for_comparison(text1)
-        norm2 = self._normalize_text_for_comparison(text2)
-        if not norm1 or not norm2:
-            return 0.0
-        return SequenceMatcher(None, norm1, norm2).ratio()
-
-    def _contains_stop_word(self, text: str) -> bool:
-        """Проверить наличие стоп-слова."""
-        if not text:
-            return False
-        normalized = re.sub(r'[-\s]+', ' ', text.lower())
-        for stop_word in STOP_WORDS:
-            normalized_stop = re.sub(r'[-\s]+', ' ', stop_word.lower())
-            if normalized_stop in normalized:
-                return True
-        return False
-
-    def _is_relevant(self, title: str, description: str) -> bool:
-        """Проверить релевантность события (B2B, не стоп-слова)."""
-        full_text = (title + " " + (description or "")).lower()
-        if self._contains_stop_word(full_text):
-            return False
-        # B2B keywords или industry keywords
-        if any(w in full_text for w in ALL_RELEVANT_KEYWORDS):
-            return True
-        # Паттерны типичных названий выставок: "Something 2026", "Something EXPO", год в названии
-        title_lower = title.lower()
-        if re.search(r'\b20[2-5]\d\b', title_lower):
-            return True
-        # Названия с типичными суффиксами выставок
-        if re.search(r'\b(show|fair|week|summit|congress|symposium)\b', title_lower, re.I):
-            return True
-        return False
-
-    def _extract_city(self, text: str) -> Optional[str]:
-        """Извлечь город из текста."""
-        if not text:
-            return None
-        text_lower = text.lower()
-        for city, variants in CITY_VARIANTS.items():
-            if any(v in text_lower for v in variants):
-                return city
-        return None
+    async def _archive_page(self, url: str, body, content_type: str = HTML_TYPE):
+        """Сохранить загруженную страницу в архив от имени текущего источника (сжатие — в потоке)."""
+        if self.archive is None:
+            return
+        run = crawl_metrics.current()
+        source = run.source if run else urlparse(url).hostname or 'unknown'
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        try:
+            await asyncio.to_thread(self.archive.store, source, url, body, content_type)
+        except Exception as e:
+            # Архив не должен мешать разбору
+            logger.warning(f"Failed to archive {url}: {e}")
 
-    def _extract_country_from_city(self, city: str) -> Optional[str]:
-        """Определить страну по городу."""
-        if not city:
-            return None
-        
-        city_lower = city.lower()
-        country_city_map = {
-            "Казахстан": ["алматы", "астана", "шымкент", "атырау", "актау", "караганда", "актобе", "тараз", "павлодар", "уральск", "семей", "костанай", "кызылорда", "петропавловск", "туркестан", "кокшетау", "талдыкорган", "оскемен", "усть-каменогорск"],
-            "Узбекистан": ["ташкент", "самарканд", "наманган", "андижан", "бухара", "хива", "карши", "термез"],
-            "Азербайджан": ["баку", "гянджа", "сумгаит", "ленкорань", "шеки"],
-            "Грузия": ["тбилиси", "батуми", "кутаиси", "рузтави"],
-            "Армения": ["ереван", "гюмри", "ванадзор"],
-            "Кыргызстан": ["бишкек", "ош", "джалал-абад", "каракол"],
-            "Таджикистан": ["душанбе", "худжанд", "куляб"],
-            "Туркменистан": ["ашхабад", "туркменабат", "мары", "дашогуз"],
-        }
-        
-        for country, cities in country_city_map.items():
-            if any(c in city_lower for c in cities):
-                return country
-        
-        return None
+    async def _extract(self, method: str, *args):
+        """Выполнить EventExtractor.<method>(*args) в пуле процессов, не блокируя event loop бота.
 
-    def _infer_country_from_text(self, text: str) -> Optional[str]:
-        """Определить страну из текста."""
-        if not text:
-            return None
-        t = text.lower()
-        country_map = [
-            ("казахстан", "Казахстан"), ("алматы", "Казахстан"), ("астана", "Казахстан"), ("шымкент", "Казахстан"), ("атырау", "Казахстан"),
-            ("узбекистан", "Узбекистан"), ("ташкент", "Узбекистан"), ("самарканд", "Узбекистан"),
-            ("азербайджан", "Азербайджан"), ("баку", "Азербайджан"),
-            ("грузия", "Грузия"), ("тбилиси", "Грузия"), ("батуми", "Грузия"),
-            ("армения", "Армения"), ("ереван", "Армения"),
-            ("кыргызстан", "Кыргызстан"), ("киргиз", "Кыргызстан"), ("бишкек", "Кыргызстан"), ("ош", "Кыргызстан"),
-            ("таджикистан", "Таджикистан"), ("душанбе", "Таджикистан"), ("худжанд", "Таджикистан"),
-            ("туркменистан", "Туркменистан"), ("ашхабад", "Туркменистан"), ("мары", "Туркменистан"),
-            # Нецелевые страны — определяем чтобы потом отфильтровать
-            ("россия", "Россия"), ("москва", "Россия"), ("санкт-петербург", "Россия"), ("краснодар", "Россия"),
-            ("новосибирск", "Россия"), ("екатеринбург", "Россия"), ("казань", "Россия"), ("нижний новгород", "Россия"),
-            ("russia", "Россия"), ("moscow", "Россия"), ("st. petersburg", "Россия"),
-            ("китай", "Китай"), ("china", "Китай"), ("пекин", "Китай"), ("шанхай", "Китай"),
-            ("гуанчжоу", "Китай"), ("шэньчжэнь", "Китай"), ("beijing", "Китай"), ("shanghai", "Китай"),
-            ("guangzhou", "Китай"), ("shenzhen", "Китай"), ("hong kong", "Китай"), ("гонконг", "Китай"),
-            ("турция", "Турция"), ("turkey", "Турция"), ("стамбул", "Турция"), ("istanbul", "Турция"), ("анкара", "Турция"),
-            ("иран", "Иран"), ("iran", "Иран"), ("тегеран", "Иран"),
-            ("индия", "Индия"), ("india", "Индия"), ("дели", "Индия"), ("мумбаи", "Индия"),
-            ("германия", "Германия"), ("germany", "Германия"), ("берлин", "Германия"), ("мюнхен", "Германия"),
-            ("оаэ", "ОАЭ"), ("uae", "ОАЭ"), ("дубай", "ОАЭ"), ("dubai", "ОАЭ"), ("абу-даби", "ОАЭ"),
-            ("беларус", "Беларусь"), ("belarus", "Беларусь"), ("минск", "Беларусь"), ("minsk", "Беларусь"),
-            ("украин", "Украина"), ("ukraine", "Украина"), ("киев", "Украина"), ("kyiv", "Украина"), ("kiev", "Украина"),
-            ("молдов", "Молдова"), ("moldova", "Молдова"), ("кишинёв", "Молдова"), ("кишинев", "Молдова"),
-            ("польш", "Польша"), ("poland", "Польша"), ("варшав", "Польша"), ("warsaw", "Польша"),
-            ("латви", "Латвия"), ("latvia", "Латвия"), ("рига", "Латвия"),
-            ("литв", "Литва"), ("lithuania", "Литва"), ("вильнюс", "Литва"),
-            ("эстони", "Эстония"), ("estonia", "Эстония"), ("таллин", "Эстония"),
-        ]
-        for kw, country in country_map:
-            if kw in t:
-                return country
-        return None
+        При PARSE_WORKERS=0 или сломанном пуле — в текущем процессе.
+        """
+        try:
+            return await self._run_extractor(method, args)
+        except Exception:
+            # Парсеры источников перехватывают ошибки сами — _safe_parse узнаёт о неполном разборе отсюда
+            outcome = _listing_outcome.get()
+            if outcome is not None:
+                outcome['extract_errors'] += 1
+            raise
+
+    async def _run_extractor(self, method: str, args: tuple):
+        run = crawl_metrics.current()
+        result, cpu = await self._run_timed(method, args)
+        if run is not None:
+            run.parse_cpu_seconds += cpu
+        shadow_key = shadow.shadow_key(method, args)
+        if shadow_key is not None:
+            self._start_shadow(shadow_key, method, args, result, cpu)
+        return result
 
-    def _infer_industry(self, title: str, description: str) -> Optional[str]:
-        """Определить индустрию по ключевым словам."""
-        full = (title + " " + (description or "")).lower()
-        
-        # Считать совпадения по каждой индустрии
-        industry_scores = {}
-        for industry, keywords in INDUSTRY_KEYWORDS.items():
-            score = sum(1 for kw in keywords if kw.lower() in full)
-            if score > 0:
-                industry_scores[industry] = score
-        
-        if not industry_scores:
-            return "Другое"
-        
-        # Вернуть индустрию с наибольшим количеством совпадений
-        return max(industry_scores.items(), key=lambda x: x[1])[0]
-
-    def _month_to_num(self, month_name: str) -> Optional[int]:
-        """Преобразовать название месяца в число."""
-        if not month_name:
-            return None
-        month_lower = month_name.lower().strip()
-        # Сначала ищем точное вхождение (или вхождение ключа в название)
-        best_match = None
-        best_len = 0
-        for m_name, m_num in MONTHS.items():
-            if m_name in month_lower or month_lower.startswith(m_name):
-                if len(m_name) > best_len:
-                    best_len = len(m_name)
-                    best_match = m_num
-        return best_match
-
-    def _extract_dates_from_text(self, text: str) -> Tuple[Optional[datetime], Optional[datetime]]:
-        """Извлечь даты начала и окончания из текста. Поддерживает множество форматов."""
-        if not text:
-            return None, None
-
-        text_lower = text.lower().strip()
-        current_year = datetime.now().year
-
-        # Формат 1: "с DD.MM.YYYY по DD.MM.YYYY" / "DD.MM.YYYY — DD.MM.YYYY"
-        m = re.search(r'(?:с\s+)?(\d{1,2})\.(\d{1,2})\.(20[2-5]\d)\s*(?:по|[-—–])\s*(\d{1,2})\.(\d{1,2})\.(20[2-5]\d)', text_lower)
-        if m:
+    async def _run_timed(self, method: str, args: tuple):
+        """EventExtractor.<method>(*args) в пуле (или в текущем процессе): (результат, секунды CPU)."""
+        pool = self.state.extraction_pool
+        if pool is not None:
             try:
-                return (
-                    datetime(int(m.group(3)), int(m.group(2)), int(m.group(1))),
-                    datetime(int(m.group(6)), int(m.group(5)), int(m.group(4)))
-                )
-            except ValueError:
-                pass
-
-        # Формат 2: "DD.MM — DD.MM.YYYY" (год только у второй даты)
-        m = re.search(r'(\d{1,2})\.(\d{1,2})\s*[-—–]\s*(\d{1,2})\.(\d{1,2})\.(20[2-5]\d)', text_lower)
-        if m:
+                return await asyncio.get_running_loop().run_in_executor(pool, run_extractor_timed, method, *args)
+            except BrokenProcessPool:
+                logger.warning(f"Extraction pool is broken, recreating it; running {method} inline")
+                self.state.reset_extraction_pool()
+        # CPU потока, а не процесса: иначе в замер попадают другие потоки (теневой кандидат, to_thread)
+        started = time.thread_time()
+        result = getattr(self, method)(*args)
+        return result, time.thread_time() - started
+
+    def _start_shadow(self, key: str, method: str, args: tuple, result, cpu: float):
+        """Запустить кандидата из SHADOW_EXTRACTORS на том же HTML отдельной задачей — уже после
+        боевого результата, чтобы не задерживать обход; сравнение — в services/shadow.py.
+
+        В метрики источника кандидат не попадает, иначе теневой режим исказит /crawlstats.
+        """
+        candidate = SHADOW_EXTRACTORS[key]
+        loop = asyncio.get_running_loop()
+        pool = self.state.extraction_pool
+        future = None
+        if pool is not None:
             try:
-                year = int(m.group(5))
-                return (
-                    datetime(year, int(m.group(2)), int(m.group(1))),
-                    datetime(year, int(m.group(4)), int(m.group(3)))
-                )
-            except ValueError:
-                pass
-
-        # Формат 3: "с DD месяц по DD месяц YYYY" (межмесячные диапазоны)
-        m = re.search(
-            r'(?:с\s+)?(\d{1,2})\s+([а-яё]+)\s+(?:по|[-—–])\s*(\d{1,2})\s+([а-яё]+)\s*(20[2-5]\d)?',
-            text_lower
+                future = loop.run_in_executor(pool, shadow.run_in_worker, candidate, method, *args)
+            except BrokenProcessPool:
+                logger.warning(f"Extraction pool is broken, running shadow candidate {candidate} in a thread")
+        if future is None:
+            future = loop.run_in_executor(None, shadow.run_candidate, self, candidate, method, args)
+        shadow.submit(key, candidate, result, cpu, future)
+
+    async def _collect(self, records: List[Dict], events: List[Dict]):
+        """Добавить записи в список событий источника.
+
+        Изображения не скачиваются: 'image_candidates' остаются в записи,
+        их загружает фоновая очередь (services/images.py).
+        """
+        events.extend(records)
+
+    async def attach_images(self, events: List[Dict]):
+        """Скачать изображения событий через фоновую очередь и дождаться её (для parse_all)."""
+        images = ImageDownloadQueue(self)
+        images.start()
+        for event in events:
+            candidates = event.pop('image_candidates', None)
+            if candidates and event.get('image_url') in MISSING_IMAGE:
+                await images.submit(event['url'], candidates)
+        await images.join()
+        for event in events:
+            path = images.take_landed(event['url'])
+            if path:
+                event['image_url'] = path
+
+    async def _parse_event_detail_page(self, event_url: str, base_event: Dict) -> Dict:
+        """Загрузить страницу события и извлечь детальную информацию."""
+        html = await self._fetch_html(event_url)
+        if not html:
+            return base_event
+        return await self._apply_detail_page(event_url, html, base_event)
+
+    def needs_detail_page(self, event: Dict) -> bool:
+        """Данные листинга неполные (нет даты, места, изображения или описание короткое)
+        и детальная страница в этом цикле ещё не применялась.
+
+        Изображения скачиваются в фоне, поэтому запись с кандидатами 'image_candidates'
+        считается имеющей изображение, хотя image_url у неё ещё пуст.
+        """
+        if not event.get('url') or event['url'] in self._detail_urls:
+            return False
+        has_image = event.get('image_url') not in (None, '', 'NO IMAGE') or bool(event.get('image_candidates'))
+        return (
+            not event.get('start_date')
+            or not event.get('place')
+            or not has_image
+            or len(event.get('description') or '') < DETAIL_MIN_DESCRIPTION
         )
-        if m:
-            day1, month1_name, day2, month2_name, year_str = m.groups()
-            month1 = self._month_to_num(month1_name)
-            month2 = self._month_to_num(month2_name)
-            if month1 and month2:
-                year = int(year_str) if year_str else current_year
-                try:
-                    return (
-                        datetime(year, month1, int(day1)),
-                        datetime(year, month2, int(day2))
-                    )
-                except ValueError:
-                    pass
-
-        # Формат 4: "DD-DD месяц YYYY" / "DD — DD месяц YYYY"
-        m = re.search(r'(\d{1,2})\s*[-—–]\s*(\d{1,2})\s+([а-яёa-z]+)\s*(20[2-5]\d)?', text_lower)
-        if m:
-            day1, day2, month_name, year_str = m.groups()
-            month_num = self._month_to_num(month_name)
-            if month_num:
-                year = int(year_str) if year_str else current_year
-                try:
-                    return (
-                        datetime(year, month_num, int(day1)),
-                        datetime(year, month_num, int(day2))
-                    )
-                except ValueError:
-                    pass
-
-        # Формат 5: "March 15-17, 2024" (английский)
-        m = re.search(r'([a-z]+)\s+(\d{1,2})\s*[-—–]\s*(\d{1,2}),?\s*(20[2-5]\d)?', text_lower)
-        if m:
-            month_name, day1, day2, year_str = m.groups()
-            month_num = self._month_to_num(month_name)
-            if month_num:
-                year = int(year_str) if year_str else current_year
-                try:
-                    return (
-                        datetime(year, month_num, int(day1)),
-                        datetime(year, month_num, int(day2))
-                    )
-                except ValueError:
-                    pass
-
-        # Формат 6: Одиночная дата "DD месяц YYYY"
-        m = re.search(r'(\d{1,2})\s+([а-яёa-z]+)\s+(20[2-5]\d)', text_lower)
-        if m:
-            day, month_name, year_str = m.groups()
-            month_num = self._month_to_num(month_name)
-            if month_num:
-                try:
-                    return datetime(int(year_str), month_num, int(day)), None
-                except ValueError:
-                    pass
-
-        # Формат 7: "DD месяц" без года
-        m = re.search(r'(\d{1,2})\s+([а-яёa-z]{3,})', text_lower)
-        if m:
-            day, month_name = m.groups()
-            month_num = self._month_to_num(month_name)
-            if month_num:
-                try:
-                    return datetime(current_year, month_num, int(day)), None
-                except ValueError:
-                    pass
 
-        # Формат 8: числовые "YYYY-MM-DD" или "DD.MM.YYYY"
-        m = re.search(r'(20[2-5]\d)[-\./](\d{1,2})[-\./](\d{1,2})', text)
-        if m:
-            try:
-                return datetime(int(m.group(1)), int(m.group(2)), int(m.group(3))), None
-            except ValueError:
-                pass
-
-        m = re.search(r'(\d{1,2})[-\./](\d{1,2})[-\./](20[2-5]\d)', text)
-        if m:
-            first, second, year = int(m.group(1)), int(m.group(2)), int(m.group(3))
-            day, month = (first, second) if first > 12 else (first, second)
-            if second > 12:
-                month, day = first, second
-            try:
-                return datetime(year, month, day), None
-            except ValueError:
-                pass
+    async def enrich_from_detail_page(self, event: Dict) -> Dict:
+        """Дополнить событие с листинга данными его детальной страницы (лимиты хоста — в _get)."""
+        no_image = event.get('image_url') == 'NO IMAGE'
+        if no_image:
+            # Маркер filter_events — не изображение: og:image страницы должен его заменить
+            event['image_url'] = None
+        event = await self._parse_event_detail_page(event['url'], event)
+        if no_image and not event.get('image_url'):
+            event['image_url'] = 'NO IMAGE'
+        return event
+
+    async def _apply_detail_page(self, event_url: str, html: str, base_event: Dict) -> Dict:
+        """Дополнить событие данными уже загруженной детальной страницы."""
+        self._detail_urls.add(base_event.get('url') or event_url)
+        try:
+            return await self._extract('extract_detail_page', html, event_url, base_event)
+        except Exception as e:
+            logger.debug(f"Error parsing detail page {event_url}: {e}")
+            return base_event
 
-        return None, None
+    # --- Инкрементальное обнаружение по sitemap.xml ---
 
-    def _extract_from_json_ld(self, soup: BeautifulSoup, base_url: str) -> List[Dict]:
-        """Извлечь события из JSON-LD structured data."""
-        events = []
-        for script in soup.find_all('script', type='application/ld+json'):
-            try:
-                data = json.loads(script.string or '')
-                # Может быть один объект или список
-                items = data if isinstance(data, list) else [data]
-                for item in items:
-                    if not isinstance(item, dict):
-                        continue
-                    item_type = item.get('@type', '')
-                    if item_type not in ('Event', 'ExhibitionEvent', 'BusinessEvent', 'Exhibition'):
-                        continue
-                    name = item.get('name', '')
-                    if not name or len(name) < 5:
-                        continue
-                    start_str = item.get('startDate', '')
-                    end_str = item.get('endDate', '')
-                    start_date = end_date = None
-                    for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M'):
-                        if start_str and not start_date:
-                            try:
-                                start_date = datetime.strptime(start_str[:19], fmt[:len(fmt)])
-                            except (ValueError, IndexError):
-                                pass
-                        if end_str and not end_date:
-                            try:
-                                end_date = datetime.strptime(end_str[:19], fmt[:len(fmt)])
-                            except (ValueError, IndexError):
-                                pass
-
-                    location = item.get('location', {})
-                    if isinstance(location, dict):
-                        place_name = location.get('name', '')
-                        address = location.get('address', {})
-                        if isinstance(address, dict):
-                            city = address.get('addressLocality', '')
-                            country = address.get('addressCountry', '')
-                        elif isinstance(address, str):
-                            city = address
-                            country = ''
-                        else:
-                            city = ''
-                            country = ''
-                    else:
-                        place_name = str(location) if location else ''
-                        city = ''
-                        country = ''
-
-                    event_url = item.get('url', '') or base_url
-                    if event_url and not event_url.startswith('http'):
-                        event_url = urljoin(base_url, event_url)
-
-                    image = item.get('image', '')
-                    if isinstance(image, list):
-                        image = image[0] if image else ''
-                    if isinstance(image, dict):
-                        image = image.get('url', '')
-
-                    events.append({
-                        'title': self._clean_title(name),
-                        'name': name,
-                        'description': self._clean_description(item.get('description', ''))[:800],
-                        'city': self._extract_city(city or place_name) or city,
-                        'place': place_name or None,
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'url': self._clean_url(event_url),
-                        'image_url': image or None,
-                        'country': self._infer_country_from_text(f"{city} {country} {place_name}"),
-                    })
-            except (json.JSONDecodeError, TypeError, KeyError):
-                continue
-        return events
+    async def _collect_sitemap_pages(self, sitemap_url: str, source: str, depth: int = 0) -> Tuple[List[Tuple[str, Optional[str]]], List[Tuple[str, Optional[str]]], bool]:
+        """Страницы из sitemap (рекурсивно по sitemap index).
 
-    async def _fetch_page_content(self, url: str) -> Tuple[Optional[str], Optional[BeautifulSoup]]:
-        """Скачать страницу и вернуть HTML + BeautifulSoup."""
+        Возвращает (страницы, обработанные дочерние sitemap, все ли sitemap загрузились).
+        Дочерние sitemap с неизменённым <lastmod> не загружаются.
+        """
         try:
-            response = await self.client.get(url)
+            response = await self._get(sitemap_url)
             response.raise_for_status()
-            html = response.text
-            soup = BeautifulSoup(html, 'lxml')
-            return html, soup
         except Exception as e:
-            logger.warning(f"Failed to fetch {url}: {e}")
-            return None, None
-
-    async def _parse_event_detail_page(self, event_url: str, base_event: Dict) -> Dict:
-        """Загрузить страницу события и извлечь детальную информацию."""
+            if depth == 0:
+                self._record_listing_outcome(sitemap_url, e)
+            raise
+        if depth == 0:
+            self._record_listing_outcome(sitemap_url)
+        await self._archive_page(sitemap_url, response.content, response.headers.get('content-type', 'application/xml'))
+        pages, children = sitemap.parse_sitemap(response.content)
+        if not children or depth >= SITEMAP_MAX_DEPTH:
+            return pages, [], True
+
+        # Без lastmod дочерний sitemap проверяем каждый раз
+        to_fetch = [c for c in children if not c[1]] + sitemap.changed_entries([c for c in children if c[1]])
+        fetched_children = []
+        complete = True
+        for child_url, child_lastmod in to_fetch:
+            try:
+                child_pages, grandchildren, child_complete = await self._collect_sitemap_pages(child_url, source, depth + 1)
+            except Exception as e:
+                logger.warning(f"Sitemap {child_url} failed: {e}")
+                complete = False
+                continue
+            pages.extend(child_pages)
+            fetched_children.extend(grandchildren)
+            if child_lastmod:
+                fetched_children.append((child_url, child_lastmod))
+            complete = complete and child_complete
+        return pages, fetched_children, complete
+
+    async def parse_sitemap_source(self, source: str, sitemap_url: str, country: str = "Казахстан", url_pattern: Optional[str] = None) -> List[Dict]:
+        """Новые и изменённые страницы событий из sitemap.xml источника → _apply_detail_page."""
+        events = self._new_events_list()
+        processed: List[Tuple[str, Optional[str]]] = []
+        children: List[Tuple[str, Optional[str]]] = []
+        all_done = False
         try:
-            html, soup = await self._fetch_page_content(event_url)
-            if not html or not soup:
-                return base_event
-            
-            # Извлечь og:image
-            og_image = await self._extract_og_image(html, event_url)
-            if og_image and not base_event.get('image_url'):
-                local_path = await self._download_and_save_image(og_image, event_url)
-                if local_path:
-                    base_event['image_url'] = local_path
-            
-            # Извлечь title из h1
-            h1 = soup.find('h1')
-            if h1:
-                h1_text = self._clean_title(h1.get_text())
-                if len(h1_text) > len(base_event.get('title', '')):
-                    base_event['title'] = h1_text
-                    base_event['name'] = h1_text
-            
-            # Извлечь описание
-            # Искать блоки с описанием
-            desc_selectors = [
-                'meta[name="description"]',
-                '.description', '.content', '.about', '.event-description',
-                '.details', '.info', 'article', '[itemprop="description"]',
-            ]
-            
-            for selector in desc_selectors:
-                if '>' in selector:
-                    elem = soup.select_one(selector)
-                else:
-                    elem = soup.find(class_=re.compile(selector.strip('.#[]'), re.I))
-                    if not elem:
-                        elem = soup.find(selector.split('[')[0].strip('.'))
-                
-                if elem:
-                    desc_text = self._clean_description(elem.get_text())
-                    if len(desc_text) > len(base_event.get('description', '')):
-                        base_event['description'] = desc_text
-                    break
-            
-            # Извлечь дату
-            date_selectors = [
-                '.date', '.event-date', '.datetime', '[itemprop="startDate"]',
-                '.schedule', '.when', '.time',
-            ]
-            
-            for selector in date_selectors:
-                elem = soup.find(class_=re.compile(selector.strip('.#[]'), re.I))
-                if elem:
-                    date_text = elem.get_text()
-                    start, end = self._extract_dates_from_text(date_text)
-                    if start:
-                        base_event['start_date'] = start
-                    if end:
-                        base_event['end_date'] = end
-                    break
-            
-            # Извлечь место
-            place_selectors = [
-                '.place', '.location', '.venue', '.address', '[itemprop="location"]',
-                '.where', '.event-location',
-            ]
-            
-            for selector in place_selectors:
-                elem = soup.find(class_=re.compile(selector.strip('.#[]'), re.I))
-                if elem:
-                    place_text = self._clean_text(elem.get_text())
-                    if place_text and len(place_text) > 5:
-                        base_event['place'] = place_text
-                        # Также извлечь город из места
-                        city = self._extract_city(place_text)
-                        if city and not base_event.get('city'):
-                            base_event['city'] = city
-                    break
-            
+            pages, children, complete = await self._collect_sitemap_pages(sitemap_url, source)
+            if url_pattern:
+                page_re = re.compile(url_pattern)
+                pages = [(loc, lastmod) for loc, lastmod in pages if page_re.search(loc)]
+            changed = sitemap.changed_entries(pages)
+            # Уже сохранённое событие конвейер всё равно отбросит — новый <lastmod> запоминается без загрузки
+            stored = [(loc, lastmod) for loc, lastmod in changed if self._is_known_event_url(loc)]
+            if stored:
+                self._stage_lastmods(stored, source)
+                stored_urls = {loc for loc, _ in stored}
+                changed = [(loc, lastmod) for loc, lastmod in changed if loc not in stored_urls]
+            logger.info(
+                f"Sitemap {source}: {len(pages)} event URLs, {len(changed)} new or changed, "
+                f"{len(stored)} changed but already stored"
+            )
+            max_pages = self._page_budget(SITEMAP_MAX_PAGES_PER_CYCLE)
+            all_done = complete and len(changed) <= max_pages
+            changed = changed[:max_pages]
+
+            async def process(loc: str, lastmod: Optional[str]):
+                nonlocal all_done
+                html = await self._fetch_html(loc)
+                if not html:
+                    all_done = False
+                    return
+                base_event = {
+                    'title': '', 'name': '', 'description': '', 'city': None, 'place': None,
+                    'start_date': None, 'end_date': None, 'url': self._clean_url(loc),
+                    'image_url': None, 'source': source, 'country': country, 'industry': None,
+                }
+                ev = await self._apply_detail_page(loc, html, base_event)
+                processed.append((loc, lastmod))
+                title = ev.get('title', '')
+                if len(title) < 5 or not ev['url'] or not self._is_relevant(title, ev.get('description', '')):
+                    return
+                ev['description'] = (ev.get('description') or '')[:800]
+                ev['country'] = self._extract_country_from_city(ev.get('city')) or country
+                ev['industry'] = self._infer_industry(title, ev.get('description', ''))
+                events.append(ev)
+
+            await asyncio.gather(*(process(loc, lastmod) for loc, lastmod in changed))
         except Exception as e:
-            logger.debug(f"Error parsing detail page {event_url}: {e}")
-        
-        return base_event
+            logger.error(f"Sitemap {source} error: {e}")
+        finally:
+            # Записываются в commit_crawl_state — после сохранения событий источника
+            self._stage_lastmods(processed, source)
+            # Дочерние sitemap помечаем обработанными, только если все их страницы обработаны
+            if all_done:
+                self._stage_lastmods(children, source, is_sitemap=True)
+
+        logger.info(f"parse_sitemap_source {source}: found {len(events)} events")
+        return events
 
     # --- Парсеры для каждого источника ---
+    # Загрузка и изображения — здесь, разбор HTML — EventExtractor.extract_* в пуле процессов
 
     async def parse_iteca(self) -> List[Dict]:
         """https://iteca.events/ru/exhibitions — Next.js RSC site with embedded JSON."""
-        events = []
-        base_url = "https://iteca.events"
+        events = self._new_events_list()
         try:
             url = "https://iteca.events/ru/exhibitions"
-            resp = await self.client.get(url)
-            html = resp.text
-
-            exhibitions = []
-
-            # RSC payload: данные внутри __next_f.push() с экранированием \\"
-            # Ищем \\"exhibitions\\":[{...}] в HTML
-            esc_marker = '\\"exhibitions\\":[{'
-            esc_idx = html.find(esc_marker)
-            if esc_idx >= 0:
-                chunk = html[esc_idx:esc_idx+100000]
-                unescaped = chunk.replace('\\"', '"').replace('\\u0026', '&')
-                m = re.search(r'"exhibitions":\[(.+?)\](?:,"|\})', unescaped)
-                if m:
-                    try:
-                        exhibitions = json.loads('[' + m.group(1) + ']')
-                    except json.JSONDecodeError:
-                        pass
-
-            # Fallback: __NEXT_DATA__ (старая версия сайта)
-            if not exhibitions:
-                soup = BeautifulSoup(html, 'lxml')
-                nds = soup.find('script', id='__NEXT_DATA__')
-                if nds and nds.string:
-                    try:
-                        nd = json.loads(nds.string)
-                        exhibitions = nd.get('props', {}).get('pageProps', {}).get('exhibitions', [])
-                    except (json.JSONDecodeError, KeyError):
-                        pass
-
-            seen_urls = set()
-            for exh in exhibitions:
-                if not isinstance(exh, dict):
-                    continue
-                try:
-                    title = (exh.get('title', '') or exh.get('project', '') or '').strip()
-                    if not title or len(title) < 5:
-                        continue
-
-                    description = exh.get('description', '') or ''
-                    begin_date = exh.get('beginDate', '') or ''
-                    end_date_str = exh.get('endDate', '') or ''
-                    city_label = exh.get('city_label', '') or exh.get('city', '') or ''
-                    location = exh.get('location', '') or exh.get('address', '') or ''
-                    logo = exh.get('logo', '') or exh.get('logo_svg', '') or exh.get('image_profile', '') or ''
-                    website = exh.get('website', '') or ''
-
-                    # Даты
-                    start_date = end_date = None
-                    for ds, target in [(begin_date, 'start'), (end_date_str, 'end')]:
-                        if ds:
-                            for fmt in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%d.%m.%Y'):
-                                try:
-                                    parsed = datetime.strptime(str(ds)[:19], fmt)
-                                    if target == 'start':
-                                        start_date = parsed
-                                    else:
-                                        end_date = parsed
-                                    break
-                                except ValueError:
-                                    pass
-                    if not start_date:
-                        date_text = exh.get('formattedDateRange', '') or f"{title} {description}"
-                        start_date, end_date = self._extract_dates_from_text(date_text)
-
-                    event_url = website if website.startswith('http') else url
-                    if event_url in seen_urls:
-                        continue
-                    seen_urls.add(event_url)
-
-                    # Изображение
-                    local_image_path = None
-                    if logo:
-                        logo_url = logo if logo.startswith('http') else urljoin(base_url, logo)
-                        local_image_path = await self._download_and_save_image(logo_url, event_url)
-
-                    city = self._extract_city(city_label) or self._extract_city(location) or self._extract_city(title)
-
-                    cleaned_url = self._clean_url(event_url)
-                    if not cleaned_url:
-                        continue
-
-                    events.append({
-                        'title': self._clean_title(title),
-                        'name': description or title,
-                        'description': self._clean_description(description)[:800],
-                        'city': city,
-                        'place': self._clean_text(location) or None,
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'url': cleaned_url,
-                        'image_url': local_image_path,
-                        'source': 'iteca.events',
-                        'country': self._extract_country_from_city(city) or 'Казахстан',
-                        'industry': (lambda v: v if v and v != '$undefined' else None)(exh.get('industryTitle')) or self._infer_industry(title, description),
-                    })
-                except Exception as e:
-                    logger.debug(f"Iteca item error: {e}")
-
+            html = await self._fetch_listing_html(url)
+            if html is None:
+                return events
+            await self._collect(await self._extract('extract_iteca', html, url), events)
         except Exception as e:
             logger.error(f"Iteca error: {e}")
 
@@ -936,82 +627,13 @@ class EventParser:
 
     async def parse_atakent(self) -> List[Dict]:
         """https://atakent-expo.kz/ — с дедупликацией внутри источника."""
-        events = []
-        seen_urls = set()
+        events = self._new_events_list()
         try:
             url = "https://atakent-expo.kz/"
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-
-            # JSON-LD
-            json_ld_events = self._extract_from_json_ld(soup, url)
-            for ev in json_ld_events:
-                if ev.get('url') and ev['url'] not in seen_urls:
-                    ev['source'] = 'atakent-expo.kz'
-                    ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
-                    ev['country'] = 'Казахстан'
-                    if not ev.get('city'):
-                        ev['city'] = 'Алматы'
-                    if not ev.get('place'):
-                        ev['place'] = 'Атакент'
-                    if self._is_relevant(ev.get('title', ''), ev.get('description', '')):
-                        events.append(ev)
-                        seen_urls.add(ev['url'])
-
-            # CSS selectors — с приоритетом более специфичных
-            selectors = ['.event-item', '.exhibition-item', 'a[href*="event"]', 'article', '.card']
-            items = []
-            for sel in selectors:
-                items.extend(soup.select(sel))
-
-            for item in items:
-                try:
-                    title_tag = item.find(['h2', 'h3', 'h4']) or item
-                    title = self._clean_title(title_tag.get_text())
-                    if len(title) < 5:
-                        continue
-
-                    link = item.find('a', href=True) or (item if item.name == 'a' and item.get('href') else None)
-                    event_url = urljoin(url, link['href']) if link and link.get('href') else url
-                    if event_url in seen_urls:
-                        continue
-
-                    desc = item.find('p')
-                    description = self._clean_description(desc.get_text()) if desc else ""
-
-                    image_urls = self._extract_all_image_urls_from_element(item, url)
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-
-                    full_text = title + " " + description
-                    start_date, end_date = self._extract_dates_from_text(full_text)
-
-                    if self._is_relevant(title, description):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-                        seen_urls.add(event_url)
-
-                        events.append({
-                            'title': title,
-                            'name': title,
-                            'description': description[:800],
-                            'city': self._extract_city(title) or "Алматы",
-                            'place': "Атакент",
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': 'atakent-expo.kz',
-                            'country': 'Казахстан',
-                            'industry': self._infer_industry(title, description)
-                        })
-                except Exception as e:
-                    logger.debug(f"Atakent item error: {e}")
+            await self._collect(await self._extract('extract_atakent', html, url), events)
         except Exception as e:
             logger.error(f"Atakent error: {e}")
 
@@ -1020,197 +642,43 @@ class EventParser:
 
     async def parse_qazexpo(self) -> List[Dict]:
         """http://www.qazexpo.kz/"""
-        events = []
+        events = self._new_events_list()
         try:
             url = "http://www.qazexpo.kz/"
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-            
-            items = soup.find_all(['a', 'div', 'article'], class_=re.compile(r'event|exhibition|card|news', re.I))
-            
-            for item in items:
-                try:
-                    title = self._clean_title(item.get_text())
-                    if len(title) < 10:
-                        continue
-                    
-                    link = item if item.name == 'a' and item.get('href') else item.find('a', href=True)
-                    event_url = urljoin(url, link['href']) if link and link.get('href') else url
-                    
-                    # Изображения
-                    image_urls = self._extract_all_image_urls_from_element(item, url)
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-                    
-                    # Дата
-                    start_date, end_date = self._extract_dates_from_text(title)
-                    
-                    if self._is_relevant(title, ""):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-
-                        events.append({
-                            'title': title[:200],
-                            'name': title[:200],
-                            'description': "",
-                            'city': self._extract_city(title) or "Астана",
-                            'place': "QazExpo",
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': 'qazexpo.kz',
-                            'country': 'Казахстан',
-                            'industry': self._infer_industry(title, "")
-                        })
-                except Exception:
-                    pass
+            await self._collect(await self._extract('extract_qazexpo', html, url), events)
         except Exception as e:
             logger.error(f"QazExpo error: {e}")
-        
+
         logger.info(f"parse_qazexpo: found {len(events)} events")
         return events
 
     async def parse_expo_centralasia(self) -> List[Dict]:
         """https://expo-centralasia.com/"""
-        events = []
+        events = self._new_events_list()
         try:
             url = "https://expo-centralasia.com/"
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-            
-            items = soup.find_all(['a', 'article', 'div'], class_=re.compile(r'event|expo|card|news', re.I))
-            
-            for item in items:
-                try:
-                    title_tag = item.find(['h2', 'h3', 'h4']) or item
-                    title = self._clean_title(title_tag.get_text())
-                    if len(title) < 5:
-                        continue
-                    
-                    link = item.find('a', href=True) or (item if item.name == 'a' else None)
-                    event_url = urljoin(url, link['href']) if link and link.get('href') else url
-                    
-                    desc = item.find('p')
-                    description = self._clean_description(desc.get_text()) if desc else ""
-                    
-                    # Изображения
-                    image_urls = self._extract_all_image_urls_from_element(item, url)
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-                    
-                    # Дата
-                    full_text = title + " " + description
-                    start_date, end_date = self._extract_dates_from_text(full_text)
-                    
-                    if self._is_relevant(title, description):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-
-                        events.append({
-                            'title': title,
-                            'name': title,
-                            'description': description[:800],
-                            'city': self._extract_city(full_text),
-                            'place': None,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': 'expo-centralasia.com',
-                            'country': 'Казахстан',
-                            'industry': self._infer_industry(title, description)
-                        })
-                except Exception as e:
-                    logger.debug(f"Expo CentralAsia item error: {e}")
+            await self._collect(await self._extract('extract_expo_centralasia', html, url), events)
         except Exception as e:
             logger.error(f"Expo CentralAsia error: {e}")
-        
+
         logger.info(f"parse_expo_centralasia: found {len(events)} events")
         return events
 
     async def parse_astanahub(self) -> List[Dict]:
         """https://astanahub.com/ru/event/ — card-based: <a> wraps div.event-card."""
-        events = []
-        base_url = "https://astanahub.com"
+        events = self._new_events_list()
         try:
             url = "https://astanahub.com/ru/event/"
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-
-            cards = soup.find_all('div', class_='event-card')
-            seen_urls = set()
-
-            for card in cards:
-                try:
-                    # Title from h5 (or h4/h3)
-                    title_tag = card.find(['h5', 'h4', 'h3'])
-                    if not title_tag:
-                        continue
-                    title = self._clean_title(title_tag.get_text())
-                    if len(title) < 5:
-                        continue
-
-                    # URL from parent <a> tag wrapping the card
-                    parent_a = card.find_parent('a', href=True)
-                    event_url = urljoin(base_url, parent_a['href']) if parent_a else url
-                    if event_url in seen_urls:
-                        continue
-                    seen_urls.add(event_url)
-
-                    # Description
-                    desc = card.find('p')
-                    description = self._clean_description(desc.get_text()) if desc else ""
-
-                    # Image: /media/ thumbnail inside div.event-thumb
-                    thumb_div = card.find('div', class_='event-thumb')
-                    img_tag = thumb_div.find('img', src=lambda s: s and '/media/' in s) if thumb_div else None
-                    local_image_path = None
-                    if img_tag:
-                        img_url = urljoin(base_url, img_tag['src'])
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-
-                    # Date from span inside div.event-card-date
-                    date_div = card.find('div', class_='event-card-date')
-                    date_text = ""
-                    if date_div:
-                        span = date_div.find('span')
-                        date_text = span.get_text().strip() if span else ""
-                    full_text = title + " " + description + " " + date_text
-                    start_date, end_date = self._extract_dates_from_text(full_text)
-
-                    if self._is_relevant(title, description):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-
-                        events.append({
-                            'title': title,
-                            'name': title,
-                            'description': description[:800],
-                            'city': self._extract_city(title) or "Астана",
-                            'place': None,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': 'astanahub.com',
-                            'country': 'Казахстан',
-                            'industry': self._infer_industry(title, description)
-                        })
-                except Exception as e:
-                    logger.debug(f"AstanaHub item error: {e}")
+            await self._collect(await self._extract('extract_with_spec', 'astanahub', html, url), events)
         except Exception as e:
             logger.error(f"AstanaHub error: {e}")
 
@@ -1219,7 +687,7 @@ class EventParser:
 
     async def parse_worldexpo(self) -> List[Dict]:
         """https://worldexpo.pro/vystavki/kazahstan — с retry на 403."""
-        events = []
+        events = self._new_events_list()
         try:
             url = "https://worldexpo.pro/vystavki/kazahstan"
             # Попробовать с Referer header для обхода 403
@@ -1229,363 +697,72 @@ class EventParser:
                 self.headers,
             ]
             html = None
-            soup = None
             for hdrs in headers_variants:
                 try:
-                    resp = await self.client.get(url, headers=hdrs)
-                    if resp.status_code == 200:
-                        html = resp.text
-                        soup = BeautifulSoup(html, 'lxml')
-                        break
-                    elif resp.status_code == 403:
+                    html = await self._fetch_listing_html(url, headers=hdrs)
+                    if html is None:
+                        return events
+                    break
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code == 403:
                         logger.debug(f"WorldExpo 403, trying different headers")
-                        continue
-                    else:
-                        resp.raise_for_status()
-                except httpx.HTTPStatusError:
                     continue
 
-            if not soup:
+            if not html:
                 logger.warning("WorldExpo: all header variants returned non-200")
                 return events
 
-            items = soup.find_all('div', class_='item-content')
-            if not items:
-                items = soup.select('.exhibition, .event-item, .news-item')
-            if not items:
-                items = soup.find_all('a', href=re.compile(r'/vystavk|/exhibition'))
-
-            for item in items:
-                try:
-                    title_tag = item.find(['h4', 'h3', 'h2'])
-                    if title_tag:
-                        link = title_tag.find('a')
-                        title = self._clean_title((link or title_tag).get_text())
-                        event_url = urljoin(url, link['href']) if link and link.get('href') else url
-                    else:
-                        title = self._clean_title(item.get_text())
-                        link = item.find('a', href=True)
-                        event_url = urljoin(url, link['href']) if link else url
-
-                    if len(title) < 5:
-                        continue
-
-                    date_span = item.find('span', class_=re.compile(r'date|item-content-date'))
-                    loc_span = item.find('span', class_=re.compile(r'location|search-location'))
-                    desc = item.find('p')
-                    description = self._clean_description(desc.get_text()) if desc else ""
-
-                    # Изображения
-                    image_urls = self._extract_all_image_urls_from_element(item, url)
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-
-                    # Дата — теперь извлекаем start И end
-                    raw_date = date_span.get_text() if date_span else title
-                    start_date, end_date = self._extract_dates_from_text(raw_date)
-
-                    loc_text = loc_span.get_text() if loc_span else ""
-                    city = self._extract_city(loc_text or title)
-                    country = self._infer_country_from_text(loc_text) or 'Казахстан'
-
-                    if self._is_relevant(title, description):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-
-                        events.append({
-                            'title': title,
-                            'name': title,
-                            'description': description[:800],
-                            'city': city,
-                            'place': self._clean_text(loc_text) or None,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': 'worldexpo.pro',
-                            'country': country,
-                            'industry': self._infer_industry(title, description)
-                        })
-                except Exception as e:
-                    logger.debug(f"WorldExpo item error: {e}")
+            await self._collect(await self._extract('extract_worldexpo', html, url), events)
         except Exception as e:
             logger.error(f"WorldExpo error: {e}")
 
         logger.info(f"parse_worldexpo: found {len(events)} events")
         return events
 
+    def _listing_page_handler(self, method: str, events: List[Dict]):
+        """handle(url, html) для CrawlFrontier: извлечение страницы в пуле + дедупликация между страницами."""
+        seen_urls = set()
+
+        async def handle_page(page_url: str, html: str) -> Tuple[List[Dict], List[str]]:
+            records, next_urls = await self._extract(method, html, page_url, sorted(seen_urls))
+            # Страницы разбираются параллельно — повторно отсекаем URL, собранные за это время
+            page_events = []
+            for record in records:
+                if record['url'] in seen_urls:
+                    continue
+                seen_urls.add(record['url'])
+                page_events.append(record)
+            await self._collect(page_events, events)
+            return page_events, next_urls
+
+        return handle_page
 
     async def parse_exposale_all(self) -> List[Dict]:
-        """https://exposale.net/ru/exhibitions/all/... — JSON-LD + card-based parsing."""
-        events = []
-        base = "https://exposale.net"
-        seen_urls = set()
+        """https://exposale.net/ru/exhibitions/all/... — JSON-LD + card-based parsing, с пагинацией."""
+        events = self._new_events_list()
         try:
-            resp = await self.client.get(EXPOSALE_ALL_URL)
-            soup = BeautifulSoup(resp.text, 'lxml')
-
-            # Способ 1: JSON-LD structured data
-            json_ld_events = self._extract_from_json_ld(soup, base)
-            for ev in json_ld_events:
-                if ev.get('url') and ev['url'] not in seen_urls:
-                    ev['source'] = 'exposale.net'
-                    ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
-                    if not ev.get('country'):
-                        ev['country'] = self._infer_country_from_text(
-                            f"{ev.get('city', '')} {ev.get('place', '')}"
-                        ) or 'Казахстан'
-                    # exposale.net — все записи являются выставками, не фильтруем по relevance
-                    if not self._contains_stop_word(ev.get('title', '') + ' ' + ev.get('description', '')):
-                        events.append(ev)
-                        seen_urls.add(ev['url'])
-
-            # Способ 2: Карточки выставок — ищем ссылки на /ru/exhibition/
-            for link in soup.find_all('a', href=re.compile(r'/ru/exhibition/')):
-                try:
-                    href = link.get('href', '')
-                    event_url = urljoin(base, href)
-                    if event_url in seen_urls:
-                        continue
-
-                    title = self._clean_title(link.get_text())
-                    if len(title) < 5:
-                        continue
-
-                    # Подняться к карточке-контейнеру
-                    card = link.find_parent(['div', 'article', 'li', 'tr', 'td'])
-                    card_text = card.get_text() if card else title
-
-                    country = self._infer_country_from_text(card_text) or "Казахстан"
-                    city = self._extract_city(card_text)
-
-                    # Описание
-                    desc_elem = card.find('p') if card else None
-                    description = self._clean_description(desc_elem.get_text()) if desc_elem else ""
-
-                    # Изображения
-                    image_urls = self._extract_all_image_urls_from_element(card, base) if card else []
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-
-                    # Дата — из текста карточки (формат "с DD.MM.YYYY по DD.MM.YYYY")
-                    start_date, end_date = self._extract_dates_from_text(card_text)
-
-                    if self._contains_stop_word(title + ' ' + description):
-                        continue
-                    cleaned_url = self._clean_url(event_url)
-                    if not cleaned_url:
-                        continue
-                    seen_urls.add(event_url)
-
-                    events.append({
-                        'title': title[:200],
-                        'name': title[:200],
-                        'description': description[:800] or self._clean_text(card_text)[:800],
-                        'city': city,
-                        'place': None,
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'url': cleaned_url,
-                        'image_url': local_image_path,
-                        'source': 'exposale.net',
-                        'country': country,
-                        'industry': self._infer_industry(title, description)
-                    })
-                except Exception as e:
-                    logger.debug(f"Exposale item error: {e}")
+            frontier = CrawlFrontier(
+                'parse_exposale_all', self._fetch_listing_html,
+                self._listing_page_handler('extract_exposale_page', events),
+                self._is_known_event_url, self._page_budget(LISTING_MAX_PAGES.get('exposale.net', 1)),
+            )
+            await frontier.crawl(EXPOSALE_ALL_URL)
         except Exception as e:
             logger.error(f"Exposale all error: {e}")
 
         logger.info(f"parse_exposale_all: found {len(events)} events")
         return events
 
-    def _parse_vystavki_title(self, raw_title: str) -> Dict:
-        """Разобрать заголовок vystavki.su формата 'НАЗВАНИЕ YYYY Город, Страна DD — DD Месяц YYYY'."""
-        result = {'title': raw_title, 'city': None, 'country': None, 'start_date': None, 'end_date': None}
-
-        # Попробовать выделить дату из конца строки
-        start_date, end_date = self._extract_dates_from_text(raw_title)
-        if start_date:
-            result['start_date'] = start_date
-            result['end_date'] = end_date
-
-        # Попробовать выделить город и страну
-        city = self._extract_city(raw_title)
-        if city:
-            result['city'] = city
-            result['country'] = self._extract_country_from_city(city)
-
-        country = self._infer_country_from_text(raw_title)
-        if country and not result['country']:
-            result['country'] = country
-
-        # Очистить заголовок: убрать дату и город/страну из конца
-        clean = raw_title
-        # Убрать дату (числа + месяц + год в конце)
-        clean = re.sub(r'\s*\d{1,2}\s*[-—–]\s*\d{1,2}\s+[а-яёa-z]+\s*\d{4}\s*$', '', clean, flags=re.I)
-        clean = re.sub(r'\s*\d{1,2}\s+[а-яёa-z]+\s*[-—–]\s*\d{1,2}\s+[а-яёa-z]+\s*\d{4}\s*$', '', clean, flags=re.I)
-        # Убрать "Город, Страна" из конца
-        clean = re.sub(r'\s*,?\s*(Казахстан|Узбекистан|Азербайджан|Грузия|Армения|Кыргызстан|Таджикистан|Туркменистан)\s*$', '', clean, flags=re.I)
-        # Убрать год из конца
-        clean = re.sub(r'\s+20[2-5]\d\s*$', '', clean)
-        # Убрать город из конца если он отдельный
-        if city:
-            clean = re.sub(r'\s*,?\s*' + re.escape(city) + r'\s*$', '', clean, flags=re.I)
-
-        result['title'] = self._clean_title(clean.strip()) or self._clean_title(raw_title)
-        return result
-
     async def parse_vystavki_main(self) -> List[Dict]:
-        """https://vystavki.su/ — WordPress, ссылки с img + текстом."""
-        events = []
-        seen_urls = set()
+        """https://vystavki.su/ — WordPress, ссылки с img + текстом, с пагинацией /page/N/."""
+        events = self._new_events_list()
         try:
-            url = VYSTAVKI_MAIN_URL
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
-                return events
-
-            # Способ 1: JSON-LD
-            json_ld_events = self._extract_from_json_ld(soup, url)
-            for ev in json_ld_events:
-                if ev.get('url') and ev['url'] not in seen_urls:
-                    ev['source'] = 'vystavki.su'
-                    ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
-                    if not ev.get('country'):
-                        ev['country'] = 'Казахстан'
-                    if self._is_relevant(ev.get('title', ''), ev.get('description', '')):
-                        events.append(ev)
-                        seen_urls.add(ev['url'])
-
-            # Способ 2: Ссылки с изображениями (основной контент vystavki.su)
-            for link in soup.find_all('a', href=True):
-                try:
-                    href = link.get('href', '')
-                    if not href or href == '/' or href == '#':
-                        continue
-                    event_url = urljoin(url, href)
-                    if event_url in seen_urls:
-                        continue
-                    # Пропускать nav-ссылки, соцсети, и т.д.
-                    if any(skip in event_url for skip in ['#', 'javascript:', 'mailto:', 'tel:', 'facebook', 'twitter', 'vk.com', 'instagram', 'youtube', 'telegram']):
-                        continue
-                    # Ссылка должна содержать img или значимый текст
-                    has_img = link.find('img') is not None
-                    link_text = self._clean_text(link.get_text())
-                    if not has_img and len(link_text) < 10:
-                        continue
-                    if len(link_text) > 500:
-                        continue
-
-                    raw_title = link_text
-                    parsed = self._parse_vystavki_title(raw_title)
-                    title = parsed['title']
-                    if len(title) < 5:
-                        continue
-
-                    city = parsed['city']
-                    country = parsed['country'] or self._infer_country_from_text(raw_title) or 'Казахстан'
-                    start_date = parsed['start_date']
-                    end_date = parsed['end_date']
-
-                    # Описание из родителя
-                    parent = link.find_parent(['article', 'div', 'li', 'section'])
-                    description = ""
-                    if parent:
-                        desc_tag = parent.find('p')
-                        if desc_tag:
-                            description = self._clean_description(desc_tag.get_text())
-
-                    # Изображения
-                    image_urls = self._extract_all_image_urls_from_element(link, url)
-                    if not image_urls and parent:
-                        image_urls = self._extract_all_image_urls_from_element(parent, url)
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-
-                    if self._is_relevant(title, description or raw_title):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-                        seen_urls.add(event_url)
-
-                        events.append({
-                            'title': title[:200],
-                            'name': title[:200],
-                            'description': description[:800],
-                            'city': city,
-                            'place': None,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': 'vystavki.su',
-                            'country': country,
-                            'industry': self._infer_industry(title, description)
-                        })
-                except Exception as e:
-                    logger.debug(f"Vystavki item error: {e}")
-
-            # Способ 3: Fallback — article/post containers
-            if not events:
-                for item in soup.select('article, .post, .entry'):
-                    try:
-                        title_tag = item.find(['h2', 'h3', 'h4'])
-                        if not title_tag:
-                            continue
-                        raw_title = title_tag.get_text()
-                        parsed = self._parse_vystavki_title(raw_title)
-                        title = parsed['title']
-                        if len(title) < 5:
-                            continue
-
-                        link = item.find('a', href=True)
-                        event_url = urljoin(url, link['href']) if link else url
-                        if event_url in seen_urls:
-                            continue
-
-                        desc = item.find('p')
-                        description = self._clean_description(desc.get_text()) if desc else ""
-
-                        image_urls = self._extract_all_image_urls_from_element(item, url)
-                        local_image_path = None
-                        for img_url in image_urls:
-                            local_image_path = await self._download_and_save_image(img_url, event_url)
-                            if local_image_path:
-                                break
-
-                        if self._is_relevant(title, description or raw_title):
-                            cleaned_url = self._clean_url(event_url)
-                            if not cleaned_url:
-                                continue
-                            seen_urls.add(event_url)
-                            events.append({
-                                'title': title[:200],
-                                'name': title[:200],
-                                'description': description[:800],
-                                'city': parsed['city'],
-                                'place': None,
-                                'start_date': parsed['start_date'],
-                                'end_date': parsed['end_date'],
-                                'url': cleaned_url,
-                                'image_url': local_image_path,
-                                'source': 'vystavki.su',
-                                'country': parsed['country'] or 'Казахстан',
-                                'industry': self._infer_industry(title, description)
-                            })
-                    except Exception as e:
-                        logger.debug(f"Vystavki fallback item error: {e}")
-
+            frontier = CrawlFrontier(
+                'parse_vystavki_main', self._fetch_listing_html,
+                self._listing_page_handler('extract_vystavki_page', events),
+                self._is_known_event_url, self._page_budget(LISTING_MAX_PAGES.get('vystavki.su', 1)),
+            )
+            await frontier.crawl(VYSTAVKI_MAIN_URL)
         except Exception as e:
             logger.error(f"Vystavki.su error: {e}")
 
@@ -1594,80 +771,15 @@ class EventParser:
 
     async def parse_generic(self, url: str, source_name: str, country: str = "Казахстан") -> List[Dict]:
         """Универсальный парсер для любого сайта."""
-        events = []
+        events = self._new_events_list()
         try:
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-            
-            # Пробовать разные селекторы
-            selectors = [
-                '.exhibition', '.event', '.item', 'article', '[class*="expo"]',
-                '.news', '.card', '.post', '.entry', '[class*="event-"]', '[class*="news-"]'
-            ]
-            items = []
-            for sel in selectors:
-                items.extend(soup.select(sel))
-            
-            # Если не нашли, взять все ссылки
-            if not items:
-                items = soup.find_all('a', href=True)[:80]
-            
-            for item in items:
-                try:
-                    if hasattr(item, 'find') and item.find(['h2', 'h3', 'h4']):
-                        title_tag = item.find(['h2', 'h3', 'h4']) or item.find('a')
-                        title = self._clean_title((title_tag or item).get_text())
-                        link = item.find('a', href=True) or (item if item.name == 'a' and item.get('href') else None)
-                    else:
-                        if item.name != 'a' or not item.get('href'):
-                            continue
-                        title = self._clean_title(item.get_text())
-                        link = item
-                    
-                    if len(title) < 5:
-                        continue
-                    
-                    event_url = urljoin(url, link['href']) if link and link.get('href') else url
-                    desc = item.find('p') if hasattr(item, 'find') else None
-                    description = self._clean_description(desc.get_text()) if desc else ""
-                    
-                    # Изображения
-                    image_urls = self._extract_all_image_urls_from_element(item, url)
-                    local_image_path = None
-                    for img_url in image_urls:
-                        local_image_path = await self._download_and_save_image(img_url, event_url)
-                        if local_image_path:
-                            break
-                    
-                    # Дата
-                    full_text = title + " " + description
-                    start_date, end_date = self._extract_dates_from_text(full_text)
-                    
-                    if self._is_relevant(title, description):
-                        cleaned_url = self._clean_url(event_url)
-                        if not cleaned_url:
-                            continue
-
-                        events.append({
-                            'title': title[:200],
-                            'name': title[:200],
-                            'description': description[:800] or "",
-                            'city': self._extract_city(full_text),
-                            'place': None,
-                            'start_date': start_date,
-                            'end_date': end_date,
-                            'url': cleaned_url,
-                            'image_url': local_image_path,
-                            'source': source_name,
-                            'country': country,
-                            'industry': self._infer_industry(title, description)
-                        })
-                except Exception as e:
-                    logger.debug(f"Generic item error: {e}")
+            await self._collect(await self._extract('extract_with_spec', 'generic', html, url, source_name, country), events)
         except Exception as e:
             logger.error(f"Generic {source_name} error: {e}")
-        
+
         logger.info(f"parse_generic {source_name}: found {len(events)} events")
         return events
 
@@ -1676,96 +788,13 @@ class EventParser:
 
     async def parse_iteca_uz(self) -> List[Dict]:
         """https://iteca.uz/ru/kalendarx-sobtij — календарь событий ITECA Uzbekistan."""
-        events = []
-        base_url = "https://iteca.uz"
+        events = self._new_events_list()
         try:
             url = "https://iteca.uz/ru/kalendarx-sobtij"
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-
-            # Каждое событие — <a href="..."> с вложенными img, time, h4, h3, p
-            seen_urls = set()
-            for link in soup.find_all('a', href=True):
-                try:
-                    # Карточка должна содержать h3 или h4 (название выставки)
-                    h4 = link.find('h4')
-                    h3 = link.find('h3')
-                    if not h4 and not h3:
-                        continue
-
-                    title_short = self._clean_text(h4.get_text()) if h4 else ""
-                    title_full = self._clean_text(h3.get_text()) if h3 else ""
-                    title = title_full or title_short
-                    if len(title) < 5:
-                        continue
-
-                    # URL события
-                    href = link.get('href', '')
-                    if not href or href.startswith('#') or href.startswith('javascript'):
-                        continue
-                    event_url = href if href.startswith('http') else urljoin(base_url, href)
-                    if event_url in seen_urls:
-                        continue
-                    seen_urls.add(event_url)
-
-                    # Дата из <time> тега
-                    time_tag = link.find('time')
-                    date_text = self._clean_text(time_tag.get_text()) if time_tag else ""
-                    start_date, end_date = self._extract_dates_from_text(date_text)
-                    if not start_date:
-                        start_date, end_date = self._extract_dates_from_text(title)
-
-                    # Место проведения из <p>
-                    place_text = ""
-                    city = None
-                    p_tag = link.find('p')
-                    if p_tag:
-                        raw_place = self._clean_text(p_tag.get_text())
-                        # "Место проведения: НВК "Узэкспоцентр" / Ташкент, Узбекистан"
-                        place_text = re.sub(r'^Место проведения:\s*', '', raw_place, flags=re.IGNORECASE)
-                        city = self._extract_city(place_text)
-
-                    if not city:
-                        city = self._extract_city(title) or "Ташкент"
-
-                    # Описание — собрать из полного названия + место
-                    description = ""
-                    if title_full and title_short:
-                        description = title_full
-                    if place_text:
-                        description = (description + ". " + place_text).strip('. ')
-
-                    # Изображение
-                    local_image_path = None
-                    img_tag = link.find('img')
-                    if img_tag:
-                        img_src = img_tag.get('src') or img_tag.get('data-src') or ''
-                        if img_src and not img_src.startswith('data:'):
-                            img_url = img_src if img_src.startswith('http') else urljoin(base_url, img_src)
-                            local_image_path = await self._download_and_save_image(img_url, event_url)
-
-                    cleaned_url = self._clean_url(event_url)
-                    if not cleaned_url:
-                        continue
-
-                    events.append({
-                        'title': self._clean_title(title_short or title),
-                        'name': title_full or title_short or title,
-                        'description': self._clean_description(description)[:800],
-                        'city': city,
-                        'place': place_text or None,
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'url': cleaned_url,
-                        'image_url': local_image_path,
-                        'source': 'iteca.uz',
-                        'country': 'Узбекистан',
-                        'industry': self._infer_industry(title, description),
-                    })
-                except Exception as e:
-                    logger.debug(f"Iteca UZ item error: {e}")
-
+            await self._collect(await self._extract('extract_with_spec', 'iteca_uz', html, url), events)
         except Exception as e:
             logger.error(f"Iteca UZ error: {e}")
 
@@ -1777,71 +806,13 @@ class EventParser:
 
     async def parse_iteca_az(self) -> List[Dict]:
         """https://iteca.az/ru/events — ITECA Caspian (Azerbaijan) exhibitions."""
-        events = []
-        base_url = "https://iteca.az"
+        events = self._new_events_list()
         try:
             url = "https://iteca.az/ru/events"
-            html, soup = await self._fetch_page_content(url)
-            if not soup:
+            html = await self._fetch_html(url, conditional=True)
+            if not html:
                 return events
-
-            seen_urls = set()
-            # Карточки: div.event-item содержит <a title="...">, дату, ссылку на сайт
-            for item in soup.find_all('div', class_='event-item'):
-                try:
-                    # Название из <a title="..."> внутри div.event-logo
-                    title_link = item.find('a', title=True)
-                    if not title_link:
-                        continue
-                    title = self._clean_text(title_link.get('title', ''))
-                    if len(title) < 5:
-                        continue
-
-                    # URL — первая внешняя ссылка (сайт выставки)
-                    event_url = ''
-                    for a in item.find_all('a', href=True):
-                        href = a.get('href', '')
-                        if href.startswith('http') and 'get-the-ticket' not in href and 'reservation' not in href:
-                            event_url = href
-                            break
-                    if not event_url or event_url in seen_urls:
-                        continue
-                    seen_urls.add(event_url)
-
-                    # Дата из текста карточки
-                    item_text = item.get_text()
-                    start_date, end_date = self._extract_dates_from_text(item_text)
-
-                    # Изображение
-                    local_image_path = None
-                    img = item.find('img')
-                    if img:
-                        img_src = img.get('src', '')
-                        if img_src and not img_src.startswith('data:'):
-                            img_url = img_src if img_src.startswith('http') else urljoin(base_url, img_src)
-                            local_image_path = await self._download_and_save_image(img_url, event_url)
-
-                    cleaned_url = self._clean_url(event_url)
-                    if not cleaned_url:
-                        continue
-
-                    events.append({
-                        'title': self._clean_title(title),
-                        'name': title,
-                        'description': self._clean_description(title)[:800],
-                        'city': 'Баку',
-                        'place': None,
-                        'start_date': start_date,
-                        'end_date': end_date,
-                        'url': cleaned_url,
-                        'image_url': local_image_path,
-                        'source': 'iteca.az',
-                        'country': 'Азербайджан',
-                        'industry': self._infer_industry(title, ''),
-                    })
-                except Exception as e:
-                    logger.debug(f"Iteca AZ item error: {e}")
-
+            await self._collect(await self._extract('extract_with_spec', 'iteca_az', html, url), events)
         except Exception as e:
             logger.error(f"Iteca AZ error: {e}")
 
@@ -1850,7 +821,7 @@ class EventParser:
 
     async def parse_expomap(self) -> List[Dict]:
         """https://expomap.ru/expo/country/{country}/ — JSON-LD structured data for CIS countries."""
-        events = []
+        events = self._new_events_list()
         base = "https://expomap.ru"
         seen_urls = set()
         country_slugs = {
@@ -1866,20 +837,13 @@ class EventParser:
         for country_name, slug in country_slugs.items():
             try:
                 url = f"{base}/expo/country/{slug}/"
-                resp = await self.client.get(url)
-                if resp.status_code != 200:
+                html = await self._fetch_listing_html(url)
+                if html is None:
                     continue
-                soup = BeautifulSoup(resp.text, 'lxml')
-                json_ld_events = self._extract_from_json_ld(soup, base)
-                for ev in json_ld_events:
-                    if ev.get('url') and ev['url'] not in seen_urls:
-                        ev['source'] = 'expomap.ru'
-                        ev['industry'] = self._infer_industry(ev.get('title', ''), ev.get('description', ''))
-                        if not ev.get('country') or ev['country'] == '':
-                            ev['country'] = country_name
-                        if not self._contains_stop_word(ev.get('title', '') + ' ' + ev.get('description', '')):
-                            events.append(ev)
-                            seen_urls.add(ev['url'])
+                for ev in await self._extract('extract_expomap', html, base, country_name):
+                    if ev['url'] not in seen_urls:
+                        events.append(ev)
+                        seen_urls.add(ev['url'])
             except Exception as e:
                 logger.debug(f"Expomap {slug} error: {e}")
 
@@ -1893,144 +857,122 @@ class EventParser:
         return await self.parse_generic(url, "vystavki.su", country)
 
     async def _safe_parse(self, coro, name: str) -> List[Dict]:
-        """Безопасно выполнить парсер, возвращая пустой список при ошибке."""
+        """Безопасно выполнить парсер, возвращая пустой список при ошибке.
+
+        Учитывает circuit breaker источника: открытый источник пропускается сразу,
+        исход запуска (все листинги упали / исключение / успех) сохраняется в БД
+        (при track_health=False breaker'ы не читаются и не меняются).
+        Источник, разобранный не полностью (дедлайн, исключение, ошибка разбора),
+        не фиксирует загруженное — в следующем цикле его листинги разбираются заново.
+        """
+        if self.track_health and not source_health.allow_request(name):
+            coro.close()
+            logger.info(f"{name}: circuit open, skipping")
+            return []
+
+        outcome = {'source': name, 'ok': 0, 'errors': 0, 'last_error': None, 'extract_errors': 0}
+        _listing_outcome.set(outcome)
+        partial: List[List[Dict]] = []
+        _partial_results.set(partial)
+        deadline = SOURCE_DEADLINES.get(name, SOURCE_DEADLINE_SECONDS)
+        run = crawl_metrics.current()
         try:
-            return await coro
+            result = await asyncio.wait_for(coro, timeout=deadline)
+        except asyncio.TimeoutError:
+            result = [e for events in partial for e in events]
+            logger.warning(f"{name}: deadline {deadline}s exceeded, keeping {len(result)} partial events")
+            self.discard_crawl_state([name])
+            if run is not None:
+                run.record_failure(f"deadline {deadline}s exceeded")
+            if outcome['ok']:
+                self._record_success(name)
+            else:
+                self._record_failure(name, f"deadline {deadline}s exceeded before listing was fetched")
+            return result
         except Exception as e:
             logger.error(f"{name} failed: {e}")
+            self.discard_crawl_state([name])
+            self._record_failure(name, str(e))
+            if run is not None:
+                run.record_failure(repr(e))
             return []
 
-    def _normalize_title_for_dedup(self, title: str) -> str:
-        """Нормализовать заголовок для дедупликации."""
-        if not title:
-            return ""
-        t = re.sub(r'[^\w\s]', '', title.lower())
-        t = re.sub(r'\s+', ' ', t).strip()
-        # Убрать год
-        t = re.sub(r'\b20[2-5]\d\b', '', t).strip()
-        return t
-
-    async def parse_all(self) -> List[Dict]:
-        all_events = []
-
-        # Этап 1: Основные парсеры — параллельно через asyncio.gather
-        # Удалены мёртвые сайты: qazexpo.kz (DNS), expo-centralasia.com (DNS),
-        # bakuexpo.center (DNS), atakent-expo.kz (SSL expired), worldexpo.pro (403)
-        main_tasks = [
-            self._safe_parse(self.parse_iteca(), "parse_iteca"),
-            self._safe_parse(self.parse_astanahub(), "parse_astanahub"),
-            self._safe_parse(self.parse_exposale_all(), "parse_exposale_all"),
-            self._safe_parse(self.parse_vystavki_main(), "parse_vystavki_main"),
-            self._safe_parse(self.parse_expomap(), "parse_expomap"),
-        ]
-
-        results = await asyncio.gather(*main_tasks)
-        for result in results:
-            all_events.extend(result)
-
-        # Этап 2: CIS парсеры — параллельно
-        cis_tasks = [
-            self._safe_parse(self.parse_uzexpocentre(), "parse_uzexpocentre"),
-            self._safe_parse(self.parse_iteca_uz(), "parse_iteca_uz"),
-            self._safe_parse(self.parse_iteca_az(), "parse_iteca_az"),
-        ]
-
-        # Дополнительные country-specific парсеры
-        for country in ("Узбекистан", "Азербайджан"):
-            for url in COUNTRY_SOURCES.get(country, []):
-                if any(skip in url for skip in ["uzexpocentre.uz", "iteca.uz", "bakuexpo.center", "iteca.az"]):
-                    continue
-                if "exposale" in url:
-                    cis_tasks.append(self._safe_parse(self.parse_exposale_country(url, country), f"exposale_{country}"))
-                elif "vystavki.su" in url:
-                    cis_tasks.append(self._safe_parse(self.parse_vystavki_country(url, country), f"vystavki_{country}"))
-                else:
-                    source_name = url.split('/')[2] if '//' in url else url
-                    cis_tasks.append(self._safe_parse(self.parse_generic(url, source_name, country), f"generic_{source_name}"))
-
-        # Другие страны CIS
-        other_countries = ["Таджикистан", "Туркменистан", "Грузия", "Армения", "Кыргызстан"]
-        for country in other_countries:
-            for url in COUNTRY_SOURCES.get(country, []):
-                if "exposale" in url:
-                    cis_tasks.append(self._safe_parse(self.parse_exposale_country(url, country), f"exposale_{country}"))
-                elif "vystavki.su" in url:
-                    cis_tasks.append(self._safe_parse(self.parse_vystavki_country(url, country), f"vystavki_{country}"))
-                else:
-                    source_name = url.split('/')[2] if '//' in url else url
-                    cis_tasks.append(self._safe_parse(self.parse_generic(url, source_name, country), f"generic_{source_name}"))
-
-        cis_results = await asyncio.gather(*cis_tasks)
-        for result in cis_results:
-            all_events.extend(result)
-
-        # Дедупликация 1: по URL
-        unique_by_url = {}
-        for e in all_events:
-            url = e.get('url', '')
-            if url and url not in unique_by_url:
-                unique_by_url[url] = e
-
-        # Дедупликация 2: по заголовку + дате (нормализованные)
-        unique_by_title_date = {}
-        for event in unique_by_url.values():
-            title_norm = self._normalize_title_for_dedup(event.get('title', ''))
-            date_key = ''
-            if event.get('start_date'):
-                date_key = event['start_date'].strftime('%Y-%m')
-            dedup_key = f"{title_norm}|{date_key}"
-            if dedup_key not in unique_by_title_date:
-                unique_by_title_date[dedup_key] = event
-            else:
-                # Предпочесть событие с более полными данными
-                existing = unique_by_title_date[dedup_key]
-                if (event.get('description', '') and len(event.get('description', '')) > len(existing.get('description', ''))):
-                    unique_by_title_date[dedup_key] = event
-
-        # Дедупликация 3: по схожести описания (>=75%)
-        filtered_events = []
-        for event in unique_by_title_date.values():
-            event_description = event.get('description', '')
-            if not event_description or len(event_description.strip()) < 20:
-                filtered_events.append(event)
-                continue
-
-            is_duplicate = False
-            for existing_event in filtered_events:
-                existing_description = existing_event.get('description', '')
-                if existing_description and len(existing_description.strip()) >= 20:
-                    similarity = self._calculate_text_similarity(event_description, existing_description)
-                    if similarity >= 0.75:
-                        logger.debug(
-                            f"Parser: Skipping duplicate (similarity {similarity:.2%}): "
-                            f"'{event.get('title', '')[:50]}' vs '{existing_event.get('title', '')[:50]}'"
-                        )
-                        is_duplicate = True
-                        break
-
-            if not is_duplicate:
-                filtered_events.append(event)
-
-        logger.info(f"Parser: Filtered {len(all_events)} -> {len(filtered_events)} unique events (removed {len(all_events) - len(filtered_events)} duplicates)")
+        if run is not None and outcome['errors']:
+            run.errors += outcome['errors']
+            run.last_error = outcome['last_error']
+        if outcome['extract_errors']:
+            logger.warning(f"{name}: {outcome['extract_errors']} page(s) failed to parse, its listings will be re-parsed")
+            self.discard_crawl_state([name])
+
+        if outcome['errors'] and not outcome['ok']:
+            self._record_failure(name, outcome['last_error'])
+        else:
+            self._record_success(name)
+        return result
 
+    def _record_success(self, name: str):
+        """Успешный запуск источника — в его circuit breaker (если учёт включён)."""
+        if self.track_health:
+            source_health.record_success(name)
+
+    def _record_failure(self, name: str, error: Optional[str]):
+        if self.track_health:
+            source_health.record_failure(name, error)
+
+    def select_sources(self, sources: Optional[List[str]] = None, budget: bool = True) -> List[Source]:
+        """Источники реестра (все или только sources), которым пора обходиться, в порядке приоритета.
+
+        budget=False — без бюджета обхода (разбор архива страниц: все источники сразу).
+        """
+        selected = [s for s in get_source_registry().values() if sources is None or s.name in sources]
+        # sort устойчив: при равном приоритете — порядок реестра
+        selected.sort(key=lambda s: s.priority)
+        if not budget:
+            return selected
+        # Бюджет обхода: малодоходные источники пропускают циклы, при равном приоритете доходные — раньше
+        return get_crawl_budget().select(selected)
+
+    async def stream_sources(self, sources: List[Source], on_result: Callable[[str, List[Dict]], Awaitable[None]]):
+        """Запустить источники по приоритету, не более MAX_CONCURRENT_SOURCES одновременно.
+
+        События каждого источника передаются в on_result(name, events), как только он завершился —
+        не дожидаясь остальных; медленный on_result (полная очередь конвейера) притормаживает
+        выдачу, но не держит слот источника. Источник стартует после завершения своих
+        зависимостей из этого же запуска (успешного или нет), и их результаты выдаются раньше.
+        """
+        logger.info(f"Parser: running {len(sources)} sources: {', '.join(s.name for s in sources)}")
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SOURCES)
+        finished = {source.name: asyncio.Event() for source in sources}
+
+        async def run(source: Source):
+            try:
+                for dep in source.depends_on:
+                    if dep in finished:
+                        await finished[dep].wait()
+                async with semaphore:
+                    # У каждого источника свой дедлайн (SOURCE_DEADLINES) — отсчёт с момента получения слота
+                    with self.metrics.timed(source.name) if self.metrics else nullcontext() as run:
+                        events = await self._safe_parse(source.parse(self), source.name)
+                    if run is not None:
+                        run.items_seen += len(events)
+                await on_result(source.name, events)
+            finally:
+                finished[source.name].set()
+
+        await asyncio.gather(*(run(source) for source in sources))
+
+    def filter_events(self, events: List[Dict]) -> List[Dict]:
+        """Отбросить мусорные записи и события вне целевых стран; проставить 'NO IMAGE'."""
         # Фильтрация мусорных записей — навигационные ссылки, новостные статьи и т.д.
-        JUNK_PATTERNS = [
-            r'^\d+\s+exhibitions?$',                    # "20 exhibitions"
-            r'^Международные выставки\b',               # navigation links
-            r'^Календарь\b',                             # "Календарь выставок"
-            r'^Мероприятия$',                            # generic "Events" page title
-            r'^\d{1,2}\s+\w+\s+20\d{2}\s+',            # news articles starting with date "26 September 2025 ..."
-        ]
-        junk_re = re.compile('|'.join(JUNK_PATTERNS), re.IGNORECASE)
-        pre_junk = len(filtered_events)
-        filtered_events = [e for e in filtered_events if not junk_re.search(e.get('title', ''))]
-        if pre_junk != len(filtered_events):
-            logger.info(f"Parser: Junk filter {pre_junk} -> {len(filtered_events)} (removed {pre_junk - len(filtered_events)} junk entries)")
+        pre_junk = len(events)
+        events = [e for e in events if not _JUNK_TITLE_RE.search(e.get('title', ''))]
+        if pre_junk != len(events):
+            logger.info(f"Parser: Junk filter {pre_junk} -> {len(events)} (removed {pre_junk - len(events)} junk entries)")
 
         # Фильтрация по странам — оставляем только целевые (из config.COUNTRIES)
         allowed_countries = set(COUNTRIES)
         country_filtered = []
-        for event in filtered_events:
+        for event in events:
             country = event.get('country', '')
             # Перепроверить страну по тексту title/description (часто country='Казахстан' а title='... Москва, Россия')
             full_text = f"{event.get('title', '')} {event.get('description', '')} {event.get('city', '')}"
@@ -2044,10 +986,8 @@ class EventParser:
             else:
                 logger.debug(f"Parser: Skipping event from '{country}': {event.get('title', '')[:60]}")
 
-        logger.info(f"Parser: Country filter {len(filtered_events)} -> {len(country_filtered)} (removed {len(filtered_events) - len(country_filtered)} from non-target countries)")
-
-        # NOTE: AI enrichment (Groq Llama) happens in scheduler.py run_parsing_cycle(),
-        # not here, to avoid double API calls.
+        if len(events) != len(country_filtered):
+            logger.info(f"Parser: Country filter {len(events)} -> {len(country_filtered)} (removed {len(events) - len(country_filtered)} from non-target countries)")
 
         # Set "NO IMAGE" for events without images
         for event in country_filtered:
@@ -2055,3 +995,64 @@ class EventParser:
                 event['image_url'] = 'NO IMAGE'
 
         return country_filtered
+
+    def dedup_key(self, event: Dict) -> str:
+        """Ключ дедупликации по заголовку + месяцу начала (нормализованные)."""
+        title_norm = self._normalize_title_for_dedup(event.get('title', ''))
+        date_key = event['start_date'].strftime('%Y-%m') if event.get('start_date') else ''
+        return f"{title_norm}|{date_key}"
+
+    async def dedup_descriptions(self, events: List[Dict], known_descriptions: Optional[List[str]] = None) -> List[Dict]:
+        """dedup_by_description в пуле процессов: O(n²) SequenceMatcher не блокирует event loop."""
+        comparisons = len(events) * (len(events) + len(known_descriptions or []))
+        if comparisons <= 50:
+            # Мелкая партия потокового конвейера — пересылка в процесс дороже самих сравнений
+            return self.dedup_by_description(events, known_descriptions)
+        return await self._extract('dedup_by_description', events, known_descriptions)
+
+    async def parse_all(self, sources: Optional[List[str]] = None) -> List[Dict]:
+        """Собрать события из источников реестра (все или только sources) одним списком и дедуплицировать.
+
+        Цикл бота обрабатывает источники потоково (services/pipeline.py); parse_all — для
+        разовых прогонов, которым нужен весь результат сразу.
+        """
+        selected = self.select_sources(sources)
+        by_source: Dict[str, List[Dict]] = {}
+
+        async def collect(name: str, events: List[Dict]):
+            by_source[name] = events
+
+        await self.stream_sources(selected, collect)
+        # Порядок приоритета, а не завершения: при дедупликации по URL побеждает более приоритетный источник
+        all_events = [e for source in selected for e in by_source.get(source.name, [])]
+
+        # Дедупликация 1: по URL
+        unique_by_url = {}
+        for e in all_events:
+            url = e.get('url', '')
+            if url and url not in unique_by_url:
+                unique_by_url[url] = e
+
+        # Дедупликация 2: по заголовку + дате (нормализованные)
+        unique_by_title_date = {}
+        for event in unique_by_url.values():
+            dedup_key = self.dedup_key(event)
+            if dedup_key not in unique_by_title_date:
+                unique_by_title_date[dedup_key] = event
+            else:
+                # Предпочесть событие с более полными данными
+                existing = unique_by_title_date[dedup_key]
+                if (event.get('description', '') and len(event.get('description', '')) > len(existing.get('description', ''))):
+                    unique_by_title_date[dedup_key] = event
+
+        # Дедупликация 3: по схожести описания (>=75%)
+        filtered_events = await self.dedup_descriptions(list(unique_by_title_date.values()))
+
+        logger.info(f"Parser: Filtered {len(all_events)} -> {len(filtered_events)} unique events (removed {len(all_events) - len(filtered_events)} duplicates)")
+
+        # NOTE: AI enrichment (Groq Llama) happens in the pipeline's enrich stage, not here,
+        # to avoid double API calls.
+        filtered_events = self.filter_events(filtered_events)
+        await self.attach_images(filtered_events)
+        self.log_host_stats()
+        return filtered_events
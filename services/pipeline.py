@@ -0,0 +1,573 @@
+"""
+Streaming ingest pipeline of one parsing cycle.
+
+    crawl → classify → dedup → details → enrich → persist → notify
+
+Stages are connected by bounded asyncio.Queues: a full queue blocks the stage
+in front of it (backpressure), so memory is bounded by the queue sizes rather
+than by the whole cycle, and events of the first finished source are enriched,
+stored and sent while slower sources are still crawling.
+
+crawl     EventParser.stream_sources(): one batch per finished source; events
+          whose URL is already stored are dropped here (services/known_filter.py)
+classify  junk / country filter (EventParser.filter_events)
+dedup     within the run (URL, title+month, description similarity against
+          everything accepted so far) — so only new events reach the detail
+          pages and AI
+details   detail page of events whose listing data is thin (no date, place,
+          image or a short description), PIPELINE_DETAIL_WORKERS concurrently;
+          image candidates go to the background ImageDownloadQueue from here
+enrich    AI extraction, PIPELINE_ENRICH_WORKERS concurrent requests
+persist   stop words, hash / URL / description checks against the DB (stored
+          descriptions are read once per cycle), insert
+          (with the image if it has already landed; later ones update the row)
+notify    notify_users() for whatever has been persisted, PIPELINE_NOTIFY_BATCH at a time,
+          after waiting up to IMAGE_NOTIFY_WAIT seconds for the batch's images
+
+Queue depth per stage is logged every PIPELINE_STATS_INTERVAL seconds and
+available via get_running_pipeline().stats() (/pipeline). Per-source metrics of
+the cycle (requests, bytes, parse CPU, items seen / relevant / new, images) go
+to the crawl_runs table at the end (services/crawl_metrics.py, /crawlstats).
+
+Conditional-request validators of the listings (services/http_cache.py) and
+the sitemap <lastmod> state (services/sitemap.py) are committed after the
+stages have drained, and only for sources that were parsed completely and none
+of whose events failed a stage; the rest re-parse them next cycle.
+
+The raw crawl batches and the records leaving the details stage are written
+to a checkpoint (services/checkpoints.py). IngestPipeline(replay=checkpoint)
+feeds such a checkpoint back in instead of crawling — classify, dedup, enrich,
+persist run as usual, detail pages come from the checkpoint, nothing is sent.
+
+Pages the parser downloads go to the HTML archive (services/html_archive.py),
+maintained after each cycle. IngestPipeline(offline=True) runs a cycle whose
+parser crawls that archive instead of the sites: no images, messages, crawl
+metrics or checkpoint, and every source runs regardless of its crawl budget.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from database.engine import SessionLocal
+from database.models import Event
+from services.ai_service import extract_event_structured
+from services.crawl_metrics import CrawlMetrics
+from services.images import ImageDownloadQueue, MISSING_IMAGE
+from services.notification import notify_users
+from services.parser import EventParser
+from services.known_filter import get_known_events
+from services.checkpoints import Checkpoint, CheckpointWriter
+from services import shadow
+from services import crawl_budget
+from services import image_store
+from config import (
+    STOP_WORDS,
+    PIPELINE_BATCH_QUEUE_SIZE,
+    PIPELINE_EVENT_QUEUE_SIZE,
+    PIPELINE_DETAIL_WORKERS,
+    PIPELINE_ENRICH_WORKERS,
+    PIPELINE_NOTIFY_BATCH,
+    PIPELINE_STATS_INTERVAL,
+    IMAGE_NOTIFY_WAIT,
+    IMAGE_DRAIN_TIMEOUT,
+    CHECKPOINTS_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Конец потока: этап передаёт его дальше, когда обработал всё
+_DONE = object()
+
+
+def _parse_date_str(s: str) -> Optional[datetime]:
+    """Try DD.MM.YYYY or similar."""
+    if not s or not isinstance(s, str):
+        return None
+    m = re.match(r"(\d{1,2})\.(\d{1,2})\.(\d{4})", s.strip())
+    if m:
+        try:
+            return datetime(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+        except (ValueError, IndexError):
+            pass
+    return None
+
+
+def _contains_stop_word(text: str) -> bool:
+    """Check if text contains any STOP_WORD variation (case-insensitive, handles hyphens/spaces)."""
+    if not text:
+        return False
+    # Normalize text: lowercase, replace hyphens/spaces with single space
+    normalized = re.sub(r'[-\s]+', ' ', text.lower())
+    # Check each stop word (already lowercase in config)
+    for stop_word in STOP_WORDS:
+        # Normalize stop word too
+        normalized_stop = re.sub(r'[-\s]+', ' ', stop_word.lower())
+        # Check if stop word appears as whole word or part of word (for variations)
+        # This catches "bootcamp", "online-bootcamp", "bootcamp-2024", etc.
+        if normalized_stop in normalized:
+            return True
+    return False
+
+
+def _normalize_text_for_comparison(text: str) -> str:
+    """Normalize text for comparison: lowercase, remove extra spaces, punctuation."""
+    if not text:
+        return ""
+    # Lowercase, remove extra whitespace, remove common punctuation
+    normalized = re.sub(r'[^\w\s]', ' ', text.lower())
+    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    return normalized
+
+
+def _calculate_text_similarity(text1: str, text2: str) -> float:
+    """Calculate similarity ratio between two texts (0.0 to 1.0)."""
+    if not text1 or not text2:
+        return 0.0
+    norm1 = _normalize_text_for_comparison(text1)
+    norm2 = _normalize_text_for_comparison(text2)
+    if not norm1 or not norm2:
+        return 0.0
+    return SequenceMatcher(None, norm1, norm2).ratio()
+
+
+def _compute_event_hash(title: str, description: str, start_date: Optional[datetime]) -> str:
+    """Compute hash for event based on title, description, and start_date."""
+    # Normalize text for hashing
+    title_norm = (title or "").lower().strip()
+    desc_norm = (description or "").lower().strip()
+    date_str = start_date.strftime("%Y-%m-%d") if start_date else ""
+
+    # Create hash from normalized content
+    content = f"{title_norm}|{desc_norm}|{date_str}"
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        bot: Optional[Bot],
+        parser: EventParser,
+        sources: Optional[List[str]] = None,
+        replay: Optional[Checkpoint] = None,
+        use_ai: bool = True,
+        offline: bool = False,
+    ):
+        """replay — пройти этапы по контрольной точке вместо обхода источников: без сети,
+        рассылки (bot может быть None), метрик обхода и новой контрольной точки.
+        offline — то же для обхода архива страниц (транспорт парсера — ArchiveTransport)."""
+        self.bot = bot
+        self.parser = parser
+        self.sources = sources
+        self.replay = replay
+        self.offline = offline or replay is not None
+        self.use_ai = use_ai
+        self.checkpoint: Optional[CheckpointWriter] = None
+        # Очередь перед каждым этапом
+        self.queues: Dict[str, asyncio.Queue] = {
+            "classify": asyncio.Queue(PIPELINE_BATCH_QUEUE_SIZE),
+            "dedup": asyncio.Queue(PIPELINE_BATCH_QUEUE_SIZE),
+            "details": asyncio.Queue(PIPELINE_EVENT_QUEUE_SIZE),
+            "enrich": asyncio.Queue(PIPELINE_EVENT_QUEUE_SIZE),
+            "persist": asyncio.Queue(PIPELINE_EVENT_QUEUE_SIZE),
+            "notify": asyncio.Queue(PIPELINE_EVENT_QUEUE_SIZE),
+        }
+        self.max_depth = dict.fromkeys(self.queues, 0)
+        self.processed = dict.fromkeys(self.queues, 0)
+        self.crawled = 0
+        self.persisted = 0
+        self.notified = 0
+        self.detail_pages = 0
+        self.started_at: Optional[float] = None
+        self.first_notification_after: Optional[float] = None
+        # Дедупликация внутри цикла
+        self._seen_urls: Set[str] = set()
+        self._seen_keys: Set[str] = set()
+        self._descriptions: List[str] = []
+        # (описание, заголовок) сохранённых событий для проверки сходства в persist:
+        # читаются из БД один раз за цикл и пополняются по мере сохранения
+        self._stored_descriptions: Optional[List[Tuple[str, Optional[str]]]] = None
+        # URL события → источник реестра, от которого оно пришло (для метрик)
+        self._source_of: Dict[str, str] = {}
+        # Источники, чьё событие упало на каком-то этапе: их загруженное не фиксируется
+        self._failed_sources: Set[str] = set()
+        self.metrics = CrawlMetrics()
+        parser.metrics = self.metrics
+        # Сессия этапов dedup/persist; notify открывает свою
+        self.db = SessionLocal()
+        self.images = ImageDownloadQueue(parser, metrics=self.metrics)
+        # Фильтр Блума сохранённых событий: URL и event_hash проверяются без запроса к БД
+        self.known = get_known_events()
+        self.known_skipped = 0
+        self.budget = crawl_budget.get_crawl_budget()
+        self._detail_pages_of: Counter = Counter()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "depth": queue.qsize(),
+                "capacity": queue.maxsize,
+                "max_depth": self.max_depth[name],
+                "processed": self.processed[name],
+            }
+            for name, queue in self.queues.items()
+        }
+
+    async def run(self) -> int:
+        """Run the cycle to completion; returns the number of new events stored."""
+        global _running
+        self.started_at = time.monotonic()
+        try:
+            await asyncio.to_thread(self.known.sync)
+        except Exception as e:
+            # Без фильтра каждая проверка — точный запрос к БД, как раньше
+            logger.warning(f"Known events filter unavailable: {e}")
+        if CHECKPOINTS_ENABLED and not self.offline:
+            try:
+                self.checkpoint = CheckpointWriter(self.sources)
+            except OSError as e:
+                logger.warning(f"Crawl checkpoint disabled for this cycle: {e}")
+        _running = self
+        tasks = [
+            asyncio.create_task(self._crawl()),
+            asyncio.create_task(self._stage("classify", self._classify, downstream="dedup")),
+            asyncio.create_task(self._stage("dedup", self._dedup, downstream="details")),
+            asyncio.create_task(self._stage("details", self._details, PIPELINE_DETAIL_WORKERS, downstream="enrich")),
+            asyncio.create_task(self._stage("enrich", self._enrich, PIPELINE_ENRICH_WORKERS, downstream="persist")),
+            asyncio.create_task(self._stage("persist", self._persist, downstream="notify")),
+            asyncio.create_task(self._notify()),
+        ]
+        monitor = asyncio.create_task(self._log_stats_periodically())
+        self.images.start()
+        try:
+            await asyncio.gather(*tasks)
+            # События сохранены — неизменённые листинги можно пропускать со следующего цикла.
+            # Обход архива состояние обхода бота (валидаторы, <lastmod> sitemap) не меняет
+            if not self.offline:
+                self.parser.commit_crawl_state(self._failed_sources)
+            # Изображения, не успевшие к рассылке, всё равно прикрепляются к событиям
+            await self.images.join(IMAGE_DRAIN_TIMEOUT)
+        finally:
+            self.images.stop()
+            # Ошибка одного этапа не должна оставить остальные ждать очередь вечно
+            for task in tasks:
+                task.cancel()
+            monitor.cancel()
+            _running = None
+            # Цикл прерван до фиксации — всё загруженное разбирается заново в следующем
+            self.parser.discard_crawl_state()
+            self.db.close()
+            self.parser.metrics = None
+            self.known.save()
+            if self.checkpoint:
+                self.checkpoint.close(persisted=self.persisted)
+            if not self.offline:
+                self.metrics.save()
+                crawl_budget.refresh(self.metrics)
+                await self._maintain_archive()
+
+        self.parser.log_host_stats()
+        self.known.log_stats()
+        await shadow.drain()
+        shadow.log_report()
+        first = f"{self.first_notification_after:.1f}s" if self.first_notification_after is not None else "—"
+        logger.info(
+            f"Pipeline: crawled {self.crawled} ({self.known_skipped} already stored), detail pages {self.detail_pages}, "
+            f"stored {self.persisted}, notified {self.notified} events, images {self.images.stats()} "
+            f"in {time.monotonic() - self.started_at:.1f}s (first notification after {first}); "
+            f"max queue depth {self.max_depth}"
+        )
+        return self.persisted
+
+    async def _emit(self, stage: str, item):
+        queue = self.queues[stage]
+        await queue.put(item)
+        self.max_depth[stage] = max(self.max_depth[stage], queue.qsize())
+
+    async def _stage(self, name: str, handle, workers: int = 1, downstream: Optional[str] = None):
+        queue = self.queues[name]
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    # Вернуть маркер для остальных воркеров этапа (место есть — только что забрали)
+                    queue.put_nowait(_DONE)
+                    return
+                try:
+                    await handle(item)
+                except Exception as e:
+                    logger.error(f"Pipeline {name} error: {e}", exc_info=True)
+                    source = self._item_source(item)
+                    if source:
+                        self._failed_sources.add(source)
+                self.processed[name] += 1
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if downstream:
+            await self._emit(downstream, _DONE)
+
+    def _item_source(self, item) -> Optional[str]:
+        # Партия источника — (имя, события), дальше по конвейеру идут отдельные события
+        if isinstance(item, tuple):
+            return item[0]
+        if isinstance(item, dict):
+            return self._source_of.get(item.get("url", ""))
+        return None
+
+    async def _crawl(self):
+        async def on_result(name: str, events: List[Dict]):
+            self.crawled += len(events)
+            if self.checkpoint:
+                self.checkpoint.raw(name, events)
+            self.metrics.source(name).event_sources.update(e['source'] for e in events if e.get('source'))
+            # Уже сохранённые события отсекаются до очистки, классификации, детальных страниц и AI
+            fresh = [e for e in events if not self.known.is_known_url(e.get('url', ''), self.db)]
+            self.known_skipped += len(events) - len(fresh)
+            events = fresh
+            if events:
+                await self._emit("classify", (name, events))
+
+        try:
+            if self.replay is not None:
+                for name, events in self.replay.batches():
+                    if self.sources is None or name in self.sources:
+                        await on_result(name, events)
+            else:
+                sources = self.parser.select_sources(self.sources, budget=not self.offline)
+                await self.parser.stream_sources(sources, on_result)
+        finally:
+            await self._emit("classify", _DONE)
+
+    async def _classify(self, batch):
+        name, events = batch
+        events = self.parser.filter_events(events)
+        self.metrics.source(name).items_relevant += len(events)
+        if events:
+            await self._emit("dedup", (name, events))
+
+    async def _dedup(self, batch):
+        name, events = batch
+        fresh = []
+        for event in events:
+            url = event.get('url', '')
+            if not url or url in self._seen_urls:
+                continue
+            key = self.parser.dedup_key(event)
+            if key in self._seen_keys:
+                continue
+            self._seen_urls.add(url)
+            self._seen_keys.add(key)
+            self._source_of[url] = name
+            fresh.append(event)
+
+        fresh = await self.parser.dedup_descriptions(fresh, self._descriptions)
+        for event in fresh:
+            if event.get('description'):
+                self._descriptions.append(event['description'])
+            await self._emit("details", event)
+
+    async def _details(self, event: Dict):
+        source = self._source_of.get(event['url'])
+        if self.replay is not None:
+            # Детальная страница — такой, какой её загрузил записанный цикл
+            event = dict(self.replay.normalized.get(event['url'], event))
+            event.pop('image_candidates', None)
+            await self._emit("enrich", event)
+            return
+        if self.parser.needs_detail_page(event) and (self.offline or self._detail_budget_left(source)):
+            # Запросы и разбор детальной страницы — в метрики источника события
+            with self.metrics.attribute(source):
+                event = await self.parser.enrich_from_detail_page(event)
+            self.detail_pages += 1
+        candidates = event.pop('image_candidates', None)
+        if self.checkpoint:
+            self.checkpoint.normalized(source, event)
+        if candidates and event.get('image_url') in MISSING_IMAGE and not self.offline:
+            await self.images.submit(event['url'], candidates, source)
+        await self._emit("enrich", event)
+
+    def _detail_budget_left(self, source: Optional[str]) -> bool:
+        """Детальные страницы источника в пределах его бюджета на цикл (services/crawl_budget.py)."""
+        limit = self.budget.detail_limit(source)
+        if limit is None:
+            return True
+        used = self._detail_pages_of[source]
+        if used >= limit:
+            if used == limit:
+                logger.info(f"Crawl budget: {source} used its {limit} detail pages, the rest go without them")
+                self._detail_pages_of[source] += 1
+            return False
+        self._detail_pages_of[source] += 1
+        return True
+
+    async def _enrich(self, e_data: Dict):
+        raw_title = e_data.get("title", "")
+        raw_desc = e_data.get("description", "") or ""
+        raw_url = e_data.get("url", "")
+
+        # Keyword check (B2B or any industry category) + Gemini extraction
+        extracted = await extract_event_structured(
+            raw_title, raw_desc, raw_url, use_ai=self.use_ai
+        )
+
+        # Merge extracted fields into event data
+        e_data["name"] = extracted.get("name") or raw_title
+        e_data["title"] = extracted.get("title") or raw_title
+        e_data["description"] = extracted.get("short_description") or raw_desc[:500]
+        if extracted.get("place"):
+            e_data["place"] = extracted["place"]
+        if extracted.get("date"):
+            parsed = _parse_date_str(extracted["date"])
+            if parsed:
+                e_data["start_date"] = parsed
+        await self._emit("persist", e_data)
+
+    async def _persist(self, e_data: Dict):
+        db = self.db
+        # Final STOP_WORDS check after AI extraction
+        final_title = e_data.get("title", "")
+        final_description = e_data.get("description") or ""
+        full_text = f"{final_title} {final_description}"
+
+        # Use improved stop word checking that handles variations
+        if _contains_stop_word(full_text):
+            logger.debug(f"Skipping event with STOP_WORDS: {e_data.get('title', '')[:50]}")
+            return
+
+        # Compute hash for duplicate detection
+        event_hash = _compute_event_hash(
+            e_data.get("title", ""),
+            e_data.get("description", ""),
+            e_data.get("start_date")
+        )
+
+        # Check for duplicates by hash (more reliable than URL alone)
+        if self.known.is_known_hash(event_hash, db):
+            logger.debug(f"Skipping duplicate event (hash match): {e_data.get('title', '')[:50]}")
+            return
+
+        # Also check by URL as fallback
+        if self.known.is_known_url(e_data.get("url", ""), db):
+            logger.debug(f"Skipping duplicate event (URL match): {e_data.get('title', '')[:50]}")
+            return
+
+        # Check for similar descriptions (>=75% similarity) even if names differ
+        new_description = e_data.get("description", "")
+        if new_description and len(new_description.strip()) > 20:  # Only check if description is meaningful
+            for existing_description, existing_title in self._known_descriptions(db):
+                similarity = _calculate_text_similarity(new_description, existing_description)
+                if similarity >= 0.75:  # 75% similarity threshold
+                    logger.debug(
+                        f"Skipping duplicate event (description similarity {similarity:.2%}): "
+                        f"'{e_data.get('title', '')[:50]}' similar to '{existing_title[:50] if existing_title else 'N/A'}'"
+                    )
+                    return
+
+        landed = self.images.take_landed(e_data.get("url", ""))
+        if landed:
+            e_data["image_url"] = landed
+
+        # Add hash to event data
+        e_data["event_hash"] = event_hash
+        event = Event(**e_data)
+        db.add(event)
+        try:
+            db.commit()
+        except Exception:
+            # Сессия общая для всего цикла — без отката следующие события тоже не сохранятся
+            db.rollback()
+            raise
+        self.persisted += 1
+        self.known.add(event)
+        if event.description and len(event.description.strip()) > 20:
+            self._known_descriptions(db).append((event.description, event.title))
+        if landed:
+            image_store.link(event.url, landed)
+        source = self._source_of.get(e_data.get("url", ""))
+        if source:
+            self.metrics.source(source).items_new += 1
+        await self._emit("notify", event.id)
+
+    def _known_descriptions(self, db) -> List[Tuple[str, Optional[str]]]:
+        """Описания сохранённых событий: запрос к БД — при первом обращении за цикл."""
+        if self._stored_descriptions is None:
+            rows = db.query(Event.description, Event.title).filter(Event.description.isnot(None))
+            self._stored_descriptions = [
+                (description, title) for description, title in rows if len(description.strip()) > 20
+            ]
+        return self._stored_descriptions
+
+    async def _notify(self):
+        """Send whatever is persisted: one item, plus everything already queued behind it."""
+        queue = self.queues["notify"]
+        done = False
+        while not done:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            batch = [item]
+            while len(batch) < PIPELINE_NOTIFY_BATCH and not queue.empty():
+                item = queue.get_nowait()
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+            if self.bot is None:
+                # Воспроизведение контрольной точки: сохраняем, но никому не отправляем
+                self.processed["notify"] += len(batch)
+                continue
+
+            db = SessionLocal()
+            try:
+                urls = [url for (url,) in db.query(Event.url).filter(Event.id.in_(batch)).all()]
+                if not await self.images.wait_for(urls, IMAGE_NOTIFY_WAIT):
+                    logger.info(f"Pipeline: some images not ready after {IMAGE_NOTIFY_WAIT}s, notifying without them")
+                events = db.query(Event).filter(Event.id.in_(batch)).order_by(Event.id).all()
+                logger.info(f"Pipeline: notifying users about {len(events)} new events")
+                await notify_users(self.bot, events, db)
+                if self.first_notification_after is None:
+                    self.first_notification_after = time.monotonic() - self.started_at
+                self.notified += len(events)
+            except Exception as e:
+                logger.error(f"Pipeline notify error: {e}", exc_info=True)
+            finally:
+                db.close()
+            self.processed["notify"] += len(batch)
+
+    async def _maintain_archive(self):
+        """Словари сжатия и предел размера архива страниц — в потоке, после цикла."""
+        archive = self.parser.archive
+        if archive is None:
+            return
+        try:
+            await asyncio.to_thread(archive.maintain)
+            logger.info(
+                f"HTML archive: {archive.stored} pages stored this process ({archive.duplicates} unchanged skipped), "
+                f"{archive.size() / 1024 / 1024:.1f} MB"
+            )
+        except Exception as e:
+            logger.warning(f"HTML archive maintenance failed: {e}")
+
+    async def _log_stats_periodically(self):
+        while True:
+            await asyncio.sleep(PIPELINE_STATS_INTERVAL)
+            depths = ", ".join(
+                f"{name} {st['depth']}/{st['capacity']}" for name, st in self.stats().items()
+            )
+            logger.info(f"Pipeline queues: {depths}; crawled {self.crawled}, stored {self.persisted}")
+
+
+_running: Optional[IngestPipeline] = None
+
+
+def get_running_pipeline() -> Optional[IngestPipeline]:
+    """Pipeline of the cycle in progress, or None."""
+    return _running
@@ -0,0 +1,221 @@
+"""
+Per-host politeness for the parser's HTTP client.
+
+Each host gets a token bucket (steady request rate + burst) and an AIMD
+concurrency window: the window grows by ~1 per window of successful responses
+and is halved on 429/503, which also blocks the host for Retry-After seconds.
+Queue depth and wait times are kept per host so the limits can be tuned.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from config import (
+    HOST_RATE_PER_SECOND,
+    HOST_BURST,
+    HOST_INITIAL_CONCURRENCY,
+    HOST_MAX_CONCURRENCY,
+    HTTP_MAX_RETRY_AFTER,
+    HEDGE_MIN_SAMPLES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds (delta-seconds or HTTP-date), capped by HTTP_MAX_RETRY_AFTER."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return max(0.0, min(seconds, HTTP_MAX_RETRY_AFTER))
+
+
+class HostLimiter:
+    """Token bucket + AIMD concurrency window for one host."""
+
+    def __init__(self, host: str, rate: float, burst: int, initial_concurrency: int, max_concurrency: int):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(initial_concurrency)
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self._waiters: deque = deque()
+
+        # Статистика для тюнинга
+        self.queued = 0
+        self.max_queued = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.hedged = 0
+        # Последние задержки ответов листингов — порог для hedged-запросов
+        self.listing_latencies: deque = deque(maxlen=50)
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.concurrency))
+
+    def _wake(self):
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                free -= 1
+
+    async def _acquire_slot(self):
+        while self.in_flight >= self.limit:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                # Отменён уже после пробуждения: слот не занят — будим следующего, иначе он потерян
+                if fut.done() and not fut.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        self.in_flight += 1
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait for a concurrency slot and a token, then hold the slot for one request."""
+        started = time.monotonic()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._acquire_slot()
+        except BaseException:
+            self.queued -= 1
+            raise
+        try:
+            try:
+                await self._take_token()
+            finally:
+                self.queued -= 1
+            waited = time.monotonic() - started
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.requests += 1
+            yield
+        finally:
+            self.in_flight -= 1
+            self._wake()
+
+    def on_success(self):
+        # Additive increase: +1 к окну за каждое «окно» успешных ответов
+        if self.concurrency < self.max_concurrency:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.limit)
+            self._wake()
+
+    def on_throttle(self, retry_after: Optional[float], fallback_delay: float):
+        """429/503: halve the window and block the host for Retry-After (or fallback_delay)."""
+        self.throttled += 1
+        self.concurrency = max(1.0, self.concurrency / 2)
+        delay = retry_after if retry_after is not None else fallback_delay
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        logger.info(f"Throttled by {self.host}: window -> {self.limit}, pausing {delay:.1f}s")
+
+    def on_error(self):
+        self.errors += 1
+
+    def record_listing_latency(self, seconds: float):
+        self.listing_latencies.append(seconds)
+
+    def listing_p95(self) -> Optional[float]:
+        """p95 latency of listing responses, None until HEDGE_MIN_SAMPLES are collected."""
+        if len(self.listing_latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.listing_latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def stats(self) -> Dict:
+        p95 = self.listing_p95()
+        return {
+            'concurrency': self.limit,
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'max_queued': self.max_queued,
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'errors': self.errors,
+            'avg_wait': round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+            'max_wait': round(self.max_wait, 3),
+            'hedged': self.hedged,
+            'listing_p95': round(p95, 3) if p95 is not None else None,
+        }
+
+
+class RateLimiter:
+    """Registry of HostLimiter objects keyed by host name."""
+
+    def __init__(
+        self,
+        rate: float = HOST_RATE_PER_SECOND,
+        burst: int = HOST_BURST,
+        initial_concurrency: int = HOST_INITIAL_CONCURRENCY,
+        max_concurrency: int = HOST_MAX_CONCURRENCY,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._hosts: Dict[str, HostLimiter] = {}
+
+    def for_host(self, host: str) -> HostLimiter:
+        host = (host or '').lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostLimiter(
+                host, self.rate, self.burst, self.initial_concurrency, self.max_concurrency
+            )
+        return self._hosts[host]
+
+    def stats(self) -> Dict[str, Dict]:
+        return {host: limiter.stats() for host, limiter in sorted(self._hosts.items())}
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Process-wide limiter, so AIMD windows survive between parsing cycles."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
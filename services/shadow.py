@@ -0,0 +1,239 @@
+"""
+Shadow mode for candidate extractors.
+
+SHADOW_EXTRACTORS maps a production extractor to a candidate that should
+replace it one day:
+
+    {"extract_iteca": "extract_iteca_v2"}        # EventExtractor method, same arguments
+    {"spec:astanahub": "spec:astanahub_v2"}      # SOURCE_SPECS entry for extract_with_spec
+
+Whenever EventParser._extract runs a shadowed extractor, the production
+result is handed back first; then the candidate runs on the same HTML as a
+separate task (in the extraction pool, or a thread without one), so it never
+delays the crawl. submit() waits for it, times it (CPU) and diffs the records
+field by field against a copy of the production result, matched by URL. The
+candidate's output never reaches the pipeline, the DB or users. Per-extractor
+totals (yield, diff, CPU) accumulate in this process and are shown by /shadow
+and logged after each cycle, once drain() has waited for the comparisons still
+running.
+"""
+import asyncio
+import copy
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config import SHADOW_EXTRACTORS, SHADOW_DIFF_SAMPLES
+
+logger = logging.getLogger(__name__)
+
+_SPEC_METHOD = "extract_with_spec"
+_SPEC_PREFIX = "spec:"
+# Служебные поля, не участвующие в сравнении
+_IGNORED_FIELDS = {"image_candidates"}
+
+
+def shadow_key(method: str, args: tuple) -> Optional[str]:
+    """Key of the production extractor in SHADOW_EXTRACTORS, None if it has no candidate."""
+    if not SHADOW_EXTRACTORS:
+        return None
+    key = f"{_SPEC_PREFIX}{args[0]}" if method == _SPEC_METHOD and args else method
+    return key if key in SHADOW_EXTRACTORS else None
+
+
+def _call_candidate(extractor, candidate: str, method: str, args: tuple):
+    """Run the candidate on the production call's arguments (without the spec name)."""
+    payload = args[1:] if method == _SPEC_METHOD else args
+    if candidate.startswith(_SPEC_PREFIX):
+        return extractor.extract_with_spec(candidate[len(_SPEC_PREFIX):], *payload)
+    return getattr(extractor, candidate)(*payload)
+
+
+def run_candidate(extractor, candidate: str, method: str, args: tuple) -> Tuple[Any, float, Optional[str]]:
+    """Run the candidate alone: (result, CPU seconds of this thread, error).
+
+    Production extraction is timed with the same clock (time.thread_time) in the
+    pool and inline, so the two CPU figures are comparable.
+    """
+    started = time.thread_time()
+    try:
+        result, error = _call_candidate(extractor, candidate, method, args), None
+    except Exception as e:
+        result, error = None, repr(e)
+    return result, time.thread_time() - started, error
+
+
+def run_in_worker(candidate: str, method: str, *args):
+    """Process pool entry point: run_candidate() with the worker's extractor.
+
+    The candidate is passed explicitly — a worker sees config.SHADOW_EXTRACTORS
+    as imported, not as changed at runtime in the bot process.
+    """
+    from services.extraction import worker_extractor
+    return run_candidate(worker_extractor(), candidate, method, args)
+
+
+# Сравнения, чей кандидат ещё работает (ссылки держим, пока задачи не завершатся)
+_pending: Set[asyncio.Task] = set()
+
+
+def submit(key: str, candidate: str, production, cpu: float, future: "asyncio.Future"):
+    """Record the comparison once the candidate's future (run_candidate's result) completes.
+
+    production is copied now: the pipeline goes on changing its records while
+    the candidate runs.
+    """
+    production = copy.deepcopy(production)
+
+    async def finish():
+        try:
+            candidate_result, candidate_cpu, error = await future
+        except Exception as e:
+            logger.warning(f"Shadow candidate {candidate} for {key} did not run: {e!r}")
+            return
+        comparison = diff_records(_records(production), _records(candidate_result))
+        comparison.update(key=key, candidate=candidate, cpu=cpu, candidate_cpu=candidate_cpu, error=error)
+        record(comparison)
+
+    task = asyncio.ensure_future(finish())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def drain():
+    """Wait for the comparisons still running (before reading the report)."""
+    if _pending:
+        await asyncio.gather(*list(_pending), return_exceptions=True)
+
+
+def _records(result) -> List[Dict]:
+    # Методы обхода страниц возвращают (записи, ссылки), детальная страница — одну запись
+    if result is None:
+        return []
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        return [result]
+    return list(result)
+
+
+def _record_key(record: Dict) -> str:
+    return record.get("url") or f"title:{record.get('title', '')}"
+
+
+def diff_records(production: List[Dict], candidate: List[Dict]) -> Dict:
+    """Match records by URL and count differing fields."""
+    prod = {_record_key(r): r for r in production}
+    cand = {_record_key(r): r for r in candidate}
+    fields: Counter = Counter()
+    samples = []
+    identical = 0
+    for key in prod.keys() & cand.keys():
+        a, b = prod[key], cand[key]
+        differing = [f for f in (a.keys() | b.keys()) - _IGNORED_FIELDS if a.get(f) != b.get(f)]
+        if not differing:
+            identical += 1
+        for field in differing:
+            fields[field] += 1
+            if len(samples) < SHADOW_DIFF_SAMPLES:
+                samples.append({"url": key, "field": field, "production": _short(a.get(field)), "candidate": _short(b.get(field))})
+    return {
+        "production_items": len(prod),
+        "candidate_items": len(cand),
+        "matched": len(prod.keys() & cand.keys()),
+        "identical": identical,
+        "only_production": sorted(prod.keys() - cand.keys())[:SHADOW_DIFF_SAMPLES],
+        "only_production_count": len(prod.keys() - cand.keys()),
+        "only_candidate": sorted(cand.keys() - prod.keys())[:SHADOW_DIFF_SAMPLES],
+        "only_candidate_count": len(cand.keys() - prod.keys()),
+        "fields": dict(fields),
+        "samples": samples,
+    }
+
+
+def _short(value) -> str:
+    text = repr(value)
+    return text if len(text) <= 120 else text[:117] + "..."
+
+
+class ShadowStats:
+    def __init__(self, key: str, candidate: str):
+        self.key = key
+        self.candidate = candidate
+        self.calls = 0
+        self.cpu = 0.0
+        self.candidate_cpu = 0.0
+        self.production_items = 0
+        self.candidate_items = 0
+        self.matched = 0
+        self.identical = 0
+        self.only_production = 0
+        self.only_candidate = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.fields: Counter = Counter()
+        self.samples: List[Dict] = []
+
+    def add(self, comparison: Dict):
+        self.calls += 1
+        self.cpu += comparison["cpu"]
+        self.candidate_cpu += comparison["candidate_cpu"]
+        self.production_items += comparison["production_items"]
+        self.candidate_items += comparison["candidate_items"]
+        self.matched += comparison["matched"]
+        self.identical += comparison["identical"]
+        self.only_production += comparison["only_production_count"]
+        self.only_candidate += comparison["only_candidate_count"]
+        self.fields.update(comparison["fields"])
+        if comparison["error"]:
+            self.errors += 1
+            self.last_error = comparison["error"]
+        room = SHADOW_DIFF_SAMPLES - len(self.samples)
+        if room > 0:
+            self.samples.extend(comparison["samples"][:room])
+            self.samples.extend(
+                {"url": url, "field": "(нет у кандидата)"} for url in comparison["only_production"][:room]
+            )
+            self.samples = self.samples[:SHADOW_DIFF_SAMPLES]
+
+    def summary(self) -> str:
+        cpu_change = f"{(self.candidate_cpu - self.cpu) / self.cpu:+.0%}" if self.cpu else "—"
+        fields = ", ".join(f"{f} {n}" for f, n in self.fields.most_common(5)) or "нет"
+        line = (
+            f"{self.key} → {self.candidate}: вызовов {self.calls}, записей {self.production_items} → {self.candidate_items}, "
+            f"совпало {self.matched} (идентичны {self.identical}), только в боевом {self.only_production}, "
+            f"только в кандидате {self.only_candidate}; различия по полям: {fields}; "
+            f"CPU {self.cpu:.2f}с → {self.candidate_cpu:.2f}с ({cpu_change})"
+        )
+        if self.errors:
+            line += f"; ошибок кандидата {self.errors}: {self.last_error}"
+        return line
+
+
+_stats: Dict[str, ShadowStats] = {}
+_since = datetime.now()
+
+
+def record(comparison: Dict):
+    key = comparison["key"]
+    if key not in _stats:
+        _stats[key] = ShadowStats(key, comparison["candidate"])
+    _stats[key].add(comparison)
+
+
+def get_report() -> Tuple[datetime, List[ShadowStats]]:
+    """Accumulated stats per shadowed extractor and since when they are collected."""
+    return _since, list(_stats.values())
+
+
+def reset():
+    global _since
+    _stats.clear()
+    _since = datetime.now()
+
+
+def log_report():
+    for stats in _stats.values():
+        logger.info(f"Shadow: {stats.summary()}")
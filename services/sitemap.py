@@ -0,0 +1,113 @@
+"""
+Sitemap reading and last-seen <lastmod> bookkeeping for incremental discovery.
+
+parse_sitemap() understands <urlset> and <sitemapindex> documents, plain or
+gzip-compressed (inflated up to SITEMAP_MAX_BYTES). The sitemap_entries table remembers the last lastmod seen per
+URL, so the parser fetches detail pages only for URLs that are new or changed.
+"""
+import logging
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from lxml import etree
+
+from config import SITEMAP_MAX_BYTES
+from database.engine import SessionLocal
+from database.models import SitemapEntry
+
+logger = logging.getLogger(__name__)
+
+_XML_PARSER = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+
+
+def _gunzip(content: bytes, limit: int = SITEMAP_MAX_BYTES) -> bytes:
+    """Inflate a gzip document, refusing one that expands beyond limit bytes."""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    data = inflater.decompress(content, limit)
+    if inflater.unconsumed_tail or (len(data) >= limit and not inflater.eof):
+        raise ValueError(f"sitemap expands beyond {limit} bytes")
+    return data
+
+
+def parse_sitemap(content: bytes) -> Tuple[List[Tuple[str, Optional[str]]], List[Tuple[str, Optional[str]]]]:
+    """Return (page URLs, child sitemap URLs), each as (loc, lastmod) pairs."""
+    if content[:2] == b'\x1f\x8b':
+        content = _gunzip(content)
+    root = etree.fromstring(content, parser=_XML_PARSER)
+    if root is None:
+        return [], []
+
+    pages, sitemaps = [], []
+    is_index = etree.QName(root).localname == 'sitemapindex'
+    for node in root:
+        if not isinstance(node.tag, str):
+            continue
+        loc = lastmod = None
+        for field in node:
+            if not isinstance(field.tag, str):
+                continue
+            name = etree.QName(field).localname
+            if name == 'loc':
+                loc = (field.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = (field.text or '').strip() or None
+        if not loc:
+            continue
+        (sitemaps if is_index else pages).append((loc, lastmod))
+    return pages, sitemaps
+
+
+def get_lastmods(urls: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Stored lastmod for every already-seen URL among urls."""
+    urls = list(urls)
+    if not urls:
+        return {}
+    db = SessionLocal()
+    try:
+        result = {}
+        for i in range(0, len(urls), 500):
+            rows = db.query(SitemapEntry.url, SitemapEntry.lastmod).filter(
+                SitemapEntry.url.in_(urls[i:i + 500])
+            ).all()
+            result.update({url: lastmod for url, lastmod in rows})
+        return result
+    finally:
+        db.close()
+
+
+def changed_entries(entries: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, Optional[str]]]:
+    """Entries that are new or whose lastmod differs from the stored one."""
+    known = get_lastmods(loc for loc, _ in entries)
+    return [
+        (loc, lastmod) for loc, lastmod in entries
+        if loc not in known or (lastmod and lastmod != known[loc])
+    ]
+
+
+def save_lastmods(entries: List[Tuple[str, Optional[str]]], source: str, is_sitemap: bool = False):
+    """Remember entries as processed (insert or update lastmod)."""
+    if not entries:
+        return
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        for i in range(0, len(entries), 500):
+            batch = entries[i:i + 500]
+            by_url = {e.url: e for e in db.query(SitemapEntry).filter(
+                SitemapEntry.url.in_([loc for loc, _ in batch])
+            ).all()}
+            for loc, lastmod in batch:
+                entry = by_url.get(loc)
+                if entry is None:
+                    entry = SitemapEntry(url=loc, source=source, is_sitemap=is_sitemap)
+                    db.add(entry)
+                    by_url[loc] = entry
+                entry.lastmod = lastmod
+                entry.processed_at = now
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to save sitemap state for {source}: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,105 @@
+"""
+Per-source circuit breakers persisted in the source_health table.
+
+closed    — source is parsed every cycle;
+open      — source failed CIRCUIT_FAILURE_THRESHOLD cycles in a row and is skipped
+            until open_until;
+half_open — open_until has passed, the next cycle runs one probe: success closes
+            the breaker, failure re-opens it with a doubled backoff.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from database.engine import SessionLocal
+from database.models import SourceHealth
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_BASE_HOURS, CIRCUIT_OPEN_MAX_HOURS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _open_duration(consecutive_failures: int) -> timedelta:
+    """6h after reaching the threshold, then doubled per failed probe, capped."""
+    exponent = max(0, consecutive_failures - CIRCUIT_FAILURE_THRESHOLD)
+    hours = min(CIRCUIT_OPEN_BASE_HOURS * (2 ** exponent), CIRCUIT_OPEN_MAX_HOURS)
+    return timedelta(hours=hours)
+
+
+def allow_request(source: str) -> bool:
+    """True if the source should be parsed this cycle (closed or due for a half-open probe)."""
+    db = SessionLocal()
+    try:
+        health = db.query(SourceHealth).filter(SourceHealth.source == source).first()
+        if not health or health.state == CLOSED:
+            return True
+        if health.state == OPEN and health.open_until and health.open_until > datetime.utcnow():
+            return False
+        health.state = HALF_OPEN
+        db.commit()
+        logger.info(f"Circuit half-open for {source}: probing after {health.consecutive_failures} failures")
+        return True
+    except Exception as e:
+        # Состояние breaker'а не должно ломать парсинг
+        logger.warning(f"Circuit state unavailable for {source}: {e}")
+        return True
+    finally:
+        db.close()
+
+
+def record_success(source: str):
+    db = SessionLocal()
+    try:
+        health = db.query(SourceHealth).filter(SourceHealth.source == source).first()
+        if not health:
+            health = SourceHealth(source=source)
+            db.add(health)
+        elif health.state != CLOSED:
+            logger.info(f"Circuit closed for {source}: source is back")
+        health.state = CLOSED
+        health.consecutive_failures = 0
+        health.open_until = None
+        health.last_success_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to record success for {source}: {e}")
+    finally:
+        db.close()
+
+
+def record_failure(source: str, error: Optional[str] = None):
+    db = SessionLocal()
+    try:
+        health = db.query(SourceHealth).filter(SourceHealth.source == source).first()
+        if not health:
+            health = SourceHealth(source=source, consecutive_failures=0)
+            db.add(health)
+        now = datetime.utcnow()
+        health.consecutive_failures = (health.consecutive_failures or 0) + 1
+        health.last_failure_at = now
+        health.last_error = (error or "")[:1000] or None
+        if health.state == HALF_OPEN or health.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+            health.state = OPEN
+            health.open_until = now + _open_duration(health.consecutive_failures)
+            logger.warning(
+                f"Circuit open for {source} until {health.open_until:%Y-%m-%d %H:%M} UTC "
+                f"({health.consecutive_failures} consecutive failures): {error}"
+            )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Failed to record failure for {source}: {e}")
+    finally:
+        db.close()
+
+
+def get_source_health() -> List[SourceHealth]:
+    db = SessionLocal()
+    try:
+        return db.query(SourceHealth).order_by(SourceHealth.source).all()
+    finally:
+        db.close()
@@ -0,0 +1,205 @@
+"""
+Declarative extraction specs for card-based listing pages.
+
+A spec describes where the event cards are (items) and where each field
+lives inside a card (fields), plus a few rules for dates, city, URL and
+images. compile_spec() turns every selector into an lxml XPath object once
+per process; EventExtractor.extract_with_spec() evaluates them over a single
+lxml tree.
+
+Selector syntax:
+    "h5, h4, h3"                 CSS (cssselect); several alternatives → first in document order
+    "div.event-thumb img@src"    trailing @attr selects the attribute value
+    "xpath:ancestor::a[1]/@href" raw XPath relative to the card
+A field may also be a list of selectors: the first one with a non-empty value wins.
+
+Spec keys:
+    source, country         record defaults (parse_generic overrides them)
+    base_url                base for relative links (default: page URL)
+    items                   card selector(s), evaluated over the whole document
+    items_fallback          used when items match nothing; items_limit caps it
+    fields                  field name → selector(s); title is required, name (default: the
+                            title) must have at least 5 characters for the card to be kept
+    title_max               truncate title/name (default: no limit)
+    clean_title             _clean_title (True) or just _clean_text (False)
+    url_required            drop cards without a link instead of using the page URL
+    description_from        fields joined with ". " into the description (default: description)
+    date_from               fields whose joined text is searched for dates
+    date_fallback           fields tried when date_from yields no date
+    city_from, city_default city: first field where a known city is found, else default
+    place_strip             regex removed from the place text
+    image                   "auto" (image heuristics over the card) or "field" (fields["image"])
+    relevance               keep only cards that pass _is_relevant()
+"""
+import re
+from typing import Dict, List
+
+from cssselect import HTMLTranslator
+import lxml.html
+from lxml import etree
+
+_TRANSLATOR = HTMLTranslator()
+_ATTR_SUFFIX_RE = re.compile(r'^(.*?)@([\w:-]+)$')
+
+SOURCE_SPECS: Dict[str, Dict] = {
+    "astanahub": {
+        "source": "astanahub.com",
+        "country": "Казахстан",
+        "base_url": "https://astanahub.com",
+        # <a> оборачивает div.event-card
+        "items": "div.event-card",
+        "fields": {
+            "title": "h5, h4, h3",
+            "url": "xpath:ancestor::a[@href][1]/@href",
+            "description": "p",
+            "date": "div.event-card-date span",
+            "image": "div.event-thumb img[src*='/media/']@src",
+        },
+        "date_from": ["title", "description", "date"],
+        "city_from": ["title"],
+        "city_default": "Астана",
+        "image": "field",
+        "relevance": True,
+    },
+    "iteca_uz": {
+        "source": "iteca.uz",
+        "country": "Узбекистан",
+        "base_url": "https://iteca.uz",
+        # Каждое событие — <a href="..."> с вложенными img, time, h4 (короткое), h3 (полное название), p (место)
+        "items": "xpath://a[@href][.//h3 or .//h4]",
+        "fields": {
+            "title": ["h4", "h3"],
+            "name": ["h3", "h4"],
+            "full_title": "h3",
+            "url": "xpath:@href",
+            "date": "time",
+            "place": "p",
+            "image": ["img@src", "img@data-src"],
+        },
+        "clean_title": False,
+        "url_required": True,
+        "description_from": ["full_title", "place"],
+        "date_from": ["date"],
+        "date_fallback": ["name"],
+        "city_from": ["place", "name"],
+        "city_default": "Ташкент",
+        "place_strip": r"^Место проведения:\s*",
+        "image": "field",
+        "relevance": False,
+    },
+    "iteca_az": {
+        "source": "iteca.az",
+        "country": "Азербайджан",
+        "base_url": "https://iteca.az",
+        # div.event-item: <a title="..."> с названием, дата в тексте, первая внешняя ссылка — сайт выставки
+        "items": "div.event-item",
+        "fields": {
+            "title": "a[title]@title",
+            "url": "xpath:.//a[starts-with(@href, 'http')][not(contains(@href, 'get-the-ticket'))]"
+                   "[not(contains(@href, 'reservation'))]/@href",
+            "text": "xpath:.",
+            "image": "img@src",
+        },
+        "clean_title": False,
+        "url_required": True,
+        "description_from": ["title"],
+        "date_from": ["text"],
+        "city_default": "Баку",
+        "image": "field",
+        "relevance": False,
+    },
+    "generic": {
+        "source": None,
+        "country": "Казахстан",
+        "items": [
+            ".exhibition", ".event", ".item", "article", "[class*='expo']",
+            ".news", ".card", ".post", ".entry", "[class*='event-']", "[class*='news-']",
+        ],
+        # Если карточек нет — первые 80 ссылок страницы
+        "items_fallback": "a[href]",
+        "items_limit": 80,
+        "fields": {
+            "title": ["h2, h3, h4", "xpath:self::a[@href]"],
+            "url": ["a[href]@href", "xpath:self::a/@href"],
+            "description": "p",
+        },
+        "title_max": 200,
+        "date_from": ["title", "description"],
+        "city_from": ["title", "description"],
+        "image": "auto",
+        "relevance": True,
+    },
+}
+
+
+def _compile_selector(selector: str, prefix: str) -> etree.XPath:
+    if selector.startswith('xpath:'):
+        return etree.XPath(selector[len('xpath:'):])
+    attr = None
+    m = _ATTR_SUFFIX_RE.match(selector)
+    if m:
+        selector, attr = m.group(1), m.group(2)
+    expr = _TRANSLATOR.css_to_xpath(selector, prefix=prefix)
+    if attr:
+        expr = f"({expr})/@{attr}"
+    return etree.XPath(expr)
+
+
+class CompiledSpec:
+    """A spec with every selector compiled to lxml XPath."""
+
+    def __init__(self, name: str, spec: Dict):
+        self.name = name
+        self.spec = spec
+        items = spec['items'] if isinstance(spec['items'], list) else [spec['items']]
+        # Объединение XPath: один проход по документу, узлы в порядке документа и без повторов
+        self.items = etree.XPath(' | '.join(
+            s[len('xpath:'):] if s.startswith('xpath:') else _TRANSLATOR.css_to_xpath(s, prefix='descendant-or-self::')
+            for s in items
+        ))
+        fallback = spec.get('items_fallback')
+        self.items_fallback = _compile_selector(fallback, 'descendant-or-self::') if fallback else None
+        self.fields: Dict[str, List[etree.XPath]] = {}
+        for field, selectors in spec['fields'].items():
+            if not isinstance(selectors, list):
+                selectors = [selectors]
+            self.fields[field] = [_compile_selector(s, 'descendant::') for s in selectors]
+        self.place_strip = re.compile(spec['place_strip'], re.IGNORECASE) if spec.get('place_strip') else None
+
+    def find_items(self, doc) -> list:
+        items = self.items(doc)
+        if not items and self.items_fallback is not None:
+            items = self.items_fallback(doc)[:self.spec.get('items_limit')]
+        return items
+
+    def values(self, item, field: str) -> List[str]:
+        """All raw values of the first selector of field that matches anything."""
+        for xpath in self.fields.get(field, ()):
+            result = xpath(item)
+            values = [r if isinstance(r, str) else r.text_content() for r in result]
+            values = [v for v in values if v and v.strip()]
+            if values:
+                return values
+        return []
+
+    def first(self, item, field: str) -> str:
+        values = self.values(item, field)
+        return values[0] if values else ''
+
+
+_compiled: Dict[str, CompiledSpec] = {}
+
+
+def compile_spec(name: str) -> CompiledSpec:
+    """Compiled spec by name, cached per process (each pool worker compiles once)."""
+    if name not in _compiled:
+        _compiled[name] = CompiledSpec(name, SOURCE_SPECS[name])
+    return _compiled[name]
+
+
+_HTML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def parse_html(html: str) -> lxml.html.HtmlElement:
+    """lxml document for html (encoding declarations in the markup are ignored)."""
+    return lxml.html.document_fromstring(html.encode('utf-8'), parser=_HTML_PARSER)
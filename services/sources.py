@@ -0,0 +1,156 @@
+"""
+Source registry: every crawlable source with its refresh cadence, priority
+and dependencies.
+
+A source is a named factory that starts its parse_* coroutine on a given
+EventParser. EventParser.stream_sources() runs a selection of sources in priority
+order under MAX_CONCURRENT_SOURCES, starting a source only after its
+dependencies from the same run have finished. The scheduler refreshes every
+source with a cadence on its own interval timer; the rest are refreshed by
+the daily full cycle.
+"""
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Coroutine, Dict, List, Optional, Tuple
+
+from config import (
+    SITEMAP_SOURCES, COUNTRY_SOURCES, SOURCE_CADENCE_MINUTES, SOURCE_PRIORITIES,
+    DEFAULT_SOURCE_PRIORITY, SOURCE_DEPENDENCIES,
+)
+
+if TYPE_CHECKING:
+    from services.parser import EventParser
+
+logger = logging.getLogger(__name__)
+
+# parse(parser) -> корутина парсера, возвращающая список событий
+ParseFactory = Callable[["EventParser"], Coroutine]
+
+# Хосты с собственными парсерами — их страницы из COUNTRY_SOURCES не дублируются generic'ом
+_DEDICATED_HOSTS = ("uzexpocentre.uz", "iteca.uz", "bakuexpo.center", "iteca.az")
+_EXTRA_COUNTRIES = ("Узбекистан", "Азербайджан", "Таджикистан", "Туркменистан", "Грузия", "Армения", "Кыргызстан")
+
+
+class Source:
+    def __init__(
+        self,
+        name: str,
+        parse: ParseFactory,
+        cadence_minutes: Optional[int] = None,
+        priority: int = DEFAULT_SOURCE_PRIORITY,
+        depends_on: Optional[List[str]] = None,
+    ):
+        self.name = name
+        self.parse = parse
+        self.cadence_minutes = cadence_minutes
+        self.priority = priority
+        self.depends_on = list(depends_on or [])
+
+    def __repr__(self) -> str:
+        return f"Source({self.name!r}, cadence={self.cadence_minutes}, priority={self.priority})"
+
+
+def _method(name: str, *args, **kwargs) -> ParseFactory:
+    return lambda parser: getattr(parser, name)(*args, **kwargs)
+
+
+def _country_source(url: str, country: str) -> Tuple[str, ParseFactory]:
+    if "exposale" in url:
+        return f"exposale_{country}", _method("parse_exposale_country", url, country)
+    if "vystavki.su" in url:
+        return f"vystavki_{country}", _method("parse_vystavki_country", url, country)
+    source_name = url.split('/')[2] if '//' in url else url
+    return f"generic_{source_name}", _method("parse_generic", url, source_name, country)
+
+
+def _check_dependencies(sources: Dict[str, Source]):
+    """Drop unknown dependencies and break cycles, so stream_sources can never deadlock."""
+    for source in sources.values():
+        unknown = [d for d in source.depends_on if d not in sources]
+        if unknown:
+            logger.warning(f"Source {source.name}: unknown dependencies {unknown} ignored")
+            source.depends_on = [d for d in source.depends_on if d in sources]
+
+    state: Dict[str, int] = {}  # 1 — в обходе, 2 — проверен
+
+    def visit(name: str):
+        state[name] = 1
+        source = sources[name]
+        for dep in list(source.depends_on):
+            if state.get(dep) == 1:
+                logger.warning(f"Source {name}: dependency cycle through {dep}, dependency dropped")
+                source.depends_on.remove(dep)
+            elif dep not in state:
+                visit(dep)
+        state[name] = 2
+
+    for name in sources:
+        if name not in state:
+            visit(name)
+
+
+def build_registry() -> Dict[str, Source]:
+    """All sources, in the order their results are merged (before priority sorting)."""
+    entries: List[Tuple[str, ParseFactory]] = [
+        ("parse_iteca", _method("parse_iteca")),
+        ("parse_astanahub", _method("parse_astanahub")),
+        ("parse_exposale_all", _method("parse_exposale_all")),
+        ("parse_vystavki_main", _method("parse_vystavki_main")),
+        ("parse_expomap", _method("parse_expomap")),
+        # Нестабильные сайты (qazexpo.kz, expo-centralasia.com, atakent-expo.kz, worldexpo.pro,
+        # bakuexpo.center) не отключаются вручную — их пропускает circuit breaker
+        ("parse_atakent", _method("parse_atakent")),
+        ("parse_qazexpo", _method("parse_qazexpo")),
+        ("parse_expo_centralasia", _method("parse_expo_centralasia")),
+        ("parse_worldexpo", _method("parse_worldexpo")),
+    ]
+    # Инкрементальные источники по sitemap.xml
+    for cfg in SITEMAP_SOURCES:
+        entries.append((f"sitemap_{cfg['source']}", _method("parse_sitemap_source", **cfg)))
+    # CIS парсеры
+    entries += [
+        ("parse_uzexpocentre", _method("parse_uzexpocentre")),
+        ("parse_iteca_uz", _method("parse_iteca_uz")),
+        ("parse_iteca_az", _method("parse_iteca_az")),
+        ("parse_bakuexpo", _method("parse_bakuexpo")),
+    ]
+    # Дополнительные country-specific страницы
+    for country in _EXTRA_COUNTRIES:
+        for url in COUNTRY_SOURCES.get(country, []):
+            if any(host in url for host in _DEDICATED_HOSTS):
+                continue
+            entries.append(_country_source(url, country))
+
+    sources: Dict[str, Source] = {}
+    for name, parse in entries:
+        if name in sources:
+            # Несколько страниц одной страны (exposale_Грузия и т.п.) — один источник
+            previous = sources[name].parse
+            sources[name].parse = _chain(previous, parse)
+            continue
+        sources[name] = Source(
+            name,
+            parse,
+            cadence_minutes=SOURCE_CADENCE_MINUTES.get(name),
+            priority=SOURCE_PRIORITIES.get(name, DEFAULT_SOURCE_PRIORITY),
+            depends_on=SOURCE_DEPENDENCIES.get(name),
+        )
+    _check_dependencies(sources)
+    return sources
+
+
+def _chain(first: ParseFactory, second: ParseFactory) -> ParseFactory:
+    async def run(parser):
+        results = await asyncio.gather(first(parser), second(parser))
+        return [e for events in results for e in events]
+    return run
+
+
+_registry: Optional[Dict[str, Source]] = None
+
+
+def get_source_registry() -> Dict[str, Source]:
+    global _registry
+    if _registry is None:
+        _registry = build_registry()
+    return _registry
@@ -0,0 +1,93 @@
+"""
+Embedded JSON scanner: JSON-LD, Next.js RSC (self.__next_f.push) and __NEXT_DATA__.
+
+Works on the raw HTML string without building a DOM: script tags are located
+by a regex over opening tags, and values are decoded in place with
+json.JSONDecoder.raw_decode, which stops at the end of the JSON value and
+ignores whatever follows it (closing tags, trailing JS).
+"""
+import json
+import re
+from typing import Any, Iterator, Optional, Tuple
+
+_DECODER = json.JSONDecoder()
+_SCRIPT_TAG_RE = re.compile(r'<script\b([^>]*)>', re.IGNORECASE)
+_JSON_LD_TYPE_RE = re.compile(r'type\s*=\s*["\']?application/ld\+json', re.IGNORECASE)
+_NEXT_DATA_ID_RE = re.compile(r'id\s*=\s*["\']?__NEXT_DATA__\b', re.IGNORECASE)
+_NEXT_F_MARKER = 'self.__next_f.push('
+# Обёртки, которые CMS иногда ставят вокруг JSON в <script>
+_WRAPPERS = ('<!--', '//<![CDATA[', '<![CDATA[')
+
+
+def _decode_at(text: str, pos: int) -> Tuple[Any, int]:
+    """Decode one JSON value starting at pos (leading whitespace skipped).
+
+    Returns (value, end) or (None, -1) if there is no valid JSON there.
+    """
+    length = len(text)
+    while pos < length and text[pos] in ' \t\r\n':
+        pos += 1
+    for wrapper in _WRAPPERS:
+        if text.startswith(wrapper, pos):
+            pos += len(wrapper)
+            while pos < length and text[pos] in ' \t\r\n':
+                pos += 1
+            break
+    try:
+        return _DECODER.raw_decode(text, pos)
+    except ValueError:
+        return None, -1
+
+
+def _script_bodies(html: str, attr_re: re.Pattern) -> Iterator[int]:
+    """Start offsets of <script> bodies whose attributes match attr_re."""
+    for m in _SCRIPT_TAG_RE.finditer(html):
+        if attr_re.search(m.group(1)):
+            yield m.end()
+
+
+def iter_json_ld(html: str) -> Iterator[dict]:
+    """Every JSON-LD object on the page; top-level lists and @graph are flattened."""
+    for start in _script_bodies(html, _JSON_LD_TYPE_RE):
+        value, _ = _decode_at(html, start)
+        stack = value if isinstance(value, list) else [value]
+        for item in stack:
+            if not isinstance(item, dict):
+                continue
+            graph = item.get('@graph')
+            if isinstance(graph, list):
+                yield from (node for node in graph if isinstance(node, dict))
+            else:
+                yield item
+
+
+def next_data(html: str) -> Optional[dict]:
+    """Decoded <script id="__NEXT_DATA__"> (Next.js pages router), or None."""
+    for start in _script_bodies(html, _NEXT_DATA_ID_RE):
+        value, _ = _decode_at(html, start)
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def next_f_payload(html: str) -> str:
+    """RSC payload (Next.js app router): joined string chunks of self.__next_f.push([1, "..."])."""
+    parts = []
+    pos = html.find(_NEXT_F_MARKER)
+    while pos >= 0:
+        value, end = _decode_at(html, pos + len(_NEXT_F_MARKER))
+        if isinstance(value, list) and len(value) >= 2 and isinstance(value[1], str):
+            parts.append(value[1])
+        pos = html.find(_NEXT_F_MARKER, max(end, pos + len(_NEXT_F_MARKER)))
+    return ''.join(parts)
+
+
+def find_json_values(text: str, key: str) -> Iterator[Any]:
+    """Decoded values of every "key": occurrence in a JSON-bearing text (e.g. an RSC payload)."""
+    marker = f'"{key}":'
+    pos = text.find(marker)
+    while pos >= 0:
+        value, end = _decode_at(text, pos + len(marker))
+        if end >= 0:
+            yield value
+        pos = text.find(marker, pos + len(marker))
+
@@ -0,0 +1,21 @@
+"""
+Test setup: the repository on sys.path and a throwaway database and work paths.
+
+The environment is set before any project module is imported, because config
+and database.engine read it at import time.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+WORKDIR = Path(tempfile.mkdtemp(prefix="events-bot-tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{WORKDIR / 'test.db'}"
+os.environ["KNOWN_FILTER_PATH"] = str(WORKDIR / "known_events.bloom")
+os.environ["HTTP_CACHE_DIR"] = str(WORKDIR / "http_cache")
+os.environ["CHECKPOINTS_DIR"] = str(WORKDIR / "checkpoints")
+os.environ["HTML_ARCHIVE_DIR"] = str(WORKDIR / "html_archive")
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,80 @@
+"""Checkpoints: what CheckpointWriter writes, Checkpoint reads back."""
+import gzip
+from datetime import datetime
+
+import pytest
+
+from services import checkpoints
+from services.checkpoints import Checkpoint, CheckpointWriter, checkpoint_path, list_checkpoints
+
+
+@pytest.fixture(autouse=True)
+def checkpoints_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINTS_DIR", str(tmp_path))
+    return tmp_path
+
+
+EVENT = {
+    "title": "KIOGE 2026",
+    "url": "https://kioge.kz/ru/",
+    "start_date": datetime(2026, 10, 29),
+    "end_date": None,
+    "image_candidates": ["https://kioge.kz/logo.png"],
+}
+
+
+def test_round_trip():
+    writer = CheckpointWriter(["parse_kioge"])
+    writer.raw("parse_kioge", [EVENT, {**EVENT, "url": "https://kioge.kz/en/"}])
+    writer.normalized("parse_kioge", {**EVENT, "description": "Нефть и газ"})
+    writer.close(persisted=1)
+
+    checkpoint = Checkpoint(checkpoint_path())
+    assert checkpoint.meta["sources"] == ["parse_kioge"]
+    assert checkpoint.summary["raw"] == 2
+    assert checkpoint.summary["persisted"] == 1
+    assert len(checkpoint) == 2
+    [(source, events)] = list(checkpoint.batches())
+    assert source == "parse_kioge"
+    assert events[0] == EVENT
+    assert isinstance(events[0]["start_date"], datetime)
+    assert checkpoint.normalized["https://kioge.kz/ru/"]["description"] == "Нефть и газ"
+
+
+def test_batches_are_copies():
+    writer = CheckpointWriter()
+    writer.raw("parse_kioge", [EVENT])
+    writer.close()
+    checkpoint = Checkpoint(checkpoint_path())
+    next(checkpoint.batches())[1][0]["title"] = "changed"
+    assert next(checkpoint.batches())[1][0]["title"] == "KIOGE 2026"
+
+
+def test_truncated_checkpoint_keeps_complete_records(checkpoints_dir):
+    writer = CheckpointWriter()
+    writer.raw("parse_kioge", [EVENT])
+    writer.close()
+    path = checkpoint_path()
+    data = gzip.decompress(path.read_bytes())
+    path.write_bytes(gzip.compress(data[:data.rindex(b'{"type": "end"') + 10]))
+
+    checkpoint = Checkpoint(path)
+    assert checkpoint.summary is None
+    assert len(checkpoint) == 1
+
+
+def test_checkpoint_path_by_name(checkpoints_dir):
+    writer = CheckpointWriter()
+    writer.close()
+    stem = writer.path.name[:-len(".jsonl.gz")]
+    assert checkpoint_path(stem) == writer.path
+    assert list_checkpoints() == [writer.path]
+    with pytest.raises(FileNotFoundError):
+        checkpoint_path("19700101-000000")
+
+
+def test_other_format_is_rejected(checkpoints_dir):
+    path = checkpoints_dir / "old.jsonl.gz"
+    path.write_bytes(gzip.compress(b'{"type": "cycle", "format": 0}\n'))
+    with pytest.raises(ValueError):
+        Checkpoint(path)
@@ -0,0 +1,73 @@
+"""Crawl budget: scoring from crawl_runs, feedback and exclusions, and what the scores allow."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.engine import SessionLocal, init_db
+from database.models import CrawlRun, Feedback, SourceBudget, User, UserEvent
+from services import crawl_budget
+from services.sources import Source
+
+
+def _source(name, priority=100):
+    return Source(name, parse=lambda parser: None, priority=priority)
+
+
+@pytest.fixture
+def history():
+    """Три запуска у hi/mid/lo/ex, один у new; ex исключили все активные пользователи."""
+    init_db()
+    db = SessionLocal()
+    for model in (Feedback, UserEvent, User, CrawlRun, SourceBudget):
+        db.query(model).delete()
+    day_ago = datetime.utcnow() - timedelta(days=1)
+    for name, new in (("hi", 20), ("mid", 4), ("lo", 0), ("ex", 4)):
+        for i in range(3):
+            db.add(CrawlRun(cycle_started_at=day_ago - timedelta(days=i), source=name, items_new=new))
+    db.add(CrawlRun(cycle_started_at=day_ago, source="new", items_new=50))
+    db.add(SourceBudget(source="ex", event_sources=["ex.kz"]))
+    for telegram_id in (1, 2):
+        db.add(User(telegram_id=telegram_id, is_active=True, feedback_metadata={"excluded_sources": ["ex.kz", "x.kz"]}))
+    db.add(User(telegram_id=3, is_active=False, feedback_metadata={}))
+    db.commit()
+    db.close()
+    crawl_budget.refresh()
+    return crawl_budget.get_crawl_budget()
+
+
+def test_score_formula():
+    assert crawl_budget._score(4, 4, None, 0) == 1
+    # Смягчение на одно событие: источник без новых против медианы 4
+    assert crawl_budget._score(0, 4, None, 0) == pytest.approx(0.2)
+    assert crawl_budget._score(4, 4, 1.0, 0) == 1.5
+    assert crawl_budget._score(4, 4, None, 0.5) == 0.5
+
+
+def test_refresh_scores_sources(history):
+    hi, mid, lo, new, ex = (history.budgets[n] for n in ("hi", "mid", "lo", "new", "ex"))
+    # Медиана установившихся источников — 4 (hi 20, mid 4, ex 4, lo 0)
+    assert hi["score"] == pytest.approx(4.2) and mid["score"] == 1 and lo["score"] == pytest.approx(0.2)
+    assert hi["interval_hours"] == 24 and hi["page_factor"] == 2.0 and hi["detail_limit"] == 120
+    assert lo["interval_hours"] == 120 and lo["page_factor"] == 0.5 and lo["detail_limit"] == 10
+    # Мало истории — нейтральная оценка, несмотря на удачный запуск
+    assert new["score"] == 1 and new["runs"] == 1
+    assert ex["excluded_share"] == 1 and ex["score"] == 0
+    assert ex["interval_hours"] == crawl_budget.CRAWL_BUDGET_EXCLUDED_DAYS * 24
+
+
+def test_select_drops_sources_not_due_and_orders_by_score(history):
+    sources = [_source("lo"), _source("ex"), _source("mid"), _source("hi"), _source("first", priority=10)]
+    assert [s.name for s in history.select(sources)] == ["first", "hi", "mid"]
+    # Срок замедленного источника подошёл — он снова обходится
+    later = datetime.utcnow() + timedelta(days=5)
+    assert history.is_due(_source("lo"), later)
+    assert history.pages("lo", 10) == 5 and history.pages("unknown", 10) == 10
+    assert history.detail_limit("unknown") is None
+
+
+def test_fully_excluded_source_is_never_crawled_without_excluded_days(history, monkeypatch):
+    monkeypatch.setattr(crawl_budget, "CRAWL_BUDGET_EXCLUDED_DAYS", 0)
+    crawl_budget.refresh()
+    budget = crawl_budget.get_crawl_budget()
+    assert budget.budgets["ex"]["interval_hours"] is None
+    assert not budget.is_due(_source("ex"), datetime.utcnow() + timedelta(days=365))
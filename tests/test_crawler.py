@@ -0,0 +1,131 @@
+"""CachingNetworkBackend and CrawlerTransport: DNS cache, address fall-through, real round-trip."""
+import asyncio
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpcore
+import httpx
+import pytest
+
+from services import crawler
+from services.crawler import CachingNetworkBackend, CrawlerState, NetworkStats
+
+
+class FakeBackend(httpcore.AsyncNetworkBackend):
+    """Backend, который «подключается» только к адресам из up."""
+
+    def __init__(self, up):
+        self.up = set(up)
+        self.attempts = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.attempts.append(host)
+        if host not in self.up:
+            raise httpcore.ConnectError(f"{host} unreachable")
+        return object()
+
+    async def sleep(self, seconds):
+        pass
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    """getaddrinfo на фиксированный список адресов, с подсчётом вызовов."""
+    calls = []
+
+    async def fake_getaddrinfo(self, host, port, **kwargs):
+        calls.append(host)
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port)),
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.2", port)),
+        ]
+
+    monkeypatch.setattr(asyncio.BaseEventLoop, "getaddrinfo", fake_getaddrinfo)
+    return calls
+
+
+def test_connect_falls_through_cached_addresses(resolver):
+    fake = FakeBackend(up={"10.0.0.2"})
+    stats = NetworkStats()
+    backend = CachingNetworkBackend(fake, stats, ttl=60)
+
+    async def run():
+        await backend.connect_tcp("a.kz", 443)
+        await backend.connect_tcp("a.kz", 443)
+
+    asyncio.run(run())
+    # Дубль 10.0.0.1 убран, после отказа первого адреса берётся второй — и так же из кэша
+    assert fake.attempts == ["10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.2"]
+    assert resolver == ["a.kz"]
+    st = stats.stats()["a.kz"]
+    assert st["dns_lookups"] == 1 and st["dns_cache_hits"] == 1 and st["connects"] == 2
+
+
+def test_all_addresses_down_drops_cache(resolver):
+    fake = FakeBackend(up=set())
+    backend = CachingNetworkBackend(fake, NetworkStats(), ttl=60)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(httpcore.ConnectError):
+                await backend.connect_tcp("a.kz", 443)
+
+    asyncio.run(run())
+    assert fake.attempts == ["10.0.0.1", "10.0.0.2"] * 2
+    # Кэш сброшен после полного отказа — второй раз резолвим заново
+    assert resolver == ["a.kz", "a.kz"]
+
+
+def test_cache_expires_after_ttl(resolver):
+    backend = CachingNetworkBackend(FakeBackend(up={"10.0.0.1"}), NetworkStats(), ttl=0)
+
+    async def run():
+        await backend.connect_tcp("a.kz", 443)
+        await backend.connect_tcp("a.kz", 443)
+
+    asyncio.run(run())
+    assert resolver == ["a.kz", "a.kz"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"hello"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_client_goes_through_caching_backend(monkeypatch):
+    monkeypatch.setattr(crawler, "HTTP2_ENABLED", False)
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://localhost:{server.server_port}/"
+
+    async def run():
+        state = CrawlerState()
+        try:
+            first = await state.client.get(url)
+            second = await state.client.get(url)
+            with pytest.raises(httpx.ConnectError):
+                await state.client.get("http://127.0.0.1:1/")
+        finally:
+            await state.close()
+        return first, second, state.network_stats.stats()
+
+    try:
+        first, second, stats = asyncio.run(run())
+    finally:
+        server.shutdown()
+    assert first.text == second.text == "hello"
+    # Одно keep-alive соединение; localhost может дать и ::1 — тогда сработает переход к 127.0.0.1
+    assert stats["localhost"]["connects"] == 1
+    assert stats["localhost"]["dns_lookups"] == 1
@@ -0,0 +1,84 @@
+"""CrawlFrontier: stops on a page without new events, on an unchanged page and at max_pages."""
+import asyncio
+
+from services.frontier import CrawlFrontier
+
+KNOWN = {"https://a.kz/e/old"}
+
+
+def _site(pages):
+    """pages: url -> (события страницы, ссылки пагинации) или None (не изменилась)."""
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        if pages[url] is None:
+            return None
+        return url
+
+    async def handle(url, html):
+        events, links = pages[url]
+        return [{"url": u} for u in events], links
+
+    return fetched, fetch, handle
+
+
+def _crawl(pages, max_pages=10, workers=1):
+    fetched, fetch, handle = _site(pages)
+    frontier = CrawlFrontier("test", fetch, handle, lambda url: url in KNOWN, max_pages, workers=workers)
+    count = asyncio.run(frontier.crawl("https://a.kz/list"))
+    return frontier, fetched, count
+
+
+def test_follows_pagination_and_skips_visited():
+    pages = {
+        "https://a.kz/list": (["https://a.kz/e/1"], ["https://a.kz/list?page=2", "https://a.kz/list/#top"]),
+        "https://a.kz/list?page=2": (["https://a.kz/e/2"], ["https://a.kz/list", "https://a.kz/list?page=3/"]),
+        "https://a.kz/list?page=3/": (["https://a.kz/e/3"], []),
+    }
+    frontier, fetched, count = _crawl(pages)
+    # #top и завершающий / — та же страница, повторно не загружается
+    assert fetched == ["https://a.kz/list", "https://a.kz/list?page=2", "https://a.kz/list?page=3/"]
+    assert count == 3 and frontier.new_events == 3 and not frontier.stopped
+
+
+def test_stops_on_page_with_only_known_events():
+    pages = {
+        "https://a.kz/list": (["https://a.kz/e/1"], ["https://a.kz/list?page=2"]),
+        "https://a.kz/list?page=2": (["https://a.kz/e/old"], ["https://a.kz/list?page=3"]),
+        "https://a.kz/list?page=3": (["https://a.kz/e/3"], []),
+    }
+    frontier, fetched, count = _crawl(pages)
+    assert fetched == ["https://a.kz/list", "https://a.kz/list?page=2"]
+    assert count == 2 and frontier.new_events == 1 and frontier.stopped
+
+
+def test_stops_on_unchanged_page():
+    pages = {
+        "https://a.kz/list": (["https://a.kz/e/1"], ["https://a.kz/list?page=2"]),
+        "https://a.kz/list?page=2": None,
+    }
+    frontier, fetched, count = _crawl(pages)
+    assert fetched == ["https://a.kz/list", "https://a.kz/list?page=2"]
+    assert count == 1 and frontier.stopped
+
+
+def test_stops_at_max_pages():
+    pages = {
+        f"https://a.kz/list?page={i}": ([f"https://a.kz/e/{i}"], [f"https://a.kz/list?page={i + 1}"])
+        for i in range(1, 10)
+    }
+    pages["https://a.kz/list"] = (["https://a.kz/e/0"], ["https://a.kz/list?page=1"])
+    frontier, fetched, count = _crawl(pages, max_pages=3, workers=2)
+    assert count == 3 and len(fetched) == 3
+
+
+def test_failed_page_does_not_stop_the_others():
+    pages = {
+        "https://a.kz/list": (["https://a.kz/e/1"], ["https://a.kz/list?page=2", "https://a.kz/list?page=3"]),
+        "https://a.kz/list?page=3": (["https://a.kz/e/3"], []),
+    }
+    # page=2 нет в pages — fetch падает с KeyError
+    frontier, fetched, count = _crawl(pages)
+    assert "https://a.kz/list?page=3" in fetched
+    assert count == 2 and frontier.new_events == 2
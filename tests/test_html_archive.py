@@ -0,0 +1,134 @@
+"""HtmlArchive: store, read back, skip identical copies, dictionaries, serve as an httpx transport."""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from services import html_archive
+from services.html_archive import ArchiveTransport, HtmlArchive
+
+pytest.importorskip("zstandard")
+
+
+def _page(i: int) -> bytes:
+    return (
+        f"<html><head><title>Выставка {i}</title></head><body><div class='event-item'>"
+        f"<h3>Expo {i} 2026</h3><p>{'Описание выставки. ' * 20}</p></div></body></html>"
+    ).encode("utf-8")
+
+
+def test_store_and_read(tmp_path):
+    archive = HtmlArchive(tmp_path)
+    assert archive.store("parse_x", "https://x.kz/1", _page(1))
+    assert archive.store("parse_x", "https://x.kz/2", _page(2), "application/xml")
+    entries = list(archive.entries())
+    assert [e["url"] for e in entries] == ["https://x.kz/1", "https://x.kz/2"]
+    assert archive.read(entries[0]) == _page(1)
+    assert entries[1]["type"] == "application/xml"
+    assert archive.sources() == ["parse_x"]
+
+
+def test_identical_copy_is_not_stored_again(tmp_path):
+    archive = HtmlArchive(tmp_path)
+    assert archive.store("parse_x", "https://x.kz/1", _page(1))
+    assert not archive.store("parse_x", "https://x.kz/1", _page(1))
+    assert archive.store("parse_x", "https://x.kz/1", _page(2))
+    # Последние копии перечитываются из индекса новым экземпляром
+    assert not HtmlArchive(tmp_path).store("parse_x", "https://x.kz/1", _page(2))
+    assert len(list(archive.entries())) == 2
+    assert archive.duplicates == 1
+
+
+def test_entries_until(tmp_path):
+    archive = HtmlArchive(tmp_path)
+    archive.store("parse_x", "https://x.kz/1", _page(1))
+    assert list(archive.entries(until=datetime.utcnow() - timedelta(days=1))) == []
+    assert len(list(archive.entries(["parse_x"], until=datetime.utcnow() + timedelta(days=1)))) == 1
+
+
+def test_dictionary_pages_read_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(html_archive, "HTML_ARCHIVE_DICT_MIN_SAMPLES", 10)
+    monkeypatch.setattr(html_archive, "HTML_ARCHIVE_DICT_SIZE", 4096)
+    archive = HtmlArchive(tmp_path)
+    for i in range(30):
+        archive.store("parse_x", f"https://x.kz/{i}", _page(i))
+    archive.maintain()
+    archive.store("parse_x", "https://x.kz/new", _page(100))
+
+    entries = list(HtmlArchive(tmp_path).entries())
+    assert entries[0]["dict"] == 0
+    assert entries[-1]["dict"] != 0
+    reader = HtmlArchive(tmp_path)
+    assert reader.read(entries[0]) == _page(0)
+    assert reader.read(entries[-1]) == _page(100)
+
+
+def test_training_does_not_block_writes(tmp_path, monkeypatch):
+    import threading
+    import zstandard
+
+    monkeypatch.setattr(html_archive, "HTML_ARCHIVE_DICT_MIN_SAMPLES", 10)
+    monkeypatch.setattr(html_archive, "HTML_ARCHIVE_DICT_SIZE", 4096)
+    archive = HtmlArchive(tmp_path)
+    for i in range(20):
+        archive.store("parse_x", f"https://x.kz/{i}", _page(i))
+    stored_while_training = []
+    train = zstandard.train_dictionary
+
+    def slow_train(*args, **kwargs):
+        writer = threading.Thread(target=lambda: stored_while_training.append(
+            archive.store("parse_x", "https://x.kz/during", _page(50))
+        ))
+        writer.start()
+        writer.join(timeout=5)
+        return train(*args, **kwargs)
+
+    monkeypatch.setattr(html_archive.zstandard, "train_dictionary", slow_train)
+    archive.maintain()
+    assert stored_while_training == [True]
+    entries = list(HtmlArchive(tmp_path).entries())
+    assert HtmlArchive(tmp_path).read(entries[-1]) == _page(50)
+
+
+def test_transport_serves_newest_copy(tmp_path):
+    archive = HtmlArchive(tmp_path)
+    archive.store("parse_x", "https://x.kz/1", _page(1))
+    archive.store("parse_x", "https://x.kz/1", _page(2))
+    transport = ArchiveTransport(archive)
+
+    async def fetch(url):
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get(url)
+
+    response = asyncio.run(fetch("https://x.kz/1"))
+    assert response.status_code == 200
+    assert response.content == _page(2)
+    assert asyncio.run(fetch("https://x.kz/missing")).status_code == 404
+    assert transport.hits == 1
+    assert transport.misses == ["https://x.kz/missing"]
+
+
+def test_archive_reparse_leaves_breakers_alone(tmp_path):
+    from database.engine import init_db
+    from services import source_health
+    from services.crawler import CrawlerState
+    from services.parser import EventParser
+
+    init_db()
+    transport = ArchiveTransport(HtmlArchive(tmp_path))
+
+    async def fetch_nothing():
+        raise httpx.HTTPStatusError("404 from the archive", request=None, response=None)
+
+    async def main():
+        state = CrawlerState(wrap_transport=lambda _: transport)
+        try:
+            parser = EventParser(use_cache=False, state=state, archive=False, track_health=False)
+            for _ in range(10):
+                await parser._safe_parse(fetch_nothing(), "archive_only_source")
+        finally:
+            await state.close()
+
+    asyncio.run(main())
+    assert all(h.source != "archive_only_source" for h in source_health.get_source_health())
@@ -0,0 +1,58 @@
+"""HttpCache: validators are staged per source and reach disk only on commit()."""
+from services.http_cache import HttpCache, content_fingerprint
+
+HEADERS = {"etag": '"v1"', "last-modified": "Sat, 17 Oct 2026 09:00:00 GMT"}
+
+
+def test_fingerprint_ignores_volatile_tokens():
+    a = '<html><meta name="csrf-token" content="aaa"><script nonce="1">x</script> <link href="/s.css?v=1700000000"></html>'
+    b = '<html><meta name="csrf-token" content="bbb"><script nonce="2">x</script>\n  <link href="/s.css?v=1800000000"></html>'
+    assert content_fingerprint(a) == content_fingerprint(b)
+    assert content_fingerprint(a) != content_fingerprint(a.replace("x", "y"))
+
+
+def test_staged_entry_is_visible_but_not_on_disk(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.stage("https://a.kz/events", HEADERS, "fp", "parse_a")
+    assert cache.conditional_headers("https://a.kz/events") == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Sat, 17 Oct 2026 09:00:00 GMT",
+    }
+    assert cache.is_unchanged("https://a.kz/events", "fp")
+    assert HttpCache(tmp_path).get("https://a.kz/events") is None
+
+
+def test_commit_writes_entries(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.stage("https://a.kz/events", HEADERS, "fp", "parse_a")
+    assert cache.commit() == 1
+    reopened = HttpCache(tmp_path)
+    assert reopened.is_unchanged("https://a.kz/events", "fp")
+    assert not reopened.is_unchanged("https://a.kz/events", "other")
+    assert cache.commit() == 0
+
+
+def test_commit_and_discard_per_source(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.stage("https://a.kz/events", HEADERS, "fp-a", "parse_a")
+    cache.stage("https://b.kz/events", HEADERS, "fp-b", "parse_b")
+    cache.stage("https://c.kz/events", HEADERS, "fp-c", "parse_c")
+    cache.discard(["parse_b"])
+    assert cache.commit(["parse_a"]) == 1
+    reopened = HttpCache(tmp_path)
+    assert reopened.get("https://a.kz/events")["fingerprint"] == "fp-a"
+    assert reopened.get("https://b.kz/events") is None
+    assert reopened.get("https://c.kz/events") is None
+    # parse_c ещё ждёт своего commit
+    assert cache.get("https://c.kz/events")["fingerprint"] == "fp-c"
+    cache.discard()
+    assert cache.get("https://c.kz/events") is None
+    assert cache.commit() == 0
+
+
+def test_broken_entry_is_ignored(tmp_path):
+    cache = HttpCache(tmp_path)
+    cache.stage("https://a.kz/events", HEADERS, "fp")
+    cache.commit()
+    cache._path("https://a.kz/events").write_text("{not json", encoding="utf-8")
+    assert HttpCache(tmp_path).get("https://a.kz/events") is None
@@ -0,0 +1,68 @@
+"""Image downloads through EventParser._get(consume=...) and the background queue."""
+import asyncio
+
+import httpx
+import pytest
+
+from database.engine import init_db
+from services import parser as parser_module
+from services.crawler import CrawlerState
+from services.images import ImageDownloadQueue
+from services.parser import EventParser
+
+
+@pytest.fixture
+def no_backoff(monkeypatch, tmp_path):
+    monkeypatch.setattr(parser_module, "HTTP_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.chdir(tmp_path)
+    init_db()
+
+
+def _run_with(handler, body):
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        return handler(request)
+
+    async def main():
+        state = CrawlerState(wrap_transport=lambda _: httpx.MockTransport(record))
+        try:
+            parser = EventParser(use_cache=False, state=state, archive=False)
+            return await body(parser)
+        finally:
+            await state.close()
+
+    return asyncio.run(main()), requests
+
+
+def test_fetch_image_gives_none_after_503_retries(no_backoff):
+    result, requests = _run_with(
+        lambda request: httpx.Response(503),
+        lambda parser: parser._fetch_image("https://img.x.kz/a.jpg"),
+    )
+    assert result is None
+    assert len(requests) == parser_module.HTTP_MAX_RETRIES + 1
+
+
+def test_queue_counts_permanent_503_once_as_failed(no_backoff):
+    async def body(parser):
+        queue = ImageDownloadQueue(parser, workers=1)
+        queue.start()
+        await queue.submit("https://x.kz/e1", ["https://img.x.kz/a.jpg"])
+        await queue.join(timeout=10)
+        return queue
+
+    queue, _ = _run_with(lambda request: httpx.Response(503), body)
+    assert queue.downloaded == 0
+    assert queue.failed == 1
+    assert queue.take_landed("https://x.kz/e1") is None
+
+
+def test_other_error_status_is_not_retried(no_backoff):
+    result, requests = _run_with(
+        lambda request: httpx.Response(404),
+        lambda parser: parser._fetch_image("https://img.x.kz/missing.jpg"),
+    )
+    assert result is None
+    assert len(requests) == 1
@@ -0,0 +1,113 @@
+"""Image GC: mark reconciles links and refcounts with events, sweep respects the grace period."""
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from database.engine import SessionLocal, init_db
+from database.models import Event, EventImage, ImageBlob, ImageSource
+from services import image_gc, image_store
+
+OLD = datetime.utcnow() - timedelta(hours=image_gc.IMAGE_GC_GRACE_HOURS + 1)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(image_gc, "IMAGE_GC_PAUSE", 0)
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    db = SessionLocal()
+    for model in (EventImage, ImageSource, ImageBlob, Event):
+        db.query(model).delete()
+    db.commit()
+    db.close()
+
+
+def _store(data: bytes, url: str) -> str:
+    image_store.IMAGES_DIR.mkdir(exist_ok=True)
+    tmp = image_store.IMAGES_DIR / ".download-test.tmp"
+    tmp.write_bytes(data)
+    return image_store._register(tmp, hashlib.sha256(data).hexdigest(), ".png", len(data), url)
+
+
+def _age(path, created=True):
+    """Сделать файл (и запись блоба) старше срока ожидания."""
+    old = time.time() - (image_gc.IMAGE_GC_GRACE_HOURS + 1) * 3600
+    os.utime(path, (old, old))
+    if created:
+        db = SessionLocal()
+        db.query(ImageBlob).filter(ImageBlob.path == str(path)).update({"created_at": OLD})
+        db.commit()
+        db.close()
+
+
+def _collect():
+    return asyncio.run(image_gc.collect_garbage())
+
+
+def test_mark_drops_links_of_missing_events_after_grace(store):
+    kept = _store(b"\x89PNG kept", "https://a.kz/kept.png")
+    dangling = _store(b"\x89PNG dangling", "https://a.kz/dangling.png")
+    waiting = _store(b"\x89PNG waiting", "https://a.kz/waiting.png")
+    db = SessionLocal()
+    db.add(Event(title="Expo", url="https://a.kz/e/1"))
+    db.commit()
+    db.close()
+    image_store.link("https://a.kz/e/1", kept)
+    image_store.link("https://a.kz/e/gone", dangling)
+    # Изображение пришло раньше события — ссылка моложе срока ждёт сохранения
+    image_store.link("https://a.kz/e/later", waiting)
+    db = SessionLocal()
+    db.query(EventImage).filter(EventImage.event_url == "https://a.kz/e/gone").update({"linked_at": OLD})
+    db.query(ImageBlob).filter(ImageBlob.path == kept).update({"refcount": 5})
+    db.commit()
+    db.close()
+    for path in (kept, dangling, waiting):
+        _age(path)
+
+    report = _collect()
+
+    assert report["links_dropped"] == 1
+    assert report["blobs_deleted"] == 1
+    assert report["refcounts_fixed"] == 1
+    assert Path(kept).exists() and Path(waiting).exists()
+    assert not Path(dangling).exists()
+    db = SessionLocal()
+    try:
+        assert {l.event_url for l in db.query(EventImage)} == {"https://a.kz/e/1", "https://a.kz/e/later"}
+        assert db.query(ImageBlob).filter(ImageBlob.path == kept).one().refcount == 1
+        assert db.query(ImageSource).count() == 2
+    finally:
+        db.close()
+
+
+def test_sweep_deletes_only_old_unowned_files(store):
+    live = _store(b"\x89PNG live", "https://a.kz/live.png")
+    image_store.link("https://a.kz/e/later", live)
+    rendition = Path(live).with_suffix(".card.webp")
+    rendition.write_bytes(b"card")
+    legacy = image_store.IMAGES_DIR / "legacy.jpg"
+    legacy.write_bytes(b"legacy")
+    db = SessionLocal()
+    db.add(Event(title="Legacy expo", url="https://a.kz/e/legacy", image_url=str(legacy)))
+    db.commit()
+    db.close()
+    stray_old = image_store.IMAGES_DIR / "stray.jpg"
+    stray_old.write_bytes(b"old")
+    stray_new = image_store.IMAGES_DIR / "fresh.jpg"
+    stray_new.write_bytes(b"fresh")
+    partial = image_store.IMAGES_DIR / f".{Path(live).stem}.card.webp.tmp"
+    partial.write_bytes(b"partial")
+    for path in (live, rendition, legacy, stray_old, partial):
+        _age(path, created=False)
+
+    report = _collect()
+
+    assert report["files_deleted"] == 2
+    assert report["bytes_reclaimed"] == len(b"old") + len(b"partial")
+    assert not stray_old.exists() and not partial.exists()
+    assert Path(live).exists() and rendition.exists() and legacy.exists() and stray_new.exists()
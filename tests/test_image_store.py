@@ -0,0 +1,74 @@
+"""Image store refcounts: link/release keep blobs while any event uses them."""
+import hashlib
+from pathlib import Path
+
+import pytest
+
+from database.engine import SessionLocal, init_db
+from database.models import EventImage, ImageBlob, ImageSource
+from services import image_store
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    init_db()
+    db = SessionLocal()
+    for model in (EventImage, ImageSource, ImageBlob):
+        db.query(model).delete()
+    db.commit()
+    db.close()
+
+
+def _store(data: bytes, url: str) -> str:
+    image_store.IMAGES_DIR.mkdir(exist_ok=True)
+    tmp = image_store.IMAGES_DIR / ".download-test.tmp"
+    tmp.write_bytes(data)
+    return image_store._register(tmp, hashlib.sha256(data).hexdigest(), ".png", len(data), url)
+
+
+def _refcount(path: str):
+    db = SessionLocal()
+    try:
+        blob = db.query(ImageBlob).filter(ImageBlob.path == path).first()
+        return blob.refcount if blob else None
+    finally:
+        db.close()
+
+
+def test_same_bytes_share_one_blob(store):
+    first = _store(b"\x89PNG same", "https://a.kz/1.png")
+    second = _store(b"\x89PNG same", "https://b.kz/copy.png")
+    assert first == second
+    assert image_store.lookup_url("https://b.kz/copy.png") == first
+
+
+def test_link_and_release_count_events(store):
+    path = _store(b"\x89PNG shared", "https://a.kz/shared.png")
+    card = Path(path).with_suffix(".card.webp")
+    card.write_bytes(b"card")
+    image_store.link("https://a.kz/e/1", path)
+    # Повторная привязка того же изображения счётчик не меняет и блоб не освобождает
+    image_store.link("https://a.kz/e/1", path)
+    assert _refcount(path) == 1 and Path(path).exists()
+    image_store.link("https://a.kz/e/2", path)
+    assert _refcount(path) == 2
+
+    assert image_store.release("https://a.kz/e/1")
+    assert _refcount(path) == 1 and Path(path).exists()
+
+    assert image_store.release("https://a.kz/e/2")
+    # Последняя ссылка снята — блоб, его источники и производные файлы удалены
+    assert _refcount(path) is None
+    assert not Path(path).exists() and not card.exists()
+    assert image_store.lookup_url("https://a.kz/shared.png") is None
+    assert not image_store.release("https://a.kz/e/2")
+
+
+def test_relink_releases_previous_image(store):
+    old = _store(b"\x89PNG old", "https://a.kz/old.png")
+    new = _store(b"\x89PNG new", "https://a.kz/new.png")
+    image_store.link("https://a.kz/e/1", old)
+    image_store.link("https://a.kz/e/1", new)
+    assert _refcount(new) == 1
+    assert _refcount(old) is None and not Path(old).exists()
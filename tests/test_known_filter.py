@@ -0,0 +1,91 @@
+"""BloomFilter and KnownEvents: no false negatives, positives confirmed by the DB, rebuild on drift."""
+import pytest
+
+from database.engine import SessionLocal, init_db
+from database.models import Event
+from services.known_filter import BloomFilter, KnownEvents
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"url:https://x.kz/e{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_false_positive_rate_is_near_target():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"in:{i}")
+    false_positives = sum(f"out:{i}" in bloom for i in range(10000))
+    assert false_positives / 10000 < 0.03
+
+
+def test_bloom_from_saved_bits():
+    bloom = BloomFilter(100, 0.01)
+    bloom.add("a")
+    copy = BloomFilter(100, 0.01, bytearray(bloom.bits))
+    assert "a" in copy
+    assert (copy.size, copy.hashes) == (bloom.size, bloom.hashes)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    session.query(Event).delete()
+    session.commit()
+    yield session
+    session.query(Event).delete()
+    session.commit()
+    session.close()
+
+
+def _store(db, i):
+    event = Event(title=f"Event {i}", url=f"https://x.kz/e{i}", event_hash=f"hash{i}")
+    db.add(event)
+    db.commit()
+    return event
+
+
+def test_known_events_round_trip(db, tmp_path):
+    for i in range(3):
+        _store(db, i)
+    known = KnownEvents(tmp_path / "known.bloom")
+    known.sync()
+    assert known.is_known_url("https://x.kz/e1", db)
+    assert known.is_known_hash("hash2", db)
+    assert not known.is_known_url("https://x.kz/new", db)
+
+    event = _store(db, 3)
+    known.add(event)
+    assert known.is_known_url("https://x.kz/e3", db)
+    known.save()
+
+    reloaded = KnownEvents(tmp_path / "known.bloom")
+    reloaded.sync()
+    # Файл соответствует таблице — загружен без пересборки
+    assert not reloaded.dirty
+    assert reloaded.is_known_hash("hash3", db)
+
+
+def test_known_events_rebuilds_after_delete(db, tmp_path):
+    for i in range(3):
+        _store(db, i)
+    known = KnownEvents(tmp_path / "known.bloom")
+    known.sync()
+    db.query(Event).filter(Event.url == "https://x.kz/e0").delete()
+    db.commit()
+    known.sync()
+    assert known.events == 2
+    assert not known.is_known_url("https://x.kz/e0", db)
+
+
+def test_positive_is_confirmed_by_db(db, tmp_path):
+    known = KnownEvents(tmp_path / "known.bloom")
+    known.sync()
+    # Ключ есть в фильтре, но не в таблице — ложное срабатывание, не «известное» событие
+    known.bloom.add("url:https://x.kz/ghost")
+    assert not known.is_known_url("https://x.kz/ghost", db)
+    assert known.stats()["false_positives"] == 1
@@ -0,0 +1,117 @@
+"""IngestPipeline: crawl state of failed sources is not committed; stored descriptions are read once."""
+import asyncio
+
+import httpx
+import pytest
+
+from database.engine import SessionLocal, init_db
+from database.models import Event
+from services import crawler
+from services import parser as parser_module
+from services import pipeline as pipeline_module
+from services.crawler import CrawlerState
+from services.http_cache import HttpCache
+from services.parser import EventParser
+from services.pipeline import IngestPipeline
+
+HEADERS = {"etag": '"v1"'}
+DESCRIPTION = "Международная выставка строительных материалов и технологий в Алматы"
+
+
+def _event(url, title, description=DESCRIPTION):
+    return {"url": url, "title": title, "description": description, "city": "Алматы",
+            "country": "Казахстан", "source": url.split("/")[2]}
+
+
+class StubParser(EventParser):
+    """Парсер без обхода: партии источников заданы заранее, листинги «загружены» в кэш."""
+
+    def __init__(self, batches, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = batches
+
+    def select_sources(self, sources=None, budget=True):
+        return list(self.batches)
+
+    async def stream_sources(self, sources, on_result):
+        for name in sources:
+            self.http_cache.stage(f"https://{name}.kz/events", HEADERS, f"fp-{name}", name)
+            await on_result(name, self.batches[name])
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(parser_module, "HTTP_CACHE_DIR", tmp_path / "http_cache")
+    monkeypatch.setattr(crawler, "PARSE_WORKERS", 0)
+    monkeypatch.setattr(pipeline_module, "CHECKPOINTS_ENABLED", False)
+    init_db()
+    db = SessionLocal()
+    db.query(Event).delete()
+    db.commit()
+    db.close()
+    return tmp_path
+
+
+def _run(batches):
+    async def main():
+        state = CrawlerState(wrap_transport=lambda _: httpx.MockTransport(lambda r: httpx.Response(404)))
+        try:
+            parser = StubParser(batches, use_cache=True, state=state, archive=False)
+            pipeline = IngestPipeline(None, parser, use_ai=False)
+            await pipeline.run()
+            return pipeline
+        finally:
+            await state.close()
+
+    return asyncio.run(main())
+
+
+def test_crawl_state_committed_only_for_sources_that_did_not_fail(env, monkeypatch):
+    real_extract = pipeline_module.extract_event_structured
+
+    async def extract(title, desc, url, **kwargs):
+        if "parse_b" in url:
+            raise RuntimeError("AI down")
+        return await real_extract(title, desc, url, **kwargs)
+
+    monkeypatch.setattr(pipeline_module, "extract_event_structured", extract)
+    pipeline = _run({
+        "parse_a": [_event("https://parse_a.kz/e/1", "Build Expo 2026")],
+        "parse_b": [_event("https://parse_b.kz/e/1", "Food Expo 2026", "Выставка продуктов питания и напитков, Астана")],
+    })
+
+    assert pipeline.persisted == 1
+    assert pipeline._failed_sources == {"parse_b"}
+    cache = HttpCache(env / "http_cache")
+    assert cache.get("https://parse_a.kz/events") is not None
+    # Событие parse_b не сохранилось — его листинг загрузится заново в следующем цикле
+    assert cache.get("https://parse_b.kz/events") is None
+
+
+def test_stored_descriptions_loaded_once_per_cycle(env, monkeypatch):
+    db = SessionLocal()
+    db.add(Event(title="Build Expo 2025", url="https://old.kz/e/1", description=DESCRIPTION + " 2025"))
+    db.commit()
+    db.close()
+    loads = []
+    real_known = IngestPipeline._known_descriptions
+
+    def known(self, db):
+        if self._stored_descriptions is None:
+            loads.append(1)
+        return real_known(self, db)
+
+    monkeypatch.setattr(IngestPipeline, "_known_descriptions", known)
+    pipeline = _run({
+        "parse_a": [_event("https://parse_a.kz/e/1", "Build Expo 2026")],
+        "parse_b": [
+            _event("https://parse_b.kz/e/1", "Food Expo 2026", "Выставка продуктов питания и напитков, Астана"),
+            _event("https://parse_b.kz/e/2", "Agro Expo 2026", "Сельскохозяйственная выставка техники и удобрений"),
+        ],
+    })
+
+    # Похожее на сохранённое описание отсечено, остальные сохранены, БД прочитана один раз
+    assert pipeline.persisted == 2
+    assert loads == [1]
+    assert len(pipeline._stored_descriptions) == 3
@@ -0,0 +1,99 @@
+"""HostLimiter: concurrency window, AIMD, Retry-After and waiter hand-over."""
+import asyncio
+
+from services.rate_limit import HostLimiter, RateLimiter, parse_retry_after
+
+
+def _limiter(concurrency=2, max_concurrency=4, rate=1000.0, burst=1000):
+    return HostLimiter("example.com", rate, burst, concurrency, max_concurrency)
+
+
+def test_slot_caps_in_flight_requests():
+    limiter = _limiter(concurrency=2)
+    peak = 0
+
+    async def request():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(request() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.in_flight == 0
+    assert limiter.requests == 10
+    assert limiter.queued == 0
+
+
+def test_aimd_window():
+    limiter = _limiter(concurrency=2, max_concurrency=4)
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.limit == 4
+    limiter.on_throttle(None, 0.0)
+    assert limiter.limit == 2
+    assert limiter.throttled == 1
+
+
+def test_throttle_blocks_host():
+    limiter = _limiter()
+    limiter.on_throttle(30.0, 1.0)
+    assert limiter.blocked_until > 0
+
+
+def test_token_bucket_paces_requests():
+    limiter = _limiter(concurrency=4, rate=50.0, burst=1)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(4):
+            async with limiter.slot():
+                pass
+        return loop.time() - started
+
+    # Один токен сразу, остальные три — по 1/50 с
+    assert asyncio.run(main()) >= 0.05
+
+
+def test_cancelled_waiter_passes_wake_up_on():
+    limiter = _limiter(concurrency=1)
+
+    async def main():
+        await limiter._acquire_slot()
+        second = asyncio.create_task(limiter._acquire_slot())
+        third = asyncio.create_task(limiter._acquire_slot())
+        await asyncio.sleep(0)
+        # Слот освобождается, second разбужен, но отменён раньше, чем успел его занять
+        limiter.in_flight -= 1
+        limiter._wake()
+        second.cancel()
+        await asyncio.wait_for(third, 1)
+        assert second.cancelled()
+        assert limiter.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_listing_p95_needs_samples():
+    limiter = _limiter()
+    assert limiter.listing_p95() is None
+    for i in range(1, 21):
+        limiter.record_listing_latency(i / 10)
+    assert limiter.listing_p95() >= 1.8
+
+
+def test_rate_limiter_keeps_one_limiter_per_host():
+    limiter = RateLimiter()
+    assert limiter.for_host("a.kz") is limiter.for_host("a.kz")
+    assert limiter.for_host("a.kz") is not limiter.for_host("b.kz")
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
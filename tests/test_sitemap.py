@@ -0,0 +1,116 @@
+"""Sitemap parsing, lastmod diffing and incremental discovery (services/sitemap.py, parse_sitemap_source)."""
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+from database.engine import SessionLocal, init_db
+from database.models import Event
+from services import sitemap
+from services.crawler import CrawlerState
+from services.known_filter import get_known_events
+from services.parser import EventParser
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://expo.kz/event/a/</loc><lastmod>2026-10-01</lastmod></url>
+  <url><loc>https://expo.kz/event/b/</loc></url>
+  <url><lastmod>2026-10-01</lastmod></url>
+</urlset>"""
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://expo.kz/sitemap-events.xml</loc><lastmod>2026-10-02</lastmod></sitemap>
+</sitemapindex>"""
+
+
+@pytest.fixture(autouse=True)
+def db():
+    init_db()
+
+
+def test_parse_urlset():
+    pages, children = sitemap.parse_sitemap(URLSET)
+    assert pages == [("https://expo.kz/event/a/", "2026-10-01"), ("https://expo.kz/event/b/", None)]
+    assert children == []
+
+
+def test_parse_index():
+    pages, children = sitemap.parse_sitemap(INDEX)
+    assert pages == []
+    assert children == [("https://expo.kz/sitemap-events.xml", "2026-10-02")]
+
+
+def test_parse_gzip():
+    assert sitemap.parse_sitemap(gzip.compress(URLSET)) == sitemap.parse_sitemap(URLSET)
+
+
+def test_gunzip_is_bounded():
+    bomb = gzip.compress(b" " * 1_000_000)
+    assert len(sitemap._gunzip(bomb, 1_000_000)) == 1_000_000
+    with pytest.raises(ValueError):
+        sitemap._gunzip(bomb, 100_000)
+    with pytest.raises(ValueError):
+        sitemap._gunzip(gzip.compress(URLSET), 10)
+
+
+def test_changed_entries():
+    entries = [("https://diff.kz/1", "2026-01-01"), ("https://diff.kz/2", "2026-01-01"), ("https://diff.kz/3", None)]
+    assert sitemap.changed_entries(entries) == entries
+    sitemap.save_lastmods(entries, "diff.kz")
+    assert sitemap.get_lastmods(["https://diff.kz/1", "https://diff.kz/new"]) == {"https://diff.kz/1": "2026-01-01"}
+    # Изменился только lastmod второй записи; запись без lastmod после обработки не перечитывается
+    updated = [("https://diff.kz/1", "2026-01-01"), ("https://diff.kz/2", "2026-02-01"), ("https://diff.kz/3", None)]
+    assert sitemap.changed_entries(updated) == [("https://diff.kz/2", "2026-02-01")]
+
+
+def test_sitemap_source_skips_stored_events():
+    stored_url = "https://known.kz/event/stored/"
+    db = SessionLocal()
+    try:
+        db.add(Event(title="Stored expo 2026", url=stored_url))
+        db.commit()
+    finally:
+        db.close()
+    # Как в начале цикла: фильтр мог быть построен предыдущими тестами
+    get_known_events().sync()
+    body = (
+        '<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<url><loc>{stored_url}</loc><lastmod>2026-10-05</lastmod></url>'
+        '<url><loc>https://known.kz/event/new/</loc><lastmod>2026-10-05</lastmod></url>'
+        '</urlset>'
+    ).encode()
+    fetched = []
+
+    def handler(request):
+        fetched.append(str(request.url))
+        if request.url.path == "/sitemap.xml":
+            return httpx.Response(200, content=body, headers={"content-type": "application/xml"})
+        return httpx.Response(200, html="<html><head><title>Новая выставка 2026</title></head></html>")
+
+    async def main():
+        state = CrawlerState(wrap_transport=lambda _: httpx.MockTransport(handler))
+        try:
+            parser = EventParser(use_cache=False, state=state, archive=False)
+            await parser.parse_sitemap_source("known.kz", "https://known.kz/sitemap.xml")
+            # До сохранения событий цикла lastmod не записывается
+            assert sitemap.get_lastmods([stored_url]) == {}
+            parser.commit_crawl_state()
+        finally:
+            await state.close()
+
+    asyncio.run(main())
+    assert stored_url not in fetched
+    assert "https://known.kz/event/new/" in fetched
+    assert sitemap.get_lastmods([stored_url, "https://known.kz/event/new/"]) == {
+        stored_url: "2026-10-05",
+        "https://known.kz/event/new/": "2026-10-05",
+    }
+
+
+def test_failed_source_does_not_record_lastmods():
+    parser = EventParser(use_cache=False, state=CrawlerState(), archive=False)
+    parser._stage_lastmods([("https://failed.kz/1", "2026-10-01")], "failed.kz")
+    parser.commit_crawl_state(["failed.kz"])
+    assert sitemap.get_lastmods(["https://failed.kz/1"]) == {}
@@ -0,0 +1,47 @@
+"""Declarative specs (services/source_specs.py) against the output of the BeautifulSoup parsers they replaced.
+
+tests/fixtures/specs/<spec>.json holds the records the old extract_<spec>
+produced for <spec>.html; dates are ISO strings.
+"""
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import FIXTURES
+from services.extraction import EventExtractor
+from services.source_specs import SOURCE_SPECS, compile_spec
+
+SPECS_DIR = FIXTURES / "specs"
+
+
+def _load(name):
+    html = (SPECS_DIR / f"{name}.html").read_text(encoding="utf-8")
+    expected = json.loads((SPECS_DIR / f"{name}.json").read_text(encoding="utf-8"))
+    return html, expected
+
+
+def _plain(records):
+    return [{k: v.isoformat() if isinstance(v, datetime) else v for k, v in r.items()} for r in records]
+
+
+@pytest.mark.parametrize("name", sorted(p.stem for p in SPECS_DIR.glob("*.html")))
+def test_spec_matches_legacy_parser(name):
+    html, expected = _load(name)
+    events = EventExtractor().extract_with_spec(name, html, expected["url"], *expected["args"])
+    assert _plain(events) == expected["events"]
+
+
+def test_every_spec_has_a_fixture():
+    assert set(SOURCE_SPECS) == {p.stem for p in SPECS_DIR.glob("*.html")}
+
+
+def test_every_spec_compiles():
+    for name in SOURCE_SPECS:
+        assert compile_spec(name) is compile_spec(name)
+
+
+def test_empty_and_broken_html():
+    extractor = EventExtractor()
+    assert extractor.extract_with_spec("generic", "", "https://x.kz/", "x.kz", "Казахстан") == []
+    assert extractor.extract_with_spec("astanahub", "<html><body><div", "https://astanahub.com/") == []